@@ -18,22 +18,27 @@ Rol: PIBADataScientist
 aws-azure-login --configure --profile default
 aws-azure-login --profile default --mode=gui
 """
-import boto3
-import awswrangler as wr
 import pandas as pd
 from datetime import datetime
 from calendar import monthrange
 import os
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+import sys
+from openpyxl.utils import get_column_letter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))  # Raiz del repo (paquete comun)
+from comun.contexto import ContextoAthena
+from comun.athena import ejecutar_query
+from comun.particiones import filtro_particiones
+from comun.reporte_excel import LibroExcel
 
 # ==================== CONFIGURACION ====================
 CONFIG = {
     'region': 'us-east-1',
     'workgroup': 'Production-caba-piba-athena-boti-group',
     'database': 'caba-piba-consume-zone-db',
-    'output_folder': 'output',
-    'config_file': '../config_fechas.txt'  # Config centralizado en raiz del proyecto
+    'output_folder': os.path.join(SCRIPT_DIR, 'output'),
+    'config_file': os.path.join(SCRIPT_DIR, '..', 'config_fechas.txt')  # Config centralizado en raiz del proyecto
 }
 
 # ==================== FUNCIONES ====================
@@ -149,72 +154,16 @@ def get_month_abbr(mes):
     }
     return meses.get(mes, 'mes')
 
-def build_partition_filter(fecha_inicio, fecha_fin):
-    """
-    Construye un filtro WHERE basado en las PARTICIONES year/month/day de la tabla.
-    Replica exactamente el criterio del Excel original que usa estas particiones
-    (NO session_creation_time).
-
-    Las particiones son strings SIN leading zeros (ej: month='3', day='10').
-    Para rangos parciales de mes se castea day a INTEGER asi el BETWEEN funciona
-    numericamente (sino '9' > '10' lexicograficamente).
-    """
-    inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d')
-    fin = datetime.strptime(fecha_fin, '%Y-%m-%d')
-
-    # CASO 1: mismo año, mismo mes
-    if inicio.year == fin.year and inicio.month == fin.month:
-        # Si abarca el mes completo (1 al ultimo dia), no necesito filtro de day
-        ultimo_dia_mes = monthrange(inicio.year, inicio.month)[1]
-        if inicio.day == 1 and fin.day == ultimo_dia_mes:
-            return "year='{0}' AND month='{1}'".format(inicio.year, inicio.month)
-        return ("year='{0}' AND month='{1}' "
-                "AND CAST(day AS INTEGER) BETWEEN {2} AND {3}").format(
-            inicio.year, inicio.month, inicio.day, fin.day
-        )
-
-    # CASO 2: rango cruzando varios meses --> armar OR de bloques mensuales
-    bloques = []
-    cur_year, cur_month = inicio.year, inicio.month
-    while (cur_year, cur_month) <= (fin.year, fin.month):
-        es_primero = (cur_year == inicio.year and cur_month == inicio.month)
-        es_ultimo = (cur_year == fin.year and cur_month == fin.month)
-        ultimo_dia_mes = monthrange(cur_year, cur_month)[1]
-
-        if es_primero and inicio.day > 1:
-            bloque = ("(year='{0}' AND month='{1}' "
-                      "AND CAST(day AS INTEGER) >= {2})").format(
-                cur_year, cur_month, inicio.day
-            )
-        elif es_ultimo and fin.day < ultimo_dia_mes:
-            bloque = ("(year='{0}' AND month='{1}' "
-                      "AND CAST(day AS INTEGER) <= {2})").format(
-                cur_year, cur_month, fin.day
-            )
-        else:
-            # mes completo
-            bloque = "(year='{0}' AND month='{1}')".format(cur_year, cur_month)
-
-        bloques.append(bloque)
-
-        # avanzar al mes siguiente
-        if cur_month == 12:
-            cur_year += 1
-            cur_month = 1
-        else:
-            cur_month += 1
-
-    return '(' + ' OR '.join(bloques) + ')'
-
 def build_query(fecha_inicio, fecha_fin):
     """
     Construye la query de Sesiones BAX (canal webchat - BAX - App).
 
     IMPORTANTE: el filtro de fecha usa las PARTICIONES year/month/day para
     replicar exactamente el numero que da el Excel original (que tambien
-    filtra por esas particiones, no por session_creation_time).
+    filtra por esas particiones, no por session_creation_time). Por eso usa
+    filtro_particiones() exacto, sin margen ni filtro de timestamp.
     """
-    filtro_particion = build_partition_filter(fecha_inicio, fecha_fin)
+    filtro_particion = filtro_particiones(fecha_inicio, fecha_fin)
 
     query = """SELECT year, month, day, channel_id, channel_name,
        count(distinct s.session_id) AS Cant_sess
@@ -250,41 +199,20 @@ def create_excel(filepath, df, total_sesiones, descripcion, modo, mes, anio, fec
     """
     print("    [INFO] Creando Excel...")
 
-    wb = openpyxl.Workbook()
-
-    # Estilos
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, size=11, color="FFFFFF")
-    bold_font = Font(bold=True, size=11)
-    card_font = Font(bold=True, size=12)
-    card_value_font = Font(bold=True, size=14)
+    libro = LibroExcel()
 
     # ===== HOJA 1: Resumen =====
-    ws = wb.active
-    ws.title = 'Resumen'
-
-    ws['A1'] = 'Sesiones BAX (webchat - BAX - App)'
-    ws['A1'].font = card_font
-    ws['B1'] = int(total_sesiones)
-    ws['B1'].font = card_value_font
-    ws['B1'].number_format = '#,##0'
-
-    ws['A2'] = 'Periodo: {}'.format(descripcion)
-    ws['A2'].font = Font(size=10, italic=True)
-
-    ws['A3'] = 'Fecha inicio'
-    ws['B3'] = fecha_inicio
-    ws['A4'] = 'Fecha fin'
-    ws['B4'] = fecha_fin
-
-    ws.column_dimensions['A'].width = 40
-    ws.column_dimensions['B'].width = 20
+    ws = libro.hoja('Resumen', anchos={'A': 40, 'B': 20})
+    ws.fila(('Sesiones BAX (webchat - BAX - App)', 'tarjeta'), (int(total_sesiones), 'tarjeta_valor'))
+    ws.fila(('Periodo: {}'.format(descripcion), 'nota'))
+    ws.fila('Fecha inicio', fecha_inicio)
+    ws.fila('Fecha fin', fecha_fin)
 
     # ===== HOJA 2: Detalle diario =====
-    ws2 = wb.create_sheet('Detalle diario')
-
-    # Construir DataFrame diario (sumando por fecha por si hubiera multiples channel_id/name)
     if len(df) > 0:
+        ws2 = libro.hoja('Detalle diario', anchos={'A': 15, 'B': 20})
+
+        # Construir DataFrame diario (sumando por fecha por si hubiera multiples channel_id/name)
         df_dia = df.copy()
         # Armar columna fecha desde year/month/day
         df_dia['Fecha'] = pd.to_datetime(
@@ -300,114 +228,55 @@ def create_excel(filepath, df, total_sesiones, descripcion, modo, mes, anio, fec
         df_dia_agg.columns = ['Fecha', 'Sesiones diarias']
         df_dia_agg = df_dia_agg.sort_values('Fecha').reset_index(drop=True)
 
-        # Headers
-        ws2['A1'] = 'Fecha'
-        ws2['B1'] = 'Sesiones diarias'
-        ws2['A1'].font = header_font
-        ws2['A1'].fill = header_fill
-        ws2['B1'].font = header_font
-        ws2['B1'].fill = header_fill
-
-        for idx, row in df_dia_agg.iterrows():
-            fila = 2 + idx
-            ws2['A{}'.format(fila)] = row['Fecha']
-            ws2['A{}'.format(fila)].number_format = 'DD/MM/YYYY'
-            ws2['B{}'.format(fila)] = int(row['Sesiones diarias'])
-            ws2['B{}'.format(fila)].number_format = '#,##0'
-
+        ws2.fila(('Fecha', 'encabezado'), ('Sesiones diarias', 'encabezado'))
+        ws2.filas(
+            [df_dia_agg['Fecha'], df_dia_agg['Sesiones diarias'].astype('int64')],
+            estilos=['fecha', 'miles']
+        )
         # Total
-        fila_total = 2 + len(df_dia_agg)
-        ws2['A{}'.format(fila_total)] = 'TOTAL'
-        ws2['A{}'.format(fila_total)].font = bold_font
-        ws2['B{}'.format(fila_total)] = int(df_dia_agg['Sesiones diarias'].sum())
-        ws2['B{}'.format(fila_total)].font = bold_font
-        ws2['B{}'.format(fila_total)].number_format = '#,##0'
-
-        ws2.column_dimensions['A'].width = 15
-        ws2.column_dimensions['B'].width = 20
+        ws2.fila(('TOTAL', 'negrita'), (int(df_dia_agg['Sesiones diarias'].sum()), 'negrita_miles'))
+    else:
+        libro.hoja('Detalle diario')
 
     # ===== HOJA 3: Crudo (mismas columnas que el CSV) =====
-    ws3 = wb.create_sheet('Crudo')
-
     if len(df) > 0:
         columnas = list(df.columns)
-        for col_idx, col_name in enumerate(columnas, start=1):
-            cell = ws3.cell(row=1, column=col_idx, value=col_name)
-            cell.font = header_font
-            cell.fill = header_fill
-
-        for r_idx, (_, row) in enumerate(df.iterrows(), start=2):
-            for c_idx, col_name in enumerate(columnas, start=1):
-                value = row[col_name]
-                cell = ws3.cell(row=r_idx, column=c_idx, value=value)
-                # Formato de miles para la columna de cantidad
-                if col_name.lower() == 'cant_sess':
-                    try:
-                        cell.value = int(value)
-                        cell.number_format = '#,##0'
-                    except (TypeError, ValueError):
-                        pass
-
         # Anchos basicos
-        for col_idx, col_name in enumerate(columnas, start=1):
-            letra = openpyxl.utils.get_column_letter(col_idx)
-            ws3.column_dimensions[letra].width = max(12, min(40, len(str(col_name)) + 2))
+        ws3 = libro.hoja('Crudo', anchos={
+            get_column_letter(col_idx): max(12, min(40, len(str(col_name)) + 2))
+            for col_idx, col_name in enumerate(columnas, start=1)
+        })
+        ws3.fila(*[(col_name, 'encabezado') for col_name in columnas])
+
+        valores, estilos = [], []
+        for col_name in columnas:
+            # Formato de miles para la columna de cantidad (si es numerica)
+            if col_name.lower() == 'cant_sess':
+                numeros = pd.to_numeric(df[col_name], errors='coerce')
+                if numeros.notna().all():
+                    valores.append(numeros.astype('int64'))
+                    estilos.append('miles')
+                    continue
+            valores.append(df[col_name])
+            estilos.append(None)
+        ws3.filas(valores, estilos)
+    else:
+        libro.hoja('Crudo')
 
-    wb.save(filepath)
+    libro.guardar(filepath)
     print("    [OK] Excel creado: {}".format(filepath))
 
-def check_aws_credentials():
-    """Verifica que las credenciales AWS esten configuradas y sean validas"""
-    try:
-        sts = boto3.client('sts', region_name=CONFIG['region'])
-        identity = sts.get_caller_identity()
-
-        user_arn = identity.get('Arn', '')
-
-        print("[OK] Credenciales AWS validas")
-        print("    ARN: {}".format(user_arn))
-
-        if 'PIBADataScientist' not in user_arn:
-            print("")
-            print("[ADVERTENCIA] No estas usando el rol correcto")
-            print("    Se requiere: PIBADataScientist")
-            if '/' in user_arn:
-                current_role = user_arn.split('/')[-2]
-            else:
-                current_role = 'desconocido'
-            print("    Tu rol actual: {}".format(current_role))
-            print("")
-            print("SOLUCION:")
-            print("    1. Ejecuta: aws-azure-login --profile default --mode=gui")
-            print("    2. Cuando te autentiques, SELECCIONA el rol: PIBADataScientist")
-            print("    3. Vuelve a ejecutar este script")
-            print("")
-            return False
-
-        return True
-
-    except Exception as e:
-        print("[ERROR] Error verificando credenciales: {}".format(str(e)))
-        if 'ExpiredToken' in str(e):
-            print("")
-            print("SOLUCION:")
-            print("    Tu sesión AWS expiró. Ejecuta:")
-            print("    aws-azure-login --profile default --mode=gui")
-            print("")
-        else:
-            print("")
-            print("SOLUCION:")
-            print("    1. Ejecuta: aws-azure-login --configure --profile default")
-            print("    2. Luego: aws-azure-login --profile default --mode=gui")
-            print("")
-        return False
-
-def execute_query_and_save():
-    """Funcion principal: ejecuta query y guarda resultados"""
+def execute_query_and_save(contexto=None):
+    """
+    Funcion principal: ejecuta query y guarda resultados
+    contexto: ContextoAthena compartido (run_all.py); si es None se crea uno propio
+    """
+    if contexto is None:
+        contexto = ContextoAthena(CONFIG['region'], CONFIG['workgroup'], CONFIG['database'])
 
     # Verificar credenciales
     print("Verificando credenciales AWS...")
-    if not check_aws_credentials():
+    if not contexto.verificar_credenciales():
         return None
 
     # Leer configuracion de fechas
@@ -441,35 +310,10 @@ def execute_query_and_save():
     print("    {}".format(query))
 
     try:
-        session = boto3.Session(region_name=CONFIG['region'])
-
         print("")
         print("Ejecutando consulta...")
 
-        try:
-            df = wr.athena.read_sql_query(
-                sql=query,
-                database=CONFIG['database'],
-                workgroup=CONFIG['workgroup'],
-                boto3_session=session,
-                ctas_approach=False,
-                unload_approach=False
-            )
-        except Exception as e:
-            if 'workgroup' in str(e).lower() or 'GetWorkGroup' in str(e):
-                print("")
-                print("[ADVERTENCIA] Error con workgroup '{}'".format(CONFIG['workgroup']))
-                print("    Intentando sin especificar workgroup...")
-
-                df = wr.athena.read_sql_query(
-                    sql=query,
-                    database=CONFIG['database'],
-                    boto3_session=session,
-                    ctas_approach=False,
-                    unload_approach=False
-                )
-            else:
-                raise e
+        df = ejecutar_query(contexto, query)
 
         print("")
         print("[OK] Consulta ejecutada exitosamente!")
@@ -573,6 +417,24 @@ def execute_query_and_save():
         traceback.print_exc()
         return None
 
+def consultas():
+    """
+    Queries que ejecuta el modulo para el periodo de config_fechas.txt.
+    run_all.py las envia a Athena por adelantado, antes de llamar a run().
+    """
+    modo, fecha_inicio, fecha_fin = read_date_config(CONFIG['config_file'])[:3]
+    if modo is None or fecha_inicio is None:
+        return []
+    return [build_query(fecha_inicio, fecha_fin)]
+
+def run(contexto):
+    """
+    Punto de entrada en modo libreria: run_all.py importa el modulo y lo
+    ejecuta en su mismo proceso, con un ContextoAthena compartido.
+    Retorna True si el proceso termino OK.
+    """
+    return execute_query_and_save(contexto) is not None
+
 # ==================== EJECUCION PRINCIPAL ====================
 
 if __name__ == "__main__":
@@ -586,12 +448,14 @@ if __name__ == "__main__":
     print("      aws-azure-login --profile default --mode=gui")
     print("")
     print("=" * 60)
-    try:
-        input("  Presiona ENTER para continuar (o Ctrl+C para cancelar)...")
-    except KeyboardInterrupt:
-        print("")
-        print("  Cancelado por el usuario.")
-        raise SystemExit(0)
+    # Bajo run_all.py no hay terminal interactiva (run_all ya verificó AWS)
+    if not os.environ.get('BOTI_RUN_ALL'):
+        try:
+            input("  Presiona ENTER para continuar (o Ctrl+C para cancelar)...")
+        except KeyboardInterrupt:
+            print("")
+            print("  Cancelado por el usuario.")
+            raise SystemExit(0)
     print("")
 
     print("=" * 60)
@@ -25,14 +25,16 @@ Uso:
 Lee configuracion de fechas desde config_fechas.txt (para nombrar el output)
 """
 import pandas as pd
-import numpy as np
 import re
 import os
+import sys
 import glob
 import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.styles import Font
 from datetime import datetime
-from calendar import monthrange
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Raiz del repo (paquete comun)
+from comun import tablero
 
 # ==================== CONFIGURACION ====================
 CONFIG = {
@@ -47,10 +49,17 @@ EXCLUDED_TOPICS = [
     'AWS Polly', 'Prueba', ' '
 ]
 
+# Criterio para contar una intención/topic común a ambos meses como modificado:
+# - 'longitud': el 'Bot Says' concatenado cambió de largo en más de UMBRAL_LONGITUD
+#   caracteres (criterio histórico del notebook)
+# - 'contenido': el texto cambió en cualquier forma (hash distinto)
+CRITERIO_MODIFICACION = 'longitud'
+UMBRAL_LONGITUD = 5
+
 # ==================== FUNCIONES ====================
 
 def read_date_config(config_file):
-    """Lee el archivo de configuracion de fechas. Retorna (modo, mes, anio, descripcion)"""
+    """Lee el archivo de configuracion de fechas. Retorna (modo, mes, anio, descripcion, fecha_inicio, fecha_fin)"""
     rutas_posibles = [
         config_file,
         'config_fechas.txt',
@@ -66,7 +75,7 @@ def read_date_config(config_file):
 
     if not archivo_encontrado:
         print("[ERROR] No se encuentra config_fechas.txt en ninguna ubicación")
-        return None, None, None, None
+        return None, None, None, None, None, None
 
     try:
         mes = None
@@ -95,19 +104,19 @@ def read_date_config(config_file):
                 fecha_inicio.strftime('%d/%m/%Y'),
                 fecha_fin.strftime('%d/%m/%Y')
             )
-            return 'rango', None, None, descripcion
+            return 'rango', None, None, descripcion, fecha_inicio_str, fecha_fin_str
 
         if mes is not None and anio is not None:
             mes_nombre = get_month_name(mes)
             descripcion = "{} {}".format(mes_nombre, anio)
-            return 'mes', mes, anio, descripcion
+            return 'mes', mes, anio, descripcion, None, None
 
         print("[ERROR] config_fechas.txt no contiene configuracion valida")
-        return None, None, None, None
+        return None, None, None, None, None, None
 
     except Exception as e:
         print("[ERROR] Error leyendo config_fechas.txt: {}".format(str(e)))
-        return None, None, None, None
+        return None, None, None, None, None, None
 
 
 def get_month_name(mes):
@@ -308,6 +317,38 @@ def clasificar_contenidos(df):
     return df
 
 
+def resumir_bot_says(df, clave):
+    """
+    Una fila por valor de `clave` ('ID' o 'Topic') con el largo y el hash del
+    'Bot Says' concatenado (" ".join de los no nulos, en el orden del TSV).
+    Las claves sin 'Bot Says' quedan con texto vacío.
+    """
+    con_texto = df[[clave, 'Bot Says']].dropna(subset=['Bot Says'])
+    textos = con_texto['Bot Says'].astype(str).groupby(con_texto[clave], sort=False).agg(' '.join)
+    textos = textos.reindex(df[clave].dropna().unique(), fill_value='')
+    return pd.DataFrame({
+        'largo': textos.str.len(),
+        'hash': pd.util.hash_pandas_object(textos, index=False),
+    })
+
+
+def claves_modificadas(df_current, df_previous, clave, criterio=None, umbral=UMBRAL_LONGITUD):
+    """
+    Claves ('ID' o 'Topic') presentes en ambos meses cuyo 'Bot Says' cambió,
+    según `criterio` ('longitud' o 'contenido', default CRITERIO_MODIFICACION).
+    Agrupa cada mes una sola vez y compara los resúmenes por clave.
+    """
+    criterio = criterio or CRITERIO_MODIFICACION
+    comunes = resumir_bot_says(df_current, clave).join(
+        resumir_bot_says(df_previous, clave), how='inner', lsuffix='_actual', rsuffix='_anterior'
+    )
+    if criterio == 'contenido':
+        cambio = comunes['hash_actual'] != comunes['hash_anterior']
+    else:
+        cambio = (comunes['largo_actual'] - comunes['largo_anterior']).abs() > umbral
+    return set(comunes.index[cambio.to_numpy()])
+
+
 def calcular_metricas(df_current, df_previous):
     """Calcula todas las métricas de contenidos"""
 
@@ -382,18 +423,9 @@ def calcular_metricas(df_current, df_previous):
         common_ids = set()
 
     # Detectar modificaciones
-    modified_ids = []
-    if 'Bot Says' in filtered_current.columns and 'Bot Says' in filtered_previous.columns and 'ID' in filtered_current.columns:
-        for id_ in common_ids:
-            curr_rows = filtered_current[filtered_current['ID'] == id_]
-            prev_rows = filtered_previous[filtered_previous['ID'] == id_]
-
-            if not curr_rows.empty and not prev_rows.empty:
-                curr_bot = " ".join(curr_rows['Bot Says'].dropna().astype(str).tolist())
-                prev_bot = " ".join(prev_rows['Bot Says'].dropna().astype(str).tolist())
-
-                if abs(len(curr_bot) - len(prev_bot)) > 5:
-                    modified_ids.append(id_)
+    modified_ids = set()
+    if 'Bot Says' in filtered_current.columns and 'Bot Says' in filtered_previous.columns and common_ids:
+        modified_ids = claves_modificadas(filtered_current, filtered_previous, 'ID')
 
     if 'Topic' in filtered_current.columns and 'Topic' in filtered_previous.columns:
         current_topics_set = set(filtered_current['Topic'])
@@ -402,21 +434,13 @@ def calcular_metricas(df_current, df_previous):
         new_topics = current_topics_set - previous_topics_set
         removed_topics = previous_topics_set - current_topics_set
 
-        modified_topics = []
+        modified_topics = set()
         if 'Bot Says' in filtered_current.columns and 'Bot Says' in filtered_previous.columns:
-            for topic in current_topics_set & previous_topics_set:
-                curr_rows = filtered_current[filtered_current['Topic'] == topic]
-                prev_rows = filtered_previous[filtered_previous['Topic'] == topic]
-
-                curr_bot = " ".join(str(v) for v in curr_rows['Bot Says'].dropna().tolist())
-                prev_bot = " ".join(str(v) for v in prev_rows['Bot Says'].dropna().tolist())
-
-                if abs(len(curr_bot) - len(prev_bot)) > 5:
-                    modified_topics.append(topic)
+            modified_topics = claves_modificadas(filtered_current, filtered_previous, 'Topic')
     else:
         new_topics = set()
         removed_topics = set()
-        modified_topics = []
+        modified_topics = set()
 
     return {
         'current_total_ids': current_total_ids,
@@ -531,94 +555,6 @@ def crear_excel(filepath, metricas, modo, mes, anio, descripcion):
     print("[OK] Excel creado: {}".format(filepath))
 
 
-def create_or_update_dashboard_master(filepath, metricas, modo, mes, anio):
-    """
-    Crea el Excel Dashboard Master con el template estándar
-    Llena las celdas D7 (Contenidos en Botmaker) y D8 (Contenidos Prendidos USUARIO)
-    """
-
-    print("    [INFO] Creando Dashboard Master...")
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = 'Dashboard'
-
-    header_font = Font(bold=True)
-
-    if modo == 'mes':
-        header_fecha = '{}-{}'.format(get_month_abbr(mes), str(anio)[-2:])
-    else:
-        header_fecha = 'rango'
-
-    # FILA 1: Encabezados
-    ws['B1'] = 'Indicador'
-    ws['C1'] = 'Descripción/Detalle'
-    ws['D1'] = header_fecha
-    ws['B1'].font = header_font
-    ws['C1'].font = header_font
-    ws['D1'].font = header_font
-
-    # FILA 2-17: Indicadores
-    ws['B2'] = 'Conversaciones'
-    ws['C2'] = 'Q Conversaciones'
-
-    ws['B3'] = 'Usuarios'
-    ws['C3'] = 'Q Usuarios únicos'
-
-    ws['B4'] = 'Sesiones abiertas por Pushes'
-    ws['C4'] = 'Q Sesiones que se abrieron con una Push'
-
-    ws['B5'] = 'Sesiones Alcanzadas por Pushes'
-    ws['C5'] = 'Q Sesiones que recibieron al menos 1 Push'
-
-    ws['B6'] = 'Mensajes Pushes Enviados'
-    ws['C6'] = 'Q de mensajes enviados bajo el formato push [Hilde gris]'
-
-    ws['B7'] = 'Contenidos en Botmaker'
-    ws['C7'] = 'Contenidos prendidos en botmaker (todos los prendidos, incluy'
-    ws['D7'] = metricas['current_active_topics']
-
-    ws['B8'] = 'Contenidos Prendidos para  el USUARIO'
-    ws['C8'] = 'Contenidos prendidos de cara al usuario (relevantes) – (no inclu'
-    ws['D8'] = metricas['relevant_topic_current']
-
-    ws['B9'] = 'Interacciones'
-    ws['C9'] = 'Q Interacciones'
-
-    ws['B10'] = 'Trámites, solicitudes y turnos'
-    ws['C10'] = 'Q Trámites, solicitudes y turnos disponibles'
-
-    ws['B11'] = 'contenidos mas consultados'
-    ws['C11'] = 'Q Contenidos con más interacciones en el mes (Top 10)'
-
-    ws['B12'] = 'Derivaciones'
-    ws['C12'] = 'Q Derivaciones'
-
-    ws['B13'] = 'No entendimiento'
-    ws['C13'] = 'Performance motor de búsqueda del nuevo modelo de IA'
-
-    ws['B14'] = 'Tasa de Efectividad'
-    ws['C14'] = 'Mide el porcentaje de usuarios que lograron su objetivo'
-
-    ws['B15'] = 'CES (Customer Effort Score)'
-    ws['C15'] = 'Mide la facilidad con la que los usuarios pueden interactuar con'
-
-    ws['B16'] = 'Satisfacción (CSAT)'
-    ws['C16'] = 'Mide la satisfacción usando una escala de 1 a 5'
-
-    ws['B17'] = 'Uptime servidor'
-    ws['C17'] = 'Disponibilidad del servidor (% tiempo activo)'
-
-    # Ajustar anchos
-    ws.column_dimensions['B'].width = 35
-    ws.column_dimensions['C'].width = 50
-    ws.column_dimensions['D'].width = 15
-
-    wb.save(filepath)
-    print("    [OK] Dashboard Master creado (D7 = {}, D8 = {})".format(
-        metricas['current_active_topics'], metricas['relevant_topic_current']))
-
-
 def imprimir_resultados(metricas):
     """Imprime los resultados en consola"""
 
@@ -666,7 +602,7 @@ def main():
     print("SCRIPT: CONTENIDOS DEL BOT")
     print("=" * 60)
     print("Compara contenidos entre dos exportaciones TSV de Botmaker")
-    print("Genera: Excel con métricas + Dashboard Master (D7, D8)")
+    print("Genera: Excel con métricas + celdas D7, D8 del tablero")
     print("")
     print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
     print("!  ATENCIÓN: SE NECESITAN 2 ARCHIVOS TSV EN ESTA CARPETA  !")
@@ -680,7 +616,7 @@ def main():
 
     # Leer configuración de fechas
     print("Leyendo configuracion de fechas...")
-    modo, mes, anio, descripcion = read_date_config(CONFIG['config_file'])
+    modo, mes, anio, descripcion, fecha_inicio, fecha_fin = read_date_config(CONFIG['config_file'])
 
     if modo is None:
         print("[ERROR] No se pudo obtener la configuracion. Abortando.")
@@ -721,26 +657,28 @@ def main():
     if modo == 'mes':
         mes_nombre = get_month_name(mes)
         filename_excel = "contenidos_bot_detalle_{0}_{1}.xlsx".format(mes_nombre, anio)
-        filename_dashboard = "contenidos_bot_{0}_{1}.xlsx".format(mes_nombre, anio)
     else:
         fecha_inicio_fmt = descripcion.replace('/', '').replace(' al ', '_a_')
         filename_excel = "contenidos_bot_detalle_{0}.xlsx".format(fecha_inicio_fmt)
-        filename_dashboard = "contenidos_bot_{0}.xlsx".format(fecha_inicio_fmt)
 
     filepath_excel = os.path.join(output_folder, filename_excel)
-    filepath_dashboard = os.path.join(output_folder, filename_dashboard)
 
     print("")
     print("Generando archivos Excel...")
     crear_excel(filepath_excel, metricas, modo, mes, anio, descripcion)
-    create_or_update_dashboard_master(filepath_dashboard, metricas, modo, mes, anio)
+
+    # D7/D8 van al tablero (el Excel lo arma consolidar_excel.py)
+    ruta_tablero = tablero.registrar('contenidos_bot', {
+        'D7': metricas['current_active_topics'],
+        'D8': metricas['relevant_topic_current']
+    }, modo, mes, anio, fecha_inicio, fecha_fin, origen=filename_excel)
 
     print("")
     print("ARCHIVOS GENERADOS:")
     print("    [1] {}".format(filepath_excel))
     print("        - Métricas completas de contenidos")
     print("        - Comparación mes actual vs anterior")
-    print("    [2] {}".format(filepath_dashboard))
+    print("    [2] {} (tablero)".format(ruta_tablero))
     print("        - D7 = {} (Contenidos Prendidos)".format(metricas['current_active_topics']))
     print("        - D8 = {} (Contenidos Relevantes)".format(metricas['relevant_topic_current']))
 
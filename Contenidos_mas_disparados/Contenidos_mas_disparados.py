@@ -23,8 +23,6 @@ MODOS SOPORTADOS:
 Workgroup: Production-caba-piba-athena-boti-group
 Rol: PIBADataScientist
 '''
-import boto3
-import awswrangler as wr
 import pandas as pd
 from datetime import datetime
 from calendar import monthrange
@@ -32,11 +30,19 @@ import os
 import re
 import csv
 import glob
+import hashlib
+import pickle
 import sys
 import time
 from contextlib import contextmanager
-import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))  # Raiz del repo (paquete comun)
+from comun import cache_consultas, tablero
+from comun.contexto import ContextoAthena
+from comun.athena import ejecutar_query, elegir_transporte
+from comun.particiones import filtro_fechas
+from comun.reporte_excel import LibroExcel
 
 # ==================== HELPERS DE LOGGING (verbose) ====================
 # Forzar flush en cada print porque Windows bufferea la salida y los pasos
@@ -68,8 +74,8 @@ CONFIG = {
     'region': 'us-east-1',
     'workgroup': 'Production-caba-piba-athena-boti-group',
     'database': 'caba-piba-consume-zone-db',
-    'output_folder': 'output',
-    'config_file': '../config_fechas.txt'  # Config centralizado en raiz del proyecto
+    'output_folder': os.path.join(SCRIPT_DIR, 'output'),
+    'config_file': os.path.join(SCRIPT_DIR, '..', 'config_fechas.txt')  # Config centralizado en raiz del proyecto
 }
 
 # Flag para activar/desactivar las exclusiones de contenidos.
@@ -125,6 +131,8 @@ _PATRON_REGEX = re.compile(
     '|'.join(re.escape(p) for p in PATRONES_EXCLUIR),
     re.IGNORECASE
 )
+# Un regex por patron (para saber cual matchea y contar por patron)
+_PATRONES_INDIVIDUALES = [(p, re.compile(re.escape(p), re.IGNORECASE)) for p in PATRONES_EXCLUIR]
 
 # ==================== CAPA 2: EXCLUSIONES MANUALES ====================
 # Para contenidos puntuales que no caen en ningún patrón de la Capa 1
@@ -250,8 +258,14 @@ RULENAMES_PRESERVAR = [
 #          --> Nombre Amigable = "Vacunacion"
 _PATRON_CODIGO = re.compile(r'^[A-Z]{2,4}\d{2}CUX\d{2}$')
 _PATRON_TOPIC_CODIGO = re.compile(r'\b([A-Z]{2,4}\d{2}CUX\d{2})\b\s*[-:.]*\s*(.+)$')
-_DESCRIPCIONES_TSV_CACHE = None  # se carga lazy en la primera llamada
-_NAME_A_TOPIC_CACHE = None       # cache para el lookup por columna Name (TSV mas reciente gana)
+_INDICE_NOMBRES = None  # se carga lazy en la primera llamada (ver _cargar_indice_nombres)
+
+# Indice persistente de nombres amigables (codigo -> descripcion y Name -> Topic)
+# armado desde las fuentes (trasco_athena*.csv / rules-*.tsv). Se reconstruye
+# solo si alguna fuente cambio de contenido. Vive en la carpeta de la cache
+# de Athena: BOTI_SIN_CACHE=1 lo ignora y borrar la carpeta lo regenera.
+ARCHIVO_INDICE_NOMBRES = os.path.join(cache_consultas.CARPETA_CACHE, 'indice_nombres_amigables.pickle')
+VERSION_INDICE_NOMBRES = 1  # subir si cambia la forma de armar el indice
 
 # Disclaimer que se agrega cuando un rulename no tiene nombre amigable en ningun lado.
 DISCLAIMER_FALTANTE = '[NOMBRE AMIGABLE FALTANTE]'
@@ -292,29 +306,138 @@ def _get_data_sources():
     tsv_paths = _find_all_tsvs()
     return [(p, '\t', 'latin-1') for p in tsv_paths]
 
-def cargar_descripciones_tsv():
+def _firma_fuente(path, anterior=None):
     '''
-    Lee TODOS los TSV de reglas (rules-*.tsv) del directorio del script y arma
-    un dict {codigo: descripcion} a partir de la columna 'Topic'.
+    Firma de un archivo fuente: tamaño, mtime y sha1 del contenido. Si el
+    tamaño y el mtime coinciden con la firma `anterior` se reutiliza su sha1
+    (no se relee el archivo).
+    '''
+    st = os.stat(path)
+    firma = {'archivo': os.path.basename(path), 'tamanio': st.st_size, 'mtime': st.st_mtime_ns}
+    if anterior and all(anterior.get(k) == firma[k] for k in firma):
+        firma['sha1'] = anterior['sha1']
+        return firma
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    firma['sha1'] = h.hexdigest()
+    return firma
+
+def _leer_indice_guardado():
+    '''Indice de ARCHIVO_INDICE_NOMBRES, o None si no hay uno legible'''
+    if not cache_consultas.habilitada() or not os.path.exists(ARCHIVO_INDICE_NOMBRES):
+        return None
+    try:
+        with open(ARCHIVO_INDICE_NOMBRES, 'rb') as f:
+            indice = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(indice, dict) or indice.get('version') != VERSION_INDICE_NOMBRES:
+        return None
+    return indice
 
-    En caso de que un mismo codigo aparezca en varios TSV con descripciones
-    distintas, gana el TSV mas reciente (los archivos se procesan en orden
-    ascendente, por eso los posteriores sobreescriben).
+def _guardar_indice(indice):
+    if not cache_consultas.habilitada():
+        return
+    try:
+        os.makedirs(os.path.dirname(ARCHIVO_INDICE_NOMBRES), exist_ok=True)
+        temporal = ARCHIVO_INDICE_NOMBRES + '.tmp'
+        with open(temporal, 'wb') as f:
+            pickle.dump(indice, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ARCHIVO_INDICE_NOMBRES)
+    except Exception as e:
+        print("    [WARN] No se pudo guardar el indice de nombres amigables: {}".format(e))
 
-    Cachea el resultado en memoria para no releer los archivos en cada llamada.
-    Encoding latin-1 (ISO-8859) que es como vienen los exports de Botmaker.
+def _cargar_indice_nombres():
     '''
-    global _DESCRIPCIONES_TSV_CACHE
-    if _DESCRIPCIONES_TSV_CACHE is not None:
-        return _DESCRIPCIONES_TSV_CACHE
+    Indice de nombres amigables, armado UNA vez desde todas las fuentes de
+    _get_data_sources() y guardado en disco (ARCHIVO_INDICE_NOMBRES):
+      - 'descripciones': codigo (prefijo SA03CUX01) -> descripcion del Topic
+      - 'mapping': Name -> (Topic, Topic path). Los Name se guardan con
+        strip, asi que la misma clave sirve para el match exacto y el
+        normalizado de resolver_nombre_amigable_por_name
+    Las corridas siguientes lo leen del disco mientras las fuentes sean las
+    mismas (misma lista de archivos y mismo contenido: tamaño+mtime, o sha1
+    si el archivo se reescribio igual, como el trasco que se baja en cada
+    corrida). Si no, se rearma y se vuelve a guardar.
+    '''
+    global _INDICE_NOMBRES
+    if _INDICE_NOMBRES is not None:
+        return _INDICE_NOMBRES
 
-    descripciones = {}
     sources = _get_data_sources()
-    if not sources:
+    guardado = _leer_indice_guardado()
+    anteriores = {}
+    if guardado and len(guardado['fuentes']) == len(sources):
+        anteriores = {fuente['archivo']: fuente for fuente in guardado['fuentes']}
+    try:
+        firmas = [_firma_fuente(path, anteriores.get(os.path.basename(path))) for path, _, _ in sources]
+    except OSError:
+        firmas = None
+
+    if guardado and firmas is not None and [
+        (fi['archivo'], fi['sha1']) for fi in firmas
+    ] == [(fi['archivo'], fi['sha1']) for fi in guardado['fuentes']]:
+        print("    [INFO] Indice de nombres amigables leido de {} (fuentes sin cambios)".format(
+            os.path.basename(ARCHIVO_INDICE_NOMBRES)))
+        if firmas != guardado['fuentes']:
+            # Mismo contenido con otro mtime: actualizar para no rehashear
+            guardado['fuentes'] = firmas
+            _guardar_indice(guardado)
+        _INDICE_NOMBRES = guardado
+        return guardado
+
+    descripciones, archivos_info = _leer_descripciones(sources)
+    indice = {
+        'version': VERSION_INDICE_NOMBRES,
+        'fuentes': firmas or [],
+        'descripciones': descripciones,
+        'archivos_info': archivos_info,
+        'mapping': _leer_mapping_name_a_topic(sources),
+    }
+    # Si algun archivo no se pudo leer no se persiste (se reintenta la proxima vez)
+    if sources and firmas is not None and len(archivos_info) == len(sources):
+        _guardar_indice(indice)
+    _INDICE_NOMBRES = indice
+    return indice
+
+def cargar_descripciones_tsv():
+    '''
+    Dict {codigo: descripcion} armado desde la columna 'Topic' de TODAS las
+    fuentes (trasco_athena*.csv o rules-*.tsv, ver _get_data_sources).
+
+    En caso de que un mismo codigo aparezca en varios archivos con
+    descripciones distintas, gana el mas reciente.
+
+    Sale del indice persistente (_cargar_indice_nombres): los archivos solo
+    se vuelven a leer si cambiaron.
+    '''
+    indice = _cargar_indice_nombres()
+    descripciones = indice['descripciones']
+    if not indice['fuentes']:
         print("    [WARN] No se encontro ninguna fuente (trasco_athena*.csv ni rules-*.tsv) para descripciones automaticas")
-        _DESCRIPCIONES_TSV_CACHE = descripciones
         return descripciones
 
+    print("    [INFO] Descripciones automaticas consolidadas desde {} archivo(s) (total: {} codigos unicos):".format(
+        len(indice['archivos_info']), len(descripciones)
+    ))
+    for nombre, total_archivo, nuevos, actualizados in indice['archivos_info']:
+        extras = ""
+        if actualizados > 0:
+            extras = ", {} actualizados por nuevo".format(actualizados)
+        print("           - {}: {} codigos en archivo ({} nuevos{})".format(
+            nombre, total_archivo, nuevos, extras
+        ))
+    return descripciones
+
+def _leer_descripciones(sources):
+    '''
+    Lee las fuentes (en orden ascendente, el mas nuevo sobreescribe) y arma
+    {codigo: descripcion}. Encoding latin-1 (ISO-8859) para los exports de
+    Botmaker. Retorna (descripciones, archivos_info).
+    '''
+    descripciones = {}
     archivos_info = []  # (filename, codigos_en_archivo, codigos_nuevos_aportados, codigos_actualizados)
     for source_path, source_delim, source_enc in sources:
         codigos_archivo = 0
@@ -348,20 +471,7 @@ def cargar_descripciones_tsv():
             archivos_info.append((os.path.basename(source_path), codigos_archivo, codigos_nuevos, codigos_actualizados))
         except Exception as e:
             print("    [WARN] Error leyendo {}: {}".format(source_path, e))
-
-    print("    [INFO] Descripciones automaticas consolidadas desde {} archivo(s) (total: {} codigos unicos):".format(
-        len(archivos_info), len(descripciones)
-    ))
-    for nombre, total_archivo, nuevos, actualizados in archivos_info:
-        extras = ""
-        if actualizados > 0:
-            extras = ", {} actualizados por nuevo".format(actualizados)
-        print("           - {}: {} codigos en archivo ({} nuevos{})".format(
-            nombre, total_archivo, nuevos, extras
-        ))
-
-    _DESCRIPCIONES_TSV_CACHE = descripciones
-    return descripciones
+    return descripciones, archivos_info
 
 def aplicar_descripcion_automatica(rulename, descripciones_tsv):
     '''
@@ -377,28 +487,25 @@ def aplicar_descripcion_automatica(rulename, descripciones_tsv):
 
 def cargar_mapping_name_a_topic():
     '''
-    Lee TODOS los TSV de reglas (rules-*.tsv) y arma un dict:
-        Name (rulename) -> (Topic, Topic path)
-
-    Empezando por el TSV MAS NUEVO: si un mismo rulename aparece en varios TSV,
-    gana el del archivo mas reciente.
+    Dict Name (rulename) -> (Topic, Topic path) de TODAS las fuentes. Si un
+    mismo rulename aparece en varios archivos, gana el mas reciente.
 
-    Cachea en memoria. Encoding latin-1 (export Botmaker).
+    Sale del indice persistente (_cargar_indice_nombres).
     '''
-    global _NAME_A_TOPIC_CACHE
-    if _NAME_A_TOPIC_CACHE is not None:
-        return _NAME_A_TOPIC_CACHE
+    indice = _cargar_indice_nombres()
+    mapping = indice['mapping']
+    if not indice['fuentes']:
+        print("    [WARN] No se encontro ninguna fuente (trasco_athena*.csv ni rules-*.tsv) para mapping name->topic")
+        return mapping
+    print("    [INFO] Mapping Name->Topic cargado: {} rulenames unicos".format(len(mapping)))
+    return mapping
 
+def _leer_mapping_name_a_topic(sources):
+    '''Lee las fuentes y arma {Name: (Topic, Topic path)} (el archivo mas nuevo gana)'''
     mapping = {}
     # Las fuentes vienen ordenadas ASC (mas viejas primero). Recorrer en orden DESC
     # asi el archivo mas nuevo se procesa primero y gana al hacer setdefault.
-    sources = list(reversed(_get_data_sources()))
-    if not sources:
-        print("    [WARN] No se encontro ninguna fuente (trasco_athena*.csv ni rules-*.tsv) para mapping name->topic")
-        _NAME_A_TOPIC_CACHE = mapping
-        return mapping
-
-    for source_path, source_delim, source_enc in sources:
+    for source_path, source_delim, source_enc in reversed(sources):
         try:
             with open(source_path, 'r', encoding=source_enc, newline='') as f:
                 reader = csv.DictReader(f, delimiter=source_delim)
@@ -413,9 +520,6 @@ def cargar_mapping_name_a_topic():
                         mapping[name] = (topic, topic_path)
         except Exception as e:
             print("    [WARN] Error leyendo {} para mapping Name: {}".format(source_path, e))
-
-    print("    [INFO] Mapping Name->Topic cargado: {} rulenames unicos".format(len(mapping)))
-    _NAME_A_TOPIC_CACHE = mapping
     return mapping
 
 def resolver_nombre_amigable_por_name(rulename, mapping_name_a_topic):
@@ -430,24 +534,18 @@ def resolver_nombre_amigable_por_name(rulename, mapping_name_a_topic):
       - Si Topic != Topic path                 --> "Topic" (tal cual)
 
     Para que coincida con strip (los rulenames pueden tener espacios extra), se
-    intenta primero el match exacto y despues el match con strip.
+    intenta primero el match exacto y despues el match con strip. Las claves
+    del mapping ya estan sin espacios: ambos son lookups directos al dict.
     '''
     if not rulename:
         return None
-    # Match exacto
-    if rulename in mapping_name_a_topic:
-        topic, topic_path = mapping_name_a_topic[rulename]
-    else:
-        # Match con strip (algunos rulenames tienen espacios al final/inicio)
-        rn_strip = str(rulename).strip()
-        clave_match = None
-        for k in mapping_name_a_topic:
-            if k.strip() == rn_strip:
-                clave_match = k
-                break
-        if clave_match is None:
-            return None
-        topic, topic_path = mapping_name_a_topic[clave_match]
+    # Match exacto, y si no, con strip (algunos rulenames tienen espacios al final/inicio)
+    encontrado = mapping_name_a_topic.get(rulename)
+    if encontrado is None:
+        encontrado = mapping_name_a_topic.get(str(rulename).strip())
+    if encontrado is None:
+        return None
+    topic, topic_path = encontrado
 
     if not topic:
         return None
@@ -469,60 +567,44 @@ def resolver_nombre_amigable_por_name(rulename, mapping_name_a_topic):
 #
 # Cuando el CSV existe, _get_data_sources() lo prioriza por sobre los TSV legacy.
 
-def descargar_trasco_csv_athena(fecha_inicio, fecha_fin, mes_nombre, anio):
-    '''
-    Ejecuta la query a Athena que devuelve el mapping rulename -> topic_path
-    y lo guarda como CSV en la carpeta del script con el MISMO formato de
-    columnas que el TSV original (Name / Topic path / Topic).
-
-    Devuelve el path al CSV generado.
-    '''
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    nombre_csv = "trasco_athena_{}_{}.csv".format(mes_nombre, anio)
-    path_csv = os.path.join(script_dir, nombre_csv)
-
+def build_query_trasco(fecha_inicio, fecha_fin):
+    '''Query del mapping rulename -> topic_path (TRASCO) para el periodo'''
     # La query devuelve los mismos NOMBRES de columna que el TSV original
     # para que el resto del codigo no necesite saber que vienen de Athena.
     #   - Name        = rule_name (rulename)
     #   - Topic path  = topic_path completo (sin separar)
     #   - Topic       = ultimo segmento de topic_path (la categoria mas especifica)
-    query = """SELECT DISTINCT
+    return """SELECT DISTINCT
     m.rule_name AS "Name",
     m.topic_path AS "Topic path",
     ELEMENT_AT(SPLIT(m.topic_path, '/'), CARDINALITY(SPLIT(m.topic_path, '/'))) AS "Topic"
 FROM "caba-piba-consume-zone-db"."boti_message_metrics_2" m
-WHERE CAST(m.creation_time AS DATE) BETWEEN date '{fi}' AND date '{ff}'
+WHERE {filtro}
   AND m.rule_name IS NOT NULL
   AND m.rule_name NOT LIKE '%push%'
   AND m.rule_name NOT LIKE '%PUSH%'
-GROUP BY m.topic_path, m.rule_name""".format(fi=fecha_inicio, ff=fecha_fin)
+GROUP BY m.topic_path, m.rule_name""".format(
+        filtro=filtro_fechas('m.creation_time', fecha_inicio, fecha_fin, alias='m'))
+
+def descargar_trasco_csv_athena(contexto, fecha_inicio, fecha_fin, mes_nombre, anio):
+    '''
+    Ejecuta la query a Athena que devuelve el mapping rulename -> topic_path
+    y lo guarda como CSV en la carpeta del script con el MISMO formato de
+    columnas que el TSV original (Name / Topic path / Topic).
+
+    Devuelve el path al CSV generado.
+    '''
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    nombre_csv = "trasco_athena_{}_{}.csv".format(mes_nombre, anio)
+    path_csv = os.path.join(script_dir, nombre_csv)
+
+    query = build_query_trasco(fecha_inicio, fecha_fin)
 
     log("    Query Athena (Name / Topic path / Topic):")
     log("    " + query.replace("\n", "\n    "))
 
-    session = boto3.Session(region_name=CONFIG['region'])
     with step("    Ejecutando query Trasco en Athena"):
-        try:
-            df = wr.athena.read_sql_query(
-                sql=query,
-                database=CONFIG['database'],
-                workgroup=CONFIG['workgroup'],
-                boto3_session=session,
-                ctas_approach=False,
-                unload_approach=False
-            )
-        except Exception as e:
-            if 'workgroup' in str(e).lower():
-                log("    [WARN] Reintentando sin workgroup...")
-                df = wr.athena.read_sql_query(
-                    sql=query,
-                    database=CONFIG['database'],
-                    boto3_session=session,
-                    ctas_approach=False,
-                    unload_approach=False
-                )
-            else:
-                raise
+        df = ejecutar_query(contexto, query, log=log, filas_estimadas=FILAS_TRASCO)
 
     log("    Filas devueltas por Athena: {:,}".format(len(df)))
 
@@ -671,8 +753,80 @@ def get_month_abbr(mes):
     }
     return meses.get(mes, 'mes')
 
-def build_query():
-    '''Construye la query para descargar la vista de contenidos consultados'''
+# Columnas de boti_vw_buscador_rulename que usa la query filtrada
+COLUMNA_FECHA_VISTA = 'fecha'
+COLUMNA_RULENAME_VISTA = 'rulename'
+COLUMNA_SESIONES_VISTA = 'sesiones_diarias'
+
+# Forma del resultado, para elegir el transporte de Athena (CSV o UNLOAD):
+# build_query devuelve por dia una fila por prefijo de rulename (~230 en
+# prefijos_temp.json) mas RULENAMES_PRESERVAR; TRASCO, una fila por
+# rulename con topic_path (~5.200 en mayo 2026)
+PREFIJOS_POR_DIA = 250
+FILAS_TRASCO = 6000
+
+def filas_estimadas_vista(fecha_inicio, fecha_fin):
+    '''Filas esperadas de build_query(fecha_inicio, fecha_fin)'''
+    dias = (datetime.strptime(str(fecha_fin)[:10], '%Y-%m-%d')
+            - datetime.strptime(str(fecha_inicio)[:10], '%Y-%m-%d')).days + 1
+    return dias * (PREFIJOS_POR_DIA + len(RULENAMES_PRESERVAR))
+
+def _literal_sql(texto):
+    '''Texto como literal SQL (comillas simples escapadas)'''
+    return "'{}'".format(texto.replace("'", "''"))
+
+def _condiciones_exclusion(columna):
+    '''
+    CAPA 1 y CAPA 2 como condiciones SQL sobre `columna` (lista de strings
+    para unir con AND). CONTAINS case-insensitive = strpos sobre lower(), sin
+    comodines de LIKE (el patron '_' es literal).
+    '''
+    condiciones = []
+    if PATRONES_EXCLUIR:
+        condiciones.append("NOT ({})".format(" OR ".join(
+            "strpos(lower({}), {}) > 0".format(columna, _literal_sql(p))
+            for p in dict.fromkeys(p.lower() for p in PATRONES_EXCLUIR)
+        )))
+    if CONTENIDOS_EXCLUIR_MANUAL:
+        condiciones.append("{} NOT IN ({})".format(
+            columna, ", ".join(_literal_sql(n) for n in CONTENIDOS_EXCLUIR_MANUAL)))
+    return condiciones
+
+def build_query(fecha_inicio, fecha_fin):
+    '''
+    Query de la vista de contenidos consultados, resuelta en Athena:
+    - solo las filas del periodo (no toda la historia de la vista)
+    - CAPA 1 y CAPA 2 (si APLICAR_EXCLUSIONES)
+    - paso 5: por (prefijo, fecha) solo el rulename con mas sesiones, mas
+      las filas de RULENAMES_PRESERVAR
+    Devuelve una fila por rulename por dia. procesar_contenidos() vuelve a
+    aplicar los mismos pasos (no cambian nada sobre este resultado).
+    '''
+    fecha, rulename, sesiones = COLUMNA_FECHA_VISTA, COLUMNA_RULENAME_VISTA, COLUMNA_SESIONES_VISTA
+    condiciones = ["CAST({} AS DATE) BETWEEN date '{}' and date '{}'".format(fecha, fecha_inicio, fecha_fin)]
+    if APLICAR_EXCLUSIONES:
+        condiciones += _condiciones_exclusion(rulename)
+
+    ganador = "puesto_dia = 1"
+    if RULENAMES_PRESERVAR:
+        ganador += " OR {} IN ({})".format(rulename, ", ".join(_literal_sql(n) for n in RULENAMES_PRESERVAR))
+
+    return """SELECT {fecha}, {rulename}, {sesiones}
+FROM (
+    SELECT {fecha}, {rulename}, {sesiones},
+           ROW_NUMBER() OVER (
+               PARTITION BY split_part({rulename}, ' ', 1), {fecha}
+               ORDER BY {sesiones} DESC, {rulename}
+           ) AS puesto_dia
+    FROM "caba-piba-consume-zone-db"."boti_vw_buscador_rulename"
+    WHERE {condiciones}
+) t
+WHERE {ganador}""".format(
+        fecha=fecha, rulename=rulename, sesiones=sesiones,
+        condiciones="\n      AND ".join(condiciones), ganador=ganador)
+
+def build_query_vista_completa():
+    '''Query de respaldo: la vista entera (si la query filtrada falla)'''
     query = 'SELECT * FROM "caba-piba-consume-zone-db"."boti_vw_buscador_rulename"'
     return query
 
@@ -682,52 +836,90 @@ def generate_filename(modo, mes, anio, fecha_inicio, fecha_fin):
         mes_nombre = get_month_name(mes)
         filename_csv = "contenidos_consultados_{0}_{1}.csv".format(mes_nombre, anio)
         filename_detalle = "contenidos_consultados_detalle_{0}_{1}.xlsx".format(mes_nombre, anio)
-        filename_dashboard = "contenidos_consultados_{0}_{1}.xlsx".format(mes_nombre, anio)
     else:
         fecha_inicio_fmt = fecha_inicio.replace('-', '')
         fecha_fin_fmt = fecha_fin.replace('-', '')
         filename_csv = "contenidos_consultados_{0}_a_{1}.csv".format(fecha_inicio_fmt, fecha_fin_fmt)
         filename_detalle = "contenidos_consultados_detalle_{0}_a_{1}.xlsx".format(fecha_inicio_fmt, fecha_fin_fmt)
-        filename_dashboard = "contenidos_consultados_{0}_a_{1}.xlsx".format(fecha_inicio_fmt, fecha_fin_fmt)
 
-    return filename_csv, filename_detalle, filename_dashboard
+    return filename_csv, filename_detalle
 
-def filtrar_por_patrones(df, rulename_col):
+def _claves_rulename(df, rulename_col):
+    '''Rulename de cada fila como texto (un rulename vacio queda 'nan', como str(x))'''
+    return df[rulename_col].astype(str).fillna('nan')
+
+def construir_indice_exclusiones(df, rulename_col):
+    '''
+    Evalua las exclusiones UNA vez por rulename distinto. El df trae una fila
+    por rulename por dia (cientos de miles de filas) pero los rulenames
+    distintos son unos pocos miles.
+
+    Retorna un DataFrame indexado por rulename (como str) con:
+      - filas: cantidad de filas del rulename en el df
+      - patron: primer patron de PATRONES_EXCLUIR que contiene (None si ninguno)
+      - capa1: True si lo excluye la CAPA 1 (contiene algun patron)
+      - capa2: True si esta en CONTENIDOS_EXCLUIR_MANUAL
+      - prefijo: RulenameUnique (primer palabra, o el rulename si no tiene espacio)
+    '''
+    indice = _claves_rulename(df, rulename_col).value_counts(sort=False).rename('filas').to_frame()
+    nombres = indice.index.to_series(index=indice.index)
+
+    patron = pd.Series(None, index=indice.index, dtype=object)
+    for texto, regex in _PATRONES_INDIVIDUALES:
+        sin_patron = patron.isna()
+        if not sin_patron.any():
+            break
+        coincide = nombres[sin_patron].str.contains(regex)
+        patron[coincide[coincide].index] = texto
+    indice['patron'] = patron
+    indice['capa1'] = patron.notna()
+    indice['capa2'] = nombres.isin(CONTENIDOS_EXCLUIR_MANUAL)
+    indice['prefijo'] = nombres.str.split(' ', n=1).str[0]
+    return indice
+
+def _filas_marcadas(df, rulename_col, indice, columna):
+    '''Veredicto del indice (por rulename distinto) llevado a cada fila del df'''
+    return _claves_rulename(df, rulename_col).map(indice[columna]).to_numpy(dtype=bool)
+
+def filtrar_por_patrones(df, rulename_col, indice=None):
     '''
     CAPA 1: Filtra contenidos usando patrones dinámicos (CONTAINS).
     Replica la lógica del Power BI documentada en el PDF.
 
     Excluye toda rule_name que contenga alguno de los patrones definidos en PATRONES_EXCLUIR.
+    Los patrones se evaluan sobre los rulenames distintos (construir_indice_exclusiones).
 
     Retorna: (df_filtrado, cantidad_excluidos, detalle_por_patron)
     '''
+    if indice is None:
+        indice = construir_indice_exclusiones(df, rulename_col)
     total_antes = len(df)
 
-    # Crear máscara: True si el rulename contiene algún patrón
-    mascara_excluir = df[rulename_col].astype(str).str.contains(_PATRON_REGEX, na=False)
-
-    # Detalle: contar cuántos excluye cada patrón individual (para el log)
+    # Detalle: filas que contienen cada patrón individual (para el log). Un
+    # rulename puede contar para varios patrones, igual que antes.
     detalle = {}
-    for patron in PATRONES_EXCLUIR:
-        patron_regex = re.compile(re.escape(patron), re.IGNORECASE)
-        coincidencias = df[rulename_col].astype(str).str.contains(patron_regex, na=False).sum()
+    nombres = indice.index.to_series(index=indice.index)
+    for texto, regex in _PATRONES_INDIVIDUALES:
+        coincidencias = int(indice.loc[nombres.str.contains(regex), 'filas'].sum())
         if coincidencias > 0:
-            detalle[patron] = coincidencias
+            detalle[texto] = coincidencias
 
-    df_filtrado = df[~mascara_excluir].copy()
+    df_filtrado = df[~_filas_marcadas(df, rulename_col, indice, 'capa1')].copy()
     cantidad_excluidos = total_antes - len(df_filtrado)
 
     return df_filtrado, cantidad_excluidos, detalle
 
-def filtrar_por_lista_manual(df, rulename_col):
+def filtrar_por_lista_manual(df, rulename_col, indice=None):
     '''
     CAPA 2: Filtra contenidos usando la lista fija de exclusiones manuales.
     Para los casos puntuales que no caen en ningún patrón de la Capa 1.
 
     Retorna: (df_filtrado, cantidad_excluidos)
     '''
+    if indice is None:
+        indice = construir_indice_exclusiones(df, rulename_col)
     total_antes = len(df)
-    df_filtrado = df[~df[rulename_col].isin(CONTENIDOS_EXCLUIR_MANUAL)].copy()
+    df_filtrado = df[~_filas_marcadas(df, rulename_col, indice, 'capa2')].copy()
     cantidad_excluidos = total_antes - len(df_filtrado)
     return df_filtrado, cantidad_excluidos
 
@@ -799,13 +991,17 @@ def procesar_contenidos(df, fecha_inicio, fecha_fin):
         ]
         print("    [INFO] Registros después de filtro de fecha: {:,}".format(len(df_filtrado)))
 
+    # Veredictos de exclusion y prefijo, una vez por rulename distinto
+    indice = construir_indice_exclusiones(df_filtrado, rulename_col)
+    log("    Rulenames distintos: {:,} (en {:,} registros)".format(len(indice), len(df_filtrado)))
+
     # 2. CAPA 1: Excluir por patrones dinámicos
     if APLICAR_EXCLUSIONES:
         log("")
         log("    === CAPA 1: Filtro por patrones dinámicos (CONTAINS) ===")
         log("    Patrones configurados: {}".format(len(PATRONES_EXCLUIR)))
         with step("    CAPA 1 - aplicando {} patrones".format(len(PATRONES_EXCLUIR))):
-            df_filtrado, excluidos_capa1, detalle_patrones = filtrar_por_patrones(df_filtrado, rulename_col)
+            df_filtrado, excluidos_capa1, detalle_patrones = filtrar_por_patrones(df_filtrado, rulename_col, indice)
         log("    Registros excluidos por patrones: {:,}".format(excluidos_capa1))
         log("    Registros restantes: {:,}".format(len(df_filtrado)))
 
@@ -821,7 +1017,7 @@ def procesar_contenidos(df, fecha_inicio, fecha_fin):
         log("    === CAPA 2: Filtro por lista fija manual ===")
         log("    Items en lista manual: {}".format(len(CONTENIDOS_EXCLUIR_MANUAL)))
         with step("    CAPA 2 - aplicando lista manual"):
-            df_filtrado, excluidos_capa2 = filtrar_por_lista_manual(df_filtrado, rulename_col)
+            df_filtrado, excluidos_capa2 = filtrar_por_lista_manual(df_filtrado, rulename_col, indice)
         log("    Registros excluidos por lista manual: {:,}".format(excluidos_capa2))
         log("    Registros restantes: {:,}".format(len(df_filtrado)))
 
@@ -833,9 +1029,7 @@ def procesar_contenidos(df, fecha_inicio, fecha_fin):
 
     # 4. Extraer prefijo (RulenameUnique) - lógica del PBI:
     #    Primer palabra antes del espacio, o el rulename completo si no tiene espacio
-    df_filtrado['_RulenameUnique'] = df_filtrado[rulename_col].apply(
-        lambda x: str(x).split(' ')[0] if ' ' in str(x) else str(x)
-    )
+    df_filtrado['_RulenameUnique'] = _claves_rulename(df_filtrado, rulename_col).map(indice['prefijo'])
 
     # 5. Para cada (prefijo, fecha): quedarse con el rulename con más sesiones ese día
     #    Esto evita que aparezcan múltiples rulenames del mismo grupo (ej: SA06CUX03)
@@ -945,13 +1139,14 @@ def procesar_contenidos(df, fecha_inicio, fecha_fin):
     if APLICAR_EXCLUSIONES and RULENAMES_REPORTAR_Y_EXCLUIR:
         print("")
         print("    [INFO] === CAPA 3: Reporte de posicion (rulenames marcados para excluir tras calcular su rank) ===")
+        # df_agrupado tiene una fila por rulename: lookup directo de su posicion
+        posiciones = pd.Series(df_agrupado.index, index=df_agrupado['Rulename'])
         indices_a_eliminar = []
         for rn in RULENAMES_REPORTAR_Y_EXCLUIR:
-            match = df_agrupado[df_agrupado['Rulename'] == rn]
-            if not match.empty:
-                idx_orig = match.index[0]
+            if rn in posiciones.index:
+                idx_orig = int(posiciones[rn])
                 posicion = idx_orig + 1  # 1-indexed
-                sesiones_rn = int(match.iloc[0]['Suma de Sesiones'])
+                sesiones_rn = int(df_agrupado.at[idx_orig, 'Suma de Sesiones'])
                 top10_flag = "SI ENTRA AL TOP 10" if posicion <= 10 else "fuera del top 10"
                 print("    [INFO] '{}'".format(rn))
                 print("           -> habria estado en el puesto #{} con {:,} sesiones ({})".format(
@@ -1002,110 +1197,47 @@ def create_detail_excel(filepath, df_contenidos, df_historico, descripcion):
 
     print("    [INFO] Creando Excel detallado...")
 
-    wb = openpyxl.Workbook()
+    libro = LibroExcel()
 
     # ===== HOJA 1: Buscador de contenidos =====
-    ws = wb.active
-    ws.title = 'Buscador de contenidos'
-
-    # Estilos
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, size=11, color="FFFFFF")
-    bold_font = Font(bold=True, size=11)
-    card_font = Font(bold=True, size=12)
-    card_value_font = Font(bold=True, size=14)
+    ws = libro.hoja('Buscador de contenidos', anchos={'A': 60, 'B': 18, 'C': 14, 'D': 18, 'E': 18})
 
     total_contenidos = len(df_contenidos)
     total_sesiones = int(df_contenidos['Suma de Sesiones'].sum())
 
     # Cards en filas 1-2
-    ws['A1'] = 'Cantidad de Rulenames'
-    ws['A1'].font = card_font
-    ws['B1'] = total_contenidos
-    ws['B1'].font = card_value_font
-    ws['B1'].number_format = '#,##0'
-
-    ws['D1'] = 'Total Sesiones'
-    ws['D1'].font = card_font
-    ws['E1'] = total_sesiones
-    ws['E1'].font = card_value_font
-    ws['E1'].number_format = '#,##0'
-
-    ws['A2'] = 'Período: {}'.format(descripcion)
-    ws['A2'].font = Font(size=10, italic=True)
+    ws.fila(('Cantidad de Rulenames', 'tarjeta'), (total_contenidos, 'tarjeta_valor'), None,
+            ('Total Sesiones', 'tarjeta'), (total_sesiones, 'tarjeta_valor'))
+    ws.fila(('Período: {}'.format(descripcion), 'nota'))
+    ws.fila()
 
     # Headers de tabla (fila 4)
-    ws['A4'] = 'Contenido'
-    ws['B4'] = 'Suma de Sesiones'
-    ws['C4'] = '% del Total'
-
-    for col in ['A', 'B', 'C']:
-        ws['{}4'.format(col)].font = header_font
-        ws['{}4'.format(col)].fill = header_fill
+    ws.fila(('Contenido', 'encabezado'), ('Suma de Sesiones', 'encabezado'), ('% del Total', 'encabezado'))
 
     # Datos (todos los contenidos)
-    for idx, row in df_contenidos.iterrows():
-        fila = 5 + idx
-        ws['A{}'.format(fila)] = row['Nombre Amigable']
-        ws['B{}'.format(fila)] = int(row['Suma de Sesiones'])
-        ws['B{}'.format(fila)].number_format = '#,##0'
-        ws['C{}'.format(fila)] = row['% del Total']
-        ws['C{}'.format(fila)].number_format = '0.00%'
+    ws.filas(
+        [df_contenidos['Nombre Amigable'], df_contenidos['Suma de Sesiones'].astype('int64'), df_contenidos['% del Total']],
+        estilos=[None, 'miles', 'porcentaje']
+    )
 
     # Fila de totales
-    fila_total = 5 + total_contenidos
-    ws['A{}'.format(fila_total)] = 'TOTAL'
-    ws['A{}'.format(fila_total)].font = bold_font
-    ws['B{}'.format(fila_total)] = total_sesiones
-    ws['B{}'.format(fila_total)].font = bold_font
-    ws['B{}'.format(fila_total)].number_format = '#,##0'
-    ws['C{}'.format(fila_total)] = 1.0
-    ws['C{}'.format(fila_total)].font = bold_font
-    ws['C{}'.format(fila_total)].number_format = '0.00%'
-
-    # Ajustar anchos
-    ws.column_dimensions['A'].width = 60
-    ws.column_dimensions['B'].width = 18
-    ws.column_dimensions['C'].width = 14
-    ws.column_dimensions['D'].width = 18
-    ws.column_dimensions['E'].width = 18
+    ws.fila(('TOTAL', 'negrita'), (total_sesiones, 'negrita_miles'), (1.0, 'negrita_porcentaje'))
 
     # ===== HOJA 2: Historico =====
     if df_historico is not None and len(df_historico) > 0:
-        ws2 = wb.create_sheet('Historico')
-
-        # Headers
-        ws2['A1'] = 'Fecha'
-        ws2['B1'] = 'Sesiones diarias'
-        ws2['A1'].font = header_font
-        ws2['A1'].fill = header_fill
-        ws2['B1'].font = header_font
-        ws2['B1'].fill = header_fill
-
-        # Datos
-        for idx, row in df_historico.iterrows():
-            fila = 2 + idx
-            ws2['A{}'.format(fila)] = row['Fecha']
-            ws2['A{}'.format(fila)].number_format = 'DD/MM/YYYY'
-            ws2['B{}'.format(fila)] = int(row['Sesiones diarias'])
-            ws2['B{}'.format(fila)].number_format = '#,##0'
-
-        # Fila de total
-        fila_total_hist = 2 + len(df_historico)
-        ws2['A{}'.format(fila_total_hist)] = 'TOTAL'
-        ws2['A{}'.format(fila_total_hist)].font = bold_font
-        ws2['B{}'.format(fila_total_hist)] = int(df_historico['Sesiones diarias'].sum())
-        ws2['B{}'.format(fila_total_hist)].font = bold_font
-        ws2['B{}'.format(fila_total_hist)].number_format = '#,##0'
-
-        # Ajustar anchos
-        ws2.column_dimensions['A'].width = 15
-        ws2.column_dimensions['B'].width = 18
-
-    wb.save(filepath)
+        ws2 = libro.hoja('Historico', anchos={'A': 15, 'B': 18})
+
+        ws2.fila(('Fecha', 'encabezado'), ('Sesiones diarias', 'encabezado'))
+        ws2.filas(
+            [df_historico['Fecha'], df_historico['Sesiones diarias'].astype('int64')],
+            estilos=['fecha', 'miles']
+        )
+        ws2.fila(('TOTAL', 'negrita'), (int(df_historico['Sesiones diarias'].sum()), 'negrita_miles'))
+
+    libro.guardar(filepath)
     print("    [OK] Excel detallado creado ({} contenidos, {} hojas)".format(
         total_contenidos,
-        len(wb.sheetnames)
+        len(libro.hojas)
     ))
 
 def format_top10_text(df_contenidos):
@@ -1122,118 +1254,13 @@ def format_top10_text(df_contenidos):
         lines.append('{}- {}: ({})'.format(idx + 1, row['Nombre Amigable'], sesiones_fmt))
     return '\n'.join(lines)
 
-def create_dashboard(filepath, valor_d11, modo, mes, anio, fecha_inicio, fecha_fin):
+def execute_query_and_save(contexto=None):
     '''
-    Crea el Excel Dashboard con la estructura estándar.
-    Llena SOLO la celda D11 (Contenidos más consultados - Top 10 formateado)
+    Función principal que ejecuta la query y guarda los resultados
+    contexto: ContextoAthena compartido (run_all.py); si es None se crea uno propio
     '''
-
-    print("    [INFO] Creando Dashboard...")
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = 'Dashboard'
-
-    header_font = Font(bold=True)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
-    # Determinar el header de fecha
-    if modo == 'mes':
-        header_fecha = '{}-{}'.format(get_month_abbr(mes), str(anio)[-2:])
-    else:
-        fecha_inicio_obj = datetime.strptime(fecha_inicio, '%Y-%m-%d')
-        fecha_fin_obj = datetime.strptime(fecha_fin, '%Y-%m-%d')
-        header_fecha = '{}-{}'.format(
-            fecha_inicio_obj.strftime('%d/%m'),
-            fecha_fin_obj.strftime('%d/%m/%y')
-        )
-
-    # FILA 1: Encabezados
-    ws['B1'] = 'Indicador'
-    ws['C1'] = 'Descripción/Detalle'
-    ws['D1'] = header_fecha
-    ws['B1'].font = header_font
-    ws['C1'].font = header_font
-    ws['D1'].font = header_font
-
-    # Filas 2-17: Indicadores
-    ws['B2'] = 'Conversaciones'
-    ws['C2'] = 'Q Conversaciones'
-
-    ws['B3'] = 'Usuarios'
-    ws['C3'] = 'Q Usuarios únicos'
-
-    ws['B4'] = 'Sesiones abiertas por Pushes'
-    ws['C4'] = 'Q Sesiones que se abrieron con una Push'
-
-    ws['B5'] = 'Sesiones Alcanzadas por Pushes'
-    ws['C5'] = 'Q Sesiones que recibieron al menos 1 Push'
-
-    ws['B6'] = 'Mensajes Pushes Enviados'
-    ws['C6'] = 'Q de mensajes enviados bajo el formato push'
-
-    ws['B7'] = 'Contenidos en Botmaker'
-    ws['C7'] = 'Contenidos prendidos en botmaker'
-
-    ws['B8'] = 'Contenidos Prendidos para el USUARIO'
-    ws['C8'] = 'Contenidos prendidos de cara al usuario (relevantes)'
-
-    ws['B9'] = 'Interacciones'
-    ws['C9'] = 'Q Interacciones'
-
-    ws['B10'] = 'Trámites, solicitudes y turnos'
-    ws['C10'] = 'Q Trámites, solicitudes y turnos disponibles'
-
-    ws['B11'] = 'Contenidos más consultados'
-    ws['C11'] = 'Q Contenidos con más interacciones en el mes'
-    if valor_d11 is not None:
-        ws['D11'] = valor_d11
-        ws['D11'].alignment = Alignment(wrap_text=True, vertical='top')
-
-    ws['B12'] = 'Derivaciones'
-    ws['C12'] = 'Q Derivaciones'
-
-    ws['B13'] = 'No entendimiento'
-    ws['C13'] = 'Performance motor de búsqueda del nuevo modelo de IA'
-
-    ws['B14'] = 'Tasa de Efectividad'
-    ws['C14'] = 'Mide el porcentaje de usuarios que lograron su objetivo'
-
-    ws['B15'] = 'CES (Customer Effort Score)'
-    ws['C15'] = 'Mide la facilidad con la que los usuarios pueden interactuar'
-
-    ws['B16'] = 'Satisfacción (CSAT)'
-    ws['C16'] = 'Mide la satisfacción usando una escala de 1 a 5'
-
-    ws['B17'] = 'Uptime servidor'
-    ws['C17'] = 'Disponibilidad del servidor (% tiempo activo)'
-
-    # Aplicar bordes a todas las celdas con datos
-    for row in range(1, 18):
-        for col in ['B', 'C', 'D']:
-            ws['{}{}'.format(col, row)].border = border
-
-    # Ajustar anchos
-    ws.column_dimensions['B'].width = 35
-    ws.column_dimensions['C'].width = 50
-    ws.column_dimensions['D'].width = 50
-
-    wb.save(filepath)
-
-    if valor_d11 is not None:
-        # Mostrar preview del Top 10
-        preview = valor_d11.split('\n')[0]
-        print("    [OK] Dashboard creado (D11 = Top 10, ej: {})".format(preview))
-    else:
-        print("    [OK] Dashboard creado (D11 vacío)")
-
-def execute_query_and_save():
-    '''Función principal que ejecuta la query y guarda los resultados'''
+    if contexto is None:
+        contexto = ContextoAthena(CONFIG['region'], CONFIG['workgroup'], CONFIG['database'], log=log)
 
     print("Leyendo configuracion de fechas...")
     modo, fecha_inicio, fecha_fin, mes, anio, descripcion = read_date_config(CONFIG['config_file'])
@@ -1248,7 +1275,7 @@ def execute_query_and_save():
     print("    Fecha inicio: {}".format(fecha_inicio))
     print("    Fecha fin: {}".format(fecha_fin))
 
-    query = build_query()
+    query = build_query(fecha_inicio, fecha_fin)
 
     print("")
     print("Configuracion AWS:")
@@ -1261,35 +1288,20 @@ def execute_query_and_save():
     print("    {}".format(query))
 
     try:
-        session = boto3.Session(region_name=CONFIG['region'])
-
         log("")
-        log("ATENCION: la query escanea TODA la vista boti_vw_buscador_rulename")
-        log("          (sin filtro de fecha). Puede tardar VARIOS MINUTOS - es normal.")
+        log("ATENCION: la vista boti_vw_buscador_rulename se filtra y agrupa en Athena")
+        log("          (solo el periodo). Puede tardar unos minutos - es normal.")
         log("          El proceso NO esta colgado; estoy esperando que Athena responda.")
 
         with step("Query Athena (boti_vw_buscador_rulename)"):
             try:
-                df = wr.athena.read_sql_query(
-                    sql=query,
-                    database=CONFIG['database'],
-                    workgroup=CONFIG['workgroup'],
-                    boto3_session=session,
-                    ctas_approach=False,
-                    unload_approach=False
-                )
+                df = ejecutar_query(contexto, query, log=log,
+                                    filas_estimadas=filas_estimadas_vista(fecha_inicio, fecha_fin))
             except Exception as e:
-                if 'workgroup' in str(e).lower():
-                    log("[ADVERTENCIA] Error con workgroup; reintentando sin workgroup...")
-                    df = wr.athena.read_sql_query(
-                        sql=query,
-                        database=CONFIG['database'],
-                        boto3_session=session,
-                        ctas_approach=False,
-                        unload_approach=False
-                    )
-                else:
-                    raise e
+                # Ej: la vista cambio de nombres de columna. La vista completa
+                # se procesa igual en procesar_contenidos()
+                log("[ADVERTENCIA] Query filtrada fallo ({}); se descarga la vista completa".format(str(e)))
+                df = ejecutar_query(contexto, build_query_vista_completa(), log=log)
 
         log("[OK] Consulta ejecutada - {:,} filas descargadas".format(len(df)))
 
@@ -1305,14 +1317,13 @@ def execute_query_and_save():
         print("Total de filas descargadas: {:,}".format(len(df)))
 
         # Generar nombres de archivo
-        filename_csv, filename_detalle, filename_dashboard = generate_filename(modo, mes, anio, fecha_inicio, fecha_fin)
+        filename_csv, filename_detalle = generate_filename(modo, mes, anio, fecha_inicio, fecha_fin)
         output_folder = CONFIG['output_folder']
 
         os.makedirs(output_folder, exist_ok=True)
 
         local_path_csv = os.path.join(output_folder, filename_csv)
         local_path_detalle = os.path.join(output_folder, filename_detalle)
-        local_path_dashboard = os.path.join(output_folder, filename_dashboard)
 
         # Guardar CSV con datos crudos
         log("")
@@ -1328,7 +1339,7 @@ def execute_query_and_save():
         mes_nombre_tr = get_month_name(mes) if modo == 'mes' else 'rango'
         anio_tr = anio if modo == 'mes' else fecha_inicio.replace('-', '')
         with step("Descargando TRASCO desde Athena (Name / Topic path / Topic)"):
-            descargar_trasco_csv_athena(fecha_inicio, fecha_fin, mes_nombre_tr, anio_tr)
+            descargar_trasco_csv_athena(contexto, fecha_inicio, fecha_fin, mes_nombre_tr, anio_tr)
 
         # Procesar datos
         log("")
@@ -1344,19 +1355,21 @@ def execute_query_and_save():
         with step("Generando Excel detallado ({} filas)".format(len(df_contenidos))):
             create_detail_excel(local_path_detalle, df_contenidos, df_historico, descripcion)
 
-        # Generar Dashboard
+        # Registrar D11 en el tablero (el Excel lo arma consolidar_excel.py)
         log("")
-        with step("Generando Dashboard"):
+        with step("Registrando D11 en el tablero"):
             # D11 = Top 10 contenidos formateado como texto multilínea
             top10_text = format_top10_text(df_contenidos)
-            create_dashboard(local_path_dashboard, top10_text, modo, mes, anio, fecha_inicio, fecha_fin)
+            ruta_tablero = tablero.registrar('contenidos_consultados', {'D11': top10_text},
+                                             modo, mes, anio, fecha_inicio, fecha_fin,
+                                             origen=os.path.basename(local_path_detalle))
 
         print("")
         print("=" * 60)
         print("ARCHIVOS GENERADOS:")
         print("=" * 60)
         print("    [CSV] {}".format(filename_csv))
-        print("          - Datos crudos de la vista Athena")
+        print("          - Filas de la vista Athena del periodo (ya filtradas y agrupadas)")
         print("")
         print("    [EXCEL DETALLE] {}".format(filename_detalle))
         print("          - Hoja 'Buscador de contenidos': {} contenidos con %GT".format(total_contenidos))
@@ -1364,7 +1377,7 @@ def execute_query_and_save():
             print("          - Hoja 'Historico': {} días de serie temporal".format(len(df_historico)))
         print("          - Total sesiones: {:,}".format(int(df_contenidos['Suma de Sesiones'].sum())))
         print("")
-        print("    [DASHBOARD] {}".format(filename_dashboard))
+        print("    [TABLERO] {}".format(ruta_tablero))
         print("          - Celda D11 = Top 10 contenidos más consultados")
 
         print("")
@@ -1381,6 +1394,27 @@ def execute_query_and_save():
         traceback.print_exc()
         return None
 
+def consultas():
+    '''
+    Queries que ejecuta el modulo para el periodo de config_fechas.txt.
+    run_all.py las envia a Athena por adelantado, antes de llamar a run().
+    '''
+    modo, fecha_inicio, fecha_fin = read_date_config(CONFIG['config_file'])[:3]
+    if modo is None or fecha_inicio is None:
+        return []
+    query = build_query(fecha_inicio, fecha_fin)
+    query_trasco = build_query_trasco(fecha_inicio, fecha_fin)
+    return [(query, elegir_transporte(query, filas_estimadas_vista(fecha_inicio, fecha_fin))),
+            (query_trasco, elegir_transporte(query_trasco, FILAS_TRASCO))]
+
+def run(contexto):
+    '''
+    Punto de entrada en modo libreria: run_all.py importa el modulo y lo
+    ejecuta en su mismo proceso, con un ContextoAthena compartido.
+    Retorna True si el proceso termino OK.
+    '''
+    return execute_query_and_save(contexto) is not None
+
 # ==================== EJECUCION PRINCIPAL ====================
 
 if __name__ == "__main__":
@@ -1403,12 +1437,14 @@ if __name__ == "__main__":
     print("      aws-azure-login --profile default --mode=gui")
     print("")
     print("=" * 60)
-    try:
-        input("  Presioná ENTER para continuar (o Ctrl+C para cancelar)...")
-    except KeyboardInterrupt:
-        print("")
-        print("  Cancelado por el usuario.")
-        raise SystemExit(0)
+    # Bajo run_all.py no hay terminal interactiva (run_all ya verificó AWS)
+    if not os.environ.get('BOTI_RUN_ALL'):
+        try:
+            input("  Presioná ENTER para continuar (o Ctrl+C para cancelar)...")
+        except KeyboardInterrupt:
+            print("")
+            print("  Cancelado por el usuario.")
+            raise SystemExit(0)
     print("")
 
     print("")
@@ -1416,11 +1452,11 @@ if __name__ == "__main__":
     print("SCRIPT: CONTENIDOS CONSULTADOS - QUERY ATHENA")
     print("=" * 60)
     print("Rol requerido: PIBADataScientist")
-    print("Salida: CSV + Excel Detalle (2 hojas) + Dashboard (celda D11)")
-    print("Query: SELECT * FROM boti_vw_buscador_rulename")
+    print("Salida: CSV + Excel Detalle (2 hojas) + celda D11 del tablero")
+    print("Query: boti_vw_buscador_rulename del periodo (filtrada y agrupada en Athena)")
     print("")
     print("LÓGICA (filtrado en 2 capas como el PBI):")
-    print("  1. Descargar vista completa de Athena")
+    print("  1. Descargar de Athena solo el período, con los pasos 3 a 6 ya aplicados")
     print("  2. Filtrar por rango de fechas del período")
     if APLICAR_EXCLUSIONES:
         print("  3. CAPA 1: Excluir por {} patrones dinámicos (CONTAINS)".format(len(PATRONES_EXCLUIR)))
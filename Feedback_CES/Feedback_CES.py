@@ -12,22 +12,28 @@ MODOS SOPORTADOS:
 Workgroup: Production-caba-piba-athena-boti-group
 Rol: PIBADataScientist
 '''
-import boto3
-import awswrangler as wr
-import pandas as pd
 from datetime import datetime
 from calendar import monthrange
 import os
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+import sys
+from openpyxl.styles import Font, Alignment, PatternFill
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))  # Raiz del repo (paquete comun)
+from comun.contexto import ContextoAthena
+from comun.athena import ejecutar_query
+from comun import diario
+from comun import tablero
+from comun.paquete_metricas import build_query_paquete, resultado_cxf, consultas_por_mes as consultas_paquete_por_mes
+from comun.reporte_excel import LibroExcel
 
 # ==================== CONFIGURACION ====================
 CONFIG = {
     'region': 'us-east-1',
     'workgroup': 'Production-caba-piba-athena-boti-group',
     'database': 'caba-piba-consume-zone-db',
-    'output_folder': 'output',
-    'config_file': '../config_fechas.txt'  # Config centralizado en raiz del proyecto
+    'output_folder': os.path.join(SCRIPT_DIR, 'output'),
+    'config_file': os.path.join(SCRIPT_DIR, '..', 'config_fechas.txt')  # Config centralizado en raiz del proyecto
 }
 
 # Reglas específicas para el cálculo de CES (Customer Effort Score)
@@ -165,29 +171,14 @@ def get_month_name(mes):
     }
     return meses.get(mes, 'mes_invalido')
 
-def get_month_abbr(mes):
-    '''Retorna la abreviatura del mes en español'''
-    if mes is None:
-        return 'rango'
-    meses = {
-        1: 'ene', 2: 'feb', 3: 'mar', 4: 'abr',
-        5: 'may', 6: 'jun', 7: 'jul', 8: 'ago',
-        9: 'sep', 10: 'oct', 11: 'nov', 12: 'dic'
-    }
-    return meses.get(mes, 'mes')
-
 def build_query(fecha_inicio, fecha_fin):
-    '''Construye la query de Feedback - CES con el rango de fechas especificado'''
-    
-    query = """SELECT 
-rule_name,
-count(distinct(session_id)) as Cant_Sesiones 
-FROM "caba-piba-consume-zone-db"."boti_message_metrics_2"
-WHERE CAST(session_creation_time AS DATE) BETWEEN date '{fecha_inicio}' and date '{fecha_fin}'
-and rule_name like ('%CXF%')
-group by rule_name""".format(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
-    
-    return query
+    '''
+    Construye la query de Feedback - CES con el rango de fechas especificado.
+    Es la query paquete compartida con los otros modulos de Feedback y con
+    Sesiones_Alcanzadas (un solo escaneo de boti_message_metrics_2); las
+    reglas CXF se toman del resultado con resultado_cxf().
+    '''
+    return build_query_paquete(fecha_inicio, fecha_fin)
 
 def generate_filename(modo, mes, anio, fecha_inicio, fecha_fin):
     '''Genera los nombres de archivos basados en el modo y las fechas'''
@@ -195,15 +186,13 @@ def generate_filename(modo, mes, anio, fecha_inicio, fecha_fin):
         mes_nombre = get_month_name(mes)
         filename_csv = "feedback_ces_{0}_{1}.csv".format(mes_nombre, anio)
         filename_excel_detalle = "feedback_ces_detalle_{0}_{1}.xlsx".format(mes_nombre, anio)
-        filename_dashboard = "feedback_ces_{0}_{1}.xlsx".format(mes_nombre, anio)
     else:
         fecha_inicio_fmt = fecha_inicio.replace('-', '')
         fecha_fin_fmt = fecha_fin.replace('-', '')
         filename_csv = "feedback_ces_{0}_a_{1}.csv".format(fecha_inicio_fmt, fecha_fin_fmt)
         filename_excel_detalle = "feedback_ces_detalle_{0}_a_{1}.xlsx".format(fecha_inicio_fmt, fecha_fin_fmt)
-        filename_dashboard = "feedback_ces_{0}_a_{1}.xlsx".format(fecha_inicio_fmt, fecha_fin_fmt)
     
-    return filename_csv, filename_excel_detalle, filename_dashboard
+    return filename_csv, filename_excel_detalle
 
 def extraer_valores_ces(df):
     '''
@@ -277,51 +266,49 @@ def calcular_ces(valores):
         'ces': ces
     }
 
+# Estilos propios del Excel detallado de CES (ademas de los de comun.reporte_excel)
+ESTILOS_EXCEL_CES = {
+    'encabezado_ces': dict(font=Font(bold=True, size=11), fill=PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")),
+    'titulo': dict(font=Font(bold=True, size=14)),
+    'subtitulo': dict(font=Font(bold=True, size=10)),
+    'nota_chica': dict(font=Font(size=9, italic=True)),
+    'ces': dict(font=Font(bold=True, size=12, color="FFFFFF"), number_format='0.00',
+                fill=PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")),
+    'ces_centrado': dict(font=Font(bold=True, size=12, color="FFFFFF"), number_format='0.00',
+                         fill=PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid"),
+                         alignment=Alignment(horizontal='center')),
+}
+# Interpretacion del CES: (limite superior, texto, color)
+INTERPRETACIONES_CES = [
+    (2, "Excelente - Muy fácil de usar", "70AD47"),
+    (3, "Bueno - Experiencia satisfactoria", "FFC000"),
+    (4, "Regular - Requiere mejoras", "FF6600"),
+    (None, "Crítico - Experiencia muy difícil", "C00000"),
+]
+for _, _, _color in INTERPRETACIONES_CES:
+    ESTILOS_EXCEL_CES['interpretacion_' + _color] = dict(font=Font(bold=True, size=11, color=_color))
+
 def create_excel_with_ces(filepath, df, valores, calculos, modo, mes, anio, fecha_inicio, fecha_fin):
     '''
     Crea un Excel con la estructura de "esfuerzo CES"
     Incluye las 10 reglas específicas y los cálculos de CES
     '''
-    
+
     print("    [INFO] Creando Excel detallado con cálculo de CES...")
-    
-    wb = openpyxl.Workbook()
-    
+
+    libro = LibroExcel(ESTILOS_EXCEL_CES)
+
     # ==================== HOJA 1: BASE CRUDA ====================
-    ws_base = wb.active
-    ws_base.title = 'base cruda'
-    
-    # Estilos para base cruda
-    header_font = Font(bold=True, size=11)
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    
-    # Headers
-    ws_base['A1'] = 'rule_name'
-    ws_base['B1'] = 'Cant_Sesiones'
-    ws_base['A1'].font = header_font
-    ws_base['B1'].font = header_font
-    ws_base['A1'].fill = header_fill
-    ws_base['B1'].fill = header_fill
-    
+    ws_base = libro.hoja('base cruda', anchos={'A': 50, 'B': 15})
+    ws_base.fila(('rule_name', 'encabezado_ces'), ('Cant_Sesiones', 'encabezado_ces'))
+
     # Datos - ordenados por cantidad de sesiones
     df_sorted = df.sort_values('cant_sesiones', ascending=False)
-    for idx, row in enumerate(df_sorted.iterrows(), start=2):
-        ws_base['A{}'.format(idx)] = row[1]['rule_name']
-        ws_base['B{}'.format(idx)] = int(row[1]['cant_sesiones'])
-    
-    # Ajustar anchos
-    ws_base.column_dimensions['A'].width = 50
-    ws_base.column_dimensions['B'].width = 15
-    
+    ws_base.filas([df_sorted['rule_name'], df_sorted['cant_sesiones'].astype('int64')])
+
     # ==================== HOJA 2: ESFUERZO CES ====================
-    ws = wb.create_sheet('esfuerzo CES')
-    
-    # Estilos
-    title_font = Font(bold=True, size=12)
-    header_font_table = Font(bold=True, size=11)
-    ces_font = Font(bold=True, size=12, color="FFFFFF")
-    ces_fill = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
-    
+    ws = libro.hoja('esfuerzo CES', anchos={'A': 40, 'B': 15, 'C': 15, 'D': 15})
+
     # Determinar el header de fecha
     if modo == 'mes':
         header_fecha = '{} {}'.format(get_month_name(mes), anio)
@@ -332,285 +319,88 @@ def create_excel_with_ces(filepath, df, valores, calculos, modo, mes, anio, fech
             fecha_inicio_obj.strftime('%d/%m/%Y'),
             fecha_fin_obj.strftime('%d/%m/%Y')
         )
-    
+
     # FILA 1: Header
-    ws['A1'] = header_fecha
-    ws['A1'].font = title_font
-    
+    ws.fila((header_fecha, 'tarjeta'))
+
     # FILA 2: Headers de tabla
-    ws['A2'] = 'Respuesta'
-    ws['B2'] = 'Valores CES'
-    ws['C2'] = 'Total'
-    ws['D2'] = 'Ponderado'
-    ws['A2'].font = header_font_table
-    ws['B2'].font = header_font_table
-    ws['C2'].font = header_font_table
-    ws['D2'].font = header_font_table
-    
+    ws.fila(*[(titulo, 'negrita') for titulo in ('Respuesta', 'Valores CES', 'Total', 'Ponderado')])
+
     # FILAS 3-7: Tabla de resultados
-    ws['A3'] = 'Muy difícil'
-    ws['B3'] = VALORES_CES['muy_dificil']
-    ws['C3'] = calculos['muy_dificil_total']
-    ws['D3'] = calculos['muy_dificil_ponderado']
-    
-    ws['A4'] = 'Difícil'
-    ws['B4'] = VALORES_CES['dificil']
-    ws['C4'] = calculos['dificil_total']
-    ws['D4'] = calculos['dificil_ponderado']
-    
-    ws['A5'] = 'Más o menos'
-    ws['B5'] = VALORES_CES['mas_o_menos']
-    ws['C5'] = calculos['mas_o_menos_total']
-    ws['D5'] = calculos['mas_o_menos_ponderado']
-    
-    ws['A6'] = 'Fácil'
-    ws['B6'] = VALORES_CES['facil']
-    ws['C6'] = calculos['facil_total']
-    ws['D6'] = calculos['facil_ponderado']
-    
-    ws['A7'] = 'Muy fácil'
-    ws['B7'] = VALORES_CES['muy_facil']
-    ws['C7'] = calculos['muy_facil_total']
-    ws['D7'] = calculos['muy_facil_ponderado']
-    
+    for etiqueta, clave in [('Muy difícil', 'muy_dificil'), ('Difícil', 'dificil'),
+                            ('Más o menos', 'mas_o_menos'), ('Fácil', 'facil'),
+                            ('Muy fácil', 'muy_facil')]:
+        ws.fila(etiqueta, VALORES_CES[clave], calculos[clave + '_total'], calculos[clave + '_ponderado'])
+
     # FILA 8: Totales
-    ws['A8'] = 'Totales:'
-    ws['A8'].font = Font(bold=True)
-    ws['C8'] = calculos['total_sesiones']
-    ws['D8'] = calculos['total_ponderado']
-    ws['C8'].font = Font(bold=True)
-    ws['D8'].font = Font(bold=True)
-    
+    ws.fila(('Totales:', 'negrita'), None, (calculos['total_sesiones'], 'negrita'),
+            (calculos['total_ponderado'], 'negrita'))
+
     # FILA 9: CES
-    ws['A9'] = 'CES'
-    ws['A9'].font = Font(bold=True, size=12)
-    ws['C9'] = calculos['ces']
-    ws['C9'].font = ces_font
-    ws['C9'].fill = ces_fill
-    ws['C9'].number_format = '0.00'
-    
+    ws.fila(('CES', 'tarjeta'), None, (calculos['ces'], 'ces'))
+
     # Línea en blanco
-    row = 11
-    
+    ws.fila()
+
     # DETALLE DE REGLAS
-    ws['A{}'.format(row)] = 'DETALLE POR REGLA'
-    ws['A{}'.format(row)].font = Font(bold=True)
-    row += 1
-    
+    ws.fila(('DETALLE POR REGLA', 'negrita'))
+
     # Integraciones
-    ws['A{}'.format(row)] = 'INTEGRACIONES:'
-    ws['A{}'.format(row)].font = Font(bold=True, size=10)
-    row += 1
-    
-    for key in ['dificil_integraciones', 'facil_integraciones', 'mas_o_menos_integraciones', 
+    ws.fila(('INTEGRACIONES:', 'subtitulo'))
+    for key in ['dificil_integraciones', 'facil_integraciones', 'mas_o_menos_integraciones',
                 'muy_dificil_integraciones', 'muy_facil_integraciones']:
-        ws['A{}'.format(row)] = REGLAS_CES[key]
-        ws['B{}'.format(row)] = valores[key]
-        row += 1
-    
+        ws.fila(REGLAS_CES[key], valores[key])
+
     # Estáticos
-    row += 1
-    ws['A{}'.format(row)] = 'ESTÁTICOS:'
-    ws['A{}'.format(row)].font = Font(bold=True, size=10)
-    row += 1
-    
+    ws.fila()
+    ws.fila(('ESTÁTICOS:', 'subtitulo'))
     for key in ['dificil_estaticos', 'facil_estaticos', 'mas_o_menos_estaticos',
                 'muy_dificil_estaticos', 'muy_facil_estaticos']:
-        ws['A{}'.format(row)] = REGLAS_CES[key]
-        ws['B{}'.format(row)] = valores[key]
-        row += 1
-    
-    # Ajustar anchos de columna
-    ws.column_dimensions['A'].width = 40
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 15
-    
+        ws.fila(REGLAS_CES[key], valores[key])
+
     # ==================== HOJA 3: RESUMEN EJECUTIVO ====================
-    ws_resumen = wb.create_sheet('Resumen')
-    
+    ws_resumen = libro.hoja('Resumen', anchos={'A': 35, 'B': 20})
+
     # Título
-    ws_resumen['A1'] = 'FEEDBACK - CES (Customer Effort Score)'
-    ws_resumen['A1'].font = Font(bold=True, size=14)
-    ws_resumen['A2'] = 'Período: {}'.format(header_fecha)
-    ws_resumen['A2'].font = Font(size=11)
-    
+    ws_resumen.fila(('FEEDBACK - CES (Customer Effort Score)', 'titulo'))
+    ws_resumen.fila('Período: {}'.format(header_fecha))
+    ws_resumen.fila()
+
     # Métrica principal
-    ws_resumen['A4'] = '🎯 CES (Customer Effort Score)'
-    ws_resumen['A4'].font = Font(bold=True, size=12)
-    
-    ws_resumen['A5'] = 'Puntuación CES:'
-    ws_resumen['B5'] = calculos['ces']
-    ws_resumen['B5'].number_format = '0.00'
-    ws_resumen['B5'].font = ces_font
-    ws_resumen['B5'].fill = ces_fill
-    ws_resumen['B5'].alignment = Alignment(horizontal='center')
-    
-    ws_resumen['A6'] = 'Escala: 1 (muy fácil) a 5 (muy difícil)'
-    ws_resumen['A6'].font = Font(size=9, italic=True)
-    
+    ws_resumen.fila(('🎯 CES (Customer Effort Score)', 'tarjeta'))
+    ws_resumen.fila('Puntuación CES:', (calculos['ces'], 'ces_centrado'))
+    ws_resumen.fila(('Escala: 1 (muy fácil) a 5 (muy difícil)', 'nota_chica'))
+    ws_resumen.fila()
+
     # Distribución
-    ws_resumen['A8'] = 'DISTRIBUCIÓN DE RESPUESTAS'
-    ws_resumen['A8'].font = Font(bold=True, size=11)
-    
-    ws_resumen['A9'] = 'Muy fácil (1):'
-    ws_resumen['B9'] = calculos['muy_facil_total']
-    
-    ws_resumen['A10'] = 'Fácil (2):'
-    ws_resumen['B10'] = calculos['facil_total']
-    
-    ws_resumen['A11'] = 'Más o menos (3):'
-    ws_resumen['B11'] = calculos['mas_o_menos_total']
-    
-    ws_resumen['A12'] = 'Difícil (4):'
-    ws_resumen['B12'] = calculos['dificil_total']
-    
-    ws_resumen['A13'] = 'Muy difícil (5):'
-    ws_resumen['B13'] = calculos['muy_dificil_total']
-    
-    ws_resumen['A15'] = 'Total de respuestas:'
-    ws_resumen['B15'] = calculos['total_sesiones']
-    ws_resumen['B15'].font = Font(bold=True)
-    
+    ws_resumen.fila(('DISTRIBUCIÓN DE RESPUESTAS', 'negrita'))
+    ws_resumen.fila('Muy fácil (1):', calculos['muy_facil_total'])
+    ws_resumen.fila('Fácil (2):', calculos['facil_total'])
+    ws_resumen.fila('Más o menos (3):', calculos['mas_o_menos_total'])
+    ws_resumen.fila('Difícil (4):', calculos['dificil_total'])
+    ws_resumen.fila('Muy difícil (5):', calculos['muy_dificil_total'])
+    ws_resumen.fila()
+    ws_resumen.fila('Total de respuestas:', (calculos['total_sesiones'], 'negrita'))
+    ws_resumen.fila()
+
     # Interpretación
-    ws_resumen['A17'] = 'INTERPRETACIÓN'
-    ws_resumen['A17'].font = Font(bold=True, size=11)
-    
-    if calculos['ces'] <= 2:
-        interpretacion = "Excelente - Muy fácil de usar"
-        color = "70AD47"
-    elif calculos['ces'] <= 3:
-        interpretacion = "Bueno - Experiencia satisfactoria"
-        color = "FFC000"
-    elif calculos['ces'] <= 4:
-        interpretacion = "Regular - Requiere mejoras"
-        color = "FF6600"
-    else:
-        interpretacion = "Crítico - Experiencia muy difícil"
-        color = "C00000"
-    
-    ws_resumen['A18'] = interpretacion
-    ws_resumen['A18'].font = Font(bold=True, size=11, color=color)
-    
-    # Ajustar anchos
-    ws_resumen.column_dimensions['A'].width = 35
-    ws_resumen.column_dimensions['B'].width = 20
-    
+    ws_resumen.fila(('INTERPRETACIÓN', 'negrita'))
+    for limite, interpretacion, color in INTERPRETACIONES_CES:
+        if limite is None or calculos['ces'] <= limite:
+            break
+    ws_resumen.fila((interpretacion, 'interpretacion_' + color))
+
     # Guardar
-    wb.save(filepath)
-    print("    [OK] Excel detallado creado con {} hojas".format(len(wb.sheetnames)))
+    libro.guardar(filepath)
+    print("    [OK] Excel detallado creado con {} hojas".format(len(libro.hojas)))
 
-def create_or_update_dashboard_master(filepath, ces_valor, modo, mes, anio, fecha_inicio, fecha_fin):
+def execute_query_and_save(contexto=None):
     '''
-    Crea o actualiza el Excel Dashboard Master
-    Llena SOLO la celda D15 (CES - Customer Effort Score)
+    Función principal que ejecuta la query y guarda los resultados
+    contexto: ContextoAthena compartido (run_all.py); si es None se crea uno propio
     '''
-    
-    # Verificar si el archivo ya existe
-    if os.path.exists(filepath):
-        print("    [INFO] Dashboard Master existe, actualizando celda D15...")
-        wb = openpyxl.load_workbook(filepath)
-        ws = wb.active
-        
-        # Actualizar SOLO D15
-        ws['D15'] = ces_valor
-        ws['D15'].number_format = '0.00'
-        
-        wb.save(filepath)
-        print("    [OK] Dashboard Master actualizado (D15 = {:.2f})".format(ces_valor))
-    else:
-        print("    [INFO] Dashboard Master no existe, creando desde cero...")
-        
-        # Crear nuevo workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = 'Dashboard'
-        
-        header_font = Font(bold=True)
-        
-        # Determinar el header de fecha
-        if modo == 'mes':
-            header_fecha = '{}-{}'.format(get_month_abbr(mes), str(anio)[-2:])
-        else:
-            fecha_inicio_obj = datetime.strptime(fecha_inicio, '%Y-%m-%d')
-            fecha_fin_obj = datetime.strptime(fecha_fin, '%Y-%m-%d')
-            header_fecha = '{}-{}'.format(
-                fecha_inicio_obj.strftime('%d/%m'),
-                fecha_fin_obj.strftime('%d/%m/%y')
-            )
-        
-        # FILA 1: Encabezados
-        ws['B1'] = 'Indicador'
-        ws['C1'] = 'Descripción/Detalle'
-        ws['D1'] = header_fecha
-        ws['B1'].font = header_font
-        ws['C1'].font = header_font
-        ws['D1'].font = header_font
-        
-        # FILA 2-13: Otros indicadores (vacíos)
-        ws['B2'] = 'Conversaciones'
-        ws['C2'] = 'Q Conversaciones'
-        
-        ws['B3'] = 'Usuarios'
-        ws['C3'] = 'Q Usuarios únicos'
-        
-        ws['B4'] = 'Sesiones abiertas por Pushes'
-        ws['C4'] = 'Q Sesiones que se abrieron con una Push'
-        
-        ws['B5'] = 'Sesiones Alcanzadas por Pushes'
-        ws['C5'] = 'Q Sesiones que recibieron al menos 1 Push'
-        
-        ws['B6'] = 'Mensajes Pushes Enviados'
-        ws['C6'] = 'Q de mensajes enviados bajo el formato push [Hilde gris]'
-        
-        ws['B7'] = 'Contenidos en Botmaker'
-        ws['C7'] = 'Contenidos prendidos en botmaker (todos los prendidos, incluy'
-        
-        ws['B8'] = 'Contenidos Prendidos para  el USUARIO'
-        ws['C8'] = 'Contenidos prendidos de cara al usuario (relevantes) – (no inclu'
-        
-        ws['B9'] = 'Interacciones'
-        ws['C9'] = 'Q Interacciones'
-        
-        ws['B10'] = 'Trámites, solicitudes y turnos'
-        ws['C10'] = 'Q Trámites, solicitudes y turnos disponibles'
-        
-        ws['B11'] = 'contenidos mas consultados'
-        ws['C11'] = 'Q Contenidos con más interacciones en el mes (Top 10)'
-        
-        ws['B12'] = 'Derivaciones'
-        ws['C12'] = 'Q Derivaciones'
-        
-        ws['B13'] = 'No entendimiento'
-        ws['C13'] = 'Performance motor de búsqueda del nuevo modelo de IA'
-        
-        # FILA 14: Tasa de Efectividad (vacío)
-        ws['B14'] = 'Tasa de Efectividad'
-        ws['C14'] = 'Mide el porcentaje de usuarios que lograron su objetivo'
-        
-        # FILA 15: CES - AQUI VA NUESTRO VALOR
-        ws['B15'] = 'CES (Customer Effort Score)'
-        ws['C15'] = 'Mide la facilidad con la que los usuarios pueden interactuar con'
-        ws['D15'] = ces_valor
-        ws['D15'].number_format = '0.00'
-        
-        # FILA 16-17: Otros indicadores (vacíos)
-        ws['B16'] = 'Satisfacción (CSAT)'
-        ws['C16'] = 'Mide la satisfacción usando una escala de 1 a 5'
-        
-        ws['B17'] = 'Uptime servidor'
-        ws['C17'] = 'Disponibilidad del servidor (% tiempo activo)'
-        
-        # Ajustar anchos
-        ws.column_dimensions['B'].width = 35
-        ws.column_dimensions['C'].width = 50
-        ws.column_dimensions['D'].width = 15
-        
-        wb.save(filepath)
-        print("    [OK] Dashboard Master creado (D15 = {:.2f})".format(ces_valor))
-
-def execute_query_and_save():
-    '''Función principal que ejecuta la query y guarda los resultados'''
+    if contexto is None:
+        contexto = ContextoAthena(CONFIG['region'], CONFIG['workgroup'], CONFIG['database'])
     
     print("Leyendo configuracion de fechas...")
     modo, fecha_inicio, fecha_fin, mes, anio, descripcion = read_date_config(CONFIG['config_file'])
@@ -638,32 +428,14 @@ def execute_query_and_save():
     print("    {}".format(query))
     
     try:
-        session = boto3.Session(region_name=CONFIG['region'])
-        
         print("")
         print("Ejecutando consulta...")
         
-        try:
-            df = wr.athena.read_sql_query(
-                sql=query,
-                database=CONFIG['database'],
-                workgroup=CONFIG['workgroup'],
-                boto3_session=session,
-                ctas_approach=False,
-                unload_approach=False
-            )
-        except Exception as e:
-            if 'workgroup' in str(e).lower():
-                print("[ADVERTENCIA] Intentando sin workgroup...")
-                df = wr.athena.read_sql_query(
-                    sql=query,
-                    database=CONFIG['database'],
-                    boto3_session=session,
-                    ctas_approach=False,
-                    unload_approach=False
-                )
-            else:
-                raise e
+        if modo == 'rango' and diario.habilitado():
+            # Rango personalizado: se arma con los dias del almacen diario
+            df = resultado_cxf(diario.resultado(contexto, 'paquete', fecha_inicio, fecha_fin))
+        else:
+            df = resultado_cxf(ejecutar_query(contexto, query))
         
         print("[OK] Consulta ejecutada exitosamente!")
         
@@ -730,14 +502,13 @@ def execute_query_and_save():
         print("     (Escala: 1=muy fácil, 5=muy difícil)")
         print("=" * 60)
         
-        filename_csv, filename_excel_detalle, filename_dashboard = generate_filename(modo, mes, anio, fecha_inicio, fecha_fin)
+        filename_csv, filename_excel_detalle = generate_filename(modo, mes, anio, fecha_inicio, fecha_fin)
         output_folder = CONFIG['output_folder']
         
         os.makedirs(output_folder, exist_ok=True)
         
         local_path_csv = os.path.join(output_folder, filename_csv)
         local_path_excel_detalle = os.path.join(output_folder, filename_excel_detalle)
-        local_path_dashboard = os.path.join(output_folder, filename_dashboard)
         
         print("")
         print("Guardando CSV...")
@@ -746,8 +517,9 @@ def execute_query_and_save():
         print("Generando Excel detallado...")
         create_excel_with_ces(local_path_excel_detalle, df, valores, calculos, modo, mes, anio, fecha_inicio, fecha_fin)
         
-        print("Generando Dashboard Master...")
-        create_or_update_dashboard_master(local_path_dashboard, calculos['ces'], modo, mes, anio, fecha_inicio, fecha_fin)
+        print("Registrando D15 en el tablero...")
+        ruta_tablero = tablero.registrar('feedback_ces', {'D15': calculos['ces']}, modo, mes, anio, fecha_inicio, fecha_fin,
+                                         origen=filename_excel_detalle)
         
         print("")
         print("ARCHIVOS GENERADOS:")
@@ -759,7 +531,7 @@ def execute_query_and_save():
         print("            - Hoja 'Resumen': Métricas principales")
         print("            - CES: {:.2f}".format(calculos['ces']))
         print("")
-        print("    [DASHBOARD] {}".format(filename_dashboard))
+        print("    [TABLERO] {}".format(ruta_tablero))
         print("            - Celda D15 = {:.2f} (CES - Customer Effort Score)".format(calculos['ces']))
         
         print("")
@@ -776,6 +548,33 @@ def execute_query_and_save():
         traceback.print_exc()
         return None
 
+def consultas():
+    '''
+    Queries que ejecuta el modulo para el periodo de config_fechas.txt.
+    run_all.py las envia a Athena por adelantado, antes de llamar a run().
+    '''
+    modo, fecha_inicio, fecha_fin = read_date_config(CONFIG['config_file'])[:3]
+    if modo is None or fecha_inicio is None:
+        return []
+    if modo == 'rango' and diario.habilitado():
+        return diario.consultas('paquete', fecha_inicio, fecha_fin)
+    return [build_query(fecha_inicio, fecha_fin)]
+
+def consultas_por_mes(meses):
+    '''
+    Backfill (run_all.py --periodos): la query paquete de todos los meses
+    en una sola consulta agrupada por mes, y la query de cada mes.
+    '''
+    return consultas_paquete_por_mes(meses)
+
+def run(contexto):
+    '''
+    Punto de entrada en modo libreria: run_all.py importa el modulo y lo
+    ejecuta en su mismo proceso, con un ContextoAthena compartido.
+    Retorna True si el proceso termino OK.
+    '''
+    return execute_query_and_save(contexto) is not None
+
 # ==================== EJECUCION PRINCIPAL ====================
 
 if __name__ == "__main__":
@@ -784,13 +583,13 @@ if __name__ == "__main__":
     print("SCRIPT: FEEDBACK - CES (Customer Effort Score) - QUERY ATHENA")
     print("=" * 60)
     print("Rol requerido: PIBADataScientist")
-    print("Salida: CSV + Excel Detalle + Dashboard Master")
+    print("Salida: CSV + Excel Detalle + celda D15 del tablero")
     print("Query: Reglas CXF con conteo de sesiones")
     print("")
     print("ARCHIVOS GENERADOS:")
     print("  - CSV: feedback_ces_[fecha].csv")
     print("  - Excel Detalle: feedback_ces_detalle_[fecha].xlsx (3 hojas)")
-    print("  - Dashboard: feedback_ces_[fecha].xlsx (celda D15)")
+    print("  - Tablero: D15 del periodo en tablero/metricas.sqlite")
     print("")
     print("CÁLCULOS:")
     print("  - Extrae 10 reglas específicas (Integraciones y Estáticos)")
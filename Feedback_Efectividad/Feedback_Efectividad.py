@@ -14,22 +14,28 @@ MODOS SOPORTADOS:
 Workgroup: Production-caba-piba-athena-boti-group
 Rol: PIBADataScientist
 '''
-import boto3
-import awswrangler as wr
-import pandas as pd
 from datetime import datetime
 from calendar import monthrange
 import os
+import sys
 import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.styles import Font, Alignment, PatternFill
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))  # Raiz del repo (paquete comun)
+from comun.contexto import ContextoAthena
+from comun.athena import ejecutar_query
+from comun import diario
+from comun import tablero
+from comun.paquete_metricas import build_query_paquete, resultado_cxf, consultas_por_mes as consultas_paquete_por_mes
 
 # ==================== CONFIGURACION ====================
 CONFIG = {
     'region': 'us-east-1',
     'workgroup': 'Production-caba-piba-athena-boti-group',
     'database': 'caba-piba-consume-zone-db',
-    'output_folder': 'output',
-    'config_file': '../config_fechas.txt'  # Config centralizado en raiz del proyecto
+    'output_folder': os.path.join(SCRIPT_DIR, 'output'),
+    'config_file': os.path.join(SCRIPT_DIR, '..', 'config_fechas.txt')  # Config centralizado en raiz del proyecto
 }
 
 # Reglas específicas para el cálculo de Efectividad
@@ -156,29 +162,14 @@ def get_month_name(mes):
     }
     return meses.get(mes, 'mes_invalido')
 
-def get_month_abbr(mes):
-    '''Retorna la abreviatura del mes en español'''
-    if mes is None:
-        return 'rango'
-    meses = {
-        1: 'ene', 2: 'feb', 3: 'mar', 4: 'abr',
-        5: 'may', 6: 'jun', 7: 'jul', 8: 'ago',
-        9: 'sep', 10: 'oct', 11: 'nov', 12: 'dic'
-    }
-    return meses.get(mes, 'mes')
-
 def build_query(fecha_inicio, fecha_fin):
-    '''Construye la query de Feedback - Efectividad con el rango de fechas especificado'''
-    
-    query = """SELECT 
-rule_name,
-count(distinct(session_id)) as Cant_Sesiones 
-FROM "caba-piba-consume-zone-db"."boti_message_metrics_2"
-WHERE CAST(session_creation_time AS DATE) BETWEEN date '{fecha_inicio}' and date '{fecha_fin}'
-and rule_name like ('%CXF%')
-group by rule_name""".format(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
-    
-    return query
+    '''
+    Construye la query de Feedback - Efectividad con el rango de fechas especificado.
+    Es la query paquete compartida con los otros modulos de Feedback y con
+    Sesiones_Alcanzadas (un solo escaneo de boti_message_metrics_2); las
+    reglas CXF se toman del resultado con resultado_cxf().
+    '''
+    return build_query_paquete(fecha_inicio, fecha_fin)
 
 def generate_filename(modo, mes, anio, fecha_inicio, fecha_fin):
     '''Genera los nombres de archivos basados en el modo y las fechas'''
@@ -186,15 +177,13 @@ def generate_filename(modo, mes, anio, fecha_inicio, fecha_fin):
         mes_nombre = get_month_name(mes)
         filename_csv = "feedback_efectividad_{0}_{1}.csv".format(mes_nombre, anio)
         filename_excel_detalle = "feedback_efectividad_detalle_{0}_{1}.xlsx".format(mes_nombre, anio)
-        filename_dashboard = "feedback_efectividad_{0}_{1}.xlsx".format(mes_nombre, anio)
     else:
         fecha_inicio_fmt = fecha_inicio.replace('-', '')
         fecha_fin_fmt = fecha_fin.replace('-', '')
         filename_csv = "feedback_efectividad_{0}_a_{1}.csv".format(fecha_inicio_fmt, fecha_fin_fmt)
         filename_excel_detalle = "feedback_efectividad_detalle_{0}_a_{1}.xlsx".format(fecha_inicio_fmt, fecha_fin_fmt)
-        filename_dashboard = "feedback_efectividad_{0}_a_{1}.xlsx".format(fecha_inicio_fmt, fecha_fin_fmt)
     
-    return filename_csv, filename_excel_detalle, filename_dashboard
+    return filename_csv, filename_excel_detalle
 
 def extraer_valores_efectividad(df):
     '''
@@ -562,103 +551,13 @@ def create_excel_with_efectividad(filepath, df, valores, calculos, modo, mes, an
 
 
 
-def create_or_update_dashboard_master(filepath, efectividad_valor, modo, mes, anio, fecha_inicio, fecha_fin):
+def execute_query_and_save(contexto=None):
     '''
-    Crea el Excel Dashboard Master con el template estándar
-    Llena SOLO la celda D14 (Tasa de Efectividad)
-    Usa el mismo template que CES y CSAT
+    Función principal que ejecuta la query y guarda los resultados
+    contexto: ContextoAthena compartido (run_all.py); si es None se crea uno propio
     '''
-
-    print("    [INFO] Creando Dashboard Master...")
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = 'Dashboard'
-
-    header_font = Font(bold=True)
-
-    # Determinar el header de fecha
-    if modo == 'mes':
-        header_fecha = '{}-{}'.format(get_month_abbr(mes), str(anio)[-2:])
-    else:
-        fecha_inicio_obj = datetime.strptime(fecha_inicio, '%Y-%m-%d')
-        fecha_fin_obj = datetime.strptime(fecha_fin, '%Y-%m-%d')
-        header_fecha = '{}-{}'.format(
-            fecha_inicio_obj.strftime('%d/%m'),
-            fecha_fin_obj.strftime('%d/%m/%y')
-        )
-
-    # FILA 1: Encabezados
-    ws['B1'] = 'Indicador'
-    ws['C1'] = 'Descripción/Detalle'
-    ws['D1'] = header_fecha
-    ws['B1'].font = header_font
-    ws['C1'].font = header_font
-    ws['D1'].font = header_font
-
-    # FILA 2-13: Otros indicadores (vacíos)
-    ws['B2'] = 'Conversaciones'
-    ws['C2'] = 'Q Conversaciones'
-
-    ws['B3'] = 'Usuarios'
-    ws['C3'] = 'Q Usuarios únicos'
-
-    ws['B4'] = 'Sesiones abiertas por Pushes'
-    ws['C4'] = 'Q Sesiones que se abrieron con una Push'
-
-    ws['B5'] = 'Sesiones Alcanzadas por Pushes'
-    ws['C5'] = 'Q Sesiones que recibieron al menos 1 Push'
-
-    ws['B6'] = 'Mensajes Pushes Enviados'
-    ws['C6'] = 'Q de mensajes enviados bajo el formato push [Hilde gris]'
-
-    ws['B7'] = 'Contenidos en Botmaker'
-    ws['C7'] = 'Contenidos prendidos en botmaker (todos los prendidos, incluy'
-
-    ws['B8'] = 'Contenidos Prendidos para  el USUARIO'
-    ws['C8'] = 'Contenidos prendidos de cara al usuario (relevantes) – (no inclu'
-
-    ws['B9'] = 'Interacciones'
-    ws['C9'] = 'Q Interacciones'
-
-    ws['B10'] = 'Trámites, solicitudes y turnos'
-    ws['C10'] = 'Q Trámites, solicitudes y turnos disponibles'
-
-    ws['B11'] = 'contenidos mas consultados'
-    ws['C11'] = 'Q Contenidos con más interacciones en el mes (Top 10)'
-
-    ws['B12'] = 'Derivaciones'
-    ws['C12'] = 'Q Derivaciones'
-
-    ws['B13'] = 'No entendimiento'
-    ws['C13'] = 'Performance motor de búsqueda del nuevo modelo de IA'
-
-    # FILA 14: Tasa de Efectividad - AQUI VA NUESTRO VALOR
-    ws['B14'] = 'Tasa de Efectividad'
-    ws['C14'] = 'Mide el porcentaje de usuarios que lograron su objetivo'
-    ws['D14'] = efectividad_valor
-    ws['D14'].number_format = '0.00%'
-
-    # FILA 15-17: Otros indicadores (vacíos)
-    ws['B15'] = 'CES (Customer Effort Score)'
-    ws['C15'] = 'Mide la facilidad con la que los usuarios pueden interactuar con'
-
-    ws['B16'] = 'Satisfacción (CSAT)'
-    ws['C16'] = 'Mide la satisfacción usando una escala de 1 a 5'
-
-    ws['B17'] = 'Uptime servidor'
-    ws['C17'] = 'Disponibilidad del servidor (% tiempo activo)'
-
-    # Ajustar anchos
-    ws.column_dimensions['B'].width = 35
-    ws.column_dimensions['C'].width = 50
-    ws.column_dimensions['D'].width = 15
-
-    wb.save(filepath)
-    print("    [OK] Dashboard Master creado (D14 = {:.2f}%)".format(efectividad_valor * 100))
-
-def execute_query_and_save():
-    '''Función principal que ejecuta la query y guarda los resultados'''
+    if contexto is None:
+        contexto = ContextoAthena(CONFIG['region'], CONFIG['workgroup'], CONFIG['database'])
     
     print("Leyendo configuracion de fechas...")
     modo, fecha_inicio, fecha_fin, mes, anio, descripcion = read_date_config(CONFIG['config_file'])
@@ -686,32 +585,14 @@ def execute_query_and_save():
     print("    {}".format(query))
     
     try:
-        session = boto3.Session(region_name=CONFIG['region'])
-        
         print("")
         print("Ejecutando consulta...")
         
-        try:
-            df = wr.athena.read_sql_query(
-                sql=query,
-                database=CONFIG['database'],
-                workgroup=CONFIG['workgroup'],
-                boto3_session=session,
-                ctas_approach=False,
-                unload_approach=False
-            )
-        except Exception as e:
-            if 'workgroup' in str(e).lower():
-                print("[ADVERTENCIA] Intentando sin workgroup...")
-                df = wr.athena.read_sql_query(
-                    sql=query,
-                    database=CONFIG['database'],
-                    boto3_session=session,
-                    ctas_approach=False,
-                    unload_approach=False
-                )
-            else:
-                raise e
+        if modo == 'rango' and diario.habilitado():
+            # Rango personalizado: se arma con los dias del almacen diario
+            df = resultado_cxf(diario.resultado(contexto, 'paquete', fecha_inicio, fecha_fin))
+        else:
+            df = resultado_cxf(ejecutar_query(contexto, query))
         
         print("[OK] Consulta ejecutada exitosamente!")
         
@@ -762,14 +643,13 @@ def execute_query_and_save():
         print("  🎯 EFECTIVIDAD:             {:.2f}%".format(calculos['efectividad'] * 100))
         print("=" * 60)
         
-        filename_csv, filename_excel_detalle, filename_dashboard = generate_filename(modo, mes, anio, fecha_inicio, fecha_fin)
+        filename_csv, filename_excel_detalle = generate_filename(modo, mes, anio, fecha_inicio, fecha_fin)
         output_folder = CONFIG['output_folder']
         
         os.makedirs(output_folder, exist_ok=True)
         
         local_path_csv = os.path.join(output_folder, filename_csv)
         local_path_excel_detalle = os.path.join(output_folder, filename_excel_detalle)
-        local_path_dashboard = os.path.join(output_folder, filename_dashboard)
         
         print("")
         print("Guardando CSV...")
@@ -780,8 +660,9 @@ def execute_query_and_save():
             local_path_excel_detalle, df, valores, calculos, modo, mes, anio, fecha_inicio, fecha_fin
         )
         
-        print("Generando Dashboard Master...")
-        create_or_update_dashboard_master(local_path_dashboard, calculos['efectividad'], modo, mes, anio, fecha_inicio, fecha_fin)
+        print("Registrando D14 en el tablero...")
+        ruta_tablero = tablero.registrar('feedback_efectividad', {'D14': calculos['efectividad']}, modo, mes, anio, fecha_inicio, fecha_fin,
+                                         origen=filename_excel_detalle)
         
         print("")
         print("ARCHIVOS GENERADOS:")
@@ -799,7 +680,7 @@ def execute_query_and_save():
         print("        - Métricas principales")
         print("        - Desglose por categoría")
         print("")
-        print("    [5] DASHBOARD: {}".format(filename_dashboard))
+        print("    [5] TABLERO: {}".format(ruta_tablero))
         print("        - Celda D14 = {:.2f}% (Tasa de Efectividad)".format(calculos['efectividad'] * 100))
         
         print("")
@@ -816,6 +697,33 @@ def execute_query_and_save():
         traceback.print_exc()
         return None
 
+def consultas():
+    '''
+    Queries que ejecuta el modulo para el periodo de config_fechas.txt.
+    run_all.py las envia a Athena por adelantado, antes de llamar a run().
+    '''
+    modo, fecha_inicio, fecha_fin = read_date_config(CONFIG['config_file'])[:3]
+    if modo is None or fecha_inicio is None:
+        return []
+    if modo == 'rango' and diario.habilitado():
+        return diario.consultas('paquete', fecha_inicio, fecha_fin)
+    return [build_query(fecha_inicio, fecha_fin)]
+
+def consultas_por_mes(meses):
+    '''
+    Backfill (run_all.py --periodos): la query paquete de todos los meses
+    en una sola consulta agrupada por mes, y la query de cada mes.
+    '''
+    return consultas_paquete_por_mes(meses)
+
+def run(contexto):
+    '''
+    Punto de entrada en modo libreria: run_all.py importa el modulo y lo
+    ejecuta en su mismo proceso, con un ContextoAthena compartido.
+    Retorna True si el proceso termino OK.
+    '''
+    return execute_query_and_save(contexto) is not None
+
 # ==================== EJECUCION PRINCIPAL ====================
 
 if __name__ == "__main__":
@@ -825,7 +733,7 @@ if __name__ == "__main__":
     print("VERSIÓN CON ARCHIVOS EXCEL SEPARADOS")
     print("=" * 60)
     print("Rol requerido: PIBADataScientist")
-    print("Salida: CSV + 3 Excel + Dashboard Master")
+    print("Salida: CSV + 3 Excel + celda D14 del tablero")
     print("Query: Reglas CXF con conteo de sesiones")
     print("")
     print("ARCHIVOS GENERADOS:")
@@ -837,7 +745,7 @@ if __name__ == "__main__":
     print("      - SUMA TOTAL DE 'NO' y 'SÍ' ✨")
     print("  [4] Excel RESUMEN: ...resumen.xlsx")
     print("      - Métricas principales ejecutivas")
-    print("  [5] Dashboard: ...dashboard.xlsx (celda D14)")
+    print("  [5] Tablero: D14 del periodo en tablero/metricas.sqlite")
     print("")
     print("CÁLCULOS:")
     print("  - Extrae 8 reglas específicas (Integraciones, Estáticos, Pushes, CATs)")
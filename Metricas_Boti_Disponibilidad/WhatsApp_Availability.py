@@ -13,17 +13,23 @@ from selenium.common.exceptions import WebDriverException
 import pandas as pd
 from datetime import datetime
 import os
+import sys
 import openpyxl
 from openpyxl.styles import Font
 import re
 import time
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))  # Raiz del repo (paquete comun)
+from comun import tablero
+
 # ==================== CONFIGURACION ====================
 CONFIG = {
     'url': 'https://metastatus.com/whatsapp-business-api',
     'output_folder': 'output',
     'headless': True,  # True = sin ventana, False = con ventana visible
-    'wait_time': 10  # Segundos para esperar que cargue la página
+    'wait_time': 10,  # Segundos para esperar que cargue la página
+    'config_file': os.path.join(SCRIPT_DIR, '..', 'config_fechas.txt')  # Periodo del tablero al que se asigna la medicion
 }
 
 # ==================== FUNCIONES ====================
@@ -319,6 +325,17 @@ def execute_and_save():
     create_excel_with_dashboard(local_path_excel, availability_percentage)
     print("    [EXCEL] {}".format(filename_excel))
     
+    # La disponibilidad se mide en el momento: se registra para el periodo
+    # que se esta reportando (config_fechas.txt)
+    periodo = tablero.periodo_configurado(CONFIG['config_file'])
+    if periodo:
+        origen = '{} ({})'.format(CONFIG['url'], fecha_consulta.strftime('%Y-%m-%d %H:%M:%S'))
+        ruta_tablero = tablero.registrar('disponibilidad', {'D17': '{}%'.format(availability_percentage)},
+                                         origen=origen, **periodo)
+        print("    [TABLERO] {} ({})".format(ruta_tablero, tablero.clave_periodo(**periodo)))
+    else:
+        print("    [ADVERTENCIA] Sin periodo en config_fechas.txt: D17 no se registra en el tablero")
+    
     print("")
     print("ARCHIVOS GENERADOS:")
     print("    Carpeta: {}/".format(output_folder))
@@ -13,11 +13,15 @@ MEJORA PRINCIPAL:
 
 FLUJO DE TRABAJO:
 1. Editar config_fechas.txt (MES=X, AÑO=YYYY)
-2. Ejecutar athena_connector.py (descarga CSVs)
+2. Ejecutar athena_connector.py (descarga CSVs y los convierte a Parquet)
 3. Ejecutar este script (calcula métricas automáticamente)
 
 OPTIMIZACIÓN INCLUIDA:
 - PASO 6 optimizado: de 60 minutos a 2 segundos
+- PASOS 3-5: lee los Parquet tipados de athena_connector (solo las columnas
+  necesarias, filtro de fecha y testers al leer); sin Parquet, lee los CSV
+- PASOS 6-9: categorización en una pasada, sin copias de los DataFrames y
+  con conteos por usuario acumulados por categoría (sin concat + pivot)
 - Resultado final: EXACTAMENTE EL MISMO
 
 Autor: Damian - GCBA
@@ -35,8 +39,12 @@ import sys
 import gc
 import json
 import openpyxl
+import pyarrow.parquet as pq
 from openpyxl.styles import Font, Alignment, PatternFill
 
+sys.path.insert(0, os_module.path.dirname(os_module.path.dirname(os_module.path.abspath(__file__))))  # Raiz del repo (paquete comun)
+from comun import tablero
+
 warnings.filterwarnings('ignore')
 pd.set_option("display.max_colwidth", None)
 
@@ -170,10 +178,18 @@ FECHA_INICIO = None  # Se configura automáticamente
 FECHA_FIN = None     # Se configura automáticamente
 
 # Archivos CSV descargados por athena_connector
+# (si existe el .parquet del mismo nombre, se lee ese)
 ARCHIVO_MENSAJES = 'mensajes_temp.csv'
 ARCHIVO_CLICKS = 'clicks_temp.csv'
 ARCHIVO_BOTONES = 'botones_temp.csv'
 
+# Columnas que usa el cálculo de cada archivo (del Parquet se lee solo esto)
+COLUMNAS_MENSAJES = ['session_id', 'id', 'creation_time', 'msg_from', 'message_type',
+                     'message', 'rule_name', 'usuario']
+COLUMNAS_CLICKS = ['ts', 'id', 'session_id', 'message_id', 'message', 'mostrado',
+                   'response_message', 'response_intent_id', 'score', 'results_score']
+COLUMNAS_BOTONES = ['ts', 'id', 'session_id', 'message_id', 'type', 'one_shot']
+
 # NOTA: Si necesitas archivos de testers y lista blanca,
 # debes colocarlos en el directorio temp/
 
@@ -244,6 +260,69 @@ def cargar_csv_optimizado(archivo, chunk_size, fecha_inicio=None, testers=None):
     imprimir_progreso(f"✓ {total_rows:,} leídos → {len(df):,} después de filtrar")
     return df
 
+def cargar_parquet(archivo, columnas, fecha_inicio=None, testers=None):
+    """
+    Carga el Parquet generado por athena_connector: solo `columnas` y con los
+    filtros de fecha y testers aplicados al leer (pyarrow descarta row
+    groups enteros por fecha sin descomprimirlos)
+    """
+    imprimir_progreso(f"Cargando {archivo}...")
+    
+    disponibles = pq.read_schema(archivo).names
+    columnas = [c for c in columnas if c in disponibles]
+    
+    filtros = []
+    if fecha_inicio is not None and 'creation_time' in disponibles:
+        filtros.append(('creation_time', '>=', pd.Timestamp(fecha_inicio)))
+    if testers is not None and len(testers) > 0 and 'usuario' in disponibles:
+        filtros.append(('usuario', 'not in', list(testers)))
+    
+    df = pd.read_parquet(archivo, columns=columnas, filters=filtros or None)
+    total_rows = pq.ParquetFile(archivo).metadata.num_rows
+    
+    imprimir_progreso(f"✓ {total_rows:,} en archivo → {len(df):,} después de filtrar")
+    return df
+
+def cargar_datos(archivo_csv, columnas, chunk_size, fecha_inicio=None, testers=None):
+    """
+    Carga un resultado de athena_connector: el Parquet si existe y no es más
+    viejo que el CSV, sino el CSV por chunks (mismo resultado)
+    """
+    archivo_parquet = os_module.path.splitext(archivo_csv)[0] + '.parquet'
+    if os_module.path.exists(archivo_parquet) and (
+        not os_module.path.exists(archivo_csv)
+        or os_module.path.getmtime(archivo_parquet) >= os_module.path.getmtime(archivo_csv)
+    ):
+        return cargar_parquet(archivo_parquet, columnas, fecha_inicio, testers)
+    return cargar_csv_optimizado(archivo_csv, chunk_size, fecha_inicio, testers)
+
+def en_indice(valores, indice):
+    """Máscara de pertenencia usando el hash ya armado de un pd.Index de valores únicos"""
+    return indice.get_indexer(valores) >= 0
+
+def contar_por_usuario(session_id, message_id, usuarios):
+    """
+    Interacciones de una categoría por usuario (primeros 20 caracteres de la
+    sesión): cantidad de message_id no nulos, solo usuarios de `usuarios`.
+    Retorna (conteo por usuario, filas consideradas)
+    """
+    usuario = session_id.str[:20]
+    validos = en_indice(usuario, usuarios)
+    conteo = message_id[validos].notna().groupby(usuario[validos]).sum()
+    return conteo, int(validos.sum())
+
+def calcular_porcentajes(respuestas_por_usuario, categorias):
+    """
+    Agrega porcentaje_<categoria> = categoría / total del usuario, con una
+    normalización por fila vectorizada (sum() ignora las categorías ausentes
+    del período, que quedan NaN; un usuario con total 0 queda NaN).
+    """
+    totales_usuario = respuestas_por_usuario[categorias].sum(axis=1)
+    porcentajes = respuestas_por_usuario[categorias].div(totales_usuario, axis=0)
+    for categoria in categorias:
+        respuestas_por_usuario[f'porcentaje_{categoria}'] = porcentajes[categoria]
+    return respuestas_por_usuario
+
 def cargar_csv_simple(archivo):
     imprimir_progreso(f"Cargando {archivo}...")
     df = pd.read_csv(archivo)
@@ -326,8 +405,9 @@ def calcular_promedios_boti(fecha_inicio, fecha_fin):
         # =================================================================
         imprimir_seccion("PASO 3: PROCESAR MENSAJES")
         
-        mm = cargar_csv_optimizado(
+        mm = cargar_datos(
             ARCHIVO_MENSAJES,
+            COLUMNAS_MENSAJES,
             CHUNK_SIZE,
             fecha_inicio_dt,
             testers
@@ -338,9 +418,8 @@ def calcular_promedios_boti(fecha_inicio, fecha_fin):
         mm.creation_time = mm.creation_time.dt.tz_localize(None)
         mm.creation_time = mm.creation_time.dt.ceil('s')
         
-        mm1 = mm.copy()
+        mm1 = mm
         del mm
-        liberar_memoria()
         
         mm1.drop_duplicates(['session_id', 'creation_time', 'msg_from', 'rule_name'], 
                            inplace=True)
@@ -354,7 +433,7 @@ def calcular_promedios_boti(fecha_inicio, fecha_fin):
         # =================================================================
         imprimir_seccion("PASO 4: PROCESAR CLICKS")
         
-        search = cargar_csv_optimizado(ARCHIVO_CLICKS, CHUNK_SIZE)
+        search = cargar_datos(ARCHIVO_CLICKS, COLUMNAS_CLICKS, CHUNK_SIZE)
         
         if len(search) == 0:
             raise ValueError("No hay datos de clicks")
@@ -365,10 +444,6 @@ def calcular_promedios_boti(fecha_inicio, fecha_fin):
         search.ts = pd.to_datetime(search.ts, errors='coerce')
         search['fecha'] = search.ts.dt.date
         
-        searchcl = search[
-            'RuleBuilder:' + search.mostrado == search.response_intent_id
-        ].drop_duplicates('id')
-        
         imprimir_progreso(f"✓ Clicks procesados: {len(search):,}")
         
         # =================================================================
@@ -376,7 +451,7 @@ def calcular_promedios_boti(fecha_inicio, fecha_fin):
         # =================================================================
         imprimir_seccion("PASO 5: PROCESAR BOTONES")
         
-        one = cargar_csv_optimizado(ARCHIVO_BOTONES, CHUNK_SIZE)
+        one = cargar_datos(ARCHIVO_BOTONES, COLUMNAS_BOTONES, CHUNK_SIZE)
         
         if len(one) == 0:
             raise ValueError("No hay datos de botones")
@@ -406,27 +481,20 @@ def calcular_promedios_boti(fecha_inicio, fecha_fin):
         # ⭐ OPTIMIZACIÓN: Usar shift() en lugar de loop ⭐
         # Esto es 100x más rápido que el método original
         # Resultado: EXACTAMENTE EL MISMO
-        mm1['msg_from_next'] = mm1['msg_from'].shift(-1)
-        mm1['session_id_next'] = mm1['session_id'].shift(-1)
-        
-        # Identificar duplicados consecutivos
         mask_duplicados = (
-            (mm1['msg_from'] == mm1['msg_from_next']) & 
-            (mm1['session_id'] == mm1['session_id_next'])
+            (mm1['msg_from'] == mm1['msg_from'].shift(-1)) & 
+            (mm1['session_id'] == mm1['session_id'].shift(-1))
         )
         
         num_duplicados = mask_duplicados.sum()
         
         if num_duplicados > 0:
-            mm1 = mm1[~mask_duplicados].copy()
+            mm1 = mm1[~mask_duplicados].reset_index(drop=True)
             imprimir_progreso(f"✓ Eliminados: {num_duplicados:,} mensajes consecutivos")
         else:
             imprimir_progreso("✓ No hay mensajes consecutivos para eliminar")
         
-        # Limpiar columnas auxiliares
-        mm1.drop(['msg_from_next', 'session_id_next'], axis=1, inplace=True, errors='ignore')
-        mm1.reset_index(inplace=True, drop=True)
-        
+        del mask_duplicados
         liberar_memoria()
         
         # =================================================================
@@ -434,132 +502,107 @@ def calcular_promedios_boti(fecha_inicio, fecha_fin):
         # =================================================================
         imprimir_seccion("PASO 7: ANÁLISIS")
         
-        mm = mm1.copy()
-        mm.reset_index(inplace=True, drop=True)
-        
-        mmtex1 = mm[np.logical_and(mm.msg_from == 'user', mm.message_type == 'Text')][
-            ['session_id', 'id', 'creation_time', 'msg_from', 'message_type', 
-             'message', 'usuario']
-        ].copy()
-        
-        if len(mmtex1) > 0:
-            mmtex1 = mmtex1.iloc[:-1]
-        
-        mmtex1['rule_name'] = [
-            r if su == sb and f == 'bot' else None
-            for r, su, sb, f in zip(
-                mm.loc[mmtex1.index + 1].rule_name.values,
-                mmtex1.session_id.values,
-                mm.loc[mmtex1.index + 1].session_id.values,
-                mm.loc[mmtex1.index + 1].msg_from.values
-            )
-        ]
+        # Índices hash de sesiones y usuarios: se arman una sola vez y se
+        # reutilizan en todos los filtros de pertenencia
+        sesiones = pd.Index(mm1.session_id.unique())
+        usuarios = pd.Index(mm1.usuario.unique())
+        
+        # Letra: mensaje de texto del usuario cuya respuesta (el mensaje
+        # siguiente, del bot y en la misma sesión) es la regla de letra no
+        # existente. El último mensaje de texto del período no se evalúa.
+        es_texto_usuario = (mm1.msg_from == 'user') & (mm1.message_type == 'Text')
+        if es_texto_usuario.any():
+            es_texto_usuario.iloc[np.flatnonzero(es_texto_usuario.values)[-1]] = False
+        es_letra = (
+            es_texto_usuario &
+            (mm1.session_id == mm1.session_id.shift(-1)) &
+            (mm1.msg_from.shift(-1) == 'bot') &
+            (mm1.rule_name.shift(-1) == RULE_LETRA_NO_EXISTE)
+        )
+        letra1 = mm1.loc[es_letra, ['session_id', 'id']].rename(columns={'id': 'message_id'})
         
-        letra1 = mmtex1[mmtex1.rule_name == RULE_LETRA_NO_EXISTE].copy()
-        letra1.rename(columns={'id': 'message_id'}, inplace=True)
+        del es_texto_usuario, es_letra
         
-        del mmtex1
-        liberar_memoria()
+        search = search[en_indice(search.session_id, sesiones)]
+        os = os[en_indice(os.session_id, sesiones)]
         
-        search1 = search[search.session_id.isin(mm1.session_id.values)].copy()
-        os1 = os[os.session_id.isin(mm1.session_id.values)].copy()
+        # Click: el usuario eligió la intención mostrada
+        es_click = ('RuleBuilder:' + search.mostrado == search.response_intent_id).values
         
-        del search, os
-        liberar_memoria()
-        
-        primera_instancia1 = search1[
-            ~search1.message_id.isin(
-                pd.concat([
-                    search1[
-                        'RuleBuilder:' + search1.mostrado == search1.response_intent_id
-                    ].message_id,
-                    os1.message_id
-                ]).values
-            )
-        ].drop_duplicates('id').copy()
+        # Primera instancia: búsquedas cuyo mensaje no terminó en click ni en oneShot
+        respondidos = pd.Index(pd.concat([search.message_id[es_click], os.message_id]).unique())
         
         # Manejar diferentes nombres de columna de score
-        if 'results_score' in primera_instancia1.columns:
-            primera_instancia1.rename(columns={"results_score": "score"}, inplace=True)
-        elif 'score' not in primera_instancia1.columns:
-            primera_instancia1['score'] = 10.0
-        
-        ne1 = primera_instancia1.groupby('id').max()[['session_id', 'message_id', 'score']]
-        ne1 = ne1[ne1.score <= SCORE_NE_THRESHOLD].copy()
+        if 'results_score' in search.columns:
+            search = search.rename(columns={"results_score": "score"})
+        elif 'score' not in search.columns:
+            search = search.assign(score=10.0)
+        
+        primera_instancia1 = search.loc[
+            ~en_indice(search.message_id, respondidos),
+            ['id', 'session_id', 'message_id', 'score', 'response_message', 'response_intent_id']
+        ].drop_duplicates('id')
         
-        primera_instancia1 = primera_instancia1[~primera_instancia1.id.isin(ne1.index)].copy()
+        # No entendido: score de la primera instancia bajo el umbral
+        es_ne = primera_instancia1.id.notna() & (primera_instancia1.score <= SCORE_NE_THRESHOLD)
         
         # =================================================================
         # PASO 8: CATEGORIZACIÓN
         # =================================================================
         imprimir_progreso("Categorizando...")
         
-        os1 = os1.drop_duplicates('id')[['session_id', 'message_id']].copy()
-        os1['categoria'] = 'one'
-        
-        click1 = search1[
-            'RuleBuilder:' + search1.mostrado == search1.response_intent_id
-        ].drop_duplicates('id')[['session_id', 'message_id']].copy()
-        click1['categoria'] = 'click'
-        
-        abandonos1 = primera_instancia1[
-            primera_instancia1.response_message.isna()
-        ][['session_id', 'message_id']].copy()
-        abandonos1['categoria'] = 'abandono'
-        
-        nada1 = primera_instancia1[
-            primera_instancia1.response_intent_id == INTENT_NADA
-        ][['session_id', 'message_id']].copy()
-        nada1['categoria'] = 'nada'
-        
-        texto1 = primera_instancia1[np.logical_and(
-            primera_instancia1.response_intent_id != INTENT_NADA,
-            ~primera_instancia1.response_message.isna()
-        )][['session_id', 'message_id']].copy()
-        texto1['categoria'] = 'texto'
-        
-        ne1['categoria'] = 'ne'
-        letra1 = letra1[['session_id', 'message_id']].copy()
-        letra1['categoria'] = 'letra'
+        os1 = os.drop_duplicates('id')
+        click1 = search[es_click].drop_duplicates('id')
+        ne1 = primera_instancia1[es_ne]
+        resto = primera_instancia1[~es_ne]
+        sin_respuesta = resto.response_message.isna()
+        es_nada = resto.response_intent_id == INTENT_NADA
+        
+        # (abandono y nada no son excluyentes: una búsqueda sin respuesta con
+        # intención "nada" cuenta en las dos, igual que siempre)
+        categorias_interaccion = [
+            ('one', os1),
+            ('click', click1),
+            ('abandono', resto[sin_respuesta]),
+            ('nada', resto[es_nada]),
+            ('texto', resto[~es_nada & ~sin_respuesta]),
+            ('ne', ne1),
+            ('letra', letra1),
+        ]
         
-        del search1, primera_instancia1
+        del search, os, primera_instancia1, resto
         liberar_memoria()
         
         print(f"\n📊 Categorías:")
-        print(f"   OneShots:    {len(os1):>7,}")
-        print(f"   Clicks:      {len(click1):>7,}")
-        print(f"   Abandonos:   {len(abandonos1):>7,}")
-        print(f"   Nada:        {len(nada1):>7,}")
-        print(f"   Texto:       {len(texto1):>7,}")
-        print(f"   No entend:   {len(ne1):>7,}")
-        print(f"   Letra:       {len(letra1):>7,}")
+        for etiqueta, (_, interacciones) in zip(
+            ['OneShots', 'Clicks', 'Abandonos', 'Nada', 'Texto', 'No entend', 'Letra'],
+            categorias_interaccion
+        ):
+            print(f"   {etiqueta + ':':<13}{len(interacciones):>7,}")
         
         # =================================================================
         # PASO 9: AGRUPACIÓN POR USUARIO
         # =================================================================
         imprimir_seccion("PASO 9: AGRUPACIÓN")
         
-        value1primera = pd.concat([os1, click1, abandonos1, nada1, texto1, ne1, letra1],
-                                   ignore_index=True)
-        
-        del os1, click1, abandonos1, nada1, texto1, ne1, letra1
+        # Conteos por usuario acumulados categoría por categoría (sin
+        # concatenar las interacciones ni pivotear)
+        conteos = {}
+        total_interacciones = 0
+        for categoria, interacciones in categorias_interaccion:
+            conteo, filas = contar_por_usuario(interacciones.session_id, interacciones.message_id, usuarios)
+            total_interacciones += filas
+            if len(conteo) > 0:
+                conteos[categoria] = conteo
+        
+        del categorias_interaccion, os1, click1, ne1, letra1
         liberar_memoria()
         
-        value1primera['usuario'] = value1primera.session_id.str[:20]
-        value1primera = value1primera[value1primera.usuario.isin(mm1.usuario.values)]
+        imprimir_progreso(f"✓ Interacciones totales: {total_interacciones:,}")
         
-        imprimir_progreso(f"✓ Interacciones totales: {len(value1primera):,}")
+        respuestas_por_usuario = pd.DataFrame(conteos).sort_index().rename_axis('usuario')
         
-        respuestas_por_usuario = value1primera.groupby(
-            ['usuario', 'categoria'],
-            as_index=False
-        ).count()[['usuario', 'categoria', 'message_id']].pivot_table(
-            'message_id',
-            ['usuario'],
-            'categoria'
-        )
-        
-        del value1primera
+        del conteos
         liberar_memoria()
         
         respuestas_por_usuario.fillna(0, inplace=True)
@@ -578,13 +621,7 @@ def calcular_promedios_boti(fecha_inicio, fecha_fin):
         n_usuarios = len(respuestas_por_usuario)
         imprimir_progreso(f"Calculando porcentajes para {n_usuarios:,} usuarios...")
 
-        for idx, categoria in enumerate(categorias, 1):
-            imprimir_progreso(f"  [{idx}/{len(categorias)}] Calculando porcentaje_{categoria}...")
-            respuestas_por_usuario[f'porcentaje_{categoria}'] = [
-                respuestas_por_usuario.loc[i][categoria] /
-                respuestas_por_usuario.loc[i][categorias].sum()
-                for i in respuestas_por_usuario.index
-            ]
+        calcular_porcentajes(respuestas_por_usuario, categorias)
 
         imprimir_progreso("✓ Porcentajes calculados")
         
@@ -804,126 +841,6 @@ def create_excel_detalle(filepath, promedios1, modo, mes, anio, fecha_inicio, fe
     print(f"  ✅ Excel detallado: {filepath}")
 
 
-def create_or_update_dashboard_master(filepath, d13_valor, modo, mes, anio, fecha_inicio, fecha_fin):
-    '''
-    Crea o actualiza Dashboard Master con estructura completa
-    Solo actualiza D13, el resto de valores quedan vacíos para llenar manualmente
-    '''
-    
-    if os_module.path.exists(filepath):
-        # Actualizar Excel existente - solo tocar D13
-        wb = openpyxl.load_workbook(filepath)
-        ws = wb.active
-        ws['D13'] = d13_valor
-        ws['D13'].number_format = '0.00%'
-        wb.save(filepath)
-        print(f"  ✅ Dashboard actualizado: {filepath} (D13 = {d13_valor*100:.2f}%)")
-    else:
-        # Crear nuevo Dashboard con estructura completa
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = 'Dashboard'
-        
-        # Header con fecha
-        if modo == 'mes':
-            mes_abbr = get_month_name(mes)[:3].lower()
-            header_fecha = '{}-{}'.format(mes_abbr, str(anio)[-2:])
-        else:
-            fecha_inicio_obj = datetime.strptime(fecha_inicio[:10], '%Y-%m-%d')
-            fecha_fin_obj = datetime.strptime(fecha_fin[:10], '%Y-%m-%d')
-            header_fecha = '{}-{}'.format(
-                fecha_inicio_obj.strftime('%d/%m'),
-                fecha_fin_obj.strftime('%d/%m/%y')
-            )
-        
-        # Estilos
-        header_font = Font(bold=True)
-        
-        # FILA 1: Headers
-        ws['B1'] = 'Indicador'
-        ws['C1'] = 'Descripción/Detalle'
-        ws['D1'] = header_fecha
-        ws['B1'].font = header_font
-        ws['C1'].font = header_font
-        ws['D1'].font = header_font
-        
-        # ESTRUCTURA COMPLETA DEL DASHBOARD
-        # Fila 2: Conversaciones
-        ws['B2'] = 'Conversaciones'
-        ws['C2'] = 'Q Conversaciones'
-        
-        # Fila 3: Usuarios
-        ws['B3'] = 'Usuarios'
-        ws['C3'] = 'Q Usuarios únicos'
-        
-        # Fila 4: Sesiones abiertas por Pushes
-        ws['B4'] = 'Sesiones abiertas por Pushes'
-        ws['C4'] = 'Q Sesiones que se abrieron con una Push'
-        
-        # Fila 5: Sesiones Alcanzadas por Pushes
-        ws['B5'] = 'Sesiones Alcanzadas por Pushes'
-        ws['C5'] = 'Q Sesiones que recibieron al menos 1 Push'
-        
-        # Fila 6: Mensajes Pushes Enviados
-        ws['B6'] = 'Mensajes Pushes Enviados'
-        ws['C6'] = 'Q de mensajes enviados bajo el formato push [Hilde gris]'
-        
-        # Fila 7: Contenidos en Botmaker
-        ws['B7'] = 'Contenidos en Botmaker'
-        ws['C7'] = 'Contenidos prendidos en botmaker (todos los prendidos, incluy'
-        
-        # Fila 8: Contenidos Prendidos para el USUARIO
-        ws['B8'] = 'Contenidos Prendidos para  el USUARIO'
-        ws['C8'] = 'Contenidos prendidos de cara al usuario (relevantes) – (no inclu'
-        
-        # Fila 9: Interacciones
-        ws['B9'] = 'Interacciones'
-        ws['C9'] = 'Q Interacciones'
-        
-        # Fila 10: Trámites, solicitudes y turnos
-        ws['B10'] = 'Trámites, solicitudes y turnos'
-        ws['C10'] = 'Q Trámites, solicitudes y turnos disponibles'
-        
-        # Fila 11: contenidos mas consultados
-        ws['B11'] = 'contenidos mas consultados'
-        ws['C11'] = 'Q Contenidos con más interacciones en el mes (Top 10)'
-        
-        # Fila 12: Derivaciones
-        ws['B12'] = 'Derivaciones'
-        ws['C12'] = 'Q Derivaciones'
-        
-        # Fila 13: No entendimiento (LA QUE LLENAMOS)
-        ws['B13'] = 'No entendimiento'
-        ws['C13'] = 'Performance motor de búsqueda del nuevo modelo de IA'
-        ws['D13'] = d13_valor
-        ws['D13'].number_format = '0.00%'
-        
-        # Fila 14: Tasa de Efectividad
-        ws['B14'] = 'Tasa de Efectividad'
-        ws['C14'] = 'Mide el porcentaje de usuarios que lograron su objetivo'
-        
-        # Fila 15: CES (Customer Effort Score)
-        ws['B15'] = 'CES (Customer Effort Score)'
-        ws['C15'] = 'Mide la facilidad con la que los usuarios pueden interactuar con'
-        
-        # Fila 16: Satisfacción (CSAT)
-        ws['B16'] = 'Satisfacción (CSAT)'
-        ws['C16'] = 'Mide la satisfacción usando una escala de 1 a 5'
-        
-        # Fila 17: Uptime servidor
-        ws['B17'] = 'Uptime servidor'
-        ws['C17'] = 'Disponibilidad del servidor (% tiempo activo)'
-        
-        # Ajustar anchos de columnas
-        ws.column_dimensions['A'].width = 5
-        ws.column_dimensions['B'].width = 35
-        ws.column_dimensions['C'].width = 60
-        ws.column_dimensions['D'].width = 15
-        
-        wb.save(filepath)
-        print(f"  ✅ Dashboard creado: {filepath} (D13 = {d13_valor*100:.2f}%)")
-
-
 # =============================================================================
 # EJECUCIÓN
 # =============================================================================
@@ -998,12 +915,10 @@ if __name__ == "__main__":
         if modo == 'mes' and mes and anio:
             mes_nombre = get_month_name(mes)
             excel_detalle = os_module.path.join(output_dir, f"no_entendimiento_detalle_{mes_nombre}_{anio}.xlsx")
-            excel_dashboard = os_module.path.join(output_dir, f"no_entendimiento_{mes_nombre}_{anio}.xlsx")
         else:
             fecha_inicio_str = fecha_inicio[:10].replace('-', '')
             fecha_fin_str = fecha_fin[:10].replace('-', '')
             excel_detalle = os_module.path.join(output_dir, f"no_entendimiento_detalle_{fecha_inicio_str}_a_{fecha_fin_str}.xlsx")
-            excel_dashboard = os_module.path.join(output_dir, f"no_entendimiento_{fecha_inicio_str}_a_{fecha_fin_str}.xlsx")
         
         # Crear Excel detallado
         create_excel_detalle(excel_detalle, promedios1, modo, mes, anio, fecha_inicio, fecha_fin)
@@ -1011,15 +926,17 @@ if __name__ == "__main__":
         # Calcular D13 (Nada + NE)
         d13 = promedios1['nada'] + promedios1['ne']
         
-        # Crear/actualizar Dashboard Master
-        create_or_update_dashboard_master(excel_dashboard, d13, modo, mes, anio, fecha_inicio, fecha_fin)
+        # Registrar D13 en el tablero (el Excel lo arma consolidar_excel.py)
+        ruta_tablero = tablero.registrar('no_entendimiento', {'D13': d13}, modo, mes, anio, fecha_inicio, fecha_fin,
+                                         origen=archivo_salida)
+        print(f"  ✅ D13 registrado en el tablero: {ruta_tablero} (D13 = {d13*100:.2f}%)")
         
         print("\n" + "=" * 80)
         print("📦 ARCHIVOS GENERADOS:")
         print("=" * 80)
         print(f"  [1] JSON:               {archivo_salida}")
         print(f"  [2] Excel Detallado:    {excel_detalle}")
-        print(f"  [3] Dashboard Master:   {excel_dashboard}")
+        print(f"  [3] Tablero (D13):      {ruta_tablero}")
         print("")
         print(f"  🎯 D13 (No Entendimiento): {d13*100:.2f}%")
         print("=" * 80)
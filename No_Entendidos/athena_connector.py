@@ -9,8 +9,19 @@ import boto3
 import time
 import re
 import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, wait
 from datetime import datetime
 
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Raiz del repo (paquete comun)
+from comun import cache_consultas
+from comun.gestor_consultas import (ESPERA_ERROR_MAXIMA, ESPERA_ERROR_MINIMA, INTENTOS_API,
+                                    es_reintentable, es_token_expirado)
+
 # =============================================================================
 # CONFIGURACIÓN - EDITAR ESTAS VARIABLES
 # =============================================================================
@@ -20,6 +31,36 @@ ATHENA_WORKGROUP = 'Production-caba-piba-athena-boti-group'  # Tu workgroup con
 ATHENA_OUTPUT_BUCKET = None  # Se obtiene automáticamente del perfil AWS
 ATHENA_REGION = 'us-east-1'  # Cambiar si usas otra región
 
+# Rutas absolutas: bajo run_all.py el connector corre en proceso (sin cwd propio)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FECHAS = os.path.join(SCRIPT_DIR, '..', 'config_fechas.txt')
+CARPETA_TEMP = os.path.join(SCRIPT_DIR, 'temp')
+
+# Las 3 queries: (archivo SQL, CSV de salida en temp/)
+TRABAJOS = [
+    (os.path.join(SCRIPT_DIR, 'Mensajes.sql'), os.path.join(CARPETA_TEMP, 'mensajes_temp.csv')),
+    (os.path.join(SCRIPT_DIR, 'Clicks.sql'), os.path.join(CARPETA_TEMP, 'clicks_temp.csv')),
+    (os.path.join(SCRIPT_DIR, 'Botones.sql'), os.path.join(CARPETA_TEMP, 'botones_temp.csv')),
+]
+
+# Espera adaptativa al consultar el estado de varias queries a la vez
+# (segundos): arranca corta y se alarga mientras ninguna termine
+ESPERA_POLLING_MIN = 1
+ESPERA_POLLING_MAX = 15
+
+# Bajo run_all.py (--con-no-entendidos) no hay terminal para pedir ENTER: un
+# token vencido se espera verificando STS cada ESPERA_RENOVACION segundos,
+# hasta INTENTOS_RENOVACION veces (renovarlo en otra terminal con aws-azure-login)
+ESPERA_RENOVACION = 30
+INTENTOS_RENOVACION = 10
+
+# Conversión de los CSV descargados a Parquet tipado (lo que lee No_Entendidos.py)
+FILAS_POR_GRUPO_PARQUET = 500000   # Filas por row group (unidad de lectura/filtrado)
+COLUMNAS_FECHA = ['creation_time', 'ts', 'response_ts']
+COLUMNAS_CATEGORIA = ['msg_from', 'message_type', 'rule_name']
+COLUMNAS_NUMERICAS = ['max_score', 'score', 'results_score', 'threshold_clustering', 'results_index']
+COLUMNAS_BOOLEANAS = ['one_shot', 'results_showable']
+
 # =============================================================================
 # FUNCIONES PRINCIPALES
 # =============================================================================
@@ -250,26 +291,7 @@ def ejecutar_query_athena(query_sql, output_location=None, boto3_session=None):
     else:
         client = boto3.client('athena', region_name=ATHENA_REGION)
     
-    # Preparar parámetros de ejecución
-    print(f"  🚀 Iniciando query en Athena (workgroup: {ATHENA_WORKGROUP})...")
-    
-    execution_params = {
-        'QueryString': query_sql,
-        'QueryExecutionContext': {'Database': ATHENA_DATABASE},
-        'WorkGroup': ATHENA_WORKGROUP  # ← CLAVE: Usar el workgroup con permisos
-    }
-    
-    # El workgroup ya tiene configurado el bucket de salida
-    # Solo agregamos ResultConfiguration si se especifica explícitamente
-    if output_location is not None:
-        execution_params['ResultConfiguration'] = {'OutputLocation': output_location}
-    elif ATHENA_OUTPUT_BUCKET is not None:
-        execution_params['ResultConfiguration'] = {'OutputLocation': ATHENA_OUTPUT_BUCKET}
-    
-    response = client.start_query_execution(**execution_params)
-    
-    query_id = response['QueryExecutionId']
-    print(f"  📋 Query ID: {query_id}")
+    query_id = iniciar_query_athena(client, query_sql, output_location)
     
     # Esperar resultado
     estado = 'RUNNING'
@@ -301,6 +323,42 @@ def ejecutar_query_athena(query_sql, output_location=None, boto3_session=None):
         raise Exception(f"❌ Query falló: {error}")
 
 
+def iniciar_query_athena(client, query_sql, output_location=None):
+    """
+    Envía una query a Athena SIN esperar a que termine
+    
+    Args:
+        client: Cliente boto3 de Athena
+        query_sql: String con el SQL a ejecutar
+        output_location: Bucket S3 para resultados (opcional, usa workgroup si None)
+    
+    Returns:
+        str: QueryExecutionId
+    """
+    # Preparar parámetros de ejecución
+    print(f"  🚀 Iniciando query en Athena (workgroup: {ATHENA_WORKGROUP})...")
+    
+    execution_params = {
+        'QueryString': query_sql,
+        'QueryExecutionContext': {'Database': ATHENA_DATABASE},
+        'WorkGroup': ATHENA_WORKGROUP  # ← CLAVE: Usar el workgroup con permisos
+    }
+    
+    # El workgroup ya tiene configurado el bucket de salida
+    # Solo agregamos ResultConfiguration si se especifica explícitamente
+    if output_location is not None:
+        execution_params['ResultConfiguration'] = {'OutputLocation': output_location}
+    elif ATHENA_OUTPUT_BUCKET is not None:
+        execution_params['ResultConfiguration'] = {'OutputLocation': ATHENA_OUTPUT_BUCKET}
+    
+    response = client.start_query_execution(**execution_params)
+    
+    query_id = response['QueryExecutionId']
+    print(f"  📋 Query ID: {query_id}")
+    
+    return query_id
+
+
 def descargar_desde_s3(s3_path, archivo_local, boto3_session=None):
     """
     Descarga un archivo desde S3 a disco local
@@ -332,6 +390,132 @@ def descargar_desde_s3(s3_path, archivo_local, boto3_session=None):
     print(f"  ✅ Descargado: {archivo_local} ({tamanio_mb:.2f} MB)")
 
 
+def ruta_parquet(archivo_csv):
+    """Ruta del Parquet que corresponde a un CSV descargado (misma carpeta y nombre)"""
+    return os.path.splitext(archivo_csv)[0] + '.parquet'
+
+
+def tipo_columna(columna):
+    """Tipo Arrow con el que se guarda cada columna en el Parquet"""
+    if columna in COLUMNAS_FECHA:
+        return pa.timestamp('ns')
+    if columna in COLUMNAS_CATEGORIA:
+        return pa.dictionary(pa.int32(), pa.string())
+    if columna in COLUMNAS_NUMERICAS:
+        return pa.float64()
+    if columna in COLUMNAS_BOOLEANAS:
+        return pa.bool_()
+    return pa.string()
+
+
+def borrar_si_existe(*archivos):
+    """Borra los archivos que existan (restos de una corrida anterior)"""
+    for archivo in archivos:
+        if os.path.exists(archivo):
+            os.remove(archivo)
+
+
+def convertir_a_parquet(archivo_csv, filas_por_grupo=FILAS_POR_GRUPO_PARQUET):
+    """
+    Convierte un CSV descargado de Athena a Parquet tipado
+    
+    El CSV se lee por partes (nunca entero en memoria) y se escribe un row
+    group por parte:
+      - Fechas (creation_time, ts) ya parseadas como timestamp
+      - msg_from, message_type, rule_name como categorías (diccionario)
+      - usuario = primeros 20 caracteres de session_id, precalculado
+    Así No_Entendidos.py lee solo las columnas que usa y filtra por fecha y
+    testers al leer (predicate pushdown) en lugar de parsear todo el CSV.
+    
+    Args:
+        archivo_csv: CSV descargado (ej: temp/mensajes_temp.csv)
+        filas_por_grupo: Filas por row group del Parquet
+    
+    Returns:
+        str: Ruta del Parquet generado, o None si no se pudo convertir
+    """
+    archivo_parquet = ruta_parquet(archivo_csv)
+    temporal = archivo_parquet + '.tmp'
+    # El Parquet de una corrida anterior no corresponde a este CSV: si la
+    # conversión falla no tiene que quedar como resultado
+    borrar_si_existe(archivo_parquet, temporal)
+    print(f"  🗜️  Convirtiendo a Parquet: {archivo_parquet}...")
+    
+    try:
+        columnas = list(pd.read_csv(archivo_csv, nrows=0).columns)
+        if 'session_id' in columnas and 'usuario' not in columnas:
+            columnas.append('usuario')
+        esquema = pa.schema([(c, tipo_columna(c)) for c in columnas])
+        
+        total = 0
+        with pq.ParquetWriter(temporal, esquema, compression='snappy') as writer:
+            for parte in pd.read_csv(archivo_csv, chunksize=filas_por_grupo, dtype=str):
+                if 'usuario' in columnas:
+                    parte['usuario'] = parte['session_id'].str[:20]
+                for columna in parte.columns:
+                    if columna in COLUMNAS_FECHA:
+                        parte[columna] = pd.to_datetime(parte[columna], errors='coerce')
+                    elif columna in COLUMNAS_CATEGORIA:
+                        parte[columna] = parte[columna].astype('category')
+                    elif columna in COLUMNAS_NUMERICAS:
+                        parte[columna] = pd.to_numeric(parte[columna], errors='coerce')
+                    elif columna in COLUMNAS_BOOLEANAS:
+                        parte[columna] = parte[columna].str.lower().map({'true': True, 'false': False})
+                writer.write_table(pa.Table.from_pandas(parte, schema=esquema, preserve_index=False))
+                total += len(parte)
+        os.replace(temporal, archivo_parquet)
+    except Exception as e:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        print(f"  ⚠ No se pudo convertir a Parquet ({str(e)}); No_Entendidos.py leerá el CSV")
+        return None
+    
+    tamanio_mb = os.path.getsize(archivo_parquet) / (1024 * 1024)
+    print(f"  ✅ Parquet: {archivo_parquet} ({total:,} filas, {tamanio_mb:.2f} MB)")
+    return archivo_parquet
+
+
+def tomar_de_cache(query_sql, output_file):
+    """
+    Deja en temp/ el resultado cacheado de la query: el Parquet si está en la
+    cache, sino el CSV (y lo convierte). Retorna True si había resultado.
+    """
+    if cache_consultas.leer_archivo(query_sql, ATHENA_DATABASE, ATHENA_WORKGROUP,
+                                    ruta_parquet(output_file), extension='.parquet'):
+        # El CSV que haya en temp/ es de otra corrida: el resultado es el
+        # Parquet cacheado
+        borrar_si_existe(output_file)
+        return True
+    if cache_consultas.leer_archivo(query_sql, ATHENA_DATABASE, ATHENA_WORKGROUP, output_file):
+        convertir_a_parquet(output_file)
+        return True
+    return False
+
+
+def guardar_resultado(query_sql, output_file):
+    """Convierte el CSV descargado a Parquet y guarda en la cache el Parquet (o el CSV si falló)"""
+    archivo_parquet = convertir_a_parquet(output_file)
+    if archivo_parquet:
+        cache_consultas.guardar_archivo(query_sql, ATHENA_DATABASE, ATHENA_WORKGROUP,
+                                        archivo_parquet, extension='.parquet')
+    else:
+        cache_consultas.guardar_archivo(query_sql, ATHENA_DATABASE, ATHENA_WORKGROUP, output_file)
+
+
+def archivo_resultado(output_file):
+    """
+    El Parquet del resultado si existe y no es más viejo que el CSV, sino el
+    CSV (mismo criterio que cargar_datos() en No_Entendidos.py)
+    """
+    archivo_parquet = ruta_parquet(output_file)
+    if os.path.exists(archivo_parquet) and (
+        not os.path.exists(output_file)
+        or os.path.getmtime(archivo_parquet) >= os.path.getmtime(output_file)
+    ):
+        return archivo_parquet
+    return output_file
+
+
 def ejecutar_y_descargar(query_file, fecha_inicio, fecha_fin, output_file):
     """
     Proceso completo: Leer SQL → Reemplazar fechas → Ejecutar → Descargar
@@ -344,7 +528,7 @@ def ejecutar_y_descargar(query_file, fecha_inicio, fecha_fin, output_file):
         output_file: Donde guardar el CSV resultante
     
     Returns:
-        str: Ruta del archivo descargado
+        str: Ruta del archivo resultado (Parquet, o el CSV si no se pudo convertir)
     """
     print(f"\n{'='*60}")
     print(f"  {query_file}")
@@ -370,6 +554,12 @@ def ejecutar_y_descargar(query_file, fecha_inicio, fecha_fin, output_file):
     print(f"📅 Reemplazando fechas...")
     query_sql = reemplazar_fechas_en_query(query_sql, fecha_inicio, fecha_fin)
     
+    # Si la misma query ya se descargó (y sigue vigente), usar la cache local
+    if tomar_de_cache(query_sql, output_file):
+        print(f"💾 Resultado tomado de la cache local (no se consulta Athena)")
+        print(f"✅ Completado: {archivo_resultado(output_file)}\n")
+        return archivo_resultado(output_file)
+    
     # 3. Ejecutar en Athena (con reintentos automáticos)
     print(f"☁️  Ejecutando en Athena...")
     result_location = ejecutar_query_athena_con_reintentos(query_sql, max_intentos=3)
@@ -402,9 +592,215 @@ def ejecutar_y_descargar(query_file, fecha_inicio, fecha_fin, output_file):
             else:
                 raise
     
-    print(f"✅ Completado: {output_file}\n")
+    guardar_resultado(query_sql, output_file)
+    print(f"✅ Completado: {archivo_resultado(output_file)}\n")
     
-    return output_file
+    return archivo_resultado(output_file)
+
+
+def leer_queries(trabajos, fecha_inicio, fecha_fin):
+    """
+    SQL de cada trabajo con las fechas del período
+
+    Returns:
+        list: (query_file, output_file, query_sql) en el orden de trabajos
+    """
+    queries = []
+    for query_file, output_file in trabajos:
+        with open(query_file, 'r', encoding='utf-8') as f:
+            query_sql = f.read()
+        query_sql = reemplazar_fechas_en_query(query_sql, fecha_inicio, fecha_fin)
+        queries.append((query_file, output_file, query_sql))
+    return queries
+
+
+def nueva_conexion():
+    """Sesión boto3 fresca y su cliente de Athena: {'session': ..., 'client': ...}"""
+    session = crear_session_boto3_fresca()
+    return {'session': session, 'client': session.client('athena', region_name=ATHENA_REGION)}
+
+
+def llamar_con_reintentos(conexion, llamada):
+    """
+    Ejecuta llamada(client) con los mismos reintentos que GestorConsultas
+    (comun/gestor_consultas.py): throttling y cortes de red se reintentan
+    con espera creciente hasta INTENTOS_API veces. Con token expirado se
+    pide renovarlo y se rearma la conexión (las queries siguen corriendo
+    en Athena).
+    """
+    espera = ESPERA_ERROR_MINIMA
+    for intento in range(1, INTENTOS_API + 1):
+        try:
+            return llamada(conexion['client'])
+        except Exception as e:
+            if intento == INTENTOS_API or not es_reintentable(e):
+                raise
+            if es_token_expirado(e):
+                if not solicitar_renovacion_token():
+                    raise
+                print("🔄 Recreando sesión de boto3 con nuevas credenciales...")
+                conexion.update(nueva_conexion())
+                continue
+            print(f"  ⚠ Error de la API de Athena ({str(e)}); reintento {intento}/{INTENTOS_API - 1} en {espera:.0f}s")
+            time.sleep(espera)
+            espera = min(espera * 2, ESPERA_ERROR_MAXIMA)
+
+
+def detener_queries(client, query_ids):
+    """Cancela en Athena las queries que siguen corriendo (no se van a esperar)"""
+    for query_id in query_ids:
+        try:
+            client.stop_query_execution(QueryExecutionId=query_id)
+            print(f"  🛑 Query {query_id} cancelada")
+        except Exception as e:
+            print(f"  ⚠ No se pudo cancelar la query {query_id}: {str(e)}")
+
+
+def ejecutar_queries_en_paralelo(trabajos, fecha_inicio, fecha_fin, contexto=None):
+    """
+    Envía TODAS las queries a Athena de una vez y descarga cada resultado
+    apenas su query termina, sin esperar al resto.
+    
+    Athena ejecuta en paralelo las queries del workgroup, así que el tiempo
+    total pasa a ser el de la query más lenta en lugar de la suma de las 3.
+    Bajo run_all.py (contexto con GestorConsultas) las queries ya fueron
+    enviadas por adelantado y solo se esperan; sino se envían y se esperan
+    acá con un único loop de polling (esperar_en_athena).
+    
+    Args:
+        trabajos: Lista de (query_file, output_file)
+        fecha_inicio: 'YYYY-MM-DD'
+        fecha_fin: 'YYYY-MM-DD'
+        contexto: ContextoAthena de run_all.py (opcional)
+    
+    Returns:
+        list: Rutas de los resultados, Parquet o CSV (mismo orden que trabajos)
+    
+    Raises:
+        Exception: Si alguna query falla (las que siguen corriendo se cancelan)
+    """
+    queries = []
+    for query_file, output_file, query_sql in leer_queries(trabajos, fecha_inicio, fecha_fin):
+        if tomar_de_cache(query_sql, output_file):
+            print(f"  💾 {os.path.basename(query_file)}: tomado de la cache local "
+                  f"({archivo_resultado(output_file)}, no se consulta Athena)")
+            continue
+        queries.append((query_file, output_file, query_sql))
+    
+    if queries and contexto is not None and contexto.gestor is not None:
+        esperar_con_gestor(contexto, queries)
+    elif queries:
+        esperar_en_athena(queries)
+    
+    return [archivo_resultado(output_file) for _, output_file in trabajos]
+
+
+def esperar_con_gestor(contexto, queries):
+    """
+    Espera las queries en el GestorConsultas de run_all.py (enviadas por
+    adelantado con consultas(); si no, se envían ahora) y descarga el CSV de
+    cada una al terminar. Si una falla, las demás se cancelan en Athena.
+    """
+    en_curso = {
+        contexto.gestor.enviar(query_sql, transporte='csv'): (query_file, output_file, query_sql)
+        for query_file, output_file, query_sql in queries
+    }
+    print(f"\n☁️  {len(en_curso)} queries corriendo en Athena en paralelo (envío anticipado)...")
+    inicio = time.time()
+    
+    try:
+        while en_curso:
+            terminadas, _ = wait(en_curso, timeout=30, return_when=FIRST_COMPLETED)
+            if not terminadas:
+                nombres = ', '.join(os.path.basename(q) for q, _, _ in en_curso.values())
+                print(f"  ⏳ Esperando: {nombres} ({time.time() - inicio:.0f}s)")
+                continue
+            for futuro in terminadas:
+                query_file, output_file, query_sql = en_curso.pop(futuro)
+                try:
+                    query_id = futuro.result()
+                except Exception as e:
+                    raise Exception(f"❌ Query {os.path.basename(query_file)} falló: {str(e)}")
+                
+                print(f"\n  ✅ {os.path.basename(query_file)} terminó ({time.time() - inicio:.0f}s)")
+                session = contexto.session
+                ejecucion = session.client('athena', region_name=ATHENA_REGION).get_query_execution(
+                    QueryExecutionId=query_id
+                )['QueryExecution']
+                descargar_desde_s3(ejecucion['ResultConfiguration']['OutputLocation'], output_file,
+                                   boto3_session=session)
+                guardar_resultado(query_sql, output_file)
+    except BaseException:
+        # Incluye Ctrl+C: no dejar queries corriendo (y facturando) en Athena
+        for _, _, query_sql in en_curso.values():
+            contexto.gestor.cancelar(query_sql, transporte='csv')
+        raise
+
+
+def esperar_en_athena(queries):
+    """
+    Envía las queries y las espera en un único loop de polling
+    (batch_get_query_execution) con espera adaptativa. Los errores de la API
+    se reintentan como en GestorConsultas (llamar_con_reintentos); si una
+    query falla, las demás se cancelan en Athena antes de propagar el error.
+    """
+    conexion = nueva_conexion()
+    pendientes = {}   # query_id -> (query_file, output_file, query_sql)
+    
+    try:
+        # 1. Enviar todas las queries
+        for query_file, output_file, query_sql in queries:
+            print(f"\n📖 {os.path.basename(query_file)}")
+            query_id = llamar_con_reintentos(conexion, lambda client: iniciar_query_athena(client, query_sql))
+            pendientes[query_id] = (query_file, output_file, query_sql)
+        
+        print(f"\n☁️  {len(pendientes)} queries corriendo en Athena en paralelo...")
+        
+        # 2. Esperar todas en un solo loop y descargar cada una al terminar
+        espera = ESPERA_POLLING_MIN
+        inicio = time.time()
+        ultimo_aviso = inicio
+        
+        while pendientes:
+            time.sleep(espera)
+            
+            response = llamar_con_reintentos(
+                conexion, lambda client: client.batch_get_query_execution(QueryExecutionIds=list(pendientes))
+            )
+            
+            terminadas = 0
+            for ejecucion in response['QueryExecutions']:
+                estado = ejecucion['Status']['State']
+                if estado in ['RUNNING', 'QUEUED']:
+                    continue
+                
+                query_id = ejecucion['QueryExecutionId']
+                query_file, output_file, query_sql = pendientes.pop(query_id)
+                terminadas += 1
+                
+                if estado != 'SUCCEEDED':
+                    error = ejecucion['Status'].get('StateChangeReason', 'Error desconocido')
+                    raise Exception(f"❌ Query {os.path.basename(query_file)} falló: {error}")
+                
+                print(f"\n  ✅ {os.path.basename(query_file)} terminó ({time.time() - inicio:.0f}s)")
+                result_location = ejecucion['ResultConfiguration']['OutputLocation']
+                descargar_desde_s3(result_location, output_file, boto3_session=conexion['session'])
+                guardar_resultado(query_sql, output_file)
+            
+            # Si algo terminó, volver a mirar pronto; si no, espaciar las consultas
+            if terminadas:
+                espera = ESPERA_POLLING_MIN
+            else:
+                espera = min(espera * 1.5, ESPERA_POLLING_MAX)
+            
+            if pendientes and time.time() - ultimo_aviso >= 30:
+                ultimo_aviso = time.time()
+                en_curso = ', '.join(os.path.basename(q) for q, _, _ in pendientes.values())
+                print(f"  ⏳ Esperando: {en_curso} ({time.time() - inicio:.0f}s)")
+    except BaseException:
+        # Incluye Ctrl+C: no dejar queries corriendo (y facturando) en Athena
+        detener_queries(conexion['client'], pendientes)
+        raise
 
 
 def crear_session_boto3_fresca():
@@ -451,6 +847,9 @@ def solicitar_renovacion_token():
     Returns:
         bool: True si el token fue renovado, False si no
     """
+    if os.environ.get('BOTI_RUN_ALL'):
+        return esperar_renovacion_token()
+
     print("\n" + "=" * 80)
     print("⚠️  TOKEN AWS EXPIRADO")
     print("=" * 80)
@@ -503,24 +902,53 @@ def solicitar_renovacion_token():
     return False
 
 
+def esperar_renovacion_token():
+    """
+    Version sin terminal de solicitar_renovacion_token() (bajo run_all.py):
+    espera a que el token se renueve en otra terminal verificando STS.
+
+    Returns:
+        bool: True si el token fue renovado, False si no
+    """
+    print("\n⚠️  TOKEN AWS EXPIRADO (ejecutando bajo run_all.py, sin terminal)")
+    print("   Renovarlo en otra terminal: aws-azure-login --profile default --mode=gui")
+    for intento in range(1, INTENTOS_RENOVACION + 1):
+        print(f"   ⏳ Verificando en {ESPERA_RENOVACION} s ({intento}/{INTENTOS_RENOVACION})...")
+        time.sleep(ESPERA_RENOVACION)
+        try:
+            crear_session_boto3_fresca().client('sts').get_caller_identity()
+            print("✅ Token renovado correctamente. Continuando...\n")
+            return True
+        except Exception:
+            pass
+    print("\n❌ El token no se renovó a tiempo.")
+    return False
 
 
-def obtener_datos_athena():
+
+
+def obtener_datos_athena(contexto=None):
     """
     FUNCIÓN PRINCIPAL
     
-    Ejecuta las 3 queries (Mensajes, Clicks, Botones) y descarga los resultados
+    Ejecuta las 3 queries (Mensajes, Clicks, Botones), descarga los resultados
+    y los convierte a Parquet
+    
+    Args:
+        contexto: ContextoAthena de run_all.py (opcional). Con contexto las
+            credenciales ya están verificadas y las queries pasan por su
+            GestorConsultas
     
     Returns:
-        tuple: (mensajes_csv, clicks_csv, botones_csv)
+        tuple: (mensajes, clicks, botones) rutas Parquet (o CSV si no se pudo convertir)
     """
     print("\n" + "=" * 80)
     print("  AWS ATHENA - EJECUCIÓN AUTOMÁTICA DE QUERIES")
     print("=" * 80 + "\n")
     
-    # Verificar credenciales AWS
+    # Verificar credenciales AWS (con contexto ya las verificó run_all.py)
     print("🔐 Verificando credenciales AWS...")
-    if not verificar_credenciales_aws():
+    if contexto is None and not verificar_credenciales_aws():
         print("\n❌ No hay credenciales AWS activas")
         print("\n⚠️  IMPORTANTE: Debes autenticarte primero con:")
         print("   aws-azure-login --profile default --mode=gui")
@@ -530,64 +958,35 @@ def obtener_datos_athena():
     print("✓ Credenciales AWS activas\n")
     
     # Leer configuración de fechas
-    fecha_inicio, fecha_fin = leer_config_fechas()
+    fecha_inicio, fecha_fin = leer_config_fechas(CONFIG_FECHAS)
     
     # Crear carpeta temporal si no existe
-    if not os.path.exists('temp'):
-        os.makedirs('temp')
+    if not os.path.exists(CARPETA_TEMP):
+        os.makedirs(CARPETA_TEMP)
         print(f"✓ Carpeta 'temp/' creada\n")
     
     # Advertencia
     print("\n⚠️  IMPORTANTE:")
     print("   Las queries en Athena pueden tardar 5-15 minutos cada una")
     print("   Escanean millones de registros")
-    print("   ANTES de cada query se te pedirá revalidar credenciales AWS\n")
+    print("   Las 3 se envían juntas y corren en paralelo en Athena\n")
 
-    # Ejecutar las 3 queries
+    # Ejecutar las 3 queries (todas a la vez)
     try:
-        # Query 1: Mensajes
-        print("\n" + "=" * 60)
-        print("  QUERY 1 de 3: Mensajes.sql")
-        print("=" * 60)
-        print("\n🔐 ANTES DE CONTINUAR, revalida tus credenciales AWS:")
-        print("   Ejecuta en otra terminal: aws-azure-login --profile default --mode=gui\n")
-        input("Presiona Enter cuando hayas revalidado las credenciales...")
-
-        mensajes_csv = ejecutar_y_descargar(
-            'Mensajes.sql',
-            fecha_inicio,
-            fecha_fin,
-            'temp/mensajes_temp.csv'
-        )
-
-        # Query 2: Clicks
-        print("\n" + "=" * 60)
-        print("  QUERY 2 de 3: Clicks.sql")
-        print("=" * 60)
-        print("\n🔐 ANTES DE CONTINUAR, revalida tus credenciales AWS:")
-        print("   Ejecuta en otra terminal: aws-azure-login --profile default --mode=gui\n")
-        input("Presiona Enter cuando hayas revalidado las credenciales...")
-
-        clicks_csv = ejecutar_y_descargar(
-            'Clicks.sql',
-            fecha_inicio,
-            fecha_fin,
-            'temp/clicks_temp.csv'
-        )
-
-        # Query 3: Botones
         print("\n" + "=" * 60)
-        print("  QUERY 3 de 3: Botones.sql")
+        print("  QUERIES: Mensajes.sql, Clicks.sql, Botones.sql")
         print("=" * 60)
-        print("\n🔐 ANTES DE CONTINUAR, revalida tus credenciales AWS:")
-        print("   Ejecuta en otra terminal: aws-azure-login --profile default --mode=gui\n")
-        input("Presiona Enter cuando hayas revalidado las credenciales...")
+        # Bajo run_all.py no hay terminal interactiva (run_all ya verificó AWS)
+        if contexto is None and not os.environ.get('BOTI_RUN_ALL'):
+            print("\n🔐 ANTES DE CONTINUAR, revalida tus credenciales AWS:")
+            print("   Ejecuta en otra terminal: aws-azure-login --profile default --mode=gui\n")
+            input("Presiona Enter cuando hayas revalidado las credenciales...")
 
-        botones_csv = ejecutar_y_descargar(
-            'Botones.sql',
+        mensajes, clicks, botones = ejecutar_queries_en_paralelo(
+            TRABAJOS,
             fecha_inicio,
             fecha_fin,
-            'temp/botones_temp.csv'
+            contexto
         )
         
         # Resumen
@@ -595,11 +994,11 @@ def obtener_datos_athena():
         print("  ✅ TODAS LAS QUERIES EJECUTADAS EXITOSAMENTE")
         print("=" * 80)
         print(f"\n📂 Archivos generados:")
-        print(f"   ├─ {mensajes_csv}")
-        print(f"   ├─ {clicks_csv}")
-        print(f"   └─ {botones_csv}\n")
+        print(f"   ├─ {mensajes}")
+        print(f"   ├─ {clicks}")
+        print(f"   └─ {botones}\n")
         
-        return mensajes_csv, clicks_csv, botones_csv
+        return mensajes, clicks, botones
     
     except Exception as e:
         print("\n" + "=" * 80)
@@ -609,6 +1008,26 @@ def obtener_datos_athena():
         raise
 
 
+def consultas():
+    """
+    Queries del período de config_fechas.txt, con transporte CSV (el CSV que
+    deja Athena se descarga y se convierte a Parquet tipado). run_all.py las
+    envía a Athena por adelantado, antes de llamar a run().
+    """
+    fecha_inicio, fecha_fin = leer_config_fechas(CONFIG_FECHAS)
+    return [(query_sql, 'csv') for _, _, query_sql in leer_queries(TRABAJOS, fecha_inicio, fecha_fin)]
+
+
+def run(contexto):
+    """
+    Punto de entrada en modo librería: run_all.py (--con-no-entendidos)
+    importa el módulo y lo ejecuta en su mismo proceso, con un ContextoAthena
+    compartido. Retorna True si las 3 queries terminaron OK.
+    """
+    obtener_datos_athena(contexto)
+    return True
+
+
 # =============================================================================
 # MODO PRUEBA
 # =============================================================================
@@ -652,7 +1071,8 @@ Configuración actual:
         exit(1)
     
     print("✓ Credenciales AWS activas\n")
-    input("Presiona Enter para continuar...")
+    if not os.environ.get('BOTI_RUN_ALL'):
+        input("Presiona Enter para continuar...")
     
     # Ejecutar
     try:
@@ -19,22 +19,30 @@ IMPORTANTE: El Excel SIEMPRE se crea NUEVO desde cero con estructura de Dashboar
 Workgroup: Production-caba-piba-athena-boti-group
 Rol: PIBADataScientist
 """
-import boto3
-import awswrangler as wr
 import pandas as pd
 from datetime import datetime
 from calendar import monthrange
 import os
+import sys
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))  # Raiz del repo (paquete comun)
+from comun.contexto import ContextoAthena
+from comun.athena import ejecutar_query
+from comun.particiones import filtro_fechas
+from comun import por_mes
+from comun import diario
+from comun import tablero
+
 # ==================== CONFIGURACION ====================
 CONFIG = {
     'region': 'us-east-1',
     'workgroup': 'Production-caba-piba-athena-boti-group',
     'database': 'caba-piba-consume-zone-db',
-    'output_folder': 'output',
-    'config_file': '../config_fechas.txt'  # Config centralizado en raiz del proyecto
+    'output_folder': os.path.join(SCRIPT_DIR, 'output'),
+    'config_file': os.path.join(SCRIPT_DIR, '..', 'config_fechas.txt')  # Config centralizado en raiz del proyecto
 }
 
 # ==================== FUNCIONES ====================
@@ -179,8 +187,23 @@ def build_query(fecha_inicio, fecha_fin):
     
     query = """SELECT starting_cause, count(distinct (session_id)) as Cant_sesiones 
 FROM "caba-piba-consume-zone-db"."boti_session_metrics_2"   
-WHERE CAST(session_creation_time AS DATE) BETWEEN date '{fecha_inicio}' and date '{fecha_fin}' 
-group by starting_cause""".format(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+WHERE {filtro} 
+group by starting_cause""".format(filtro=filtro_fechas('session_creation_time', fecha_inicio, fecha_fin))
+    
+    return query
+
+def build_query_por_mes(meses):
+    """
+    build_query() de varios meses (lista de (anio, mes)) en una sola
+    consulta: las filas de cada mes con la columna periodo_mes
+    """
+    where, mes = por_mes.filtro_meses(
+        lambda fi, ff: filtro_fechas('session_creation_time', fi, ff), meses
+    )
+    query = """SELECT {mes} AS {columna}, starting_cause, count(distinct (session_id)) as Cant_sesiones 
+FROM "caba-piba-consume-zone-db"."boti_session_metrics_2"   
+WHERE {where} 
+group by 1, starting_cause""".format(mes=mes, columna=por_mes.COLUMNA_MES, where=where)
     
     return query
 
@@ -312,59 +335,17 @@ def create_excel_with_dashboard(filepath, result_value, modo, mes, anio, fecha_i
     wb.save(filepath)
     print("    [OK] Excel generado: {}".format(filepath))
 
-def check_aws_credentials():
-    """Verifica que las credenciales AWS esten configuradas y sean validas"""
-    try:
-        sts = boto3.client('sts', region_name=CONFIG['region'])
-        identity = sts.get_caller_identity()
-        
-        user_arn = identity.get('Arn', '')
-        
-        print("[OK] Credenciales AWS validas")
-        print("    ARN: {}".format(user_arn))
-        
-        # Verificar que sea el rol correcto
-        if 'PIBADataScientist' not in user_arn:
-            print("")
-            print("[ADVERTENCIA] No estas usando el rol correcto")
-            print("    Se requiere: PIBADataScientist")
-            if '/' in user_arn:
-                current_role = user_arn.split('/')[-2]
-            else:
-                current_role = 'desconocido'
-            print("    Tu rol actual: {}".format(current_role))
-            print("")
-            print("SOLUCION:")
-            print("    1. Ejecuta: aws-azure-login --profile default --mode=gui")
-            print("    2. Cuando te autentiques, SELECCIONA el rol: PIBADataScientist")
-            print("    3. Vuelve a ejecutar este script")
-            print("")
-            return False
-        
-        return True
-        
-    except Exception as e:
-        print("[ERROR] Error verificando credenciales: {}".format(str(e)))
-        if 'ExpiredToken' in str(e):
-            print("")
-            print("SOLUCION:")
-            print("    Tu sesión AWS expiró. Ejecuta:")
-            print("    aws-azure-login --profile default --mode=gui")
-            print("")
-        else:
-            print("")
-            print("SOLUCION:")
-            print("    1. Ejecuta: aws-azure-login --configure --profile default")
-            print("    2. Luego: aws-azure-login --profile default --mode=gui")
-            print("")
-        return False
-
-def execute_query_and_save():
-    """Funcion principal: ejecuta query y guarda resultados"""
+def execute_query_and_save(contexto=None):
+    """
+    Funcion principal: ejecuta query y guarda resultados
+    contexto: ContextoAthena compartido (run_all.py); si es None se crea uno propio
+    """
+    if contexto is None:
+        contexto = ContextoAthena(CONFIG['region'], CONFIG['workgroup'], CONFIG['database'])
     
     # Verificar credenciales
     print("Verificando credenciales AWS...")
-    if not check_aws_credentials():
+    if not contexto.verificar_credenciales():
         return None
     
     # Leer configuracion de fechas
@@ -398,37 +379,14 @@ def execute_query_and_save():
     print("    {}".format(query))
     
     try:
-        # Crear sesion boto3
-        session = boto3.Session(region_name=CONFIG['region'])
-        
         print("")
         print("Ejecutando consulta...")
         
-        # Intentar con el workgroup especificado
-        try:
-            df = wr.athena.read_sql_query(
-                sql=query,
-                database=CONFIG['database'],
-                workgroup=CONFIG['workgroup'],
-                boto3_session=session,
-                ctas_approach=False,
-                unload_approach=False
-            )
-        except Exception as e:
-            if 'workgroup' in str(e).lower() or 'GetWorkGroup' in str(e):
-                print("")
-                print("[ADVERTENCIA] Error con workgroup '{}'".format(CONFIG['workgroup']))
-                print("    Intentando sin especificar workgroup...")
-                
-                df = wr.athena.read_sql_query(
-                    sql=query,
-                    database=CONFIG['database'],
-                    boto3_session=session,
-                    ctas_approach=False,
-                    unload_approach=False
-                )
-            else:
-                raise e
+        if modo == 'rango' and diario.habilitado():
+            # Rango personalizado: se arma con los dias del almacen diario
+            df = diario.resultado(contexto, 'sesiones_abiertas', fecha_inicio, fecha_fin)
+        else:
+            df = ejecutar_query(contexto, query)
         
         print("")
         print("[OK] Consulta ejecutada exitosamente!")
@@ -483,6 +441,10 @@ def execute_query_and_save():
         print("Generando Excel Dashboard...")
         create_excel_with_dashboard(local_path_excel, result_value, modo, mes, anio, fecha_inicio, fecha_fin)
         
+        print("Registrando D4 en el tablero...")
+        ruta_tablero = tablero.registrar('sesiones_abiertas', {'D4': result_value}, modo, mes, anio, fecha_inicio, fecha_fin,
+                                         origen=filename_excel)
+        
         print("")
         print("ARCHIVOS GENERADOS:")
         print("    Carpeta: {}/".format(output_folder))
@@ -497,6 +459,8 @@ def execute_query_and_save():
         print("            Hoja: Dashboard")
         print("            Resultado en celda: D4 = {:,}".format(result_value))
         print("            [IMPORTANTE] Excel creado NUEVO con estructura completa")
+        print("")
+        print("    [TABLERO] Ruta: {}".format(ruta_tablero))
         
         print("")
         print("=" * 60)
@@ -532,6 +496,33 @@ def execute_query_and_save():
         
         return None
 
+def consultas():
+    """
+    Queries que ejecuta el modulo para el periodo de config_fechas.txt.
+    run_all.py las envia a Athena por adelantado, antes de llamar a run().
+    """
+    modo, fecha_inicio, fecha_fin = read_date_config(CONFIG['config_file'])[:3]
+    if modo is None or fecha_inicio is None:
+        return []
+    if modo == 'rango' and diario.habilitado():
+        return diario.consultas('sesiones_abiertas', fecha_inicio, fecha_fin)
+    return [build_query(fecha_inicio, fecha_fin)]
+
+def consultas_por_mes(meses):
+    """
+    Backfill (run_all.py --periodos): la query de todos los meses en una
+    sola consulta agrupada por mes, y la query de cada mes.
+    """
+    return [(build_query_por_mes(meses), por_mes.consultas_mes(build_query, meses))]
+
+def run(contexto):
+    """
+    Punto de entrada en modo libreria: run_all.py importa el modulo y lo
+    ejecuta en su mismo proceso, con un ContextoAthena compartido.
+    Retorna True si el proceso termino OK.
+    """
+    return execute_query_and_save(contexto) is not None
+
 # ==================== EJECUCION PRINCIPAL ====================
 
 if __name__ == "__main__":
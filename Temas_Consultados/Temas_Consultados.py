@@ -9,35 +9,45 @@ Tablero-de-mensajes-y-disparadores:
            clasifica mensajes por categoria y genera todos los outputs.
 
 Genera:
-  - output/temas_consultados_<mes>_<año>.csv        Dataset crudo limpio
+  - output/temas_consultados_<mes>_<año>.csv        Dataset crudo limpio del ultimo mes
   - output/top_200_mensajes_<mes>_<año>.csv         Top 200 mensajes mas repetidos
   - output/comparison_mensajes_<mes>_<año>.xlsx     Comparacion mes vs mes anterior
   - output/reporte_mensajes_<mes>_<año>.xlsx        Comparativo + Top100 Otros
-  - output/top_variaciones_<mes>_<año>.xlsx         Top 3 subidas/bajadas por categoria
+  - output/top_variaciones_<mes>_<año>.xlsx         Top N subidas/bajadas por categoria
   - output/ranking_temas_<mes>_<año>.txt            Texto formateado para el TABLERO
                                                     (celda 'Temas mas consultados')
+  - agregados/temas_<año>_<mm>.parquet              Conteos por mensaje de cada mes
+                                                    cerrado (el mes siguiente no lo
+                                                    vuelve a consultar en Athena)
 
 Workgroup: Production-caba-piba-athena-boti-group
 Rol: PIBADataScientist
 """
 
-import boto3
-import awswrangler as wr
 import pandas as pd
 import numpy as np
+import hashlib
+import json
 import os
 import sys
 import time
 import re
 import string
 import unicodedata
-from datetime import datetime
+from datetime import datetime, timedelta
 from calendar import monthrange
-from collections import Counter
 from contextlib import contextmanager
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))  # Raiz del repo (paquete comun)
+from comun import cache_consultas
+from comun.contexto import ContextoAthena
+from comun.athena import ejecutar_query, elegir_transporte
+from comun.particiones import filtro_fechas
+from comun.reporte_excel import escribir_dataframes
+
 # NLTK - stopwords en español (puede tardar la primera vez al bajar el pack)
 try:
     from nltk.corpus import stopwords
@@ -76,8 +86,9 @@ CONFIG = {
     'region': 'us-east-1',
     'workgroup': 'Production-caba-piba-athena-boti-group',
     'database': 'caba-piba-consume-zone-db',
-    'output_folder': 'output',
-    'config_file': '../config_fechas.txt',
+    'output_folder': os.path.join(SCRIPT_DIR, 'output'),
+    'carpeta_agregados': os.path.join(SCRIPT_DIR, 'agregados'),
+    'config_file': os.path.join(SCRIPT_DIR, '..', 'config_fechas.txt'),
 }
 
 # ============================================================================
@@ -199,6 +210,11 @@ CATEGORIAS_EXCLUIR_DEL_RANKING = [
 ]
 TOP_N_RANKING = 10
 
+# top_variaciones: mensajes que mas subieron / bajaron por categoria, entre
+# los que tuvieron mas de VOLUMEN_MINIMO_VARIACIONES consultas en el ultimo mes
+TOP_N_VARIACIONES = 3
+VOLUMEN_MINIMO_VARIACIONES = 100
+
 # ============================================================================
 # LIMPIEZA DE TEXTO
 # ============================================================================
@@ -215,12 +231,14 @@ def _build_stopwords_set():
 
 _STOP = _build_stopwords_set()
 
+_TABLA_PUNTUACION = str.maketrans('', '', string.punctuation)
+
 def limpiar_mensaje(message):
     """Lowercase + sin puntuacion + sin acentos + sin stopwords + sin tokens <=2 letras."""
     if not isinstance(message, str):
         return ''
     msg = message.lower()
-    msg = msg.translate(str.maketrans('', '', string.punctuation))
+    msg = msg.translate(_TABLA_PUNTUACION)
     msg = unicodedata.normalize('NFKD', msg).encode('ascii', 'ignore').decode('utf-8', 'ignore')
     palabras = [w for w in msg.split() if w not in _STOP and len(w) > 2]
     return ' '.join(palabras)
@@ -236,6 +254,19 @@ def es_mensaje_basura(message):
         return True
     return False
 
+def aplicar_por_unicos(serie, funcion):
+    """
+    Igual que serie.apply(funcion), pero evaluando `funcion` una sola vez por
+    valor distinto (los mensajes de usuario se repiten muchisimo). Los nulos
+    se evaluan como None: limpiar_mensaje y es_mensaje_basura tratan igual a
+    cualquier valor que no sea texto.
+    """
+    codigos, unicos = pd.factorize(serie)
+    resultados = np.empty(len(unicos) + 1, dtype=object)
+    resultados[:-1] = [funcion(v) for v in unicos]
+    resultados[-1] = funcion(None)  # codigo -1: nulos
+    return pd.Series(resultados[codigos], index=serie.index)
+
 def clasificar(texto):
     """Asigna la categoria de un mensaje siguiendo el orden de prioridad."""
     if not isinstance(texto, str):
@@ -247,6 +278,43 @@ def clasificar(texto):
                 return cat
     return "Otros"
 
+# Un patron por nivel de prioridad: alternancia de todas las palabras clave
+# de la categoria (mismo criterio que clasificar(): substring, sin limites
+# de palabra). Las mas largas primero solo por prolijidad, no cambia el match.
+def compilar_patrones(categorias, orden):
+    """Lista (categoria, regex) en orden de prioridad para clasificar_serie()."""
+    return [
+        (cat, re.compile('|'.join(re.escape(p) for p in sorted(categorias[cat], key=len, reverse=True))))
+        for cat in orden
+    ]
+
+_PATRONES_PRIORIDAD = compilar_patrones(CATEGORIAS, ORDEN_PRIORIDAD)
+
+def clasificar_serie(textos, patrones=None):
+    """
+    Version vectorizada de clasificar() para una Serie: mismo resultado que
+    textos.apply(clasificar). Clasifica cada texto distinto una sola vez y
+    por nivel de prioridad aplica UN regex a los textos todavia sin
+    categoria, en lugar de probar palabra por palabra en cada mensaje.
+    `patrones` (de compilar_patrones) reemplaza a las CATEGORIAS del modulo.
+    """
+    if patrones is None:
+        patrones = _PATRONES_PRIORIDAD
+    codigos, unicos = pd.factorize(textos)
+    unicos = pd.Series(unicos, dtype=object)
+    es_texto = unicos.map(lambda v: isinstance(v, str)).astype(bool)
+
+    categorias = np.full(len(unicos) + 1, "Otros", dtype=object)  # ultima: nulos (codigo -1)
+    pendientes = unicos[es_texto].astype(str).str.lower()
+    for cat, patron in patrones:
+        if pendientes.empty:
+            break
+        coincide = pendientes.str.contains(patron).values
+        categorias[pendientes.index[coincide]] = cat
+        pendientes = pendientes[~coincide]
+
+    return pd.Series(categorias[codigos], index=textos.index)
+
 # ============================================================================
 # CONFIG DE FECHAS
 # ============================================================================
@@ -293,10 +361,116 @@ def fechas_rango(mes, anio):
     fecha_fin = "{:04d}-{:02d}-{:02d}".format(anio, mes, ultimo_dia)
     return fecha_inicio, fecha_fin
 
+def rango_a_consultar(mes, anio):
+    """
+    Rango de la query de Athena. Si los conteos del mes anterior ya estan en
+    el almacen (agregados/, con la normalizacion actual) solo se consulta el
+    ultimo mes, desde
+    MARGEN_DIAS_SESIONES dias antes (sesiones que empiezan el ultimo dia del
+    mes anterior y siguen despues de medianoche). Sino, los 2 meses enteros.
+    Devuelve (fecha_inicio, fecha_fin, incremental).
+    """
+    fecha_inicio, fecha_fin = fechas_rango(mes, anio)
+    mes_ant, anio_ant = calcular_mes_anterior(mes, anio)
+    if not agregado_vigente(pd.Period(year=anio_ant, month=mes_ant, freq='M')):
+        return fecha_inicio, fecha_fin, False
+    inicio = datetime(anio, mes, 1) - timedelta(days=MARGEN_DIAS_SESIONES)
+    return inicio.strftime('%Y-%m-%d'), fecha_fin, True
+
+# ============================================================================
+# ALMACEN MENSUAL DE CONTEOS (agregados/)
+# ============================================================================
+
+# Dias antes del ultimo mes que se consultan en modo incremental (ver rango_a_consultar)
+MARGEN_DIAS_SESIONES = 1
+
+# Subir si cambia limpiar_mensaje() o es_mensaje_basura(): los conteos guardados
+# con otra normalizacion no se mezclan con los nuevos
+VERSION_NORMALIZACION = 1
+
+def firma_normalizacion():
+    """
+    Firma de la normalizacion de mensajes (VERSION_NORMALIZACION + stopwords
+    en uso). Dos meses solo se comparan si sus mensaje_ok salieron de la
+    misma normalizacion.
+    """
+    texto = json.dumps([VERSION_NORMALIZACION, sorted(_STOP)], ensure_ascii=False)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:16]
+
+def ruta_agregado(periodo):
+    """agregados/temas_<año>_<mm>.parquet del mes `periodo` (pd.Period mensual)."""
+    return os.path.join(CONFIG['carpeta_agregados'],
+                        "temas_{:04d}_{:02d}.parquet".format(periodo.year, periodo.month))
+
+def ruta_firma(periodo):
+    """agregados/temas_<año>_<mm>.json: firma_normalizacion() con la que se guardo el mes."""
+    return os.path.splitext(ruta_agregado(periodo))[0] + '.json'
+
+def agregado_vigente(periodo):
+    """True si el mes esta en el almacen y se guardo con la normalizacion actual."""
+    if not os.path.exists(ruta_agregado(periodo)):
+        return False
+    try:
+        with open(ruta_firma(periodo), 'r', encoding='utf-8') as f:
+            return json.load(f).get('firma') == firma_normalizacion()
+    except (OSError, ValueError):
+        return False
+
+def mes_cerrado(periodo, hoy=None):
+    """True si el mes termino hace al menos DIAS_CIERRE dias (sus datos ya no cambian)."""
+    hoy = hoy or datetime.now()
+    return periodo.end_time + timedelta(days=cache_consultas.DIAS_CIERRE) <= hoy
+
+def guardar_agregados(conteos, periodos):
+    """
+    Guarda en agregados/ los conteos (mensaje_ok, categoria, Q) de cada mes
+    de `periodos` que ya este cerrado. Un mes en curso no se guarda: el
+    proximo run lo vuelve a consultar completo. Devuelve los meses guardados.
+    """
+    os.makedirs(CONFIG['carpeta_agregados'], exist_ok=True)
+    guardados = []
+    for periodo in periodos:
+        if not mes_cerrado(periodo):
+            continue
+        ruta = ruta_agregado(periodo)
+        temporal = ruta + '.tmp'
+        del_mes = conteos[conteos['mes'] == periodo]
+        del_mes[['mensaje_ok', 'categoria', 'Q']].to_parquet(temporal, index=False)
+        os.replace(temporal, ruta)
+        with open(ruta_firma(periodo), 'w', encoding='utf-8') as f:
+            json.dump({'version': VERSION_NORMALIZACION, 'firma': firma_normalizacion()}, f)
+        guardados.append(periodo)
+    return guardados
+
+def leer_agregado(periodo):
+    """
+    Conteos de un mes guardados en agregados/, con las mismas columnas que
+    agregar_conteos() (None si el mes no esta o se guardo con otra
+    normalizacion, ver agregado_vigente). La categoria se recalcula con las
+    CATEGORIAS actuales por si cambiaron las palabras clave.
+    """
+    ruta = ruta_agregado(periodo)
+    if not agregado_vigente(periodo):
+        return None
+    conteos = pd.read_parquet(ruta, columns=['mensaje_ok', 'Q'])
+    conteos['categoria'] = clasificar_serie(conteos['mensaje_ok'])
+    conteos['mes'] = periodo
+    return conteos[['mensaje_ok', 'categoria', 'mes', 'Q']]
+
 # ============================================================================
 # ATHENA
 # ============================================================================
 
+# build_query trae el detalle: una fila por mensaje de texto de usuario
+# (~1,36 millones en marzo 2026, ver output/comparison_mensajes_*.xlsx).
+# Con la cantidad esperada se elige el transporte de Athena (comun.athena)
+MENSAJES_POR_DIA = 45000
+
+def filas_estimadas(fecha_inicio, fecha_fin):
+    """Filas esperadas de build_query(fecha_inicio, fecha_fin)"""
+    dias = (datetime.strptime(fecha_fin, '%Y-%m-%d') - datetime.strptime(fecha_inicio, '%Y-%m-%d')).days + 1
+    return dias * MENSAJES_POR_DIA
+
 def build_query(fecha_inicio, fecha_fin):
     """Replica la query del repo Tablero-de-mensajes-y-disparadores pero con
     rango de fechas explicito (2 meses: mes anterior + ultimo mes)."""
@@ -305,58 +479,13 @@ def build_query(fecha_inicio, fecha_fin):
        id,
        message
 FROM "caba-piba-consume-zone-db"."boti_message_metrics_2"
-WHERE CAST(session_creation_time AS DATE) BETWEEN date '{fi}' AND date '{ff}'
+WHERE {filtro}
   AND msg_from = 'user'
   AND message IS NOT NULL
   AND message_type = 'Text'
   AND LENGTH(message) > 2
-  AND COMPREHENSION_TYPE != 'Answer to question'""".format(fi=fecha_inicio, ff=fecha_fin)
-
-def check_aws_credentials():
-    """Verifica que las credenciales AWS esten configuradas y el rol sea correcto."""
-    try:
-        sts = boto3.client('sts', region_name=CONFIG['region'])
-        identity = sts.get_caller_identity()
-        user_arn = identity.get('Arn', '')
-        log("[OK] Credenciales AWS validas")
-        log("     ARN: {}".format(user_arn))
-        if 'PIBADataScientist' not in user_arn:
-            log("[ADVERTENCIA] No estas usando el rol correcto")
-            log("     Se requiere: PIBADataScientist")
-            log("     Ejecutar: aws-azure-login --profile default --mode=gui")
-            log("     y SELECCIONAR el rol PIBADataScientist")
-            return False
-        return True
-    except Exception as e:
-        log("[ERROR] Error verificando credenciales: {}".format(e))
-        if 'ExpiredToken' in str(e):
-            log("     Tu sesion AWS expiro. Ejecuta:")
-            log("     aws-azure-login --profile default --mode=gui")
-        return False
-
-def ejecutar_query(query):
-    """Corre la query en Athena con manejo robusto de workgroup."""
-    session = boto3.Session(region_name=CONFIG['region'])
-    try:
-        return wr.athena.read_sql_query(
-            sql=query,
-            database=CONFIG['database'],
-            workgroup=CONFIG['workgroup'],
-            boto3_session=session,
-            ctas_approach=False,
-            unload_approach=False,
-        )
-    except Exception as e:
-        if 'workgroup' in str(e).lower():
-            log("[ADVERTENCIA] Reintentando sin workgroup...")
-            return wr.athena.read_sql_query(
-                sql=query,
-                database=CONFIG['database'],
-                boto3_session=session,
-                ctas_approach=False,
-                unload_approach=False,
-            )
-        raise
+  AND COMPREHENSION_TYPE != 'Answer to question'""".format(
+        filtro=filtro_fechas('session_creation_time', fecha_inicio, fecha_fin))
 
 # ============================================================================
 # PROCESAMIENTO
@@ -368,12 +497,12 @@ def procesar_df(df):
 
     # Eliminar mensajes basura
     log("    Filas iniciales: {:,}".format(len(df)))
-    mask_basura = df['message'].apply(es_mensaje_basura)
+    mask_basura = aplicar_por_unicos(df['message'], es_mensaje_basura).astype(bool)
     df = df[~mask_basura].copy()
     log("    Filas tras filtro de basura (test/@/clean/reset/<=2): {:,}".format(len(df)))
 
     # Limpiar texto
-    df['mensaje_ok'] = df['message'].apply(limpiar_mensaje)
+    df['mensaje_ok'] = aplicar_por_unicos(df['message'], limpiar_mensaje)
 
     # Eliminar los que quedaron vacios tras limpieza
     df = df[df['mensaje_ok'].str.strip().astype(bool)].copy()
@@ -383,27 +512,45 @@ def procesar_df(df):
     df['link'] = 'https://go.botmaker.com/#/chats/' + df['session_id'].astype(str).str[:20]
 
     # Categoria
-    df['categoria'] = df['mensaje_ok'].apply(clasificar)
+    df['categoria'] = clasificar_serie(df['mensaje_ok'])
 
     # Periodo
     df['creation_time'] = pd.to_datetime(df['creation_time'])
     df['mes'] = df['creation_time'].dt.to_period('M')
     return df
 
-def calcular_comparison(df, mes_ant_str, ultimo_mes_str):
+def agregar_conteos(df):
+    """
+    Representacion compacta del DataFrame procesado: cantidad de filas (Q)
+    por (mensaje_ok, categoria, mes). Todos los reportes salen de aca; solo
+    el CSV crudo usa las filas individuales. Los grupos quedan en el orden
+    de primera aparicion de cada mensaje (el mismo que usaba Counter).
+    """
+    return (
+        df.groupby(['mensaje_ok', 'categoria', 'mes'], sort=False, dropna=False)
+        .size()
+        .reset_index(name='Q')
+    )
+
+def contar_mensajes(conteos):
+    """Q total por mensaje_ok (en orden de primera aparicion)."""
+    return conteos.groupby('mensaje_ok', sort=False)['Q'].sum()
+
+def calcular_comparison(conteos, mes_ant_str, ultimo_mes_str):
     """Comparacion mes vs mes anterior por mensaje individual (no por categoria)."""
-    df_last = df[df['mes'].astype(str) == ultimo_mes_str]
-    df_prev = df[df['mes'].astype(str) == mes_ant_str]
+    mes_str = conteos['mes'].astype(str)
+    cnt_last = contar_mensajes(conteos[mes_str == ultimo_mes_str])
+    cnt_prev = contar_mensajes(conteos[mes_str == mes_ant_str])
+    tot_last = int(cnt_last.sum()) or 1
+    tot_prev = int(cnt_prev.sum()) or 1
 
-    cnt_last = Counter(df_last['mensaje_ok'])
-    cnt_prev = Counter(df_prev['mensaje_ok'])
-    tot_last = sum(cnt_last.values()) or 1
-    tot_prev = sum(cnt_prev.values()) or 1
+    # Filtrar igual que el notebook: solo mensajes con >=10 en ambos periodos
+    comunes = cnt_last[cnt_last >= 10].index.intersection(cnt_prev[cnt_prev >= 10].index)
 
     rows = []
-    for msg in set(cnt_last.keys()).union(cnt_prev.keys()):
-        c_last = cnt_last.get(msg, 0)
-        c_prev = cnt_prev.get(msg, 0)
+    for msg in comunes:
+        c_last = int(cnt_last[msg])
+        c_prev = int(cnt_prev[msg])
         if c_prev > 0:
             var = ((c_last - c_prev) / c_prev) * 100
             status = 'existed'
@@ -422,17 +569,17 @@ def calcular_comparison(df, mes_ant_str, ultimo_mes_str):
             'status': status,
         })
 
-    df_cmp = pd.DataFrame(rows)
-    # Filtrar igual que el notebook: solo mensajes con >=10 en ambos periodos
-    df_cmp = df_cmp[(df_cmp['count_last_30_days'] >= 10) &
-                    (df_cmp['count_before_last_30_days'] >= 10)]
-    return df_cmp
+    return pd.DataFrame(rows, columns=[
+        'message', 'count_last_30_days', 'percentage_last_30_days',
+        'count_before_last_30_days', 'percentage_before_last_30_days',
+        'variation_percentage', 'status',
+    ])
 
-def calcular_conteo_categorias(df, mes_ant_period, ultimo_mes_period):
+def calcular_conteo_categorias(conteos, mes_ant_period, ultimo_mes_period):
     """Conteo por categoria y mes. Devuelve (conteo_largo, pivot_resultado)."""
-    df_mes = df[df['mes'].isin([mes_ant_period, ultimo_mes_period])].copy()
+    df_mes = conteos[conteos['mes'].isin([mes_ant_period, ultimo_mes_period])].copy()
     df_mes['mes_str'] = df_mes['mes'].astype(str)
-    conteo = df_mes.groupby(['mes_str', 'categoria']).size().reset_index(name='Q')
+    conteo = df_mes.groupby(['mes_str', 'categoria'])['Q'].sum().reset_index(name='Q')
 
     mes_ant_str = str(mes_ant_period)
     ultimo_mes_str = str(ultimo_mes_period)
@@ -461,11 +608,17 @@ def calcular_conteo_categorias(df, mes_ant_period, ultimo_mes_period):
     resultado.columns = ['Tema Último Mes', 'Q Mensajes', 'Var %', 'Q Mes Ant.']
     return conteo, resultado
 
-def calcular_top_variaciones(df, mes_ant_period, ultimo_mes_period):
-    """Top 3 al alza / a la baja por categoria a nivel mensaje."""
-    df_mes = df[df['mes'].isin([mes_ant_period, ultimo_mes_period])]
+def calcular_top_variaciones(conteos, mes_ant_period, ultimo_mes_period,
+                             top_n=TOP_N_VARIACIONES, volumen_minimo=VOLUMEN_MINIMO_VARIACIONES):
+    """
+    Top N al alza / a la baja por categoria a nivel mensaje (solo mensajes con
+    mas de `volumen_minimo` consultas en el ultimo mes). Los tops de todas las
+    categorias salen de un sort + groupby().head() por tendencia, sin filtrar
+    el pivot categoria por categoria.
+    """
+    df_mes = conteos[conteos['mes'].isin([mes_ant_period, ultimo_mes_period])]
     conteo_msg = (
-        df_mes.groupby(['categoria', 'mensaje_ok', 'mes']).size().reset_index(name='Q')
+        df_mes.groupby(['categoria', 'mensaje_ok', 'mes'])['Q'].sum().reset_index(name='Q')
     )
     pivot_msg = conteo_msg.pivot_table(
         index=['categoria', 'mensaje_ok'],
@@ -484,20 +637,20 @@ def calcular_top_variaciones(df, mes_ant_period, ultimo_mes_period):
         (pivot_msg[ultimo_mes_period] - pivot_msg[mes_ant_period]) / pivot_msg[mes_ant_period] * 100,
         np.where(pivot_msg[ultimo_mes_period] > 0, np.inf, np.nan),
     )
-    pivot_msg = pivot_msg[pivot_msg[ultimo_mes_period] > 100]
-
-    salida = []
-    for cat in pivot_msg['categoria'].unique():
-        subset = pivot_msg[pivot_msg['categoria'] == cat].copy()
-        top_up = subset.sort_values(by='Var %', ascending=False).head(3).copy()
-        top_up['Tendencia'] = '↑ Subida'
-        top_down = subset.sort_values(by='Var %', ascending=True).head(3).copy()
-        top_down['Tendencia'] = '↓ Bajada'
-        salida.append(pd.concat([top_up, top_down]))
-
-    if not salida:
+    pivot_msg = pivot_msg[pivot_msg[ultimo_mes_period] > volumen_minimo]
+    if pivot_msg.empty:
         return pd.DataFrame()
-    df_out = pd.concat(salida)
+
+    tops = []
+    for ascendente, tendencia in ((False, '↑ Subida'), (True, '↓ Bajada')):
+        top = (
+            pivot_msg.sort_values(by='Var %', ascending=ascendente, kind='stable')
+            .groupby('categoria', sort=False)
+            .head(top_n)
+        )
+        tops.append(top.assign(Tendencia=tendencia))
+    # Por categoria: primero las subidas y despues las bajadas
+    df_out = pd.concat(tops).sort_values(by='categoria', kind='stable')
     df_out['Var %'] = df_out['Var %'].apply(
         lambda x: 'NUEVO' if x == np.inf else ("{:+.1f}%".format(x) if not pd.isna(x) else '-')
     )
@@ -567,7 +720,14 @@ def generar_excel_ranking(filepath, ranking_texto, periodo_label):
 # MAIN
 # ============================================================================
 
-def main():
+def main(contexto=None):
+    """
+    contexto: ContextoAthena compartido (run_all.py); si es None se crea uno propio.
+    Retorna True si el proceso termino OK.
+    """
+    if contexto is None:
+        contexto = ContextoAthena(CONFIG['region'], CONFIG['workgroup'], CONFIG['database'], log=log)
+
     log("=" * 60)
     log("TEMAS CONSULTADOS - METRICAS MENSUALES DE BOTI")
     log("=" * 60)
@@ -577,20 +737,24 @@ def main():
         mes, anio = leer_config_fechas()
     except Exception as e:
         log("[ERROR] {}".format(e))
-        return
+        return False
 
     mes_ant, anio_ant = calcular_mes_anterior(mes, anio)
-    fecha_inicio, fecha_fin = fechas_rango(mes, anio)
+    fecha_inicio, fecha_fin, incremental = rango_a_consultar(mes, anio)
+    mes_ant_period = pd.Period("{:04d}-{:02d}".format(anio_ant, mes_ant), freq='M')
+    ultimo_mes_period = pd.Period("{:04d}-{:02d}".format(anio, mes), freq='M')
     periodo = "{} {}".format(NOMBRES_MESES[mes], anio)
     log("Periodo (ultimo mes): {}".format(periodo))
-    log("Mes anterior:         {} {}".format(NOMBRES_MESES[mes_ant], anio_ant))
+    log("Mes anterior:         {} {}{}".format(
+        NOMBRES_MESES[mes_ant], anio_ant,
+        " (conteos de {})".format(ruta_agregado(mes_ant_period)) if incremental else ""))
     log("Rango de Athena:      {} a {}".format(fecha_inicio, fecha_fin))
 
     # 2) Verificar credenciales AWS
     log("")
     log("Verificando credenciales AWS...")
-    if not check_aws_credentials():
-        return
+    if not contexto.verificar_credenciales():
+        return False
 
     # 3) Construir query
     query = build_query(fecha_inicio, fecha_fin)
@@ -600,25 +764,25 @@ def main():
 
     # 4) Ejecutar query
     log("")
-    log("ATENCION: la query escanea boti_message_metrics_2 por 2 meses.")
+    if incremental:
+        log("ATENCION: la query escanea boti_message_metrics_2 por 1 mes")
+        log("          (el mes anterior se lee del almacen local).")
+    else:
+        log("ATENCION: la query escanea boti_message_metrics_2 por 2 meses.")
     log("          Puede tardar VARIOS MINUTOS - es normal.")
     with step("Query Athena (boti_message_metrics_2)"):
-        df = ejecutar_query(query)
+        df = ejecutar_query(contexto, query, log=log, filas_estimadas=filas_estimadas(fecha_inicio, fecha_fin))
     log("[OK] {:,} filas descargadas".format(len(df)))
 
     if len(df) == 0:
         log("[ADVERTENCIA] La query no devolvio filas. Abortando.")
-        return
+        return False
 
     # 5) Procesar
     log("")
     with step("Procesando mensajes (filtros + limpieza + categorizacion)"):
         df = procesar_df(df)
 
-    # 6) Periodos como Period
-    mes_ant_period = pd.Period("{:04d}-{:02d}".format(anio_ant, mes_ant), freq='M')
-    ultimo_mes_period = pd.Period("{:04d}-{:02d}".format(anio, mes), freq='M')
-
     # 7) Setup nombres de archivo
     mes_nombre = NOMBRES_MESES[mes]
     sufijo = "{}_{}".format(mes_nombre, anio)
@@ -635,16 +799,35 @@ def main():
 
     # 8) CSV crudo limpio
     log("")
-    with step("Guardando CSV crudo procesado"):
-        df_out = df.drop(columns=['mes'])  # mes es un Period que no serializa lindo
+    # Solo el ultimo mes, en los dos modos: en modo incremental la query trae
+    # ademas el margen de dias del mes anterior, y en modo completo el mes
+    # anterior entero
+    with step("Guardando CSV crudo procesado (ultimo mes)"):
+        df_out = df[df['mes'] == ultimo_mes_period].drop(columns=['mes'])  # mes es un Period que no serializa lindo
         df_out.to_csv(path_csv, index=False, encoding='utf-8-sig', sep=';')
     log("    [OK] {}".format(path_csv))
 
+    # Desde aca todo sale de los conteos por (mensaje_ok, categoria, mes):
+    # las filas individuales ya no se necesitan
+    with step("Agregando conteos por mensaje/categoria/mes"):
+        conteos = agregar_conteos(df)
+        del df, df_out
+
+    # Meses consultados completos -> almacen. En modo incremental el mes
+    # anterior sale del almacen (las filas del margen de dias se descartan)
+    meses_completos = [ultimo_mes_period] if incremental else [mes_ant_period, ultimo_mes_period]
+    for p in guardar_agregados(conteos, meses_completos):
+        log("    [OK] Conteos guardados: {}".format(ruta_agregado(p)))
+    if incremental:
+        conteos = pd.concat([leer_agregado(mes_ant_period), conteos[conteos['mes'] != mes_ant_period]],
+                            ignore_index=True)
+    log("    {:,} combinaciones mensaje/categoria/mes".format(len(conteos)))
+
     # 9) Top 200 mensajes mas repetidos
     with step("Top 200 mensajes mas repetidos"):
-        message_counts = Counter(df['mensaje_ok'])
-        top_200 = pd.DataFrame(message_counts.most_common(10000),
-                               columns=['message_ok', 'count'])
+        message_counts = contar_mensajes(conteos).sort_values(ascending=False, kind='stable')
+        top_200 = pd.DataFrame({'message_ok': message_counts.index[:10000],
+                                'count': message_counts.values[:10000]})
         top_200.to_csv(path_top200, index=False, encoding='utf-8-sig', sep=';')
     log("    [OK] {}".format(path_top200))
 
@@ -652,13 +835,13 @@ def main():
     mes_ant_str = str(mes_ant_period)
     ultimo_mes_str = str(ultimo_mes_period)
     with step("Comparison mensajes mes vs mes anterior"):
-        df_cmp = calcular_comparison(df, mes_ant_str, ultimo_mes_str)
-        df_cmp.to_excel(path_cmp, index=False)
+        df_cmp = calcular_comparison(conteos, mes_ant_str, ultimo_mes_str)
+        escribir_dataframes(path_cmp, {'Sheet1': df_cmp})
     log("    [OK] {} ({:,} mensajes)".format(path_cmp, len(df_cmp)))
 
     # 11) Conteo y comparativo por categoria
     with step("Conteo por categoria + comparativo"):
-        conteo, resultado = calcular_conteo_categorias(df, mes_ant_period, ultimo_mes_period)
+        conteo, resultado = calcular_conteo_categorias(conteos, mes_ant_period, ultimo_mes_period)
     log("    Conteo por mes/categoria:")
     for _, row in conteo.sort_values(['mes_str', 'categoria']).iterrows():
         log("        {} | {:40s} | {:>10,}".format(row['mes_str'], row['categoria'], int(row['Q'])))
@@ -666,23 +849,24 @@ def main():
     # 12) reporte_mensajes.xlsx (Comparativo + Top100 Otros)
     with step("Excel reporte (Comparativo + Top100_Otros)"):
         otros_top100 = (
-            df[df['categoria'] == 'Otros']
-            .groupby('mensaje_ok').size()
+            conteos[conteos['categoria'] == 'Otros']
+            .groupby('mensaje_ok')['Q'].sum()
             .reset_index(name='Cantidad')
             .sort_values(by='Cantidad', ascending=False)
             .head(100)
         )
-        with pd.ExcelWriter(path_reporte) as writer:
-            resultado.to_excel(writer, sheet_name='Comparativo', index=True)
-            otros_top100.to_excel(writer, sheet_name='Top100_Otros', index=False)
+        # El ranking (indice 1..N) va como primera columna, sin titulo
+        escribir_dataframes(path_reporte, {
+            'Comparativo': resultado.reset_index().rename(columns={'index': ''}),
+            'Top100_Otros': otros_top100
+        })
     log("    [OK] {}".format(path_reporte))
 
     # 13) Top variaciones
-    with step("Top 3 variaciones (subida/bajada) por categoria"):
-        df_topvar = calcular_top_variaciones(df, mes_ant_period, ultimo_mes_period)
+    with step("Top {} variaciones (subida/bajada) por categoria".format(TOP_N_VARIACIONES)):
+        df_topvar = calcular_top_variaciones(conteos, mes_ant_period, ultimo_mes_period)
         if len(df_topvar) > 0:
-            with pd.ExcelWriter(path_topvar) as writer:
-                df_topvar.to_excel(writer, sheet_name='TopVariaciones', index=False)
+            escribir_dataframes(path_topvar, {'TopVariaciones': df_topvar})
     log("    [OK] {}".format(path_topvar))
 
     # 14) Ranking texto y Excel para el tablero
@@ -720,6 +904,25 @@ def main():
     log("=" * 60)
     log("PROCESO COMPLETADO EXITOSAMENTE")
     log("=" * 60)
+    return True
+
+def consultas():
+    """
+    Queries que ejecuta el modulo para el periodo de config_fechas.txt.
+    run_all.py las envia a Athena por adelantado, antes de llamar a run().
+    """
+    mes, anio = leer_config_fechas()
+    fecha_inicio, fecha_fin, _ = rango_a_consultar(mes, anio)
+    query = build_query(fecha_inicio, fecha_fin)
+    return [(query, elegir_transporte(query, filas_estimadas(fecha_inicio, fecha_fin)))]
+
+def run(contexto):
+    """
+    Punto de entrada en modo libreria: run_all.py importa el modulo y lo
+    ejecuta en su mismo proceso, con un ContextoAthena compartido.
+    Retorna True si el proceso termino OK.
+    """
+    return main(contexto)
 
 # ============================================================================
 # EJECUCION
@@ -743,11 +946,13 @@ if __name__ == "__main__":
     print("")
     print("  Rol requerido: PIBADataScientist")
     print("=" * 60)
-    try:
-        input("  Presioná ENTER para continuar (o Ctrl+C para cancelar)...")
-    except KeyboardInterrupt:
-        print("\n  Cancelado por el usuario.")
-        raise SystemExit(0)
+    # Bajo run_all.py no hay terminal interactiva (run_all ya verificó AWS)
+    if not os.environ.get('BOTI_RUN_ALL'):
+        try:
+            input("  Presioná ENTER para continuar (o Ctrl+C para cancelar)...")
+        except KeyboardInterrupt:
+            print("\n  Cancelado por el usuario.")
+            raise SystemExit(0)
     print("")
 
     main()
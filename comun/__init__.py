@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+'''
+Codigo compartido por los modulos de Metricas_Boti_Mensual.
+
+Cada modulo sigue siendo un script standalone dentro de su carpeta; para
+importar este paquete agregan la raiz del repo al sys.path:
+
+    sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+    from comun.contexto import ContextoAthena
+
+Contenido:
+- contexto.py: ContextoAthena (credenciales, session boto3 y config de
+  awswrangler compartidas entre modulos cuando run_all.py los ejecuta en
+  un solo proceso)
+- athena.py:   ejecucion de queries Athena con el contexto compartido
+- reporte_excel.py: escritura de reportes Excel (openpyxl write-only,
+  estilos con nombre, tablas por columnas)
+- lectura_excel.py: lectura de celdas de los Excel de los modulos
+  (read_only, una pasada por hoja, cache por ruta + fecha de modificacion)
+- tablero.py:  estructura del tablero de 17 filas, almacen de metricas
+  (SQLite) con las celdas de cada modulo y armado del Excel consolidado
+- por_mes.py:  queries agrupadas por mes para el backfill de varios
+  periodos (run_all.py --periodos / --desde --hasta)
+- diario.py:   almacen diario (SQLite) de conteos y HyperLogLog para
+  responder rangos personalizados sin volver a escanear los dias ya vistos
+'''
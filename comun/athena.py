@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+'''
+Ejecucion de queries Athena con el contexto compartido (ContextoAthena).
+
+Reemplaza el bloque wr.athena.read_sql_query + "reintentar sin workgroup"
+que cada modulo tenia copiado.
+
+Transporte del resultado (elegir_transporte):
+- 'csv': Athena escribe un CSV que se parsea en Python. Rapido de arrancar,
+  ideal para resultados de pocas filas.
+- 'unload': UNLOAD a Parquet + lectura con pyarrow. Para las queries que
+  traen cientos de miles / millones de filas es mucho mas rapido que
+  parsear el CSV y conserva los tipos.
+- 'ctas': CREATE TABLE AS temporal (awswrangler). Necesita permisos para
+  crear tablas en la base, por eso nunca se elige automaticamente.
+
+El criterio es la cantidad de filas esperada: quien arma la query y conoce
+la forma del resultado pasa filas_estimadas (ej: el almacen diario, 16.384
+filas por dia por HyperLogLog) o directamente el transporte. Sin eso se
+adivina por el texto de la query (agregada -> CSV, detalle -> UNLOAD),
+que falla en los dos sentidos: un GROUP BY puede devolver cientos de miles
+de filas y un SELECT sin agregar, pocas miles.
+
+La variable de entorno BOTI_TRANSPORTE_ATHENA=csv|unload|ctas fuerza el
+transporte de todas las queries. Si 'unload'/'ctas' fallan se reintenta
+con CSV.
+'''
+import os
+import re
+
+import awswrangler as wr
+
+from comun import cache_consultas
+from comun.gestor_consultas import ErrorConsulta
+
+TRANSPORTES = ('csv', 'unload', 'ctas')
+
+ENV_TRANSPORTE = 'BOTI_TRANSPORTE_ATHENA'
+
+# Desde cuantas filas esperadas conviene UNLOAD a Parquet: por debajo el
+# CSV tarda menos (UNLOAD suma listar y leer los Parquet de S3)
+FILAS_UNLOAD = 50000
+
+# Sin estimacion: una query que agrega (GROUP BY, count/sum...) se supone de pocas filas
+_PATRON_AGREGADA = re.compile(r'\bgroup\s+by\b|\b(count|sum|avg|approx_distinct)\s*\(', re.IGNORECASE)
+
+
+def elegir_transporte(query, filas_estimadas=None):
+    '''
+    Transporte del resultado para la query: el de BOTI_TRANSPORTE_ATHENA si
+    esta definido; si no, 'unload' desde FILAS_UNLOAD filas estimadas y
+    'csv' por debajo. Sin filas_estimadas: 'csv' para queries agregadas y
+    'unload' para las que traen filas de detalle.
+    '''
+    forzado = os.environ.get(ENV_TRANSPORTE, '').strip().lower()
+    if forzado in TRANSPORTES:
+        return forzado
+    if filas_estimadas is not None:
+        return 'unload' if filas_estimadas >= FILAS_UNLOAD else 'csv'
+    return 'csv' if _PATRON_AGREGADA.search(query) else 'unload'
+
+
+def ejecutar_query(contexto, query, log=None, transporte=None, filas_estimadas=None):
+    '''
+    Ejecuta la query en Athena con la session y el workgroup del contexto.
+    Si el workgroup da error, reintenta sin workgroup (mismo comportamiento
+    que tenian los modulos). Si el contexto tiene un GestorConsultas, la
+    query se toma del envio anticipado. Retorna un DataFrame.
+
+    Los resultados pasan por la cache local (comun.cache_consultas): una
+    query ya ejecutada y vigente no se vuelve a mandar a Athena.
+
+    transporte: 'csv', 'unload' o 'ctas'; None = elegir_transporte(query,
+    filas_estimadas).
+    '''
+    log = log or contexto.log
+    transporte = transporte or elegir_transporte(query, filas_estimadas)
+
+    df = cache_consultas.leer_dataframe(query, contexto.database, contexto.workgroup)
+    if df is not None:
+        log("[CACHE] Resultado tomado de la cache local ({:,} filas) - no se consulta Athena".format(len(df)))
+        return df
+
+    df = _consultar_athena(contexto, query, log, transporte)
+    cache_consultas.guardar_dataframe(query, contexto.database, contexto.workgroup, df)
+    return df
+
+
+def _consultar_athena(contexto, query, log, transporte):
+    contexto.configurar_wrangler()
+    if contexto.gestor is not None and transporte != 'ctas':
+        # Query ya enviada por run_all.py (o se envia ahora): solo esperarla
+        try:
+            return contexto.gestor.resultado(query, log=log, transporte=transporte)
+        except ErrorConsulta:
+            raise   # La query fallo en Athena: ejecutarla de nuevo no cambia nada
+        except Exception as e:
+            # Error de la API durante el envio o la espera: se ejecuta sola, sin el gestor
+            log("[ADVERTENCIA] Envio anticipado fallo ({}); se ejecuta la query directamente".format(str(e)))
+    try:
+        return _read_sql_query(contexto, query, log, transporte)
+    except Exception as e:
+        if transporte == 'csv':
+            raise
+        log("[ADVERTENCIA] Transporte {} no disponible ({}); se usa CSV".format(transporte.upper(), str(e)))
+        return _read_sql_query(contexto, query, log, 'csv')
+
+
+def _read_sql_query(contexto, query, log, transporte):
+    opciones = dict(
+        sql=query,
+        database=contexto.database,
+        boto3_session=contexto.session,
+        ctas_approach=(transporte == 'ctas'),
+        unload_approach=(transporte == 'unload')
+    )
+    try:
+        return wr.athena.read_sql_query(workgroup=contexto.workgroup, **opciones)
+    except Exception as e:
+        if 'workgroup' in str(e).lower():
+            log("[ADVERTENCIA] Intentando sin workgroup...")
+            return wr.athena.read_sql_query(**opciones)
+        raise
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+'''
+Cache local de resultados de Athena (cache_athena/ en la raiz del repo).
+
+Si un modulo falla a mitad de camino (al escribir el Excel, al procesar) y
+se vuelve a correr, la misma query no se vuelve a ejecutar en Athena: el
+resultado se lee del disco.
+
+- Clave: hash de la SQL normalizada (espacios colapsados) + database +
+  workgroup. Misma query = misma entrada, la arme quien la arme.
+- Formato: DataFrames como Parquet; los resultados grandes de No_Entendidos
+  se guardan tal cual como archivo (el Parquet tipado que arma
+  athena_connector, o el CSV si no se pudo convertir).
+- Vigencia: las queries de periodos CERRADOS (la fecha mas alta de la SQL
+  quedo DIAS_CIERRE dias atras) son inmutables y no vencen; el resto vence
+  a las TTL_HORAS.
+- Tamaño: si la carpeta supera CACHE_MAX_GB se borran las entradas usadas
+  hace mas tiempo (LRU).
+
+Para ignorar la cache: variable de entorno BOTI_SIN_CACHE=1
+(run_all.py --sin-cache). Para vaciarla alcanza con borrar la carpeta.
+'''
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+CARPETA_CACHE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache_athena')
+
+# Horas de validez de un resultado de un periodo todavia abierto
+TTL_HORAS = 12
+
+# Dias despues de la ultima fecha de la query para considerar el periodo cerrado
+# (margen para datos que llegan tarde a las tablas)
+DIAS_CIERRE = 3
+
+# Tamaño maximo de la carpeta de cache (GB). Los resultados de No_Entendidos son grandes.
+CACHE_MAX_GB = float(os.environ.get('BOTI_CACHE_MAX_GB', 30))
+
+ENV_SIN_CACHE = 'BOTI_SIN_CACHE'
+
+_PATRON_FECHA = re.compile(r"'(\d{4}-\d{2}-\d{2})(?: \d{2}:\d{2}:\d{2})?'")
+
+_lock = threading.Lock()
+
+
+def habilitada():
+    '''False si se pidio ignorar la cache (BOTI_SIN_CACHE=1)'''
+    return not os.environ.get(ENV_SIN_CACHE)
+
+
+def normalizar_sql(sql):
+    '''SQL sin diferencias de espacios/saltos de linea ni ; final'''
+    return ' '.join(sql.split()).rstrip(';').strip()
+
+
+def clave_consulta(sql, database, workgroup):
+    '''Clave de la cache para una query (sha256 de SQL normalizada + db + workgroup)'''
+    texto = '\n'.join([normalizar_sql(sql), database or '', workgroup or ''])
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def periodo_cerrado(sql, hoy=None):
+    '''
+    True si la fecha mas alta que aparece en la SQL ('YYYY-MM-DD' o
+    'YYYY-MM-DD HH:MM:SS') quedo al menos DIAS_CIERRE dias atras.
+    Una query sin fechas nunca se considera cerrada.
+    '''
+    fechas = _PATRON_FECHA.findall(sql)
+    if not fechas:
+        return False
+    hoy = hoy or datetime.now()
+    ultima = datetime.strptime(max(fechas), '%Y-%m-%d')
+    return ultima + timedelta(days=DIAS_CIERRE) <= hoy
+
+
+def _rutas(clave, extension):
+    base = os.path.join(CARPETA_CACHE, clave)
+    return base + extension, base + '.json'
+
+
+def _entrada_vigente(clave, extension):
+    '''Ruta del archivo cacheado si existe y no vencio (y lo marca como usado)'''
+    ruta, ruta_meta = _rutas(clave, extension)
+    if not (os.path.exists(ruta) and os.path.exists(ruta_meta)):
+        return None
+    try:
+        with open(ruta_meta, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not meta.get('inmutable') and time.time() - meta.get('creado', 0) > TTL_HORAS * 3600:
+        return None
+    # LRU: la fecha de modificacion del archivo es la de ultimo uso
+    os.utime(ruta, None)
+    return ruta
+
+
+def _registrar(clave, extension, sql, filas=None):
+    '''Escribe la metadata de una entrada recien guardada y aplica el limite de tamaño'''
+    _, ruta_meta = _rutas(clave, extension)
+    meta = {
+        'creado': time.time(),
+        'inmutable': periodo_cerrado(sql),
+        'filas': filas,
+        'sql': normalizar_sql(sql)[:500]
+    }
+    with open(ruta_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    _liberar_espacio()
+
+
+def _liberar_espacio():
+    '''Borra las entradas usadas hace mas tiempo hasta quedar bajo CACHE_MAX_GB'''
+    with _lock:
+        entradas = []
+        for nombre in os.listdir(CARPETA_CACHE):
+            if nombre.endswith('.json') or nombre.endswith('.tmp'):
+                continue
+            ruta = os.path.join(CARPETA_CACHE, nombre)
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                continue
+            entradas.append((st.st_mtime, st.st_size, ruta))
+
+        total = sum(tamanio for _, tamanio, _ in entradas)
+        limite = CACHE_MAX_GB * 1024 ** 3
+        for _, tamanio, ruta in sorted(entradas):
+            if total <= limite:
+                break
+            for archivo in (ruta, os.path.splitext(ruta)[0] + '.json'):
+                try:
+                    os.remove(archivo)
+                except OSError:
+                    pass
+            total -= tamanio
+
+
+def esta_en_cache(sql, database, workgroup, extension='.parquet'):
+    '''True si hay un resultado vigente para la query'''
+    if not habilitada():
+        return False
+    return _entrada_vigente(clave_consulta(sql, database, workgroup), extension) is not None
+
+
+def leer_dataframe(sql, database, workgroup):
+    '''DataFrame cacheado de la query, o None si no hay uno vigente'''
+    if not habilitada():
+        return None
+    ruta = _entrada_vigente(clave_consulta(sql, database, workgroup), '.parquet')
+    if ruta is None:
+        return None
+    try:
+        return pd.read_parquet(ruta)
+    except Exception:
+        return None
+
+
+def guardar_dataframe(sql, database, workgroup, df):
+    '''Guarda el resultado de la query. Retorna True si se pudo cachear.'''
+    if not habilitada():
+        return False
+    os.makedirs(CARPETA_CACHE, exist_ok=True)
+    clave = clave_consulta(sql, database, workgroup)
+    ruta, _ = _rutas(clave, '.parquet')
+    temporal = ruta + '.{}.tmp'.format(threading.get_ident())
+    try:
+        df.to_parquet(temporal, index=False)
+        os.replace(temporal, ruta)
+    except Exception:
+        # Tipos que Parquet no soporta: simplemente no se cachea
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return False
+    _registrar(clave, '.parquet', sql, filas=len(df))
+    return True
+
+
+def leer_archivo(sql, database, workgroup, destino, extension='.csv'):
+    '''
+    Copia a `destino` el archivo cacheado de la query (ej: CSV descargado de
+    S3). Retorna True si habia uno vigente. Usa hard link cuando se puede
+    para no duplicar archivos de varios GB.
+    '''
+    if not habilitada():
+        return False
+    ruta = _entrada_vigente(clave_consulta(sql, database, workgroup), extension)
+    if ruta is None:
+        return False
+    _enlazar_o_copiar(ruta, destino)
+    return True
+
+
+def guardar_archivo(sql, database, workgroup, origen, extension='.csv'):
+    '''Guarda en la cache el archivo resultado de la query (ej: CSV descargado)'''
+    if not habilitada():
+        return False
+    os.makedirs(CARPETA_CACHE, exist_ok=True)
+    clave = clave_consulta(sql, database, workgroup)
+    ruta, _ = _rutas(clave, extension)
+    _enlazar_o_copiar(origen, ruta)
+    _registrar(clave, extension, sql)
+    return True
+
+
+def _enlazar_o_copiar(origen, destino):
+    if os.path.abspath(origen) == os.path.abspath(destino):
+        return
+    if os.path.exists(destino):
+        os.remove(destino)
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copy2(origen, destino)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+'''
+Contexto de ejecucion compartido para los modulos que consultan Athena.
+
+Cuando run_all.py ejecuta los modulos en un solo proceso (modo libreria),
+crea UN ContextoAthena y se lo pasa a cada modulo via run(contexto):
+- Las credenciales se verifican UNA vez (una sola llamada STS por corrida)
+- Las credenciales se resuelven UNA vez y todas las sessions boto3 salen de ahi
+- awswrangler se configura UNA vez (reintentos, pool de conexiones)
+
+Cuando un modulo se ejecuta standalone (python Modulo.py) crea su propio
+contexto, con el mismo comportamiento que antes.
+'''
+import threading
+
+import boto3
+
+ROL_REQUERIDO = 'PIBADataScientist'
+
+
+class ContextoAthena:
+    '''
+    Credenciales, session boto3 y configuracion de awswrangler compartidas.
+
+    boto3 recomienda una Session por thread (las Session no son thread-safe),
+    asi que `session` devuelve una Session por thread, todas construidas con
+    las MISMAS credenciales resueltas una sola vez en verificar_credenciales().
+    '''
+
+    def __init__(self, region, workgroup, database, log=print):
+        self.region = region
+        self.workgroup = workgroup
+        self.database = database
+        self.log = log
+        self._credenciales = None
+        self._credenciales_ok = None
+        self._wrangler_configurado = False
+        self._lock = threading.Lock()
+        self._locales = threading.local()
+        # Sube con cada renovar_credenciales(): las sessions de los threads se rearman
+        self._generacion = 0
+        # GestorConsultas (comun.gestor_consultas) cuando run_all.py envia las
+        # queries por adelantado; None = cada query se ejecuta y se espera sola
+        self.gestor = None
+
+    def verificar_credenciales(self):
+        '''
+        Verifica que las credenciales AWS esten configuradas y que el rol sea
+        PIBADataScientist. Hace la llamada STS solo la primera vez; las
+        siguientes devuelven el resultado cacheado.
+        '''
+        with self._lock:
+            if self._credenciales_ok is not None:
+                return self._credenciales_ok
+            self._credenciales_ok = self._verificar_sts()
+            return self._credenciales_ok
+
+    def _verificar_sts(self):
+        log = self.log
+        try:
+            session = boto3.Session(region_name=self.region)
+            identity = session.client('sts').get_caller_identity()
+            user_arn = identity.get('Arn', '')
+
+            log("[OK] Credenciales AWS validas")
+            log("    ARN: {}".format(user_arn))
+
+            # Verificar que sea el rol correcto
+            if ROL_REQUERIDO not in user_arn:
+                log("")
+                log("[ADVERTENCIA] No estas usando el rol correcto")
+                log("    Se requiere: {}".format(ROL_REQUERIDO))
+                if '/' in user_arn:
+                    current_role = user_arn.split('/')[-2]
+                else:
+                    current_role = 'desconocido'
+                log("    Tu rol actual: {}".format(current_role))
+                log("")
+                log("SOLUCION:")
+                log("    1. Ejecuta: aws-azure-login --profile default --mode=gui")
+                log("    2. Cuando te autentiques, SELECCIONA el rol: {}".format(ROL_REQUERIDO))
+                log("    3. Vuelve a ejecutar este script")
+                log("")
+                return False
+
+            self._credenciales = session.get_credentials().get_frozen_credentials()
+            return True
+
+        except Exception as e:
+            log("[ERROR] Error verificando credenciales: {}".format(str(e)))
+            if 'ExpiredToken' in str(e):
+                log("")
+                log("SOLUCION:")
+                log("    Tu sesión AWS expiró. Ejecuta:")
+                log("    aws-azure-login --profile default --mode=gui")
+                log("")
+            else:
+                log("")
+                log("SOLUCION:")
+                log("    1. Ejecuta: aws-azure-login --configure --profile default")
+                log("    2. Luego: aws-azure-login --profile default --mode=gui")
+                log("")
+            return False
+
+    @property
+    def session(self):
+        '''boto3.Session del thread actual (todas con las mismas credenciales)'''
+        session = getattr(self._locales, 'session', None)
+        if session is None or getattr(self._locales, 'generacion', None) != self._generacion:
+            if self._credenciales is not None:
+                session = boto3.Session(
+                    aws_access_key_id=self._credenciales.access_key,
+                    aws_secret_access_key=self._credenciales.secret_key,
+                    aws_session_token=self._credenciales.token,
+                    region_name=self.region
+                )
+            else:
+                # Sin verificar_credenciales() previo: cadena de credenciales normal
+                session = boto3.Session(region_name=self.region)
+            self._locales.session = session
+            self._locales.generacion = self._generacion
+        return session
+
+    def renovar_credenciales(self):
+        '''
+        Vuelve a leer las credenciales de la cadena normal de boto3 (ej:
+        despues de un aws-azure-login por token expirado). Las sessions de
+        todos los threads se rearman con las credenciales nuevas en su
+        proximo uso. Retorna True si se pudieron leer credenciales.
+        '''
+        with self._lock:
+            try:
+                credenciales = boto3.Session(region_name=self.region).get_credentials()
+            except Exception as e:
+                self.log("[ERROR] No se pudieron renovar las credenciales: {}".format(str(e)))
+                return False
+            if credenciales is None:
+                return False
+            self._credenciales = credenciales.get_frozen_credentials()
+            self._generacion += 1
+            return True
+
+    def configurar_wrangler(self):
+        '''
+        Configura awswrangler una sola vez por proceso (reintentos y pool de
+        conexiones de botocore). Workgroup y database se pasan explicitos en
+        cada query (ver comun.athena.ejecutar_query) para poder reintentar
+        sin workgroup.
+        '''
+        with self._lock:
+            if self._wrangler_configurado:
+                return
+            import awswrangler as wr
+            from botocore.config import Config
+
+            # Reintentos adaptativos: con varios modulos en paralelo Athena
+            # puede devolver ThrottlingException / TooManyRequestsException
+            wr.config.botocore_config = Config(
+                retries={'max_attempts': 10, 'mode': 'adaptive'},
+                max_pool_connections=50
+            )
+            self._wrangler_configurado = True
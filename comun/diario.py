@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+'''
+Almacen diario de metricas (tablero/diario.sqlite) para los periodos de
+rango personalizado (FECHA_INICIO / FECHA_FIN en config_fechas.txt).
+
+Un reporte semanal o de quincena volvia a escanear en Athena todo el rango
+aunque esos dias ya se hubieran consultado. Aca cada fuente (grupo de
+metricas que sale de una misma query) se guarda por DIA:
+
+- Metricas sumables (sesiones por dia de creacion, por starting_cause o por
+  regla CXF): un conteo por dia; el total del rango es la suma.
+- Metricas de distintos que no se pueden sumar (usuarios, mensajes push,
+  sesiones con Template): un HyperLogLog por dia (2^PRECISION registros de
+  un byte). Los registros se calculan en Athena (xxhash64 del valor: los
+  bits bajos eligen el registro y del resto se toma el minimo, que es el de
+  mas ceros a la izquierda) y se combinan aca con el maximo por registro.
+  El resultado es una estimacion (error tipico ~0.8%).
+
+Solo se consultan en Athena los dias que faltan (una query por fuente para
+el tramo que los cubre). Los dias de los ultimos DIAS_CIERRE dias se
+vuelven a pedir en la corrida siguiente, como en la cache de queries.
+
+El modo MES COMPLETO no pasa por aca: sigue con la query exacta del mes.
+Para no usar el almacen: BOTI_SIN_DIARIO=1 (run_all.py --sin-diario).
+
+Uso (en el modulo, modo rango):
+
+    df = diario.resultado(contexto, 'usuarios_conversaciones', fecha_inicio, fecha_fin)
+'''
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from comun.athena import ejecutar_query, elegir_transporte
+from comun.cache_consultas import DIAS_CIERRE
+from comun.particiones import filtro_fechas, filtro_particiones_ampliado
+from comun.tablero import CARPETA_TABLERO, ESPERA_BLOQUEO
+
+ALMACEN = os.path.join(CARPETA_TABLERO, 'diario.sqlite')
+
+ENV_SIN_DIARIO = 'BOTI_SIN_DIARIO'
+
+# Bits del hash que eligen el registro del HyperLogLog (2^14 = 16384 registros)
+PRECISION = 14
+REGISTROS = 1 << PRECISION
+# Bits del hash que quedan para contar ceros (63: el bit de signo se descarta)
+BITS_RESTO = 63 - PRECISION
+
+_ESQUEMA = '''
+CREATE TABLE IF NOT EXISTS conteos (
+    fuente   TEXT NOT NULL,
+    metrica  TEXT NOT NULL,
+    dia      TEXT NOT NULL,     -- 'YYYY-MM-DD'
+    clave    TEXT NOT NULL,     -- desglose (starting_cause, regla); '' = sin desglose / NULL
+    valor    INTEGER NOT NULL,
+    PRIMARY KEY (fuente, metrica, dia, clave)
+);
+CREATE TABLE IF NOT EXISTS bosquejos (
+    fuente    TEXT NOT NULL,
+    metrica   TEXT NOT NULL,
+    dia       TEXT NOT NULL,
+    registros BLOB NOT NULL,    -- REGISTROS bytes del HyperLogLog del dia
+    PRIMARY KEY (fuente, metrica, dia)
+);
+CREATE TABLE IF NOT EXISTS dias (
+    fuente      TEXT NOT NULL,
+    dia         TEXT NOT NULL,
+    cerrado     INTEGER NOT NULL,  -- 0: dia reciente, se vuelve a consultar
+    actualizado TEXT NOT NULL,
+    PRIMARY KEY (fuente, dia)
+)
+'''
+
+
+# ==================== QUERIES POR FUENTE ====================
+# Todas devuelven (dia, metrica, clave, valor). Para los bosquejos clave es
+# el numero de registro y valor el minimo de los bits restantes del hash.
+
+def _sql_bosquejo(expresion):
+    '''(registro, resto) del HyperLogLog para el hash de `expresion`'''
+    hash_ = 'from_big_endian_64(xxhash64(to_utf8(CAST({} AS varchar))))'.format(expresion)
+    return ('CAST(bitwise_and({h}, {m}) AS varchar)'.format(h=hash_, m=REGISTROS - 1),
+            'bitwise_and({h}, 9223372036854775807) / {r}'.format(h=hash_, r=REGISTROS))
+
+
+def _sql_sesiones(fecha_inicio, fecha_fin):
+    '''boti_session_metrics_2: conversaciones y sesiones por starting_cause (sumables), usuarios (bosquejo)'''
+    registro, resto = _sql_bosquejo('SUBSTR(session_id, 1, 20)')
+    return """WITH base AS (
+SELECT CAST(CAST(session_creation_time AS DATE) AS varchar) AS dia,
+       session_id,
+       starting_cause
+FROM "caba-piba-consume-zone-db"."boti_session_metrics_2"
+WHERE {filtro}
+)
+SELECT dia, 'conversaciones' AS metrica, '' AS clave, count(distinct session_id) AS valor
+FROM base GROUP BY 1
+UNION ALL
+SELECT dia, 'sesiones_abiertas', coalesce(starting_cause, ''), count(distinct session_id)
+FROM base GROUP BY 1, 3
+UNION ALL
+SELECT dia, 'usuarios', {registro}, min({resto})
+FROM base GROUP BY 1, 3""".format(
+        filtro=filtro_fechas('session_creation_time', fecha_inicio, fecha_fin),
+        registro=registro, resto=resto
+    )
+
+
+def _sql_pushes(fecha_inicio, fecha_fin):
+    '''boti_event_metrics_2 x boti_message_metrics_2: mensajes push (bosquejo por dia del evento)'''
+    registro, resto = _sql_bosquejo('m.id')
+    return """SELECT CAST(CAST(ev.creation_time AS DATE) AS varchar) AS dia,
+       'mensajes' AS metrica,
+       {registro} AS clave,
+       min({resto}) AS valor
+FROM "caba-piba-consume-zone-db"."boti_event_metrics_2" ev
+JOIN "caba-piba-consume-zone-db"."boti_message_metrics_2" m
+ON ev.session_id=m.session_id
+WHERE {filtro_ev}
+AND regexp_like(m.message, '^Template')
+and events_name in ('notification-status-sent')
+GROUP BY 1, 3""".format(
+        filtro_ev=filtro_fechas('ev.creation_time', fecha_inicio, fecha_fin, alias='ev'),
+        registro=registro, resto=resto
+    )
+
+
+def _sql_paquete(fecha_inicio, fecha_fin):
+    '''
+    boti_message_metrics_2 (los filtros de la query paquete): sesiones por
+    regla CXF por dia de la sesion (sumables) y sesiones con Template por
+    dia del mensaje (bosquejo: una sesion puede tener Templates varios dias)
+    '''
+    registro, resto = _sql_bosquejo('session_id')
+    return """WITH base AS (
+SELECT session_id,
+       rule_name,
+       CAST(CAST(session_creation_time AS DATE) AS varchar) AS dia_sesion,
+       CAST(CAST(creation_time AS DATE) AS varchar) AS dia_mensaje,
+       (rule_name like ('%CXF%')
+          AND CAST(session_creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}') AS es_cxf,
+       (regexp_like(message, '^Template')
+          AND CAST(creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}') AS es_template
+FROM "caba-piba-consume-zone-db"."boti_message_metrics_2"
+WHERE {particiones}
+  AND ((CAST(session_creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}'
+        AND rule_name like ('%CXF%'))
+    OR (CAST(creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}'
+        AND regexp_like(message, '^Template')))
+)
+SELECT dia_sesion AS dia, 'cxf' AS metrica, rule_name AS clave, count(distinct session_id) AS valor
+FROM base WHERE es_cxf GROUP BY 1, 3
+UNION ALL
+SELECT dia_mensaje, 'template', {registro}, min({resto})
+FROM base WHERE es_template GROUP BY 1, 3""".format(
+        fi=fecha_inicio, ff=fecha_fin,
+        particiones=filtro_particiones_ampliado(fecha_inicio, fecha_fin),
+        registro=registro, resto=resto
+    )
+
+
+# fuente -> query del tramo y metricas que se guardan como HyperLogLog
+FUENTES = {
+    'sesiones': {'sql': _sql_sesiones, 'bosquejos': ('usuarios',)},
+    'pushes': {'sql': _sql_pushes, 'bosquejos': ('mensajes',)},
+    'paquete': {'sql': _sql_paquete, 'bosquejos': ('template',)},
+}
+
+_locks = {fuente: threading.Lock() for fuente in FUENTES}
+
+
+# ==================== HYPERLOGLOG ====================
+
+def registros_dia(claves, restos):
+    '''Registros del HyperLogLog de un dia a partir de las filas (registro, resto) de Athena'''
+    registros = np.zeros(REGISTROS, dtype=np.uint8)
+    restos = np.asarray(restos, dtype=np.int64)
+    # Ceros a la izquierda + 1 dentro de los BITS_RESTO bits (frexp da el largo en bits)
+    largo = np.frexp(restos.astype(np.float64))[1]
+    registros[np.asarray(claves, dtype=np.int64)] = BITS_RESTO - largo + 1
+    return registros
+
+
+def estimar(registros):
+    '''Cantidad de distintos estimada a partir de los registros (HyperLogLog)'''
+    m = float(REGISTROS)
+    alfa = 0.7213 / (1 + 1.079 / m)
+    estimado = alfa * m * m / np.sum(np.ldexp(1.0, -registros.astype(np.int64)))
+    vacios = int(np.count_nonzero(registros == 0))
+    if estimado <= 2.5 * m and vacios > 0:
+        # Cardinalidades chicas: conteo lineal
+        estimado = m * np.log(m / vacios)
+    return int(round(estimado))
+
+
+# ==================== ALMACEN ====================
+
+def habilitado():
+    '''False si se pidio no usar el almacen diario (BOTI_SIN_DIARIO=1)'''
+    return not os.environ.get(ENV_SIN_DIARIO)
+
+
+def _conectar():
+    os.makedirs(CARPETA_TABLERO, exist_ok=True)
+    conexion = sqlite3.connect(ALMACEN, timeout=ESPERA_BLOQUEO)
+    conexion.executescript(_ESQUEMA)
+    return conexion
+
+
+def _dias(fecha_inicio, fecha_fin):
+    inicio = datetime.strptime(str(fecha_inicio)[:10], '%Y-%m-%d')
+    fin = datetime.strptime(str(fecha_fin)[:10], '%Y-%m-%d')
+    return [(inicio + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((fin - inicio).days + 1)]
+
+
+def dias_faltantes(fuente, fecha_inicio, fecha_fin):
+    '''Dias del rango que la fuente no tiene cerrados en el almacen'''
+    dias = _dias(fecha_inicio, fecha_fin)
+    if not os.path.exists(ALMACEN):
+        return dias
+    with closing(_conectar()) as conexion:
+        cerrados = {d for (d,) in conexion.execute(
+            'SELECT dia FROM dias WHERE fuente = ? AND cerrado = 1 AND dia BETWEEN ? AND ?',
+            (fuente, dias[0], dias[-1])
+        )}
+    return [d for d in dias if d not in cerrados]
+
+
+def filas_estimadas(fuente, desde, hasta):
+    '''
+    Filas (como maximo) del resultado de la query del tramo: REGISTROS por
+    dia por cada bosquejo; los conteos son pocas filas por dia.
+    '''
+    return len(_dias(desde, hasta)) * REGISTROS * len(FUENTES[fuente]['bosquejos'])
+
+
+def _consulta_tramo(fuente, fecha_inicio, fecha_fin):
+    '''
+    (desde, hasta, query, transporte) del tramo a consultar en Athena, o
+    None si no falta nada. El transporte sale de filas_estimadas(): desde
+    pocos dias los bosquejos superan lo que conviene traer como CSV.
+    '''
+    faltan = dias_faltantes(fuente, fecha_inicio, fecha_fin)
+    if not faltan:
+        return None
+    query = FUENTES[fuente]['sql'](faltan[0], faltan[-1])
+    return faltan[0], faltan[-1], query, elegir_transporte(query, filas_estimadas(fuente, faltan[0], faltan[-1]))
+
+
+def _guardar(fuente, desde, hasta, df):
+    '''Reemplaza en el almacen los dias desde..hasta de la fuente con el resultado de Athena'''
+    df = df.rename(columns=str.lower)
+    df['dia'] = df['dia'].astype(str).str[:10]
+    es_bosquejo = df['metrica'].isin(FUENTES[fuente]['bosquejos'])
+
+    conteos = df[~es_bosquejo]
+    filas_conteos = list(zip(
+        [fuente] * len(conteos), conteos['metrica'], conteos['dia'],
+        conteos['clave'].fillna('').astype(str),
+        conteos['valor'].astype('int64').tolist()
+    ))
+    filas_bosquejos = [
+        (fuente, metrica, dia,
+         registros_dia(pd.to_numeric(grupo['clave']), pd.to_numeric(grupo['valor'])).tobytes())
+        for (metrica, dia), grupo in df[es_bosquejo].groupby(['metrica', 'dia'])
+    ]
+    limite_cierre = (datetime.now() - timedelta(days=DIAS_CIERRE)).strftime('%Y-%m-%d')
+    actualizado = datetime.now().isoformat(timespec='seconds')
+    filas_dias = [(fuente, d, int(d <= limite_cierre), actualizado) for d in _dias(desde, hasta)]
+
+    with closing(_conectar()) as conexion, conexion:
+        for tabla in ('conteos', 'bosquejos', 'dias'):
+            conexion.execute('DELETE FROM {} WHERE fuente = ? AND dia BETWEEN ? AND ?'.format(tabla),
+                             (fuente, desde, hasta))
+        conexion.executemany('INSERT INTO conteos VALUES (?, ?, ?, ?, ?)', filas_conteos)
+        conexion.executemany('INSERT INTO bosquejos VALUES (?, ?, ?, ?)', filas_bosquejos)
+        conexion.executemany('INSERT INTO dias VALUES (?, ?, ?, ?)', filas_dias)
+
+
+def actualizar(contexto, fuente, fecha_inicio, fecha_fin, log=None):
+    '''
+    Completa en el almacen los dias del rango que le faltan a la fuente,
+    con una query a Athena por el tramo que los cubre.
+    '''
+    log = log or contexto.log
+    with _locks[fuente]:
+        tramo = _consulta_tramo(fuente, fecha_inicio, fecha_fin)
+        if tramo is None:
+            log("[DIARIO] {}: {} al {} completo en el almacen diario - no se consulta Athena".format(
+                fuente, fecha_inicio, fecha_fin))
+            return
+        desde, hasta, query, transporte = tramo
+        log("[DIARIO] {}: consultando Athena del {} al {} ({} dias)".format(
+            fuente, desde, hasta, len(_dias(desde, hasta))))
+        _guardar(fuente, desde, hasta, ejecutar_query(contexto, query, log=log, transporte=transporte))
+
+
+def sumas(fuente, metrica, fecha_inicio, fecha_fin):
+    '''{clave: total del rango} de una metrica sumable'''
+    with closing(_conectar()) as conexion:
+        return dict(conexion.execute(
+            'SELECT clave, SUM(valor) FROM conteos '
+            'WHERE fuente = ? AND metrica = ? AND dia BETWEEN ? AND ? GROUP BY clave',
+            (fuente, metrica, str(fecha_inicio)[:10], str(fecha_fin)[:10])
+        ).fetchall())
+
+
+def distintos(fuente, metrica, fecha_inicio, fecha_fin):
+    '''Distintos estimados del rango: union de los HyperLogLog de cada dia'''
+    with closing(_conectar()) as conexion:
+        filas = conexion.execute(
+            'SELECT registros FROM bosquejos '
+            'WHERE fuente = ? AND metrica = ? AND dia BETWEEN ? AND ?',
+            (fuente, metrica, str(fecha_inicio)[:10], str(fecha_fin)[:10])
+        ).fetchall()
+    if not filas:
+        return 0
+    return estimar(np.maximum.reduce([np.frombuffer(r, dtype=np.uint8) for (r,) in filas]))
+
+
+# ==================== RESULTADOS POR MODULO ====================
+# Cada vista arma un DataFrame con las mismas columnas que la query
+# original del modulo, asi el resto del modulo no cambia.
+
+def _usuarios_conversaciones(fi, ff):
+    return pd.DataFrame({
+        'Cant_Usuario': [distintos('sesiones', 'usuarios', fi, ff)],
+        'Cant_Sesiones': [sumas('sesiones', 'conversaciones', fi, ff).get('', 0)]
+    })
+
+
+def _sesiones_abiertas(fi, ff):
+    totales = sumas('sesiones', 'sesiones_abiertas', fi, ff)
+    return pd.DataFrame({
+        'starting_cause': [causa or None for causa in totales],
+        'Cant_sesiones': list(totales.values())
+    })
+
+
+def _pushes_enviadas(fi, ff):
+    return pd.DataFrame({'count_messages': [distintos('pushes', 'mensajes', fi, ff)]})
+
+
+def _paquete(fi, ff):
+    '''Forma de build_query_paquete(): filas CXF por regla + fila TEMPLATE'''
+    reglas = sumas('paquete', 'cxf', fi, ff)
+    return pd.DataFrame({
+        'metrica': ['CXF'] * len(reglas) + ['TEMPLATE'],
+        'rule_name': list(reglas) + [None],
+        'cant_sesiones': list(reglas.values()) + [distintos('paquete', 'template', fi, ff)]
+    })
+
+
+# vista -> (fuente, armado del DataFrame)
+VISTAS = {
+    'usuarios_conversaciones': ('sesiones', _usuarios_conversaciones),
+    'sesiones_abiertas': ('sesiones', _sesiones_abiertas),
+    'pushes_enviadas': ('pushes', _pushes_enviadas),
+    'paquete': ('paquete', _paquete),
+}
+
+
+def consultas(vista, fecha_inicio, fecha_fin):
+    '''
+    Query que hara falta en Athena para la vista (los dias que faltan), con
+    su transporte, para que run_all.py la envie por adelantado: [(query,
+    transporte)]. Lista vacia si el rango ya esta completo.
+    '''
+    tramo = _consulta_tramo(VISTAS[vista][0], fecha_inicio, fecha_fin)
+    return [tramo[2:]] if tramo else []
+
+
+def resultado(contexto, vista, fecha_inicio, fecha_fin, log=None):
+    '''
+    Resultado del rango para el modulo (mismas columnas que su query),
+    armado con los dias del almacen; antes completa los dias que falten.
+    '''
+    fuente, armar = VISTAS[vista]
+    actualizar(contexto, fuente, fecha_inicio, fecha_fin, log=log)
+    return armar(fecha_inicio, fecha_fin)
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+'''
+Envio anticipado de queries a Athena con un unico loop de polling.
+
+Con wr.athena.read_sql_query cada modulo tiene UNA query en vuelo y espera
+bloqueado a que termine. Athena ejecuta las queries del workgroup en
+paralelo del lado del servidor, asi que run_all.py envia TODAS las queries
+del mes al principio (GestorConsultas.enviar) y un solo thread consulta el
+estado de todas juntas (batch_get_query_execution, hasta 50 IDs por
+llamada) con espera adaptativa. Cada modulo, al llegar a su
+ejecutar_query(), solo espera a que SU query termine y descarga el
+resultado.
+
+Transporte del resultado (ver comun.athena.elegir_transporte):
+- 'csv': la query tal cual; Athena deja un CSV que se parsea en Python.
+- 'unload': la query envuelta en UNLOAD ... WITH (format='PARQUET'); el
+  resultado se lee con pyarrow (tipos correctos, mucho mas rapido para
+  millones de filas). Si UNLOAD falla (ej: permisos) se reintenta como CSV.
+
+Errores de la API (throttling, un corte de red, token expirado): el envio
+(StartQueryExecution) y el polling se reintentan con espera creciente; con
+token expirado se vuelven a leer las credenciales (ContextoAthena.
+renovar_credenciales) y se rearma el cliente. Solo despues de
+INTENTOS_API intentos fallan las queries afectadas, y una query fallida se
+olvida: el proximo enviar() la vuelve a mandar. cancelar() detiene en Athena
+una query que ya no se va a esperar (ej: fallo otra del mismo modulo).
+'''
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+import awswrangler as wr
+import pandas as pd
+
+# Espera adaptativa del polling (segundos): arranca corta para las queries
+# rapidas y se alarga mientras no cambie nada; vuelve al minimo cada vez que
+# termina una query o se envia una nueva.
+ESPERA_MINIMA = 0.5
+ESPERA_MAXIMA = 10.0
+FACTOR_ESPERA = 1.5
+
+# Limite de la API de Athena para batch_get_query_execution
+IDS_POR_LLAMADA = 50
+
+ESTADOS_FINALES = ('SUCCEEDED', 'FAILED', 'CANCELLED')
+
+# Intentos ante errores de la API de Athena antes de fallar las queries
+# afectadas, y espera entre intentos (se duplica hasta ESPERA_ERROR_MAXIMA)
+INTENTOS_API = 8
+ESPERA_ERROR_MINIMA = 1.0
+ESPERA_ERROR_MAXIMA = 60.0
+
+
+class ErrorConsulta(Exception):
+    '''La query termino en Athena con estado FAILED o CANCELLED'''
+
+
+def _codigo_error(e):
+    '''Codigo de error de botocore (ClientError) o el texto de la excepcion'''
+    respuesta = getattr(e, 'response', None) or {}
+    return respuesta.get('Error', {}).get('Code') or str(e)
+
+
+def es_token_expirado(e):
+    texto = '{} {}'.format(_codigo_error(e), str(e))
+    return 'ExpiredToken' in texto or 'expired' in texto.lower()
+
+
+def es_reintentable(e):
+    '''Throttling / limite de queries concurrentes / corte de red / token expirado'''
+    texto = '{} {}'.format(_codigo_error(e), str(e))
+    transitorios = ('TooManyRequests', 'Throttling', 'Rate exceeded', 'RequestLimitExceeded',
+                    'ServiceUnavailable', 'InternalServerException', 'EndpointConnectionError',
+                    'ConnectionError', 'ConnectTimeout', 'ReadTimeout', 'timed out')
+    return es_token_expirado(e) or any(t in texto for t in transitorios)
+
+
+class GestorConsultas:
+    '''
+    Envia queries a Athena sin esperarlas y resuelve un Future por query
+    cuando termina. Las queries se identifican por su SQL y transporte:
+    enviar dos veces la misma query devuelve el mismo Future (no se ejecuta
+    dos veces).
+    '''
+
+    def __init__(self, contexto):
+        self.contexto = contexto
+        # Session y cliente propios del gestor: los clientes boto3 son
+        # thread-safe, las Session no (ver ContextoAthena.session)
+        self._session = contexto.session
+        self._cliente = self._session.client('athena')
+        self._futuros = {}         # (sql, transporte) -> Future
+        self._pendientes = {}      # query_execution_id -> Future
+        self._claves = {}          # query_execution_id -> (sql, transporte)
+        self._fallos = {}          # query_execution_id -> errores de polling seguidos
+        self._rutas_unload = {}    # query_execution_id -> carpeta S3 del UNLOAD
+        self._carpeta_resultados = None
+        self._lock = threading.Lock()
+        self._hay_novedades = threading.Event()
+        self._poller = None
+
+    def enviar(self, query, log=None, transporte='csv'):
+        '''
+        Envia la query a Athena (si no fue enviada antes) y retorna su
+        Future. El Future se resuelve con el query_execution_id cuando la
+        query termina OK, o con una excepcion si falla.
+        '''
+        log = log or self.contexto.log
+        clave = (query, transporte)
+        with self._lock:
+            if clave in self._futuros:
+                return self._futuros[clave]
+            futuro = Future()
+            self._futuros[clave] = futuro
+
+        # El envio (con sus reintentos) va fuera del lock: no frena al polling
+        ruta = None
+        try:
+            if transporte == 'unload':
+                ruta = '{}unload/{}/'.format(self._carpeta_s3(), uuid.uuid4().hex)
+                sql = ("UNLOAD ({}) TO '{}' "
+                       "WITH (format = 'PARQUET', compression = 'SNAPPY')").format(query, ruta)
+                query_id = self._iniciar(sql, log)
+            else:
+                query_id = self._iniciar(query, log)
+        except Exception as e:
+            self._fallar(clave, futuro, e)
+            return futuro
+
+        with self._lock:
+            if ruta is not None:
+                self._rutas_unload[query_id] = ruta
+            self._pendientes[query_id] = futuro
+            self._claves[query_id] = clave
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._loop_polling, daemon=True)
+                self._poller.start()
+        self._hay_novedades.set()
+        return futuro
+
+    def resultado(self, query, log=None, transporte='csv'):
+        '''Espera a que la query termine y descarga el resultado (DataFrame)'''
+        log = log or self.contexto.log
+        if transporte != 'unload':
+            query_id = self.enviar(query, log=log).result()
+            return wr.athena.get_query_results(
+                query_execution_id=query_id,
+                boto3_session=self.contexto.session
+            )
+
+        try:
+            query_id = self.enviar(query, log=log, transporte='unload').result()
+        except Exception as e:
+            log("[ADVERTENCIA] UNLOAD a Parquet no disponible ({}); se usa CSV".format(str(e)))
+            return self.resultado(query, log=log, transporte='csv')
+        return self._leer_unload(self._rutas_unload[query_id])
+
+    def cancelar(self, query, transporte='csv'):
+        '''
+        Detiene en Athena (stop_query_execution) una query enviada que
+        todavia no termino y falla su Future con ErrorConsulta. Retorna True
+        si la query estaba en curso.
+        '''
+        clave = (query, transporte)
+        with self._lock:
+            query_id = next((q for q, c in self._claves.items() if c == clave), None)
+            if query_id is None:
+                return False
+            futuro = self._pendientes.pop(query_id)
+            del self._claves[query_id]
+            self._fallos.pop(query_id, None)
+        try:
+            self._cliente.stop_query_execution(QueryExecutionId=query_id)
+        except Exception as e:
+            self.contexto.log("[ADVERTENCIA] No se pudo cancelar la query {}: {}".format(query_id, str(e)))
+        self._fallar(clave, futuro, ErrorConsulta("Query {} CANCELLED: cancelada al fallar otra query".format(query_id)))
+        return True
+
+    def _leer_unload(self, ruta):
+        '''Lee (con pyarrow) los Parquet que dejo el UNLOAD y los borra de S3'''
+        session = self.contexto.session
+        try:
+            df = wr.s3.read_parquet(path=ruta, boto3_session=session)
+        except wr.exceptions.NoFilesFound:
+            # UNLOAD sin filas no escribe archivos
+            return pd.DataFrame()
+        try:
+            wr.s3.delete_objects(ruta, boto3_session=session)
+        except Exception:
+            pass
+        return df
+
+    def _carpeta_s3(self):
+        '''Carpeta S3 de resultados del workgroup (o el bucket default de awswrangler)'''
+        if self._carpeta_resultados is None:
+            carpeta = None
+            try:
+                grupo = self._cliente.get_work_group(WorkGroup=self.contexto.workgroup)
+                config = grupo['WorkGroup']['Configuration']
+                carpeta = config.get('ResultConfiguration', {}).get('OutputLocation')
+            except Exception:
+                pass
+            if not carpeta:
+                carpeta = wr.athena.create_athena_bucket(boto3_session=self._session)
+            self._carpeta_resultados = carpeta if carpeta.endswith('/') else carpeta + '/'
+        return self._carpeta_resultados
+
+    def _fallar(self, clave, futuro, error):
+        '''Falla el Future y lo olvida: el proximo enviar() vuelve a mandar la query'''
+        with self._lock:
+            if self._futuros.get(clave) is futuro:
+                del self._futuros[clave]
+        futuro.set_exception(error)
+
+    def _renovar_cliente(self, log):
+        '''Token expirado: credenciales nuevas y cliente nuevo'''
+        log("[ADVERTENCIA] Token AWS expirado: renovarlo con "
+            "aws-azure-login --profile default --mode=gui (se reintenta)")
+        if self.contexto.renovar_credenciales():
+            self._session = self.contexto.session
+            self._cliente = self._session.client('athena')
+
+    def _iniciar(self, query, log):
+        '''StartQueryExecution con reintentos ante throttling / token expirado'''
+        espera = ESPERA_ERROR_MINIMA
+        for intento in range(1, INTENTOS_API + 1):
+            try:
+                return self._iniciar_una_vez(query, log)
+            except Exception as e:
+                if intento == INTENTOS_API or not es_reintentable(e):
+                    raise
+                log("[ADVERTENCIA] Athena no acepto la query ({}); reintento {}/{} en {:.0f}s".format(
+                    _codigo_error(e), intento, INTENTOS_API - 1, espera))
+                if es_token_expirado(e):
+                    self._renovar_cliente(log)
+                time.sleep(espera)
+                espera = min(espera * 2, ESPERA_ERROR_MAXIMA)
+
+    def _iniciar_una_vez(self, query, log):
+        contexto = self.contexto
+        try:
+            return wr.athena.start_query_execution(
+                sql=query,
+                database=contexto.database,
+                workgroup=contexto.workgroup,
+                boto3_session=self._session
+            )
+        except Exception as e:
+            if 'workgroup' not in str(e).lower():
+                raise
+            log("[ADVERTENCIA] Intentando sin workgroup...")
+            return wr.athena.start_query_execution(
+                sql=query,
+                database=contexto.database,
+                boto3_session=self._session
+            )
+
+    def _loop_polling(self):
+        espera = ESPERA_MINIMA
+        while True:
+            with self._lock:
+                ids = list(self._pendientes)
+                if not ids:
+                    self._poller = None
+                    return
+
+            terminadas = 0
+            error = None
+            for i in range(0, len(ids), IDS_POR_LLAMADA):
+                lote = ids[i:i + IDS_POR_LLAMADA]
+                try:
+                    respuesta = self._cliente.batch_get_query_execution(QueryExecutionIds=lote)
+                except Exception as e:
+                    # Las queries siguen corriendo en Athena: se reintenta el lote
+                    error = e
+                    terminadas += self._registrar_fallo(lote, e)
+                    continue
+                for ejecucion in respuesta.get('QueryExecutions', []):
+                    self._fallos.pop(ejecucion['QueryExecutionId'], None)
+                    if self._resolver(ejecucion):
+                        terminadas += 1
+                no_procesadas = respuesta.get('UnprocessedQueryExecutionIds', [])
+                for item in no_procesadas:
+                    motivo = Exception(item.get('ErrorMessage') or item.get('ErrorCode') or 'sin detalle')
+                    terminadas += self._registrar_fallo([item['QueryExecutionId']], motivo)
+
+            if error is not None:
+                if es_token_expirado(error):
+                    self._renovar_cliente(self.contexto.log)
+                espera = min(max(espera * 2, ESPERA_ERROR_MINIMA), ESPERA_ERROR_MAXIMA)
+            elif terminadas:
+                espera = ESPERA_MINIMA
+            else:
+                espera = min(espera * FACTOR_ESPERA, ESPERA_MAXIMA)
+            # Una query nueva despierta al loop antes de tiempo
+            if self._hay_novedades.wait(espera):
+                self._hay_novedades.clear()
+                espera = ESPERA_MINIMA
+
+    def _registrar_fallo(self, ids, error):
+        '''
+        Cuenta un error de polling para cada query de `ids`; las que llegan a
+        INTENTOS_API errores seguidos fallan (solo esas). Retorna cuantas fallaron.
+        '''
+        agotadas = []
+        with self._lock:
+            for query_id in ids:
+                if query_id not in self._pendientes:
+                    continue
+                self._fallos[query_id] = self._fallos.get(query_id, 0) + 1
+                if self._fallos[query_id] >= INTENTOS_API:
+                    del self._fallos[query_id]
+                    agotadas.append((query_id, self._pendientes.pop(query_id),
+                                     self._claves.pop(query_id, None)))
+        for query_id, futuro, clave in agotadas:
+            self._fallar(clave, futuro, Exception(
+                "No se pudo consultar el estado de la query {} tras {} intentos: {}".format(
+                    query_id, INTENTOS_API, str(error))))
+        return len(agotadas)
+
+    def _resolver(self, ejecucion):
+        '''Resuelve el Future de una query si llego a un estado final'''
+        estado = ejecucion['Status']['State']
+        if estado not in ESTADOS_FINALES:
+            return False
+        query_id = ejecucion['QueryExecutionId']
+        with self._lock:
+            futuro = self._pendientes.pop(query_id, None)
+            clave = self._claves.pop(query_id, None)
+        if futuro is None:
+            return False
+        if estado == 'SUCCEEDED':
+            futuro.set_result(query_id)
+        else:
+            motivo = ejecucion['Status'].get('StateChangeReason', 'Error desconocido')
+            self._fallar(clave, futuro, ErrorConsulta("Query {} {}: {}".format(query_id, estado, motivo)))
+        return True
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+'''
+Lectura de celdas de los Excel de los modulos, compartida por
+consolidar_excel.py y diagnosticar_excel.py.
+
+Antes cada celda se leia con su propio openpyxl.load_workbook (libro
+entero en memoria): un modulo con D2/D3 abria su Excel tres veces (D2, D3
+y D1 para el periodo). Aca:
+
+- El libro se abre en modo read_only (openpyxl no arma la planilla
+  entera) y las celdas pedidas se leen de una sola pasada por la hoja
+  activa (el rectangulo que las contiene).
+- Lo leido queda en memoria con clave (ruta, fecha de modificacion): si se
+  vuelven a pedir celdas del mismo archivo no se abre de nuevo, y si el
+  archivo cambio en disco se vuelve a leer.
+- Se guardan los valores y no el libro abierto: en read_only openpyxl deja
+  el archivo abierto hasta close(), y en Windows eso lo bloquea para los
+  modulos que lo regeneran.
+
+Uso:
+
+    valores = lectura_excel.leer_celdas(ruta, ['D1', 'D2', 'D3'])
+    valores['D2']
+'''
+import os
+import threading
+
+import openpyxl
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string, get_column_letter
+
+# Archivos distintos que se mantienen en memoria
+MAX_ARCHIVOS = 64
+
+_cache = {}
+_aperturas = 0
+_lock = threading.Lock()
+
+
+def _posicion(celda):
+    '''"D12" -> (12, 4)'''
+    letra, fila = coordinate_from_string(celda)
+    return fila, column_index_from_string(letra)
+
+
+def _leer_rango(ruta, rango):
+    '''Valores del rectangulo (fila_min, fila_max, col_min, col_max) de la hoja activa'''
+    global _aperturas
+    fila_min, fila_max, col_min, col_max = rango
+    wb = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    _aperturas += 1
+    try:
+        ws = wb.active
+        valores = {}
+        filas = ws.iter_rows(min_row=fila_min, max_row=fila_max,
+                             min_col=col_min, max_col=col_max, values_only=True)
+        for fila, contenido in enumerate(filas, start=fila_min):
+            for columna, valor in enumerate(contenido, start=col_min):
+                valores['{}{}'.format(get_column_letter(columna), fila)] = valor
+        return valores
+    finally:
+        wb.close()
+
+
+def leer_celdas(ruta, celdas):
+    '''
+    Valores de `celdas` (['D1', 'D2']) de la hoja activa del Excel:
+    {celda: valor}; las celdas vacias (o fuera de la hoja) valen None.
+    Lanza las excepciones de openpyxl si el archivo no se puede leer.
+    '''
+    posiciones = [_posicion(c) for c in celdas]
+    if not posiciones:
+        return {}
+    clave = (os.path.abspath(ruta), os.path.getmtime(ruta))
+    filas = [f for f, _ in posiciones]
+    columnas = [c for _, c in posiciones]
+    rango = (min(filas), max(filas), min(columnas), max(columnas))
+
+    with _lock:
+        entrada = _cache.get(clave)
+        if entrada is not None:
+            cacheado = entrada['rango']
+            if not (cacheado[0] <= rango[0] and rango[1] <= cacheado[1]
+                    and cacheado[2] <= rango[2] and rango[3] <= cacheado[3]):
+                # Se piden celdas fuera de lo leido: una pasada por el rectangulo que cubre ambos
+                rango = (min(rango[0], cacheado[0]), max(rango[1], cacheado[1]),
+                         min(rango[2], cacheado[2]), max(rango[3], cacheado[3]))
+                entrada = None
+
+        if entrada is None:
+            entrada = {'rango': rango, 'valores': _leer_rango(ruta, rango)}
+            _cache.pop(clave, None)
+            if len(_cache) >= MAX_ARCHIVOS:
+                _cache.pop(next(iter(_cache)))
+            _cache[clave] = entrada
+
+    return {c: entrada['valores'].get('{}{}'.format(*coordinate_from_string(c))) for c in celdas}
+
+
+def leer_celda(ruta, celda):
+    '''Valor de una celda de la hoja activa (ver leer_celdas)'''
+    return leer_celdas(ruta, [celda])[celda]
+
+
+def aperturas():
+    '''Cantidad de veces que se abrio un Excel desde que arranco el proceso'''
+    return _aperturas
+
+
+def vaciar():
+    '''Olvida todo lo leido'''
+    with _lock:
+        _cache.clear()
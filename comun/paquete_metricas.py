@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+'''
+Query "paquete" sobre boti_message_metrics_2 compartida por varios modulos.
+
+Feedback_CES, Feedback_CSAT y Feedback_Efectividad hacian la MISMA query
+(sesiones por regla CXF) y Sesiones_Alcanzadas volvia a escanear la tabla
+para contar sesiones con mensajes Template. build_query_paquete() calcula
+todo en UN solo escaneo con GROUPING SETS:
+
+    metrica   | rule_name        | cant_sesiones
+    ----------+------------------+--------------
+    CXF       | <cada regla CXF> | sesiones distintas de esa regla
+    TEMPLATE  | NULL             | sesiones distintas con mensajes '^Template'
+
+Cada modulo construye la misma query (mismo texto), asi que run_all.py la
+envia una sola vez (GestorConsultas deduplica por SQL) y cada modulo toma
+sus numeros del resultado con resultado_cxf() / resultado_template().
+
+Para el backfill de varios meses, build_query_paquete_por_mes() hace lo
+mismo para todos los meses en un solo escaneo (ver comun.por_mes).
+'''
+import pandas as pd
+
+from comun import por_mes
+from comun.particiones import filtro_particiones_ampliado
+
+
+def build_query_paquete(fecha_inicio, fecha_fin):
+    '''
+    Construye la query paquete para el rango de fechas. Conserva los filtros
+    de fecha originales de cada metrica: session_creation_time para las
+    reglas CXF y creation_time para los Template. El filtro de particiones
+    (year/month/day del periodo + margen) solo evita escanear toda la tabla.
+    '''
+    return """WITH base AS (
+SELECT session_id,
+       IF(rule_name like ('%CXF%')
+          AND CAST(session_creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}',
+          rule_name) AS rule_cxf,
+       (regexp_like(message, '^Template')
+          AND CAST(creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}') AS es_template
+FROM "caba-piba-consume-zone-db"."boti_message_metrics_2"
+WHERE {particiones}
+  AND ((CAST(session_creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}'
+        AND rule_name like ('%CXF%'))
+    OR (CAST(creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}'
+        AND regexp_like(message, '^Template')))
+)
+SELECT IF(grouping(rule_cxf) = 1, 'TEMPLATE', 'CXF') AS metrica,
+       rule_cxf AS rule_name,
+       IF(grouping(rule_cxf) = 1,
+          count(distinct IF(es_template, session_id)),
+          count(distinct session_id)) AS cant_sesiones
+FROM base
+GROUP BY GROUPING SETS ((rule_cxf), ())
+HAVING grouping(rule_cxf) = 1 OR rule_cxf IS NOT NULL""".format(
+        fi=fecha_inicio, ff=fecha_fin,
+        particiones=filtro_particiones_ampliado(fecha_inicio, fecha_fin)
+    )
+
+
+def build_query_paquete_por_mes(meses):
+    '''
+    La query paquete de varios meses (lista de (anio, mes)) en una sola
+    consulta, con la columna periodo_mes. Cada regla CXF y el conteo
+    Template se etiquetan con el mes de SU filtro (particiones del mes +
+    margen y fecha exacta), igual que en build_query_paquete() de ese mes.
+    '''
+    def filtro(columna):
+        return lambda fi, ff: "{particiones}\n  AND CAST({columna} AS DATE) BETWEEN date '{fi}' and date '{ff}'".format(
+            particiones=filtro_particiones_ampliado(fi, ff), columna=columna, fi=fi, ff=ff
+        )
+
+    where_cxf, mes_cxf = por_mes.filtro_meses(filtro('session_creation_time'), meses)
+    where_template, mes_template = por_mes.filtro_meses(filtro('creation_time'), meses)
+    return """WITH base AS (
+SELECT session_id,
+       rule_name,
+       IF(rule_name like ('%CXF%'), {mes_cxf}) AS mes_cxf,
+       IF(regexp_like(message, '^Template'), {mes_template}) AS mes_template
+FROM "caba-piba-consume-zone-db"."boti_message_metrics_2"
+WHERE ({where_cxf} AND rule_name like ('%CXF%'))
+   OR ({where_template} AND regexp_like(message, '^Template'))
+)
+SELECT IF(grouping(mes_cxf) = 0, mes_cxf, mes_template) AS {columna},
+       IF(grouping(mes_cxf) = 0, 'CXF', 'TEMPLATE') AS metrica,
+       IF(grouping(mes_cxf) = 0, rule_name) AS rule_name,
+       count(distinct session_id) AS cant_sesiones
+FROM base
+GROUP BY GROUPING SETS ((mes_cxf, rule_name), (mes_template))
+HAVING IF(grouping(mes_cxf) = 0, mes_cxf, mes_template) IS NOT NULL""".format(
+        mes_cxf=mes_cxf, mes_template=mes_template,
+        where_cxf=where_cxf, where_template=where_template,
+        columna=por_mes.COLUMNA_MES
+    )
+
+
+def consultas_por_mes(meses):
+    '''
+    Backfill: [(query paquete agrupada por mes, {mes: query paquete del mes})]
+    para consultas_por_mes() de los modulos que usan la query paquete.
+    '''
+    return [(build_query_paquete_por_mes(meses), por_mes.consultas_mes(build_query_paquete, meses))]
+
+
+def resultado_cxf(df):
+    '''
+    Filas CXF del resultado paquete, con las mismas columnas que devolvia la
+    query original de los modulos de Feedback (rule_name, cant_sesiones).
+    '''
+    df = df.rename(columns=str.lower)
+    cxf = df[df['metrica'] == 'CXF'][['rule_name', 'cant_sesiones']]
+    return cxf.reset_index(drop=True)
+
+
+def resultado_template(df):
+    '''
+    Conteo de sesiones Template del resultado paquete, con la misma forma que
+    devolvia la query original de Sesiones_Alcanzadas (columna count_sessions).
+    '''
+    df = df.rename(columns=str.lower)
+    fila = df[df['metrica'] == 'TEMPLATE']
+    total = int(fila['cant_sesiones'].iloc[0]) if len(fila) > 0 else 0
+    return pd.DataFrame({'count_sessions': [total]})
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+'''
+Predicados de fecha con poda de particiones para las queries de Athena.
+
+Las tablas *_metrics_2 estan particionadas por year/month/day (strings sin
+ceros a la izquierda: month='3', day='10'). Un filtro solo sobre
+CAST(session_creation_time AS DATE) obliga a Athena a leer TODAS las
+particiones; agregando un filtro sobre year/month/day lee solo los dias del
+periodo.
+
+- filtro_particiones(): filtro exacto sobre las particiones (el criterio que
+  usa BAX_sesiones, que replica al Excel original).
+- filtro_fechas(): filtro de particiones AMPLIADO unos dias hacia cada lado
+  + el filtro exacto sobre la columna de fecha de siempre. El resultado es
+  identico al de la query original (el filtro exacto es el que decide) pero
+  Athena solo escanea los dias del periodo: el margen cubre la diferencia
+  entre la fecha de la particion y la de la columna (zona horaria, sesiones
+  que cruzan la medianoche).
+'''
+from calendar import monthrange
+from datetime import datetime, timedelta
+
+# Dias de margen del filtro de particiones respecto del rango pedido
+MARGEN_DIAS_PARTICION = 2
+
+
+def filtro_particiones(fecha_inicio, fecha_fin, alias=None):
+    '''
+    Construye un filtro WHERE basado en las PARTICIONES year/month/day.
+
+    Para rangos parciales de mes se castea day a INTEGER asi el BETWEEN
+    funciona numericamente (sino '9' > '10' lexicograficamente). Un rango
+    que cruza varios meses se arma como OR de bloques mensuales.
+    alias: alias de la tabla (ej: 'm') si la query hace JOIN.
+    '''
+    p = '{}.'.format(alias) if alias else ''
+    inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d')
+    fin = datetime.strptime(fecha_fin, '%Y-%m-%d')
+
+    # CASO 1: mismo año, mismo mes
+    if inicio.year == fin.year and inicio.month == fin.month:
+        # Si abarca el mes completo (1 al ultimo dia), no necesito filtro de day
+        ultimo_dia_mes = monthrange(inicio.year, inicio.month)[1]
+        if inicio.day == 1 and fin.day == ultimo_dia_mes:
+            return "{p}year='{0}' AND {p}month='{1}'".format(inicio.year, inicio.month, p=p)
+        return ("{p}year='{0}' AND {p}month='{1}' "
+                "AND CAST({p}day AS INTEGER) BETWEEN {2} AND {3}").format(
+            inicio.year, inicio.month, inicio.day, fin.day, p=p
+        )
+
+    # CASO 2: rango cruzando varios meses --> armar OR de bloques mensuales
+    bloques = []
+    cur_year, cur_month = inicio.year, inicio.month
+    while (cur_year, cur_month) <= (fin.year, fin.month):
+        es_primero = (cur_year == inicio.year and cur_month == inicio.month)
+        es_ultimo = (cur_year == fin.year and cur_month == fin.month)
+        ultimo_dia_mes = monthrange(cur_year, cur_month)[1]
+
+        if es_primero and inicio.day > 1:
+            bloque = ("({p}year='{0}' AND {p}month='{1}' "
+                      "AND CAST({p}day AS INTEGER) >= {2})").format(
+                cur_year, cur_month, inicio.day, p=p
+            )
+        elif es_ultimo and fin.day < ultimo_dia_mes:
+            bloque = ("({p}year='{0}' AND {p}month='{1}' "
+                      "AND CAST({p}day AS INTEGER) <= {2})").format(
+                cur_year, cur_month, fin.day, p=p
+            )
+        else:
+            # mes completo
+            bloque = "({p}year='{0}' AND {p}month='{1}')".format(cur_year, cur_month, p=p)
+
+        bloques.append(bloque)
+
+        # avanzar al mes siguiente
+        if cur_month == 12:
+            cur_year += 1
+            cur_month = 1
+        else:
+            cur_month += 1
+
+    return '(' + ' OR '.join(bloques) + ')'
+
+
+def filtro_particiones_ampliado(fecha_inicio, fecha_fin, alias=None, margen_dias=MARGEN_DIAS_PARTICION):
+    '''
+    Filtro de particiones del rango ampliado `margen_dias` hacia cada lado.
+    Solo sirve para podar: siempre va acompañado de un filtro exacto.
+    '''
+    inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d') - timedelta(days=margen_dias)
+    fin = datetime.strptime(fecha_fin, '%Y-%m-%d') + timedelta(days=margen_dias)
+    return filtro_particiones(inicio.strftime('%Y-%m-%d'), fin.strftime('%Y-%m-%d'), alias=alias)
+
+
+def filtro_fechas(columna, fecha_inicio, fecha_fin, alias=None, margen_dias=MARGEN_DIAS_PARTICION):
+    '''
+    Filtro de fecha para un WHERE: particiones (ampliadas `margen_dias`
+    hacia cada lado, solo para podar) + el filtro exacto de siempre sobre
+    `columna` (ej: 'session_creation_time', 'ev.creation_time').
+    '''
+    particiones = filtro_particiones_ampliado(fecha_inicio, fecha_fin, alias, margen_dias)
+    return "{particiones}\n  AND CAST({columna} AS DATE) BETWEEN date '{fi}' and date '{ff}'".format(
+        particiones=particiones, columna=columna, fi=fecha_inicio, ff=fecha_fin
+    )
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+'''
+Queries agrupadas por mes para el backfill de varios periodos
+(run_all.py --periodos / --desde --hasta).
+
+En un backfill cada modulo corre una vez por mes, y las queries agregadas
+(conteos) de cada mes son la misma query con otro filtro de fechas. En
+lugar de mandar una por mes (un escaneo de la tabla por mes), el modulo
+arma con consultas_por_mes() UNA query que calcula todos los meses a la vez
+(columna periodo_mes). run_all.py la ejecuta antes de arrancar los meses y
+guarda el resultado de cada mes en la cache local (comun.cache_consultas)
+con la clave de la query individual de ese mes: cuando el modulo corre
+para el mes, ejecutar_query() lo encuentra en la cache y no consulta Athena.
+
+La query agrupada conserva el filtro de cada mes tal cual lo arma el
+modulo: filtra por el OR de los filtros y etiqueta cada fila con el mes
+cuyo filtro cumple (CASE). Los filtros exactos de fecha de meses distintos
+no se superponen, asi que el resultado de cada mes es el mismo que daria su
+query individual.
+'''
+from calendar import monthrange
+
+COLUMNA_MES = 'periodo_mes'
+
+
+def parsear_mes(texto):
+    '''"2025-06" -> (2025, 6). Lanza ValueError si no es un mes valido.'''
+    try:
+        anio, mes = (int(parte) for parte in texto.strip().split('-'))
+    except ValueError:
+        raise ValueError("Periodo invalido: '{}' (formato AAAA-MM, ej: 2025-06)".format(texto))
+    if not 1 <= mes <= 12:
+        raise ValueError("Mes invalido en '{}': debe estar entre 1 y 12".format(texto))
+    return anio, mes
+
+
+def meses_entre(desde, hasta):
+    '''Lista de (anio, mes) desde `desde` hasta `hasta` inclusive'''
+    if hasta < desde:
+        raise ValueError("El periodo final es anterior al inicial")
+    meses = []
+    anio, mes = desde
+    while (anio, mes) <= hasta:
+        meses.append((anio, mes))
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return meses
+
+
+def rango_mes(mes):
+    '''(2025, 6) -> ('2025-06-01', '2025-06-30')'''
+    anio, numero = mes
+    return ('{:04d}-{:02d}-01'.format(anio, numero),
+            '{:04d}-{:02d}-{:02d}'.format(anio, numero, monthrange(anio, numero)[1]))
+
+
+def etiqueta(mes):
+    '''(2025, 6) -> '2025-06' (valor de la columna periodo_mes)'''
+    return '{:04d}-{:02d}'.format(*mes)
+
+
+def filtro_meses(filtro, meses):
+    '''
+    `filtro(fecha_inicio, fecha_fin)` arma el predicado WHERE de un mes (el
+    mismo que usa la query individual). Retorna (where, caso): el OR de los
+    predicados de todos los meses y un CASE que da la etiqueta del mes de
+    cada fila (NULL si no cumple ninguno).
+    '''
+    predicados = [(etiqueta(mes), filtro(*rango_mes(mes))) for mes in meses]
+    where = '(' + '\n  OR '.join('({})'.format(p) for _, p in predicados) + ')'
+    caso = 'CASE ' + '\n  '.join("WHEN ({}) THEN '{}'".format(p, e) for e, p in predicados) + ' END'
+    return where, caso
+
+
+def consultas_mes(build_query, meses):
+    '''{mes: query individual del mes} para `build_query(fecha_inicio, fecha_fin)`'''
+    return {mes: build_query(*rango_mes(mes)) for mes in meses}
+
+
+def repartir(df, meses):
+    '''
+    Separa el resultado de una query agrupada en un DataFrame por mes, con
+    las columnas de la query individual (sin periodo_mes). Solo incluye los
+    meses con filas: un mes sin filas se deja para que el modulo lo consulte
+    (la query individual puede devolver una fila en cero).
+    '''
+    columna = next((c for c in df.columns if c.lower() == COLUMNA_MES), None)
+    if columna is None:
+        raise ValueError("El resultado no tiene la columna {}".format(COLUMNA_MES))
+    resultado = {}
+    for mes in meses:
+        filas = df[df[columna].astype(str) == etiqueta(mes)]
+        if len(filas) > 0:
+            resultado[mes] = filas.drop(columns=[columna]).reset_index(drop=True)
+    return resultado
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+'''
+Escritura de reportes Excel compartida por los modulos.
+
+Los modulos armaban los Excel celda por celda (ws['B{}'.format(fila)] = ...
+dentro de un iterrows) creando un Font/PatternFill por celda. Aca:
+
+- El libro se abre en modo write-only de openpyxl: las filas se escriben en
+  orden, de arriba hacia abajo, y van directo al archivo (no se arma la
+  planilla entera en memoria).
+- Los formatos son estilos con nombre (ESTILOS), registrados una vez por
+  libro; cada celda solo referencia el nombre.
+- Las tablas se escriben por columnas (arrays), sin iterrows.
+
+Uso:
+
+    libro = LibroExcel()
+    hoja = libro.hoja('Detalle', anchos={'A': 15, 'B': 18})
+    hoja.fila(('Fecha', 'encabezado'), ('Sesiones', 'encabezado'))
+    hoja.filas([df['Fecha'], df['Sesiones']], estilos=['fecha', 'miles'])
+    hoja.fila(('TOTAL', 'negrita'), (total, 'negrita_miles'))
+    libro.guardar(filepath)
+
+Cada celda de fila() es un valor, o (valor, nombre_de_estilo). Las filas
+vacias se escriben con fila() sin argumentos.
+'''
+from copy import copy
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle, PatternFill
+from openpyxl.styles.fonts import DEFAULT_FONT
+
+FORMATO_MILES = '#,##0'
+FORMATO_PORCENTAJE = '0.00%'
+FORMATO_FECHA = 'DD/MM/YYYY'
+FORMATO_DECIMAL = '0.00'
+
+
+def _relleno(color):
+    return PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+
+# Estilos con nombre disponibles en todos los libros.
+# Cada uno: dict con font / fill / number_format / alignment (todos opcionales)
+ESTILOS = {
+    'encabezado': dict(font=Font(bold=True, size=11, color='FFFFFF'), fill=_relleno('366092')),
+    'encabezado_tabla': dict(font=Font(bold=True, size=11)),
+    'negrita': dict(font=Font(bold=True, size=11)),
+    'negrita_miles': dict(font=Font(bold=True, size=11), number_format=FORMATO_MILES),
+    'negrita_porcentaje': dict(font=Font(bold=True, size=11), number_format=FORMATO_PORCENTAJE),
+    'tarjeta': dict(font=Font(bold=True, size=12)),
+    'tarjeta_valor': dict(font=Font(bold=True, size=14), number_format=FORMATO_MILES),
+    'nota': dict(font=Font(size=10, italic=True)),
+    'miles': dict(number_format=FORMATO_MILES),
+    'porcentaje': dict(number_format=FORMATO_PORCENTAJE),
+    'fecha': dict(number_format=FORMATO_FECHA),
+    'decimal': dict(number_format=FORMATO_DECIMAL),
+}
+
+
+def _valores_columna(columna):
+    '''Array/Series/lista -> lista de valores Python (NaN/NaT/NA -> celda vacia)'''
+    serie = columna if isinstance(columna, pd.Series) else pd.Series(columna)
+    serie = serie.astype(object)
+    return serie.where(serie.notna(), None).tolist()
+
+
+class LibroExcel:
+    '''
+    Libro write-only con los estilos con nombre de ESTILOS (mas `estilos`
+    propios del modulo, mismo formato; pisan a los comunes si se repite el
+    nombre).
+    '''
+
+    def __init__(self, estilos=None):
+        self.wb = Workbook(write_only=True)
+        for nombre, atributos in dict(ESTILOS, **(estilos or {})).items():
+            # Sin font propio: la del libro (Calibri 11), como una celda sin formato
+            estilo = NamedStyle(name=nombre, font=atributos.get('font', DEFAULT_FONT))
+            if 'fill' in atributos:
+                estilo.fill = atributos['fill']
+            if 'number_format' in atributos:
+                estilo.number_format = atributos['number_format']
+            if 'alignment' in atributos:
+                estilo.alignment = atributos['alignment']
+            self.wb.add_named_style(estilo)
+
+    def hoja(self, titulo, anchos=None):
+        '''
+        Agrega una hoja. `anchos` = {letra_columna: ancho}; en modo
+        write-only tiene que definirse antes de escribir la primera fila.
+        '''
+        ws = self.wb.create_sheet(titulo)
+        for letra, ancho in (anchos or {}).items():
+            ws.column_dimensions[letra].width = ancho
+        return HojaExcel(ws)
+
+    @property
+    def hojas(self):
+        return self.wb.sheetnames
+
+    def guardar(self, filepath):
+        self.wb.save(filepath)
+
+
+class HojaExcel:
+    '''Hoja write-only: se escribe fila por fila, de arriba hacia abajo'''
+
+    def __init__(self, ws):
+        self.ws = ws
+        self._plantillas = {}
+
+    def _celda(self, valor, estilo):
+        if estilo is None:
+            return valor
+        # El estilo con nombre se resuelve una vez por hoja; cada celda copia el resultado
+        plantilla = self._plantillas.get(estilo)
+        if plantilla is None:
+            plantilla = self._plantillas[estilo] = WriteOnlyCell(self.ws)
+            plantilla.style = estilo
+        celda = WriteOnlyCell(self.ws, value=valor)
+        celda._style = copy(plantilla._style)
+        return celda
+
+    def fila(self, *celdas):
+        '''Una fila: cada celda es un valor o (valor, estilo)'''
+        self.ws.append([
+            self._celda(*c) if isinstance(c, tuple) else c
+            for c in celdas
+        ])
+
+    def filas(self, columnas, estilos=None):
+        '''
+        Escribe una tabla a partir de sus columnas (Series, arrays o listas
+        del mismo largo). `estilos`: un nombre de estilo (o None) por columna.
+        '''
+        valores = [_valores_columna(c) for c in columnas]
+        estilos = estilos or [None] * len(valores)
+        if not any(estilos):
+            for fila in zip(*valores):
+                self.ws.append(fila)
+            return
+        for fila in zip(*valores):
+            self.ws.append([self._celda(v, e) for v, e in zip(fila, estilos)])
+
+    def tabla(self, df, estilos=None, encabezado='encabezado_tabla'):
+        '''
+        Encabezado + filas de un DataFrame (columnas en el orden del df).
+        `estilos` = {columna: estilo} para las columnas con formato.
+        '''
+        estilos = estilos or {}
+        self.fila(*[(str(c), encabezado) for c in df.columns])
+        self.filas([df[c] for c in df.columns], [estilos.get(c) for c in df.columns])
+
+
+def escribir_dataframes(filepath, hojas, estilos=None):
+    '''
+    Reemplazo de DataFrame.to_excel / pd.ExcelWriter: un libro con una hoja
+    por DataFrame de `hojas` ({nombre_hoja: df}), sin indice (hacer
+    reset_index() antes si hace falta). `estilos` = {columna: estilo}.
+    '''
+    libro = LibroExcel()
+    for nombre, df in hojas.items():
+        libro.hoja(nombre).tabla(df, estilos)
+    libro.guardar(filepath)
+
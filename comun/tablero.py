@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+'''
+Tablero GCBA (dashboard de 17 filas) compartido por los modulos y por
+consolidar_excel.py.
+
+Antes cada modulo que llena una celda del tablero (Feedback CES / CSAT /
+Efectividad, No_Entendidos, Contenidos_Bot, Contenidos_mas_disparados)
+tenia su propia copia de las 17 filas y creaba (o abria y volvia a
+guardar) un Excel entero para escribir una sola celda; las copias se
+fueron desfasando. Ahora:
+
+- ESTRUCTURA_DASHBOARD es la unica definicion de las filas (columnas B/C)
+  y FORMATOS_VALOR el formato de cada celda de la columna D.
+- Cada modulo publica sus valores con registrar() en el almacen de
+  metricas tablero/metricas.sqlite: una fila por (periodo, celda) con el
+  valor, el modulo, de donde salio (origen) y cuando se registro. SQLite
+  serializa las escrituras, asi que los modulos que corren en paralelo
+  (en proceso o como subproceso) no se pisan.
+- consolidar_excel.py lee todo el periodo con una sola consulta
+  (valores_registrados) y arma el Excel una sola vez con
+  escribir_tablero(). Los Excel de los modulos solo se leen para periodos
+  generados con versiones anteriores (sin registro en el almacen).
+
+<periodo> es el mismo texto que usa el nombre del consolidado:
+'mayo_2026' o '2026-05-01_al_2026-05-31' (clave_periodo).
+'''
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import openpyxl
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+CARPETA_TABLERO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tablero')
+ALMACEN = os.path.join(CARPETA_TABLERO, 'metricas.sqlite')
+
+# Segundos que espera una escritura si otro modulo tiene tomada la base
+ESPERA_BLOQUEO = 30
+
+_ESQUEMA = '''
+CREATE TABLE IF NOT EXISTS metricas (
+    periodo     TEXT NOT NULL,  -- clave_periodo(): 'mayo_2026'
+    celda       TEXT NOT NULL,  -- id de la metrica = celda del tablero ('D15')
+    modulo      TEXT NOT NULL,  -- clave en consolidar_excel.MODULOS
+    valor       TEXT,           -- JSON (numero o texto)
+    encabezado  TEXT,           -- texto de D1 para el periodo
+    origen      TEXT,           -- de donde sale el valor (archivo generado, fuente)
+    actualizado TEXT NOT NULL,
+    PRIMARY KEY (periodo, celda)
+)
+'''
+
+MESES = {
+    1: 'enero', 2: 'febrero', 3: 'marzo', 4: 'abril',
+    5: 'mayo', 6: 'junio', 7: 'julio', 8: 'agosto',
+    9: 'septiembre', 10: 'octubre', 11: 'noviembre', 12: 'diciembre'
+}
+
+# Estructura del dashboard GCBA (17 filas)
+ESTRUCTURA_DASHBOARD = [
+    {'fila': 1, 'indicador': 'Indicador', 'detalle': 'Descripción/Detalle', 'es_header': True},
+    {'fila': 2, 'indicador': 'Conversaciones', 'detalle': 'Q Conversaciones'},
+    {'fila': 3, 'indicador': 'Usuarios', 'detalle': 'Q Usuarios únicos'},
+    {'fila': 4, 'indicador': 'Sesiones abiertas por Pushes', 'detalle': 'Q Sesiones que se abrieron con una Push'},
+    {'fila': 5, 'indicador': 'Sesiones Alcanzadas por Pushes', 'detalle': 'Q Sesiones que recibieron al menos 1 Push'},
+    {'fila': 6, 'indicador': 'Mensajes Pushes Enviados', 'detalle': 'Q de mensajes enviados bajo el formato push'},
+    {'fila': 7, 'indicador': 'Contenidos en Botmaker', 'detalle': 'Contenidos prendidos en botmaker'},
+    {'fila': 8, 'indicador': 'Contenidos Prendidos para el USUARIO', 'detalle': 'Contenidos prendidos de cara al usuario'},
+    {'fila': 9, 'indicador': 'Interacciones', 'detalle': 'Q Interacciones'},
+    {'fila': 10, 'indicador': 'Trámites, solicitudes y turnos', 'detalle': 'Q Trámites, solicitudes y turnos disponibles'},
+    {'fila': 11, 'indicador': 'contenidos mas consultados', 'detalle': 'Q Contenidos con más interacciones'},
+    {'fila': 12, 'indicador': 'Derivaciones', 'detalle': 'Q Derivaciones'},
+    {'fila': 13, 'indicador': 'No entendimiento', 'detalle': 'Performance motor de búsqueda'},
+    {'fila': 14, 'indicador': 'Tasa de Efectividad', 'detalle': 'Mide el porcentaje de usuarios que lograron su objetivo'},
+    {'fila': 15, 'indicador': 'CES (Customer Effort Score)', 'detalle': 'Mide la facilidad con la que los usuarios pueden interactuar'},
+    {'fila': 16, 'indicador': 'Satisfacción (CSAT)', 'detalle': 'Mide la satisfacción usando una escala de 1 a 5'},
+    {'fila': 17, 'indicador': 'Uptime servidor', 'detalle': 'Disponibilidad del servidor (% tiempo activo)'},
+]
+
+# Formato de numero de las celdas de valor (el resto queda General)
+FORMATOS_VALOR = {
+    'D13': '0.00%',  # No Entendimiento
+    'D14': '0.00%',  # Efectividad
+    'D15': '0.00',   # CES
+    'D16': '0.00%',  # CSAT
+    'D17': '0.00%',  # Availability
+}
+
+# Celda con texto multilinea (Top 10 de contenidos consultados)
+CELDA_MULTILINEA = 'D11'
+
+ALTO_FILA = {1: 30, 11: 180}
+ALTO_FILA_DEFECTO = 25
+
+
+# ==================== PERIODO ====================
+
+def clave_periodo(modo, mes, anio, fecha_inicio=None, fecha_fin=None):
+    '''
+    Periodo como texto para carpetas/nombres: 'mayo_2026' (modo 'mes') o
+    '2026-05-01_al_2026-05-31' (rango; acepta fechas con hora).
+    '''
+    if modo == 'mes':
+        return '{}_{}'.format(MESES.get(mes, 'mes{}'.format(mes)), anio)
+    return '{}_al_{}'.format(str(fecha_inicio)[:10], str(fecha_fin)[:10])
+
+
+def encabezado_periodo(modo, mes, anio, fecha_inicio=None, fecha_fin=None):
+    '''Texto de la celda D1: 'may-26' (mes) o '01/05-15/05/26' (rango)'''
+    if modo == 'mes':
+        return '{}-{}'.format(MESES.get(mes, 'mes')[:3], str(anio)[-2:])
+    inicio = datetime.strptime(str(fecha_inicio)[:10], '%Y-%m-%d')
+    fin = datetime.strptime(str(fecha_fin)[:10], '%Y-%m-%d')
+    return '{}-{}'.format(inicio.strftime('%d/%m'), fin.strftime('%d/%m/%y'))
+
+
+# ==================== REGISTRO DE VALORES ====================
+
+def _conectar():
+    os.makedirs(CARPETA_TABLERO, exist_ok=True)
+    conexion = sqlite3.connect(ALMACEN, timeout=ESPERA_BLOQUEO)
+    conexion.execute(_ESQUEMA)
+    return conexion
+
+
+def _valor_json(valor):
+    '''numpy -> tipos de Python (json no serializa np.int64 / np.float64)'''
+    return valor.item() if hasattr(valor, 'item') else valor
+
+
+def registrar(modulo, valores, modo, mes, anio, fecha_inicio=None, fecha_fin=None, origen=None):
+    '''
+    Publica en el almacen las celdas que llena un modulo ({'D15': 2.1}) para
+    el periodo. `modulo` es la clave del modulo en consolidar_excel.MODULOS
+    (ej: 'feedback_ces'); `origen` indica de donde sale el valor (ej: el
+    archivo generado). Pisa lo registrado antes para esas celdas.
+    Retorna la ruta del almacen.
+    '''
+    periodo = clave_periodo(modo, mes, anio, fecha_inicio, fecha_fin)
+    encabezado = encabezado_periodo(modo, mes, anio, fecha_inicio, fecha_fin)
+    actualizado = datetime.now().isoformat(timespec='seconds')
+    filas = [
+        (periodo, celda, modulo, json.dumps(_valor_json(valor), ensure_ascii=False),
+         encabezado, origen, actualizado)
+        for celda, valor in valores.items()
+    ]
+    with closing(_conectar()) as conexion, conexion:
+        conexion.executemany(
+            'INSERT OR REPLACE INTO metricas '
+            '(periodo, celda, modulo, valor, encabezado, origen, actualizado) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            filas
+        )
+    return ALMACEN
+
+
+def valores_registrados(periodo):
+    '''
+    Todo lo registrado para el periodo, agrupado por modulo (una consulta):
+    {modulo: {'modulo', 'periodo', 'encabezado', 'valores': {celda: valor},
+    'origen', 'actualizado'}}. Vacio si ningun modulo registro valores
+    todavia.
+    '''
+    if not os.path.exists(ALMACEN):
+        return {}
+    with closing(_conectar()) as conexion:
+        filas = conexion.execute(
+            'SELECT modulo, celda, valor, encabezado, origen, actualizado '
+            'FROM metricas WHERE periodo = ? ORDER BY modulo, celda',
+            (periodo,)
+        ).fetchall()
+    registros = {}
+    for modulo, celda, valor, encabezado, origen, actualizado in filas:
+        registro = registros.setdefault(modulo, {
+            'modulo': modulo,
+            'periodo': periodo,
+            'encabezado': encabezado,
+            'valores': {},
+            'origen': origen,
+            'actualizado': actualizado
+        })
+        registro['valores'][celda] = json.loads(valor) if valor is not None else None
+        # Si las celdas de un modulo se registraron en momentos distintos, vale la ultima
+        if actualizado > registro['actualizado']:
+            registro.update(encabezado=encabezado, origen=origen, actualizado=actualizado)
+    return registros
+
+
+def leer_registro(periodo, modulo):
+    '''Registro de un modulo para el periodo (ver valores_registrados) o None'''
+    return valores_registrados(periodo).get(modulo)
+
+
+def periodo_configurado(config_file):
+    '''
+    Periodo de config_fechas.txt como argumentos de registrar()
+    ({'modo', 'mes', 'anio', 'fecha_inicio', 'fecha_fin'}), para los modulos
+    que no trabajan sobre un periodo (ej: la disponibilidad, que se mide en
+    el momento). None si el archivo no existe o no tiene un periodo valido.
+    '''
+    if not os.path.exists(config_file):
+        return None
+    config = {}
+    with open(config_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '=' in line:
+                clave, valor = line.split('=', 1)
+                config[clave.strip()] = valor.strip()
+    if config.get('FECHA_INICIO') and config.get('FECHA_FIN'):
+        return dict(modo='rango', mes=None, anio=None,
+                    fecha_inicio=config['FECHA_INICIO'], fecha_fin=config['FECHA_FIN'])
+    anio = config.get('AÑO') or config.get('ANO')
+    try:
+        return dict(modo='mes', mes=int(config['MES']), anio=int(anio))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+# ==================== EXCEL ====================
+
+def crear_estilos():
+    '''Estilos del tablero (header, indicador, detalle, valor)'''
+    borde = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    return {
+        'header': {
+            'font': Font(name='Calibri', size=11, bold=True, color='FFFFFF'),
+            'fill': PatternFill(start_color='366092', end_color='366092', fill_type='solid'),
+            'alignment': Alignment(horizontal='center', vertical='center'),
+            'border': borde
+        },
+        'indicador': {
+            'font': Font(name='Calibri', size=11, bold=True),
+            'alignment': Alignment(horizontal='left', vertical='center'),
+            'border': borde
+        },
+        'detalle': {
+            'font': Font(name='Calibri', size=11),
+            'alignment': Alignment(horizontal='left', vertical='center', wrap_text=True),
+            'border': borde
+        },
+        'valor': {
+            'font': Font(name='Calibri', size=11),
+            'alignment': Alignment(horizontal='center', vertical='center'),
+            'border': borde
+        }
+    }
+
+
+def _aplicar(celda, estilo):
+    for atributo, valor in estilo.items():
+        setattr(celda, atributo, valor)
+
+
+def escribir_tablero(filepath, valores, encabezado, titulo='Dashboard Boti'):
+    '''
+    Arma el Excel del tablero: las 17 filas de ESTRUCTURA_DASHBOARD con los
+    valores de la columna D ({'D2': ..., 'D15': ...}; las celdas sin valor
+    quedan en '-') y `encabezado` en D1.
+    '''
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = titulo
+
+    estilos = crear_estilos()
+
+    ws.column_dimensions['B'].width = 35
+    ws.column_dimensions['C'].width = 50
+    ws.column_dimensions['D'].width = 20
+
+    for item in ESTRUCTURA_DASHBOARD:
+        fila = item['fila']
+        celda_valor = 'D{}'.format(fila)
+        ws['B{}'.format(fila)] = item['indicador']
+        ws['C{}'.format(fila)] = item['detalle']
+
+        if item.get('es_header'):
+            ws[celda_valor] = encabezado
+            for columna in 'BCD':
+                _aplicar(ws['{}{}'.format(columna, fila)], estilos['header'])
+            continue
+
+        ws[celda_valor] = valores.get(celda_valor, '-')
+        _aplicar(ws['B{}'.format(fila)], estilos['indicador'])
+        _aplicar(ws['C{}'.format(fila)], estilos['detalle'])
+        _aplicar(ws[celda_valor], estilos['valor'])
+
+        if celda_valor == CELDA_MULTILINEA:
+            ws[celda_valor].alignment = Alignment(wrap_text=True, vertical='top')
+        elif celda_valor in FORMATOS_VALOR:
+            ws[celda_valor].number_format = FORMATOS_VALOR[celda_valor]
+
+    for item in ESTRUCTURA_DASHBOARD:
+        ws.row_dimensions[item['fila']].height = ALTO_FILA.get(item['fila'], ALTO_FILA_DEFECTO)
+
+    wb.save(filepath)
@@ -7,8 +7,10 @@ Consolida todos los reportes Excel parciales en un dashboard completo
 ubicado en la raíz del proyecto.
 
 Este script:
-1. Busca los Excel más recientes en cada carpeta output/
-2. Lee las métricas específicas de cada uno
+1. Lee del almacen de métricas (tablero/metricas.sqlite) todo lo que los
+   módulos registraron para el período, con una sola consulta
+2. Para los módulos sin registro (reportes de versiones anteriores) lee
+   las celdas del Excel del período en su carpeta output/
 3. Crea un dashboard consolidado con todas las métricas
 4. Guarda el archivo en la raíz del proyecto
 
@@ -18,9 +20,8 @@ Uso:
 import os
 import glob
 from datetime import datetime
-from calendar import monthrange
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+
+from comun import lectura_excel, tablero
 
 # ==================== FUNCIONES DE UTILIDAD ====================
 
@@ -33,13 +34,15 @@ def get_month_name(mes):
     }
     return meses.get(mes, f'mes{mes}')
 
-def leer_config_fechas(config_file='config_fechas.txt'):
+def leer_config_fechas(config_file=None):
     '''
     Lee el archivo de configuración de fechas y retorna el periodo como string
-    para usar en el nombre del archivo.
+    para usar en el nombre del archivo. Por defecto config_fechas.txt, o el
+    que indique BOTI_CONFIG_FECHAS (run_all.py en un backfill, uno por mes).
     
     Retorna: string con el periodo (ej: "octubre_2025" o "2025-10-01_al_2025-10-15")
     '''
+    config_file = config_file or os.environ.get('BOTI_CONFIG_FECHAS', 'config_fechas.txt')
     try:
         if not os.path.exists(config_file):
             # Si no existe, usar fecha actual
@@ -87,6 +90,15 @@ def leer_config_fechas(config_file='config_fechas.txt'):
         print(f"⚠️  Error al leer config: {str(e)}")
         return datetime.now().strftime('%Y%m%d')
 
+def encabezado_config(config_file=None):
+    '''
+    Texto de D1 del período configurado ('may-26' o '01/05-15/05/26', ver
+    tablero.encabezado_periodo), o None si el config no tiene un período válido
+    '''
+    config_file = config_file or os.environ.get('BOTI_CONFIG_FECHAS', 'config_fechas.txt')
+    periodo = tablero.periodo_configurado(config_file)
+    return tablero.encabezado_periodo(**periodo) if periodo else None
+
 # ==================== CONFIGURACIÓN ====================
 MODULOS = {
     'usuarios_conversaciones': {
@@ -187,27 +199,6 @@ MODULOS = {
     }
 }
 
-# Estructura del dashboard GCBA (17 filas)
-ESTRUCTURA_DASHBOARD = [
-    {'fila': 1, 'indicador': 'Indicador', 'detalle': 'Descripción/Detalle', 'es_header': True},
-    {'fila': 2, 'indicador': 'Conversaciones', 'detalle': 'Q Conversaciones'},
-    {'fila': 3, 'indicador': 'Usuarios', 'detalle': 'Q Usuarios únicos'},
-    {'fila': 4, 'indicador': 'Sesiones abiertas por Pushes', 'detalle': 'Q Sesiones que se abrieron con una Push'},
-    {'fila': 5, 'indicador': 'Sesiones Alcanzadas por Pushes', 'detalle': 'Q Sesiones que recibieron al menos 1 Push'},
-    {'fila': 6, 'indicador': 'Mensajes Pushes Enviados', 'detalle': 'Q de mensajes enviados bajo el formato push'},
-    {'fila': 7, 'indicador': 'Contenidos en Botmaker', 'detalle': 'Contenidos prendidos en botmaker'},
-    {'fila': 8, 'indicador': 'Contenidos Prendidos para el USUARIO', 'detalle': 'Contenidos prendidos de cara al usuario'},
-    {'fila': 9, 'indicador': 'Interacciones', 'detalle': 'Q Interacciones'},
-    {'fila': 10, 'indicador': 'Trámites, solicitudes y turnos', 'detalle': 'Q Trámites, solicitudes y turnos disponibles'},
-    {'fila': 11, 'indicador': 'contenidos mas consultados', 'detalle': 'Q Contenidos con más interacciones'},
-    {'fila': 12, 'indicador': 'Derivaciones', 'detalle': 'Q Derivaciones'},
-    {'fila': 13, 'indicador': 'No entendimiento', 'detalle': 'Performance motor de búsqueda'},
-    {'fila': 14, 'indicador': 'Tasa de Efectividad', 'detalle': 'Mide el porcentaje de usuarios que lograron su objetivo'},
-    {'fila': 15, 'indicador': 'CES (Customer Effort Score)', 'detalle': 'Mide la facilidad con la que los usuarios pueden interactuar'},
-    {'fila': 16, 'indicador': 'Satisfacción (CSAT)', 'detalle': 'Mide la satisfacción usando una escala de 1 a 5'},
-    {'fila': 17, 'indicador': 'Uptime servidor', 'detalle': 'Disponibilidad del servidor (% tiempo activo)'},
-]
-
 # ==================== FUNCIONES ====================
 
 def print_header(text):
@@ -216,8 +207,16 @@ def print_header(text):
     print(f"  {text}")
     print("=" * 70 + "\n")
 
-def buscar_excel_mas_reciente(carpeta, patron, patron_alternativo=None, excluir_patron=None):
-    '''Busca el Excel más reciente en una carpeta, excluyendo archivos no deseados'''
+def buscar_excel_mas_reciente(carpeta, patron, patron_alternativo=None, excluir_patron=None,
+                              periodo=None, encabezado=None):
+    '''
+    Busca el Excel más reciente en una carpeta, excluyendo archivos no
+    deseados. Si se pasa `periodo` ('mayo_2026') solo valen los archivos con
+    ese período en el nombre o, si no hay ninguno, los de versiones
+    anteriores cuyo header D1 es `encabezado` ('may-26'): nunca se toma el
+    Excel de otro período (en un backfill los módulos que no se recalculan
+    no dejan Excel del mes).
+    '''
     ruta_completa = os.path.join(carpeta, patron)
     print(f"   🔍 Buscando: {ruta_completa}")
     
@@ -245,6 +244,18 @@ def buscar_excel_mas_reciente(carpeta, patron, patron_alternativo=None, excluir_
     for archivo in archivos:
         print(f"      • {os.path.basename(archivo)}")
     
+    if periodo:
+        del_periodo = [f for f in archivos if periodo in os.path.basename(f)]
+        if del_periodo:
+            print(f"   📅 Con el período {periodo} en el nombre: {len(del_periodo)}")
+        elif encabezado:
+            del_periodo = [f for f in archivos if header_del_excel(f) == encabezado]
+            print(f"   📅 Sin el período {periodo} en el nombre; con header {encabezado}: {len(del_periodo)}")
+        if not del_periodo:
+            print(f"   ❌ Ningún archivo es del período {periodo}")
+            return None
+        archivos = del_periodo
+    
     # Ordenar por fecha de modificación (más reciente primero)
     archivos.sort(key=os.path.getmtime, reverse=True)
     archivo_seleccionado = archivos[0]
@@ -252,37 +263,43 @@ def buscar_excel_mas_reciente(carpeta, patron, patron_alternativo=None, excluir_
     
     return archivo_seleccionado
 
-def leer_valor_celda(archivo_excel, celda):
-    '''Lee el valor de una celda específica de un Excel'''
+def header_del_excel(archivo_excel):
+    '''Texto del header D1 de un Excel parcial, o None si no se puede leer'''
     try:
-        wb = openpyxl.load_workbook(archivo_excel, data_only=True)
-        ws = wb.active
-        
-        valor = ws[celda].value
-        
-        # Debug: mostrar tipo de dato
-        if valor is not None:
-            tipo = type(valor).__name__
-            print(f"       DEBUG: Celda {celda} = {valor} (tipo: {tipo})")
-        else:
-            print(f"       DEBUG: Celda {celda} = None")
-        
-        wb.close()
-        
-        return valor
-    except Exception as e:
-        print(f"    ⚠️  Error al leer {celda}: {str(e)}")
+        valor = lectura_excel.leer_celda(archivo_excel, 'D1')
+    except Exception:
         return None
+    return str(valor).strip() if valor is not None else None
 
-def extraer_metricas():
-    '''Extrae todas las métricas de los Excel parciales'''
+def extraer_metricas(periodo_config, encabezado=None):
+    '''
+    Extrae todas las métricas. Lo registrado en el almacen del tablero
+    (comun.tablero) para el período se lee con una sola consulta; solo los
+    módulos sin registro (Excel de versiones anteriores) se leen de los
+    Excel parciales del mismo período (nombre con `periodo_config` o header
+    D1 igual a `encabezado`). Sin Excel del período, sus celdas van '-'.
+    '''
     print_header("EXTRAYENDO MÉTRICAS DE LOS REPORTES")
     
     metricas = {}
     periodo_detectado = None
+    registrados = tablero.valores_registrados(periodo_config)
     
     for modulo_key, config in MODULOS.items():
         print(f"\n📊 Módulo: {modulo_key}")
+        
+        registro = registrados.get(modulo_key)
+        if registro and all(celda in registro['valores'] for celda in config['celdas']):
+            print(f"   📒 Registrado en el tablero ({registro.get('actualizado', '-')}, origen: {registro.get('origen') or '-'})")
+            for celda, nombre in config['celdas'].items():
+                valor = registro['valores'][celda]
+                metricas[celda] = valor if valor is not None else '-'
+                print(f"   ✅ {celda} ({nombre}) = {metricas[celda]}")
+            if not periodo_detectado:
+                periodo_detectado = registro.get('encabezado')
+            continue
+        
+        print(f"   Sin registro en el tablero - leyendo Excel (versión anterior)")
         print(f"   Carpeta: {config['carpeta']}")
         
         # Buscar Excel más reciente
@@ -292,183 +309,59 @@ def extraer_metricas():
             config['carpeta'], 
             config['patron'], 
             patron_alt,
-            excluir_patron
+            excluir_patron,
+            periodo_config,
+            encabezado
         )
         
         if not excel_path:
-            print(f"   ⚠️  No se encontró archivo Excel - marcando como '-'")
+            print(f"   ⚠️  No se encontró archivo Excel del período - marcando como '-'")
             for celda in config['celdas'].keys():
                 metricas[celda] = '-'
             continue
         
         print(f"   ✅ Excel encontrado")
         
-        # Leer valores de las celdas
+        # Una sola lectura del Excel para todas sus celdas y el header D1
+        try:
+            valores = lectura_excel.leer_celdas(excel_path, ['D1'] + list(config['celdas']))
+        except Exception as e:
+            print(f"    ⚠️  Error al leer {os.path.basename(excel_path)}: {str(e)}")
+            valores = {}
+        
         for celda, nombre in config['celdas'].items():
-            print(f"   📈 Leyendo {celda} ({nombre})...")
-            valor = leer_valor_celda(excel_path, celda)
+            valor = valores.get(celda)
             metricas[celda] = valor if valor is not None else '-'
-            print(f"   ✅ {celda} = {metricas[celda]}")
+            tipo = type(valor).__name__ if valor is not None else '-'
+            print(f"   ✅ {celda} ({nombre}) = {metricas[celda]} (tipo: {tipo})")
         
         # Intentar detectar el período del header
-        if not periodo_detectado:
-            try:
-                wb = openpyxl.load_workbook(excel_path, data_only=True)
-                ws = wb.active
-                periodo_detectado = ws['D1'].value
-                wb.close()
-                print(f"   📅 Período detectado en header: {periodo_detectado}")
-            except:
-                pass
+        if not periodo_detectado and valores:
+            periodo_detectado = valores['D1']
+            print(f"   📅 Período detectado en header: {periodo_detectado}")
+    
+    if not periodo_detectado:
+        periodo_detectado = encabezado
     
     print("\n" + "─" * 70)
     print(f"📅 Período detectado: {periodo_detectado if periodo_detectado else 'No disponible'}")
+    print(f"📂 Excel abiertos: {lectura_excel.aperturas()}")
     
     return metricas, periodo_detectado
 
-def crear_estilos():
-    '''Crea los estilos para el Excel'''
-    estilos = {
-        'header': {
-            'font': Font(name='Calibri', size=11, bold=True, color='FFFFFF'),
-            'fill': PatternFill(start_color='366092', end_color='366092', fill_type='solid'),
-            'alignment': Alignment(horizontal='center', vertical='center'),
-            'border': Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-        },
-        'indicador': {
-            'font': Font(name='Calibri', size=11, bold=True),
-            'alignment': Alignment(horizontal='left', vertical='center'),
-            'border': Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-        },
-        'detalle': {
-            'font': Font(name='Calibri', size=11),
-            'alignment': Alignment(horizontal='left', vertical='center', wrap_text=True),
-            'border': Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-        },
-        'valor': {
-            'font': Font(name='Calibri', size=11),
-            'alignment': Alignment(horizontal='center', vertical='center'),
-            'border': Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-        }
-    }
-    return estilos
-
 def crear_dashboard_consolidado(metricas, periodo):
-    '''Crea el Excel consolidado con todas las métricas'''
+    '''Crea el Excel consolidado con todas las métricas (estructura de comun.tablero)'''
     print_header("CREANDO DASHBOARD CONSOLIDADO")
     
-    # Crear workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Dashboard Boti"
-    
-    # Obtener estilos
-    estilos = crear_estilos()
-    
-    # Configurar anchos de columna
-    ws.column_dimensions['B'].width = 35
-    ws.column_dimensions['C'].width = 50
-    ws.column_dimensions['D'].width = 20
-    
     # Header del período
     periodo_texto = periodo if periodo else datetime.now().strftime('%b-%Y')
     
-    # Crear estructura del dashboard
-    for item in ESTRUCTURA_DASHBOARD:
-        fila = item['fila']
-        
-        if item.get('es_header'):
-            # Fila de encabezado
-            ws[f'B{fila}'] = item['indicador']
-            ws[f'C{fila}'] = item['detalle']
-            ws[f'D{fila}'] = periodo_texto
-            
-            ws[f'B{fila}'].font = estilos['header']['font']
-            ws[f'B{fila}'].fill = estilos['header']['fill']
-            ws[f'B{fila}'].alignment = estilos['header']['alignment']
-            ws[f'B{fila}'].border = estilos['header']['border']
-            
-            ws[f'C{fila}'].font = estilos['header']['font']
-            ws[f'C{fila}'].fill = estilos['header']['fill']
-            ws[f'C{fila}'].alignment = estilos['header']['alignment']
-            ws[f'C{fila}'].border = estilos['header']['border']
-            
-            ws[f'D{fila}'].font = estilos['header']['font']
-            ws[f'D{fila}'].fill = estilos['header']['fill']
-            ws[f'D{fila}'].alignment = estilos['header']['alignment']
-            ws[f'D{fila}'].border = estilos['header']['border']
-        else:
-            # Filas de datos
-            ws[f'B{fila}'] = item['indicador']
-            ws[f'C{fila}'] = item['detalle']
-            
-            # Obtener valor de las métricas extraídas
-            celda_valor = f'D{fila}'
-            valor = metricas.get(celda_valor, '-')
-            ws[celda_valor] = valor
-            
-            # Aplicar estilos
-            ws[f'B{fila}'].font = estilos['indicador']['font']
-            ws[f'B{fila}'].alignment = estilos['indicador']['alignment']
-            ws[f'B{fila}'].border = estilos['indicador']['border']
-            
-            ws[f'C{fila}'].font = estilos['detalle']['font']
-            ws[f'C{fila}'].alignment = estilos['detalle']['alignment']
-            ws[f'C{fila}'].border = estilos['detalle']['border']
-            
-            ws[celda_valor].font = estilos['valor']['font']
-            ws[celda_valor].alignment = estilos['valor']['alignment']
-            ws[celda_valor].border = estilos['valor']['border']
-            
-            # Aplicar formato específico según la celda
-            if celda_valor == 'D11':  # Contenidos Consultados (texto multilínea Top 10)
-                ws[celda_valor].alignment = Alignment(wrap_text=True, vertical='top')
-            elif celda_valor == 'D13':  # No Entendimiento (porcentaje)
-                ws[celda_valor].number_format = '0.00%'
-            elif celda_valor == 'D14':  # Efectividad (porcentaje)
-                ws[celda_valor].number_format = '0.00%'
-            elif celda_valor == 'D15':  # CES (número decimal)
-                ws[celda_valor].number_format = '0.00'
-            elif celda_valor == 'D16':  # CSAT (porcentaje)
-                ws[celda_valor].number_format = '0.00%'
-            elif celda_valor == 'D17':  # Availability (porcentaje)
-                ws[celda_valor].number_format = '0.00%'
-    
-    # Ajustar altura de filas
-    for fila in range(1, 18):
-        if fila == 1:
-            ws.row_dimensions[fila].height = 30
-        elif fila == 11:
-            ws.row_dimensions[fila].height = 180  # Top 10 multilínea
-        else:
-            ws.row_dimensions[fila].height = 25
-    
     # Generar nombre de archivo basado en el periodo del config
     periodo_config = leer_config_fechas()
     nombre_archivo = f'Boti_Consolidado_{periodo_config}.xlsx'
     
     # Guardar en raíz del proyecto
-    wb.save(nombre_archivo)
+    tablero.escribir_tablero(nombre_archivo, metricas, periodo_texto)
     print(f"✅ Dashboard consolidado creado: {nombre_archivo}")
     
     return nombre_archivo
@@ -558,7 +451,7 @@ def main():
     print(f"📝 Nombre del archivo: Boti_Consolidado_{periodo_config}.xlsx")
     
     # Extraer métricas
-    metricas, periodo = extraer_metricas()
+    metricas, periodo = extraer_metricas(periodo_config, encabezado_config())
     
     # Crear dashboard consolidado
     nombre_archivo = crear_dashboard_consolidado(metricas, periodo)
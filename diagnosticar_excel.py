@@ -11,7 +11,8 @@ Uso:
 """
 import os
 import glob
-import openpyxl
+
+from comun import lectura_excel
 
 # Módulos a verificar
 MODULOS = {
@@ -70,30 +71,26 @@ def buscar_excel_mas_reciente(carpeta, patron, patron_alternativo=None):
     return archivos[0]
 
 def leer_todas_celdas_relevantes(archivo_excel):
-    """Lee todas las celdas relevantes de un Excel"""
+    """Lee todas las celdas relevantes de un Excel (B1:D17, una sola lectura)"""
     try:
-        wb = openpyxl.load_workbook(archivo_excel, data_only=True)
-        ws = wb.active
+        valores = lectura_excel.leer_celdas(
+            archivo_excel,
+            [f'{columna}{i}' for i in range(1, 18) for columna in 'BCD']
+        )
         
         # Leer header
-        header_d1 = ws['D1'].value
+        header_d1 = valores['D1']
         
         # Leer celdas de datos (D2 a D17)
         celdas = {}
         for i in range(2, 18):
             celda = f'D{i}'
-            valor = ws[celda].value
-            indicador_b = ws[f'B{i}'].value
-            detalle_c = ws[f'C{i}'].value
-            
             celdas[celda] = {
-                'valor': valor,
-                'indicador': indicador_b,
-                'detalle': detalle_c
+                'valor': valores[celda],
+                'indicador': valores[f'B{i}'],
+                'detalle': valores[f'C{i}']
             }
         
-        wb.close()
-        
         return header_d1, celdas
     except Exception as e:
         return None, {'error': str(e)}
@@ -200,6 +197,7 @@ def main():
     print(f"📊 Módulos verificados: {total}")
     print(f"✅ Con Excel encontrado: {exitosos}")
     print(f"❌ Sin Excel: {total - exitosos}")
+    print(f"📂 Excel abiertos: {lectura_excel.aperturas()}")
     
     if exitosos < total:
         print("\n⚠️  PROBLEMA DETECTADO:")
@@ -6,114 +6,243 @@ Script Maestro - Ejecuta todos los módulos de Metricas_Boti_Mensual
 Este script:
 1. Verifica autenticación AWS
 2. Lee configuración de fechas
-3. Ejecuta todos los módulos secuencialmente
-4. Genera reporte consolidado
+3. Ejecuta los módulos en paralelo respetando sus dependencias ('depende_de')
+4. Genera reporte consolidado (consolidar_excel.py, al final de todo)
 5. Muestra resumen de ejecución
 
+Los módulos sin dependencias entre sí (la mayoría son queries Athena que
+pasan minutos esperando al servidor) corren a la vez en un pool acotado de
+workers. La salida de cada módulo se muestra con un prefijo [Script] y se
+guarda además en logs/<timestamp>/<Script>.log.
+
+Los módulos marcados con 'en_proceso' exponen run(contexto) y se ejecutan
+como librería dentro de este mismo proceso: se importan una sola vez,
+comparten un ContextoAthena (una sola verificación STS, credenciales y
+configuración de awswrangler resueltas una vez) y no pagan el arranque de
+un intérprete nuevo con pandas/boto3/awswrangler por módulo. Antes de
+arrancarlos se envían a Athena TODAS sus queries (consultas() de cada
+módulo) para que corran a la vez del lado del servidor. El resto
+(Contenidos_Bot, WhatsApp, No_Entendidos.py, consolidar_excel) sigue
+corriendo como subproceso.
+
 Uso:
-    python run_all.py
+    python run_all.py              # 4 módulos en paralelo (default)
+    python run_all.py --jobs 6     # hasta 6 módulos en paralelo
+    python run_all.py --jobs 1     # secuencial (comportamiento anterior)
+    python run_all.py --subprocesos   # cada módulo en su propio intérprete
+    python run_all.py --sin-cache     # ignorar la cache local de resultados Athena
+    python run_all.py --sin-diario    # rango personalizado: query completa, sin el almacen diario
+    python run_all.py --con-no-entendidos   # correr también athena_connector -> No_Entendidos
+
+No_Entendidos se corre a mano por default (athena_connector.py pide
+revalidar las credenciales antes de las queries). Con --con-no-entendidos
+entra al pool como cualquier otro módulo: sin pausas, y las 3 queries de
+athena_connector se envían por adelantado junto con las del resto.
+
+Backfill de varios meses (un consolidado por mes en una sola corrida):
+    python run_all.py --periodos 2025-06 2025-09 2025-10
+    python run_all.py --desde 2025-06 --hasta 2026-05
+
+En el backfill corren los módulos Athena en proceso y el consolidado, mes
+por mes, sin tocar config_fechas.txt. Antes de arrancar, las queries que
+se pueden agrupar por mes (consultas_por_mes() de cada módulo) se ejecutan
+UNA vez para todos los meses y el resultado de cada mes queda en la cache
+local (comun/por_mes.py): un backfill de 12 meses escanea esas tablas una
+vez, no doce.
 '''
+import argparse
+import contextlib
+import importlib.util
+import io
 import subprocess
 import sys
 import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 import time
 
+from comun import cache_consultas, diario, por_mes, tablero
+from comun.athena import ejecutar_query, elegir_transporte
+from comun.contexto import ContextoAthena
+from comun.gestor_consultas import GestorConsultas
+
 # ==================== CONFIGURACIÓN ====================
 MODULOS = [
     {
         'nombre': 'Usuarios y Conversaciones',
         'carpeta': 'Metricas_Boti_Conversaciones_Usuarios',
         'script': 'Usuarios_Conversaciones.py',
+        'en_proceso': True,
         'celdas': 'D2, D3',
-        'requiere_aws': True
+        'requiere_aws': True,
+        'depende_de': []
     },
     {
         'nombre': 'Pushes Enviadas',
         'carpeta': 'Pushes_Enviadas',
         'script': 'Pushes_Enviadas.py',
+        'en_proceso': True,
         'celdas': 'D6',
-        'requiere_aws': True
+        'requiere_aws': True,
+        'depende_de': []
     },
     {
         'nombre': 'Sesiones Abiertas por Pushes',
         'carpeta': 'Sesiones_Abiertas_Pushes',
         'script': 'Sesiones_Abiertas_porPushes.py',
+        'en_proceso': True,
         'celdas': 'D4',
-        'requiere_aws': True
+        'requiere_aws': True,
+        'depende_de': []
     },
     {
         'nombre': 'Sesiones Alcanzadas por Pushes',
         'carpeta': 'Sesiones_alcanzadas_pushes',
         'script': 'Sesiones_Alcanzadas.py',
+        'en_proceso': True,
         'celdas': 'D5',
-        'requiere_aws': True
+        'requiere_aws': True,
+        'depende_de': []
     },
     {
         'nombre': 'BAX Sesiones',
         'carpeta': 'BAX-sesiones',
         'script': 'BAX_sesiones.py',
+        'en_proceso': True,
         'celdas': 'Excel propio (no escribe en el consolidado)',
-        'requiere_aws': True
+        'requiere_aws': True,
+        'depende_de': []
     },
     {
         'nombre': 'Contenidos del Bot',
         'carpeta': 'Contenidos_Bot',
         'script': 'Contenidos_Bot.py',
         'celdas': 'D7, D8',
-        'requiere_aws': False
+        'requiere_aws': False,
+        'depende_de': []
     },
     {
         'nombre': 'Contenidos mas disparados',
         'carpeta': 'Contenidos_mas_disparados',
         'script': 'Contenidos_mas_disparados.py',
+        'en_proceso': True,
         'celdas': 'D11',
-        'requiere_aws': True
+        'requiere_aws': True,
+        'depende_de': []
     },
     {
         'nombre': 'Temas Consultados (Tablero mensajes)',
         'carpeta': 'Temas_Consultados',
         'script': 'Temas_Consultados.py',
+        'en_proceso': True,
         'celdas': 'Excel propio (no escribe en el consolidado)',
-        'requiere_aws': True
+        'requiere_aws': True,
+        'depende_de': []
+    },
+    {
+        'nombre': 'No Entendimiento - Descarga Athena',
+        'carpeta': 'No_Entendidos',
+        'script': 'athena_connector.py',
+        'celdas': 'CSVs temporales (temp/) para No_Entendidos.py',
+        'requiere_aws': True,
+        'en_proceso': True,
+        'depende_de': []
     },
     {
         'nombre': 'No Entendimiento',
         'carpeta': 'No_Entendidos',
-        'scripts': ['athena_connector.py', 'No_Entendidos.py'],  # Ejecutar ambos en orden
+        'script': 'No_Entendidos.py',
         'celdas': 'D13',
-        'requiere_aws': True
+        'requiere_aws': False,
+        'depende_de': ['athena_connector.py']  # Lee los CSVs que descarga el connector
     },
     {
         'nombre': 'Feedback - Efectividad',
         'carpeta': 'Feedback_Efectividad',
         'script': 'Feedback_Efectividad.py',
+        'en_proceso': True,
         'celdas': 'D14',
-        'requiere_aws': True
+        'requiere_aws': True,
+        'depende_de': []
     },
     {
         'nombre': 'Feedback - CES',
         'carpeta': 'Feedback_CES',
         'script': 'Feedback_CES.py',
+        'en_proceso': True,
         'celdas': 'D15',
-        'requiere_aws': True
+        'requiere_aws': True,
+        'depende_de': []
     },
     {
         'nombre': 'Feedback - CSAT',
         'carpeta': 'Feedback_CSAT',
         'script': 'Feedback_CSAT.py',
+        'en_proceso': True,
         'celdas': 'D16',
-        'requiere_aws': True
+        'requiere_aws': True,
+        'depende_de': []
     },
     {
         'nombre': 'Disponibilidad WhatsApp',
         'carpeta': 'Metricas_Boti_Disponibilidad',
         'script': 'WhatsApp_Availability.py',
         'celdas': 'D17',
-        'requiere_aws': False
+        'requiere_aws': False,
+        'depende_de': []
+    },
+    {
+        'nombre': 'Consolidado',
+        'carpeta': '.',
+        'script': 'consolidar_excel.py',
+        'celdas': 'Boti_Consolidado_[periodo].xlsx',
+        'requiere_aws': False,
+        # Va al final de todo: espera a cada módulo que llena una celda del
+        # consolidado (BAX y Temas_Consultados generan Excel propio y no
+        # bloquean la consolidación si fallan)
+        'depende_de': [
+            'Usuarios_Conversaciones.py', 'Pushes_Enviadas.py',
+            'Sesiones_Abiertas_porPushes.py', 'Sesiones_Alcanzadas.py',
+            'Contenidos_Bot.py', 'Contenidos_mas_disparados.py',
+            'No_Entendidos.py', 'Feedback_Efectividad.py', 'Feedback_CES.py',
+            'Feedback_CSAT.py', 'WhatsApp_Availability.py'
+        ]
     }
 ]
 
+# Cantidad de módulos que corren a la vez (se puede cambiar con --jobs N)
+JOBS_DEFAULT = 4
+
+# Carpeta donde se guarda un log por módulo (logs/<timestamp>/<Script>.log)
+CARPETA_LOGS = 'logs'
+
+# Variable de entorno que indica a los módulos que corren bajo run_all.py:
+# no deben pedir ENTER (run_all.py ya verificó las credenciales AWS y la
+# salida de los módulos en paralelo no tiene una terminal interactiva)
+ENV_RUN_ALL = 'BOTI_RUN_ALL'
+
+# Variable de entorno con la ruta del config de fechas del período que se
+# está procesando en un backfill (la lee consolidar_excel.py)
+ENV_CONFIG_FECHAS = 'BOTI_CONFIG_FECHAS'
+
+# Módulos que en un backfill no se recalculan: miden el estado del momento
+# (TSV exportados de Botmaker, disponibilidad actual) o se corren a mano.
+# El consolidado toma lo que tengan registrado para cada mes.
+SIN_BACKFILL = 'Contenidos_Bot, WhatsApp_Availability y No_Entendidos'
+
+# Athena compartido por los módulos que corren en proceso (mismos valores
+# que el CONFIG de cada módulo)
+CONFIG_ATHENA = {
+    'region': 'us-east-1',
+    'workgroup': 'Production-caba-piba-athena-boti-group',
+    'database': 'caba-piba-consume-zone-db'
+}
+
+# Lock para que las líneas de módulos paralelos no se mezclen en la terminal
+_print_lock = threading.Lock()
+
 # ==================== FUNCIONES ====================
 
 def print_header(text, char='='):
@@ -259,91 +388,254 @@ def verificar_tsv_contenidos_bot(mes_nombre, anio):
 
 
 def verificar_no_entendidos_ejecutado(mes_nombre, anio):
-    '''Verifica si No_Entendidos ya fue ejecutado para el período'''
-    archivo_esperado = f"No_Entendidos/output/no_entendimiento_{mes_nombre}_{anio}.xlsx"
+    '''
+    Verifica si No_Entendidos ya fue ejecutado para el período: D13
+    registrado en el tablero (o el Excel de dashboard de versiones anteriores)
+    '''
+    registro = tablero.leer_registro(f"{mes_nombre}_{anio}", 'no_entendimiento')
+    archivo_anterior = f"No_Entendidos/output/no_entendimiento_{mes_nombre}_{anio}.xlsx"
 
-    if os.path.exists(archivo_esperado):
-        print(f"✅ No_Entendidos ya ejecutado: {archivo_esperado}")
+    if registro and 'D13' in registro['valores']:
+        print(f"✅ No_Entendidos ya ejecutado: D13 registrado en el tablero ({registro.get('actualizado', '-')})")
+        return True
+    elif os.path.exists(archivo_anterior):
+        print(f"✅ No_Entendidos ya ejecutado: {archivo_anterior}")
         return True
     else:
         print(f"❌ No_Entendidos NO fue ejecutado para {mes_nombre} {anio}")
-        print(f"   Archivo esperado: {archivo_esperado}")
+        print(f"   Registro esperado: D13 de {mes_nombre}_{anio} en tablero/metricas.sqlite")
         return False
 
-def ejecutar_modulo(modulo, numero, total):
-    '''Ejecuta un módulo específico (soporta uno o múltiples scripts)'''
-    print_section(f"[{numero}/{total}] {modulo['nombre']}")
-    print(f"📊 Celdas Excel: {modulo['celdas']}")
-    print(f"📂 Carpeta: {modulo['carpeta']}")
+def clave_modulo(modulo):
+    '''Clave con la que otros módulos lo referencian en 'depende_de' (nombre del script)'''
+    if 'scripts' in modulo:
+        return modulo['scripts'][-1]
+    return modulo['script']
+
+def validar_dependencias(modulos):
+    '''
+    Verifica que cada 'depende_de' apunte a un script existente en MODULOS
+    y que no haya ciclos. Retorna la lista de errores (vacía si está todo OK).
+    '''
+    errores = []
+    claves = {clave_modulo(m): m for m in modulos}
+
+    for modulo in modulos:
+        for dep in modulo.get('depende_de', []):
+            if dep not in claves:
+                errores.append(f"{modulo['nombre']}: dependencia desconocida '{dep}'")
+
+    # Detección de ciclos (DFS con marcas: 1 = visitando, 2 = terminado)
+    marcas = {}
+
+    def visitar(clave, camino):
+        if marcas.get(clave) == 2:
+            return
+        if marcas.get(clave) == 1:
+            errores.append("Ciclo de dependencias: " + " → ".join(camino + [clave]))
+            return
+        marcas[clave] = 1
+        for dep in claves[clave].get('depende_de', []):
+            if dep in claves:
+                visitar(dep, camino + [clave])
+        marcas[clave] = 2
 
+    for clave in claves:
+        visitar(clave, [])
+
+    return errores
+
+def emitir(prefijo, texto, log_file=None):
+    '''Imprime una línea con el prefijo del módulo y la agrega a su log'''
+    # Directo a la terminal real: sys.stdout puede ser _SalidaPorThread
+    with _print_lock:
+        print(f"[{prefijo}] {texto}", file=sys.__stdout__, flush=True)
+    if log_file is not None:
+        log_file.write(texto + "\n")
+        log_file.flush()
+
+class _SalidaPorThread:
+    '''
+    Reemplaza a sys.stdout / sys.stderr mientras corren módulos en proceso.
+
+    Cada thread que ejecuta un módulo registra su prefijo y su log: lo que
+    ese módulo imprime sale línea por línea con emitir(), igual que la salida
+    de un subproceso. Los threads sin registro escriben en el stream original.
+    '''
+    def __init__(self, original):
+        self.original = original
+        self._locales = threading.local()
+
+    def registrar(self, prefijo, log_file):
+        self._locales.destino = (prefijo, log_file)
+        self._locales.pendiente = ''
+
+    def desregistrar(self):
+        destino = getattr(self._locales, 'destino', None)
+        if destino and self._locales.pendiente:
+            emitir(destino[0], self._locales.pendiente, destino[1])
+        self._locales.destino = None
+
+    def write(self, texto):
+        destino = getattr(self._locales, 'destino', None)
+        if destino is None:
+            return self.original.write(texto)
+        *lineas, self._locales.pendiente = (self._locales.pendiente + texto).split('\n')
+        for linea in lineas:
+            emitir(destino[0], linea.rstrip('\r'), destino[1])
+        return len(texto)
+
+    def flush(self):
+        self.original.flush()
+
+    def __getattr__(self, nombre):
+        return getattr(self.original, nombre)
+
+def importar_modulos_en_proceso(modulos):
+    '''
+    Importa una sola vez (en el thread principal) los scripts de los módulos
+    marcados 'en_proceso'. Retorna (cargados, errores): clave -> módulo
+    importado y clave -> mensaje para los que no se pudieron importar.
+    '''
+    cargados = {}
+    errores = {}
+    for modulo in modulos:
+        if not modulo.get('en_proceso'):
+            continue
+        clave = clave_modulo(modulo)
+        ruta = os.path.abspath(os.path.join(modulo['carpeta'], modulo['script']))
+        # Nombre único: varios módulos podrían tener scripts homónimos
+        nombre = f"boti_{os.path.splitext(clave)[0].lower()}"
+        try:
+            spec = importlib.util.spec_from_file_location(nombre, ruta)
+            libreria = importlib.util.module_from_spec(spec)
+            sys.modules[nombre] = libreria
+            spec.loader.exec_module(libreria)
+            if not hasattr(libreria, 'run'):
+                raise AttributeError(f"{modulo['script']} no define run(contexto)")
+            cargados[clave] = libreria
+        except Exception as e:
+            sys.modules.pop(nombre, None)
+            errores[clave] = f"No se pudo importar {modulo['script']}: {str(e)}"
+    return cargados, errores
+
+def enviar_consultas_anticipadas(librerias, contexto):
+    '''
+    Envía a Athena, todas a la vez, las queries de los módulos en proceso
+    (función consultas() de cada uno). Athena las ejecuta en paralelo; cada
+    módulo después solo espera la suya dentro de ejecutar_query().
+    consultas() retorna SQLs (transporte = elegir_transporte) o tuplas
+    (sql, transporte) cuando el módulo necesita un transporte fijo.
+    '''
+    if contexto.gestor is None:
+        contexto.gestor = GestorConsultas(contexto)
+    enviadas = set()
+    en_cache = set()
+    for clave, libreria in librerias.items():
+        if not hasattr(libreria, 'consultas'):
+            continue
+        try:
+            # consultas() lee config_fechas.txt y lo informa: acá no interesa
+            with contextlib.redirect_stdout(io.StringIO()):
+                queries = libreria.consultas()
+            for query in queries:
+                query, transporte = query if isinstance(query, tuple) else (query, elegir_transporte(query))
+                if query in enviadas or query in en_cache:
+                    continue   # Misma query que otro módulo (ej: query paquete)
+                # Lo que ya está en la cache local no se vuelve a ejecutar
+                if cache_consultas.esta_en_cache(query, contexto.database, contexto.workgroup):
+                    en_cache.add(query)
+                    continue
+                if transporte == 'ctas':
+                    continue   # CTAS no pasa por el gestor: lo ejecuta el módulo
+                contexto.gestor.enviar(query, transporte=transporte)
+                enviadas.add(query)
+        except Exception as e:
+            print(f"⚠️  {clave}: no se pudieron enviar sus queries por adelantado ({str(e)})")
+    print(f"☁️  {len(enviadas)} queries enviadas a Athena por adelantado ({len(en_cache)} ya estaban en la cache local)")
+
+def ejecutar_modulo(modulo, numero, total, carpeta_logs, libreria=None, contexto=None):
+    '''
+    Ejecuta un módulo específico (soporta uno o múltiples scripts).
+    Si se pasa `libreria` (el script ya importado), se llama a
+    libreria.run(contexto) en este mismo proceso en lugar de lanzar un
+    subproceso.
+    '''
     # Determinar si hay uno o múltiples scripts
     if 'scripts' in modulo:
         scripts = modulo['scripts']
-        print(f"🐍 Scripts: {', '.join(scripts)}")
     else:
         scripts = [modulo['script']]
-        print(f"🐍 Script: {modulo['script']}")
 
-    if modulo['requiere_aws']:
-        print(f"🔐 Requiere AWS: Sí")
-    else:
-        print(f"🔐 Requiere AWS: No")
+    prefijo = os.path.splitext(clave_modulo(modulo))[0]
+    ruta_log = os.path.join(carpeta_logs, f"{prefijo}.log")
 
-    print("\n⏳ Ejecutando...")
+    with _print_lock:
+        print_section(f"[{numero}/{total}] {modulo['nombre']}")
+        print(f"📊 Celdas Excel: {modulo['celdas']}")
+        print(f"📂 Carpeta: {modulo['carpeta']}")
+        print(f"🐍 Script{'s' if len(scripts) > 1 else ''}: {', '.join(scripts)}")
+        print(f"🔐 Requiere AWS: {'Sí' if modulo['requiere_aws'] else 'No'}")
+        print(f"⚙️  Modo: {'en proceso' if libreria else 'subproceso'}")
+        print(f"📝 Log: {ruta_log}")
+        print("\n⏳ Ejecutando...", flush=True)
 
     inicio = time.time()
 
+    if libreria is not None:
+        return ejecutar_en_proceso(modulo, libreria, contexto, prefijo, ruta_log, inicio)
+
     try:
-        # Cambiar al directorio del módulo
-        os.chdir(modulo['carpeta'])
-
-        # Ejecutar todos los scripts en orden
-        # IMPORTANTE: NO usar capture_output=True. Si capturamos, el output del
-        # subprocess se acumula en memoria y solo se ve cuando el subproceso
-        # termina. En scripts largos (ej: Contenidos_mas_disparados con su query
-        # Athena de varios minutos) eso da la sensacion de que se trabo.
-        # Dejamos que stdout/stderr fluyan al terminal del run_all en tiempo
-        # real (PYTHONUNBUFFERED=1 fuerza que Python no buferee la salida).
+        # Cada línea del subproceso se lee apenas se escribe y se re-emite con
+        # el prefijo del módulo, así la salida de módulos paralelos se puede
+        # seguir en vivo sin mezclarse (PYTHONUNBUFFERED=1 + -u fuerzan que el
+        # hijo no buferee; PYTHONIOENCODING evita errores con emojis en pipes).
+        # Se usa cwd= en lugar de os.chdir: el directorio de trabajo es global
+        # al proceso y los módulos corren en threads distintos.
         env_hijo = os.environ.copy()
         env_hijo['PYTHONUNBUFFERED'] = '1'
+        env_hijo['PYTHONIOENCODING'] = 'utf-8'
+        env_hijo[ENV_RUN_ALL] = '1'
 
-        for idx, script in enumerate(scripts, 1):
-            if len(scripts) > 1:
-                print(f"\n  [{idx}/{len(scripts)}] Ejecutando {script}...")
-
-            result = subprocess.run(
-                [sys.executable, '-u', script],   # -u tambien fuerza unbuffered
-                env=env_hijo
-                # SIN capture_output: la salida fluye al terminal en vivo
-            )
-
-            if result.returncode != 0:
-                # Volver al directorio raíz
-                os.chdir('..')
-                fin = time.time()
-                duracion = fin - inicio
-
-                # El output del subprocess ya se vio en pantalla en tiempo real;
-                # aca solo reportamos el fallo.
-                print(f"  ❌ Error en {script} (returncode={result.returncode})")
-                print(f"     Revisa la salida del script arriba para diagnosticar.")
-                return {
-                    'nombre': modulo['nombre'],
-                    'exitoso': False,
-                    'duracion': duracion,
-                    'mensaje': f'Error en {script}'
-                }
-            else:
+        with open(ruta_log, 'w', encoding='utf-8') as log_file:
+            for idx, script in enumerate(scripts, 1):
                 if len(scripts) > 1:
-                    print(f"  ✅ {script} completado")
+                    emitir(prefijo, f"[{idx}/{len(scripts)}] Ejecutando {script}...", log_file)
 
-        # Volver al directorio raíz
-        os.chdir('..')
+                proceso = subprocess.Popen(
+                    [sys.executable, '-u', script],   # -u tambien fuerza unbuffered
+                    cwd=modulo['carpeta'],
+                    env=env_hijo,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    encoding='utf-8',
+                    errors='replace'
+                )
+                for linea in proceso.stdout:
+                    emitir(prefijo, linea.rstrip('\n'), log_file)
+                returncode = proceso.wait()
 
-        fin = time.time()
-        duracion = fin - inicio
+                if returncode != 0:
+                    duracion = time.time() - inicio
 
-        print(f"✅ Completado en {duracion:.1f} segundos")
+                    # El output del subprocess ya se vio en pantalla en tiempo real;
+                    # aca solo reportamos el fallo.
+                    emitir(prefijo, f"❌ Error en {script} (returncode={returncode})", log_file)
+                    emitir(prefijo, f"   Revisa la salida del script arriba o en {ruta_log}.")
+                    return {
+                        'nombre': modulo['nombre'],
+                        'exitoso': False,
+                        'duracion': duracion,
+                        'mensaje': f'Error en {script}'
+                    }
+                elif len(scripts) > 1:
+                    emitir(prefijo, f"✅ {script} completado", log_file)
+
+        duracion = time.time() - inicio
+
+        emitir(prefijo, f"✅ Completado en {duracion:.1f} segundos")
         return {
             'nombre': modulo['nombre'],
             'exitoso': True,
@@ -352,10 +644,8 @@ def ejecutar_modulo(modulo, numero, total):
         }
 
     except Exception as e:
-        os.chdir('..')  # Asegurar que volvemos a raíz
-        fin = time.time()
-        duracion = fin - inicio
-        print(f"❌ Excepción: {str(e)}")
+        duracion = time.time() - inicio
+        emitir(prefijo, f"❌ Excepción: {str(e)}")
         return {
             'nombre': modulo['nombre'],
             'exitoso': False,
@@ -363,6 +653,271 @@ def ejecutar_modulo(modulo, numero, total):
             'mensaje': str(e)
         }
 
+def ejecutar_en_proceso(modulo, libreria, contexto, prefijo, ruta_log, inicio):
+    '''Llama a run(contexto) del módulo ya importado, capturando su salida'''
+    exitoso = False
+    mensaje = 'OK'
+    with open(ruta_log, 'w', encoding='utf-8') as log_file:
+        for salida in (sys.stdout, sys.stderr):
+            salida.registrar(prefijo, log_file)
+        try:
+            exitoso = bool(libreria.run(contexto))
+            if not exitoso:
+                mensaje = f"Error en {modulo['script']}"
+        except SystemExit as e:
+            # Algunos caminos de error de los módulos todavía llaman a sys.exit()
+            exitoso = e.code in (None, 0)
+            if not exitoso:
+                mensaje = f"Error en {modulo['script']} (exit={e.code})"
+        except Exception as e:
+            traceback.print_exc()
+            mensaje = f"Excepción: {str(e)}"
+        finally:
+            for salida in (sys.stdout, sys.stderr):
+                salida.desregistrar()
+
+        duracion = time.time() - inicio
+        if exitoso:
+            emitir(prefijo, f"✅ Completado en {duracion:.1f} segundos")
+        else:
+            emitir(prefijo, f"❌ {mensaje}", log_file)
+            emitir(prefijo, f"   Revisa la salida del módulo arriba o en {ruta_log}.")
+
+    return {
+        'nombre': modulo['nombre'],
+        'exitoso': exitoso,
+        'duracion': duracion,
+        'mensaje': mensaje
+    }
+
+def ejecutar_en_paralelo(modulos, jobs, resueltos, carpeta_logs, librerias=None, contexto=None):
+    '''
+    Ejecuta los módulos en un pool de `jobs` workers respetando 'depende_de'.
+
+    Un módulo arranca apenas terminaron bien todas sus dependencias; si alguna
+    falló, se omite (y con él, todo lo que dependa de él). `resueltos` mapea
+    clave -> exitoso para dependencias resueltas fuera de esta corrida
+    (ej: No_Entendidos, que se ejecuta a mano). `librerias` mapea clave ->
+    script ya importado para los módulos que corren en proceso con `contexto`.
+
+    Retorna la lista de resultados en el orden en que fueron terminando.
+    '''
+    estado = dict(resueltos)   # clave -> True/False cuando ya se resolvió
+    pendientes = list(modulos)
+    en_curso = {}
+    resultados = []
+    total = len(modulos)
+    numero = 0
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pendientes or en_curso:
+            # Omitir en cascada los módulos con alguna dependencia fallida
+            hubo_cambios = True
+            while hubo_cambios:
+                hubo_cambios = False
+                for modulo in list(pendientes):
+                    fallidas = [d for d in modulo['depende_de'] if estado.get(d) is False]
+                    if fallidas:
+                        pendientes.remove(modulo)
+                        estado[clave_modulo(modulo)] = False
+                        resultados.append({
+                            'nombre': modulo['nombre'],
+                            'exitoso': False,
+                            'duracion': 0,
+                            'mensaje': f"Omitido: falló {', '.join(fallidas)}"
+                        })
+                        with _print_lock:
+                            print(f"\n⏭️  {modulo['nombre']} omitido (falló {', '.join(fallidas)})")
+                        hubo_cambios = True
+
+            # Lanzar todo lo que ya tiene sus dependencias resueltas
+            for modulo in list(pendientes):
+                if all(estado.get(d) is True for d in modulo['depende_de']):
+                    pendientes.remove(modulo)
+                    numero += 1
+                    libreria = (librerias or {}).get(clave_modulo(modulo))
+                    futuro = pool.submit(ejecutar_modulo, modulo, numero, total, carpeta_logs,
+                                         libreria, contexto)
+                    en_curso[futuro] = modulo
+
+            if not en_curso:
+                # Quedan módulos cuyas dependencias nunca se van a resolver
+                for modulo in pendientes:
+                    resultados.append({
+                        'nombre': modulo['nombre'],
+                        'exitoso': False,
+                        'duracion': 0,
+                        'mensaje': 'Omitido: dependencias sin resolver'
+                    })
+                break
+
+            terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                modulo = en_curso.pop(futuro)
+                resultado = futuro.result()
+                estado[clave_modulo(modulo)] = resultado['exitoso']
+                resultados.append(resultado)
+
+    return resultados
+
+def meses_a_procesar(args):
+    '''
+    Meses del backfill ((anio, mes) ordenados, sin repetir) según
+    --periodos o --desde/--hasta. Lista vacía si es una corrida normal.
+    '''
+    if args.periodos:
+        return sorted(set(por_mes.parsear_mes(p) for p in args.periodos))
+    if args.desde:
+        return por_mes.meses_entre(por_mes.parsear_mes(args.desde), por_mes.parsear_mes(args.hasta))
+    return []
+
+def escribir_config_periodo(carpeta, mes):
+    '''config_fechas.txt de un mes del backfill (no se toca el de la raíz)'''
+    ruta = os.path.abspath(os.path.join(carpeta, 'config_fechas.txt'))
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write("# Generado por run_all.py (backfill)\n")
+        f.write(f"MES={mes[1]}\n")
+        f.write(f"AÑO={mes[0]}\n")
+    return ruta
+
+def precargar_consultas_por_mes(librerias, contexto, meses):
+    '''
+    Backfill: ejecuta UNA query agrupada por mes por métrica
+    (consultas_por_mes() de cada módulo; las que comparten query, como la
+    query paquete, se ejecutan una vez) y guarda el resultado de cada mes en
+    la cache local con la clave de la query individual de ese mes.
+    '''
+    if not cache_consultas.habilitada():
+        print("⚠️  Cache local deshabilitada (--sin-cache): cada mes hace sus propias queries")
+        return
+
+    agrupadas = {}   # query agrupada -> {mes: query del mes}
+    for clave, libreria in librerias.items():
+        if not hasattr(libreria, 'consultas_por_mes'):
+            continue
+        try:
+            for query, consultas_mes in libreria.consultas_por_mes(meses):
+                faltan = [q for q in consultas_mes.values()
+                          if not cache_consultas.esta_en_cache(q, contexto.database, contexto.workgroup)]
+                if faltan:
+                    agrupadas[query] = consultas_mes
+        except Exception as e:
+            print(f"⚠️  {clave}: no se pudo armar su query agrupada por mes ({str(e)})")
+
+    if not agrupadas:
+        print("☁️  Queries agrupadas por mes: todos los meses ya estaban en la cache local")
+        return
+
+    # Todas a la vez del lado de Athena; después se espera cada una
+    for query in agrupadas:
+        contexto.gestor.enviar(query, transporte=elegir_transporte(query))
+    print(f"☁️  {len(agrupadas)} queries agrupadas por mes enviadas a Athena ({len(meses)} meses cada una)")
+
+    for query, consultas_mes in agrupadas.items():
+        try:
+            df = ejecutar_query(contexto, query)
+            resultados = por_mes.repartir(df, list(consultas_mes))
+        except Exception as e:
+            print(f"⚠️  Query agrupada falló ({str(e)}): esos meses harán su propia query")
+            continue
+        for mes, df_mes in resultados.items():
+            cache_consultas.guardar_dataframe(consultas_mes[mes], contexto.database, contexto.workgroup, df_mes)
+        print(f"   ✅ {len(resultados)}/{len(consultas_mes)} meses precargados en la cache")
+
+def ejecutar_backfill(args, meses):
+    '''
+    Corre los módulos Athena en proceso y el consolidado para cada mes de
+    `meses`, en orden, con el config de fechas de cada mes. Un
+    Boti_Consolidado_<mes>_<año>.xlsx por mes. Retorna {clave_periodo: resultados}.
+    '''
+    print_section(f"BACKFILL: {len(meses)} meses ({por_mes.etiqueta(meses[0])} a {por_mes.etiqueta(meses[-1])})")
+    print(f"ℹ️  No se recalculan: {SIN_BACKFILL}. El consolidado usa lo registrado para cada mes.")
+
+    contexto = ContextoAthena(
+        CONFIG_ATHENA['region'], CONFIG_ATHENA['workgroup'], CONFIG_ATHENA['database']
+    )
+    print("🔐 Verificando autenticación AWS...")
+    if not contexto.verificar_credenciales():
+        print("\n❌ Autenticación AWS requerida. Ejecutar:")
+        print("   aws-azure-login --profile default --mode=gui")
+        print("\nAbortando.")
+        sys.exit(1)
+    contexto.configurar_wrangler()
+    contexto.gestor = GestorConsultas(contexto)
+
+    # El backfill no recalcula No_Entendidos (athena_connector también corre en proceso)
+    modulos_backfill = [m for m in MODULOS if m.get('en_proceso') and m['carpeta'] != 'No_Entendidos']
+    librerias, errores_import = importar_modulos_en_proceso(modulos_backfill)
+    for clave, error in errores_import.items():
+        # Sin importar no se le puede indicar el mes: queda como fallido
+        print(f"❌ {error} → no se puede incluir en el backfill")
+    modulos_backfill += [m for m in MODULOS if clave_modulo(m) == 'consolidar_excel.py']
+
+    # Lo que no corre en el backfill no bloquea al consolidado (salvo los que no se pudieron importar)
+    corren = {clave_modulo(m) for m in modulos_backfill}
+    resueltos = {clave_modulo(m): True for m in MODULOS if clave_modulo(m) not in corren}
+    resueltos.update({clave: False for clave in errores_import})
+    modulos_backfill = [m for m in modulos_backfill if clave_modulo(m) not in errores_import]
+
+    for mes in meses:
+        periodo = tablero.clave_periodo('mes', mes[1], mes[0])
+        if not tablero.leer_registro(periodo, 'no_entendimiento'):
+            print(f"⚠️  {periodo}: sin D13 registrado (No_Entendidos se corre a mano)")
+
+    print_header("PRECARGA DE QUERIES AGRUPADAS POR MES")
+    precargar_consultas_por_mes(librerias, contexto, meses)
+
+    carpeta_logs = os.path.join(CARPETA_LOGS, datetime.now().strftime('%Y%m%d_%H%M%S'))
+    print(f"📝 Logs por mes y módulo en: {carpeta_logs}/")
+
+    configs_originales = {clave: libreria.CONFIG['config_file'] for clave, libreria in librerias.items()}
+    por_periodo = {}
+    sys.stdout = _SalidaPorThread(sys.stdout)
+    sys.stderr = _SalidaPorThread(sys.stderr)
+    try:
+        for mes in meses:
+            periodo = tablero.clave_periodo('mes', mes[1], mes[0])
+            with _print_lock:
+                print_header(f"PERÍODO {periodo.replace('_', ' ').upper()}")
+            carpeta_periodo = os.path.join(carpeta_logs, periodo)
+            os.makedirs(carpeta_periodo, exist_ok=True)
+
+            ruta_config = escribir_config_periodo(carpeta_periodo, mes)
+            for libreria in librerias.values():
+                libreria.CONFIG['config_file'] = ruta_config
+            os.environ[ENV_CONFIG_FECHAS] = ruta_config   # consolidar_excel.py (subproceso)
+
+            enviar_consultas_anticipadas(librerias, contexto)
+            por_periodo[periodo] = ejecutar_en_paralelo(modulos_backfill, args.jobs, resueltos,
+                                                        carpeta_periodo, librerias, contexto)
+    finally:
+        sys.stdout = sys.stdout.original
+        sys.stderr = sys.stderr.original
+        os.environ.pop(ENV_CONFIG_FECHAS, None)
+        for clave, ruta in configs_originales.items():
+            librerias[clave].CONFIG['config_file'] = ruta
+
+    return por_periodo
+
+def mostrar_resumen_backfill(por_periodo, tiempo_total):
+    '''Resumen del backfill: un renglón por mes'''
+    print_header("RESUMEN DEL BACKFILL", '=')
+    print(f"⏱️  Tiempo total: {tiempo_total:.1f} segundos ({tiempo_total/60:.1f} minutos)\n")
+
+    for periodo, resultados in por_periodo.items():
+        fallidos = [r for r in resultados if not r['exitoso']]
+        consolidado = f"Boti_Consolidado_{periodo}.xlsx"
+        if not fallidos:
+            print(f"✅ {periodo}: {len(resultados)} módulos OK → {consolidado}")
+        else:
+            print(f"❌ {periodo}: {len(fallidos)} de {len(resultados)} módulos fallaron")
+            for r in fallidos:
+                print(f"     • {r['nombre']}: {r['mensaje']}")
+
+    if any(not r['exitoso'] for resultados in por_periodo.values() for r in resultados):
+        print("\n📝 Revisar los errores en logs/<timestamp>/<período>/ y volver a correr esos meses")
+        print("   (lo que ya terminó bien sale de la cache local)")
+
 def mostrar_resumen(resultados, tiempo_total):
     '''Muestra un resumen de la ejecución'''
     print_header("RESUMEN DE EJECUCIÓN", '=')
@@ -374,6 +929,10 @@ def mostrar_resumen(resultados, tiempo_total):
     print(f"✅ Exitosos: {exitosos}")
     print(f"❌ Fallidos: {fallidos}")
     print(f"⏱️  Tiempo total: {tiempo_total:.1f} segundos ({tiempo_total/60:.1f} minutos)")
+
+    # Lo que hubiera tardado la corrida secuencial (suma de cada módulo)
+    tiempo_secuencial = sum(r['duracion'] for r in resultados)
+    print(f"⏱️  Suma de tiempos por módulo: {tiempo_secuencial:.1f} segundos ({tiempo_secuencial/60:.1f} minutos)")
     
     print("\n📋 Detalle por módulo:")
     print("-" * 70)
@@ -387,16 +946,77 @@ def mostrar_resumen(resultados, tiempo_total):
         print("\n" + "=" * 70)
         print("🎉 ¡TODOS LOS MÓDULOS SE EJECUTARON EXITOSAMENTE!")
         print("=" * 70)
-        print("\n💡 Próximo paso: Ejecutar el consolidador de Excel")
-        print("   python consolidar_excel.py")
+        print("\n💡 El consolidado Boti_Consolidado_[periodo].xlsx quedó generado en la raíz")
     else:
         print("\n" + "=" * 70)
         print("⚠️  ALGUNOS MÓDULOS FALLARON")
         print("=" * 70)
-        print("\n📝 Revisar los errores arriba y corregir antes de consolidar")
+        print("\n📝 Revisar los errores arriba (o en logs/) y corregir antes de consolidar")
+        print("   python consolidar_excel.py")
+
+def parse_args():
+    '''Lee los argumentos de línea de comandos'''
+    parser = argparse.ArgumentParser(
+        description='Ejecuta todos los módulos de Metricas_Boti_Mensual en paralelo, respetando sus dependencias'
+    )
+    parser.add_argument(
+        '--jobs', '-j', type=int, default=JOBS_DEFAULT, metavar='N',
+        help=f'Cantidad máxima de módulos ejecutándose a la vez (default: {JOBS_DEFAULT})'
+    )
+    parser.add_argument(
+        '--subprocesos', action='store_true',
+        help='Ejecutar cada módulo en su propio intérprete en lugar de importarlo (modo anterior)'
+    )
+    parser.add_argument(
+        '--sin-cache', action='store_true',
+        help='No usar la cache local de resultados de Athena (vuelve a ejecutar todas las queries)'
+    )
+    parser.add_argument(
+        '--sin-diario', action='store_true',
+        help='Rango personalizado: no usar el almacen diario (cada módulo consulta el rango completo)'
+    )
+    parser.add_argument(
+        '--con-no-entendidos', action='store_true',
+        help='Ejecutar también athena_connector.py y No_Entendidos.py (D13) en lugar de esperarlos hechos a mano'
+    )
+    parser.add_argument(
+        '--periodos', nargs='+', metavar='AAAA-MM',
+        help='Backfill: meses a procesar (ej: 2025-06 2025-07); un consolidado por mes'
+    )
+    parser.add_argument(
+        '--desde', metavar='AAAA-MM',
+        help='Backfill: primer mes del rango (junto con --hasta)'
+    )
+    parser.add_argument(
+        '--hasta', metavar='AAAA-MM',
+        help='Backfill: último mes del rango (junto con --desde)'
+    )
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error('--jobs debe ser >= 1')
+    if bool(args.desde) != bool(args.hasta):
+        parser.error('--desde y --hasta van juntos')
+    if args.periodos and args.desde:
+        parser.error('usar --periodos o --desde/--hasta, no ambos')
+    if (args.periodos or args.desde) and args.subprocesos:
+        parser.error('el backfill corre los módulos en proceso: no admite --subprocesos')
+    if (args.periodos or args.desde) and args.con_no_entendidos:
+        parser.error('el backfill no recalcula No_Entendidos: no admite --con-no-entendidos')
+    try:
+        args.meses = meses_a_procesar(args)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
 
 def main():
     '''Función principal'''
+    args = parse_args()
+    if args.sin_cache:
+        # Vale también para los subprocesos (heredan el entorno)
+        os.environ[cache_consultas.ENV_SIN_CACHE] = '1'
+    if args.sin_diario:
+        os.environ[diario.ENV_SIN_DIARIO] = '1'
+
     print_header("SCRIPT MAESTRO - Metricas_Boti_Mensual")
 
     print("★" * 70)
@@ -405,7 +1025,7 @@ def main():
     print("  1. Abrir una terminal y autenticarse con credenciales AWS:")
     print("       aws-azure-login --profile default --mode=gui")
     print("")
-    print("  2. Ejecutar el módulo No_Entendidos:")
+    print("  2. Ejecutar el módulo No_Entendidos (o correr con --con-no-entendidos):")
     print("       cd No_Entendidos")
     print("       python athena_connector.py")
     print("       python No_Entendidos.py")
@@ -417,12 +1037,31 @@ def main():
     print("\nEste script ejecutará los siguientes módulos:")
     for i, modulo in enumerate(MODULOS, 1):
         print(f"  {i}. {modulo['nombre']} ({modulo['celdas']})")
+        if modulo['depende_de']:
+            print(f"       ↳ después de: {', '.join(modulo['depende_de'])}")
 
     print("\n⚠️  IMPORTANTE: Este proceso puede tardar varios minutos")
     
     # Verificaciones previas
     print_section("VERIFICACIONES PREVIAS")
 
+    errores = validar_dependencias(MODULOS)
+    if errores:
+        print("❌ Dependencias inválidas en MODULOS:")
+        for error in errores:
+            print(f"   • {error}")
+        print("\nAbortando.")
+        sys.exit(1)
+
+    if args.meses:
+        inicio_total = time.time()
+        por_periodo = ejecutar_backfill(args, args.meses)
+        mostrar_resumen_backfill(por_periodo, time.time() - inicio_total)
+        print("\n" + "=" * 70)
+        print(f"🕐 Finalizado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print("=" * 70 + "\n")
+        return
+
     if not verificar_config():
         print("\n❌ Configuración inválida. Abortando.")
         sys.exit(1)
@@ -442,7 +1081,9 @@ def main():
     # 2. No_Entendidos
     print(f"\n📋 [2/2] No Entendimiento (D13)")
     no_entendidos_ok = verificar_no_entendidos_ejecutado(mes_nombre, anio)
-    if not no_entendidos_ok:
+    if args.con_no_entendidos:
+        print(f"   → Se ejecutará en esta corrida (--con-no-entendidos)")
+    elif not no_entendidos_ok:
         print(f"\n   ⚠️  Requiere interacción manual (revalidar credenciales AWS).")
         print(f"   → Ejecutar antes de correr este script:")
         print(f"       1. cd No_Entendidos")
@@ -454,18 +1095,42 @@ def main():
     print(f"\n{'─' * 70}")
     print(f"  Resumen pre-requisitos:")
     print(f"    {'✅' if tsv_ok          else '❌'} TSV Contenidos_Bot  (necesario para D7, D8)")
-    print(f"    {'✅' if no_entendidos_ok else '❌'} No_Entendidos       (necesario para D13)")
+    if args.con_no_entendidos:
+        print(f"    ▶️  No_Entendidos       (se ejecuta en esta corrida)")
+    else:
+        print(f"    {'✅' if no_entendidos_ok else '❌'} No_Entendidos       (necesario para D13)")
     if not tsv_ok:
         print(f"\n  ⚠️  Contenidos_Bot va a FALLAR porque le falta el TSV.")
         print(f"      Podés continuar de todas formas o cancelar (Ctrl+C).")
     print(f"{'─' * 70}\n")
 
     # Verificar AWS solo si hay módulos que lo requieren
-    # Excluir No_Entendidos de los módulos a ejecutar (se maneja manualmente)
-    modulos_a_ejecutar = [m for m in MODULOS if m['carpeta'] != 'No_Entendidos']
+    # Excluir No_Entendidos de los módulos a ejecutar (se maneja manualmente),
+    # salvo con --con-no-entendidos
+    if args.con_no_entendidos:
+        modulos_a_ejecutar = list(MODULOS)
+    else:
+        modulos_a_ejecutar = [m for m in MODULOS if m['carpeta'] != 'No_Entendidos']
 
     requiere_aws = any(m['requiere_aws'] for m in modulos_a_ejecutar)
-    if requiere_aws:
+    en_proceso = not args.subprocesos and any(m.get('en_proceso') for m in modulos_a_ejecutar)
+
+    # Modo librería: un único contexto para todos los módulos en proceso.
+    # Su verificación (STS + rol PIBADataScientist) reemplaza a la del CLI
+    # y a la que antes hacía cada módulo por separado.
+    contexto = None
+    if en_proceso:
+        contexto = ContextoAthena(
+            CONFIG_ATHENA['region'], CONFIG_ATHENA['workgroup'], CONFIG_ATHENA['database']
+        )
+        print("🔐 Verificando autenticación AWS...")
+        if not contexto.verificar_credenciales():
+            print("\n❌ Autenticación AWS requerida. Ejecutar:")
+            print("   aws-azure-login --profile default --mode=gui")
+            print("\nAbortando.")
+            sys.exit(1)
+        contexto.configurar_wrangler()
+    elif requiere_aws:
         if not verificar_aws_auth():
             print("\n❌ Autenticación AWS requerida. Ejecutar:")
             print("   aws-azure-login --profile default --mode=gui")
@@ -475,33 +1140,60 @@ def main():
     # Iniciar ejecución automáticamente
     print("\n" + "=" * 70)
     print("🚀 Iniciando ejecución automática...")
-    if no_entendidos_ok:
+    if args.con_no_entendidos:
+        print(f"   (No_Entendidos incluido: athena_connector.py → No_Entendidos.py)")
+    elif no_entendidos_ok:
         print(f"   (No_Entendidos ya ejecutado - se omitirá)")
     else:
         print(f"   (No_Entendidos pendiente - se omitirá)")
+    print(f"   Módulos en paralelo: {args.jobs}")
+    print(f"   Modo: {'módulos Athena en proceso' if en_proceso else 'un subproceso por módulo'}")
     print("=" * 70)
 
-    # Ejecutar módulos (sin No_Entendidos)
+    # Ejecutar módulos (sin No_Entendidos, salvo --con-no-entendidos)
     print_header("EJECUTANDO MÓDULOS")
 
+    carpeta_logs = os.path.join(CARPETA_LOGS, datetime.now().strftime('%Y%m%d_%H%M%S'))
+    os.makedirs(carpeta_logs, exist_ok=True)
+    print(f"📝 Logs por módulo en: {carpeta_logs}/")
+
     inicio_total = time.time()
     resultados = []
 
-    # Agregar No_Entendidos al resumen según si fue ejecutado o no
-    resultados.append({
-        'nombre': 'No Entendimiento',
-        'exitoso': no_entendidos_ok,
-        'duracion': 0,
-        'mensaje': 'Ya ejecutado manualmente' if no_entendidos_ok else '⚠️  Pendiente - no ejecutado'
-    })
-
-    for i, modulo in enumerate(modulos_a_ejecutar, 1):
-        resultado = ejecutar_modulo(modulo, i, len(modulos_a_ejecutar))
-        resultados.append(resultado)
-
-        if i < len(modulos_a_ejecutar):
-            print("\n⏸️  Pausa de 2 segundos antes del siguiente módulo...")
-            time.sleep(2)
+    resueltos = {}
+    if not args.con_no_entendidos:
+        # Agregar No_Entendidos al resumen según si fue ejecutado o no
+        resultados.append({
+            'nombre': 'No Entendimiento',
+            'exitoso': no_entendidos_ok,
+            'duracion': 0,
+            'mensaje': 'Ya ejecutado manualmente' if no_entendidos_ok else '⚠️  Pendiente - no ejecutado'
+        })
+
+        # Los scripts de No_Entendidos no corren acá: quedan resueltos según
+        # si ya se ejecutaron a mano (de eso depende el consolidado)
+        resueltos = {
+            clave_modulo(m): no_entendidos_ok
+            for m in MODULOS if m['carpeta'] == 'No_Entendidos'
+        }
+
+    librerias = {}
+    if en_proceso:
+        librerias, errores_import = importar_modulos_en_proceso(modulos_a_ejecutar)
+        for clave, error in errores_import.items():
+            # Si no se pudo importar, se intenta igual como subproceso
+            print(f"⚠️  {error} → se ejecutará como subproceso")
+        enviar_consultas_anticipadas(librerias, contexto)
+        sys.stdout = _SalidaPorThread(sys.stdout)
+        sys.stderr = _SalidaPorThread(sys.stderr)
+
+    try:
+        resultados.extend(ejecutar_en_paralelo(modulos_a_ejecutar, args.jobs, resueltos,
+                                               carpeta_logs, librerias, contexto))
+    finally:
+        if en_proceso:
+            sys.stdout = sys.stdout.original
+            sys.stderr = sys.stderr.original
     
     fin_total = time.time()
     tiempo_total = fin_total - inicio_total
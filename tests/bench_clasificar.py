@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark de clasificacion de Temas_Consultados: textos.apply(clasificar)
+contra clasificar_serie(textos) sobre mensajes sinteticos.
+
+Uso (desde la raiz del repo):
+    python tests/bench_clasificar.py [cantidad_mensajes] [cantidad_distintos]
+
+Default: 1.000.000 mensajes con 50.000 textos distintos (en produccion los
+mensajes se repiten muchisimo). No lo corre pytest (no es test_*.py).
+'''
+import random
+import sys
+import time
+
+import pandas as pd
+
+from conftest import importar_temas
+
+temas = importar_temas()
+
+RELLENO = ['hola', 'quiero', 'necesito', 'ayuda', 'con', 'el', 'la', 'mi', 'por', 'favor',
+           'donde', 'como', 'hago', 'para', 'consulta', 'gracias', 'buenas', 'tardes']
+
+
+def generar_mensajes(cantidad, distintos, semilla=0):
+    rnd = random.Random(semilla)
+    claves = [p for ps in temas.CATEGORIAS.values() for p in ps]
+    pool = []
+    for _ in range(distintos):
+        palabras = rnd.choices(RELLENO, k=rnd.randint(1, 8))
+        if rnd.random() < 0.7:  # ~30% termina en "Otros"
+            palabras.insert(rnd.randrange(len(palabras) + 1), rnd.choice(claves))
+        texto = ' '.join(palabras)
+        pool.append(texto.upper() if rnd.random() < 0.1 else texto)
+    return pd.Series(rnd.choices(pool, k=cantidad), dtype=object)
+
+
+def medir(nombre, funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    print('  {:<28} {:8.2f} s'.format(nombre, time.perf_counter() - inicio))
+    return resultado
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    distintos = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    textos = generar_mensajes(cantidad, distintos)
+    print('{:,} mensajes, {:,} distintos'.format(len(textos), textos.nunique()))
+    esperado = medir('apply(clasificar)', lambda: textos.apply(temas.clasificar))
+    obtenido = medir('clasificar_serie', lambda: temas.clasificar_serie(textos))
+    print('  resultados iguales: {}'.format(bool((esperado == obtenido).all())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark de lectura de los Excel parciales (comun/lectura_excel.py):
+cuantas veces se abre un Excel antes (un openpyxl.load_workbook completo
+por celda) y despues (leer_celdas: una pasada read_only por archivo).
+
+Las aperturas se cuentan con un openpyxl.load_workbook envuelto (todas,
+antes y despues) y con lectura_excel.aperturas() (solo las de leer_celdas).
+
+Uso (desde la raiz del repo):
+    python tests/bench_lectura_excel.py [filas_por_excel] [repeticiones]
+
+Default: Excel de 2.000 filas de relleno (como los de detalle que generan
+los modulos), un Excel por modulo del consolidado; el diagnostico recorre
+todos los Excel 2 veces. No lo corre pytest (no es test_*.py).
+'''
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import openpyxl
+
+import conftest  # noqa: F401  (pone la raiz del repo en sys.path)
+import consolidar_excel
+import diagnosticar_excel
+from comun import lectura_excel, tablero
+
+PERIODO = 'enero_2026'
+ENCABEZADO = 'ene-26'
+
+_load_workbook = openpyxl.load_workbook
+abiertos = 0
+
+
+def load_workbook_contado(*args, **kwargs):
+    global abiertos
+    abiertos += 1
+    return _load_workbook(*args, **kwargs)
+
+
+def generar_excels(filas):
+    '''Un Excel del periodo por modulo del consolidado, en la carpeta actual'''
+    rutas = []
+    for config in consolidar_excel.MODULOS.values():
+        os.makedirs(config['carpeta'], exist_ok=True)
+        ruta = os.path.join(config['carpeta'], config['patron'].replace('*', PERIODO))
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws['D1'] = ENCABEZADO
+        for i in range(2, 18):
+            ws['B{}'.format(i)] = 'Indicador {}'.format(i)
+            ws['C{}'.format(i)] = 'Detalle {}'.format(i)
+        for celda in config['celdas']:
+            ws[celda] = int(celda[1:]) * 100
+        for i in range(20, 20 + filas):
+            ws.append(['relleno', i, i * 1.5, 'texto de detalle {}'.format(i)])
+        wb.save(ruta)
+        rutas.append(ruta)
+    return rutas
+
+
+# ----- Antes: un load_workbook completo por celda (y otro para el header D1) -----
+
+def extraer_metricas_antes():
+    metricas = {}
+    periodo_detectado = None
+    for config in consolidar_excel.MODULOS.values():
+        ruta = os.path.join(config['carpeta'], config['patron'].replace('*', PERIODO))
+        for celda in config['celdas']:
+            wb = openpyxl.load_workbook(ruta, data_only=True)
+            metricas[celda] = wb.active[celda].value
+            wb.close()
+        if not periodo_detectado:
+            wb = openpyxl.load_workbook(ruta, data_only=True)
+            periodo_detectado = wb.active['D1'].value
+            wb.close()
+    return metricas, periodo_detectado
+
+
+def diagnosticar_antes(ruta):
+    wb = openpyxl.load_workbook(ruta, data_only=True)
+    ws = wb.active
+    celdas = {
+        'D{}'.format(i): {'valor': ws['D{}'.format(i)].value,
+                          'indicador': ws['B{}'.format(i)].value,
+                          'detalle': ws['C{}'.format(i)].value}
+        for i in range(2, 18)
+    }
+    header = ws['D1'].value
+    wb.close()
+    return header, celdas
+
+
+# ----- Despues: el codigo actual (comun.lectura_excel) -----
+
+def extraer_metricas_despues():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return consolidar_excel.extraer_metricas(PERIODO, ENCABEZADO)
+
+
+def medir(nombre, funcion):
+    global abiertos
+    abiertos = 0
+    lectura_excel.vaciar()
+    antes = lectura_excel.aperturas()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - inicio
+    print('  {:<32} {:4d} aperturas (leer_celdas: {:3d})  {:7.2f} s'.format(
+        nombre, abiertos, lectura_excel.aperturas() - antes, duracion))
+    return resultado
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    openpyxl.load_workbook = load_workbook_contado
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        os.chdir(carpeta)
+        # Tablero vacio: todos los modulos se leen de su Excel
+        tablero.ALMACEN = os.path.join(carpeta, 'tablero', 'metricas.sqlite')
+        rutas = generar_excels(filas)
+        print('{} Excel de {:,} filas'.format(len(rutas), filas))
+
+        print('consolidar_excel.extraer_metricas')
+        esperado = medir('antes (load_workbook por celda)', extraer_metricas_antes)
+        obtenido = medir('despues (leer_celdas)', extraer_metricas_despues)
+        obtenido = ({c: v for c, v in obtenido[0].items() if c in esperado[0]}, obtenido[1])
+        print('  resultados iguales: {}'.format(esperado == obtenido))
+
+        print('diagnosticar_excel, {} pasadas por los {} Excel'.format(repeticiones, len(rutas)))
+        esperado = medir('antes (load_workbook por Excel)',
+                         lambda: [diagnosticar_antes(r) for _ in range(repeticiones) for r in rutas])
+        obtenido = medir('despues (leer_celdas)',
+                         lambda: [diagnosticar_excel.leer_todas_celdas_relevantes(r)
+                                  for _ in range(repeticiones) for r in rutas])
+        print('  resultados iguales: {}'.format(esperado == obtenido))
+        os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+'''
+Tests de Metricas_Boti_Mensual. Los modulos son scripts dentro de su
+carpeta: se importan por ruta (ver importar_script) con la raiz del repo en
+el sys.path, igual que hace run_all.py.
+'''
+import importlib.util
+import os
+import sys
+import types
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def importar_script(ruta_relativa, nombre):
+    '''Importa un script de modulo (ej: 'No_Entendidos/No_Entendidos.py')'''
+    ruta = os.path.join(RAIZ, ruta_relativa)
+    sys.path.insert(0, os.path.dirname(ruta))
+    spec = importlib.util.spec_from_file_location(nombre, ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nombre] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+# Stopwords fijas para Temas_Consultados en los tests: el modulo las toma de
+# nltk al importarse (y si falta el corpus intenta bajarlo)
+STOPWORDS_PRUEBA = ['de', 'la', 'que', 'el', 'en', 'y', 'a', 'los', 'del', 'se', 'las', 'por',
+                    'un', 'para', 'con', 'no', 'una', 'su', 'al', 'lo', 'como', 'mas', 'pero',
+                    'sus', 'le', 'ya', 'o', 'este', 'si', 'porque', 'esta', 'entre', 'cuando',
+                    'muy', 'sin', 'sobre', 'tambien', 'me', 'hasta', 'hay', 'donde', 'quien',
+                    'desde', 'todo', 'nos', 'durante', 'todos', 'uno', 'les', 'ni', 'contra',
+                    'otros', 'ese', 'eso', 'ante', 'ellos', 'e', 'esto', 'mi', 'antes', 'algunos',
+                    'unos', 'yo', 'otro', 'otras', 'otra', 'tanto', 'esa', 'estos']
+
+
+def importar_temas():
+    '''
+    Importa Temas_Consultados con nltk.corpus.stopwords reemplazado por
+    STOPWORDS_PRUEBA (sin corpus instalado ni descarga)
+    '''
+    corpus = types.ModuleType('nltk.corpus')
+    corpus.stopwords = types.SimpleNamespace(words=lambda idioma: list(STOPWORDS_PRUEBA))
+    anterior = sys.modules.get('nltk.corpus')
+    sys.modules['nltk.corpus'] = corpus
+    try:
+        return importar_script('Temas_Consultados/Temas_Consultados.py', 'Temas_Consultados')
+    finally:
+        if anterior is None:
+            sys.modules.pop('nltk.corpus', None)
+        else:
+            sys.modules['nltk.corpus'] = anterior
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+'''Resultados en temp/ y queries en Athena de No_Entendidos/athena_connector.py (sin AWS)'''
+import os
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from conftest import importar_script
+
+connector = importar_script('No_Entendidos/athena_connector.py', 'athena_connector')
+from comun import cache_consultas  # noqa: E402  (despues de importar el connector)
+from comun.gestor_consultas import ErrorConsulta  # noqa: E402
+
+CSV = 'session_id,id,creation_time,msg_from\n{}\n'.format(
+    '\n'.join('s{:025d},{},2025-06-0{} 10:00:00,user'.format(i, i, 1 + i % 9) for i in range(50))
+)
+
+
+@pytest.fixture
+def temp(tmp_path):
+    ruta = tmp_path / 'mensajes_temp.csv'
+    ruta.write_text(CSV, encoding='utf-8')
+    return str(ruta)
+
+
+def _envejecer(ruta, segundos=60):
+    viejo = time.time() - segundos
+    os.utime(ruta, (viejo, viejo))
+
+
+def test_conversion_deja_el_parquet_como_resultado(temp):
+    parquet = connector.convertir_a_parquet(temp)
+    assert parquet == connector.ruta_parquet(temp)
+    assert connector.archivo_resultado(temp) == parquet
+
+
+def test_conversion_fallida_borra_el_parquet_anterior(temp):
+    viejo = connector.convertir_a_parquet(temp)
+    open(viejo + '.tmp', 'w').close()
+    with open(temp, 'w', encoding='utf-8') as f:
+        f.write('')  # CSV nuevo que no se puede convertir
+    assert connector.convertir_a_parquet(temp) is None
+    assert not os.path.exists(viejo)
+    assert not os.path.exists(viejo + '.tmp')
+    assert connector.archivo_resultado(temp) == temp
+
+
+def test_parquet_mas_viejo_que_el_csv_no_es_el_resultado(temp):
+    parquet = connector.convertir_a_parquet(temp)
+    _envejecer(parquet)
+    assert connector.archivo_resultado(temp) == temp
+
+
+def test_parquet_de_la_cache_reemplaza_al_csv_de_otra_corrida(temp, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_consultas, 'CARPETA_CACHE', str(tmp_path / 'cache'))
+    sql = "SELECT 1 WHERE fecha BETWEEN date '2025-06-01' and date '2025-06-30'"
+    parquet = connector.convertir_a_parquet(temp)
+    cache_consultas.guardar_archivo(sql, connector.ATHENA_DATABASE, connector.ATHENA_WORKGROUP,
+                                    parquet, extension='.parquet')
+    os.remove(parquet)
+    with open(temp, 'w', encoding='utf-8') as f:
+        f.write('session_id,id\nviejo,1\n')  # CSV de otra query
+
+    assert connector.tomar_de_cache(sql, temp)
+    assert not os.path.exists(temp)
+    assert connector.archivo_resultado(temp) == parquet
+
+
+# ---------------------------------------------------------------------------
+# ejecutar_queries_en_paralelo: reintentos de la API y cancelación (sin AWS)
+# ---------------------------------------------------------------------------
+
+class ErrorCliente(Exception):
+    '''Imita a botocore ClientError (atributo response con el codigo)'''
+
+    def __init__(self, codigo):
+        super().__init__('An error occurred ({})'.format(codigo))
+        self.response = {'Error': {'Code': codigo}}
+
+
+class ClienteAthenaFalso:
+    '''
+    Las queries enviadas son q1, q2, ... y terminan con el estado de
+    `estados` (default RUNNING); `errores` se lanzan en las primeras
+    llamadas a batch_get_query_execution.
+    '''
+
+    def __init__(self, errores=(), estados=None):
+        self.errores = list(errores)
+        self.estados = estados or {}
+        self.iniciadas = 0
+        self.detenidas = []
+
+    def start_query_execution(self, **parametros):
+        self.iniciadas += 1
+        return {'QueryExecutionId': 'q{}'.format(self.iniciadas)}
+
+    def batch_get_query_execution(self, QueryExecutionIds):
+        if self.errores:
+            raise self.errores.pop(0)
+        return {'QueryExecutions': [
+            {'QueryExecutionId': i,
+             'Status': {'State': self.estados.get(i, 'RUNNING'), 'StateChangeReason': 'SYNTAX_ERROR'},
+             'ResultConfiguration': {'OutputLocation': 's3://bucket/{}.csv'.format(i)}}
+            for i in QueryExecutionIds
+        ]}
+
+    def get_query_execution(self, QueryExecutionId):
+        return {'QueryExecution': {'ResultConfiguration': {
+            'OutputLocation': 's3://bucket/{}.csv'.format(QueryExecutionId)}}}
+
+    def stop_query_execution(self, QueryExecutionId):
+        self.detenidas.append(QueryExecutionId)
+
+
+@pytest.fixture
+def trabajos(tmp_path, monkeypatch):
+    '''3 queries sin cache; las descargas se registran en trabajos.descargas'''
+    lista = []
+    for nombre in ('a', 'b', 'c'):
+        sql = tmp_path / '{}.sql'.format(nombre)
+        sql.write_text("SELECT '{}' WHERE t BETWEEN '2025-01-01 00:00:00' AND '2025-02-01 00:00:00'"
+                       .format(nombre), encoding='utf-8')
+        lista.append((str(sql), str(tmp_path / '{}.csv'.format(nombre))))
+    descargas = []
+    monkeypatch.setattr(connector, 'tomar_de_cache', lambda query_sql, output_file: False)
+    monkeypatch.setattr(connector, 'descargar_desde_s3',
+                        lambda s3_path, archivo_local, boto3_session=None: descargas.append(s3_path))
+    monkeypatch.setattr(connector, 'guardar_resultado', lambda query_sql, output_file: None)
+    for espera in ('ESPERA_POLLING_MIN', 'ESPERA_POLLING_MAX', 'ESPERA_ERROR_MINIMA', 'ESPERA_ERROR_MAXIMA'):
+        monkeypatch.setattr(connector, espera, 0)
+    return lista, descargas
+
+
+def _ejecutar(trabajos, cliente, monkeypatch):
+    monkeypatch.setattr(connector, 'nueva_conexion', lambda: {'session': None, 'client': cliente})
+    return connector.ejecutar_queries_en_paralelo(trabajos, '2025-06-01', '2025-07-01')
+
+
+def test_polling_reintenta_throttling(trabajos, monkeypatch):
+    lista, descargas = trabajos
+    cliente = ClienteAthenaFalso(errores=[ErrorCliente('ThrottlingException')] * 2,
+                                 estados={'q1': 'SUCCEEDED', 'q2': 'SUCCEEDED', 'q3': 'SUCCEEDED'})
+    assert _ejecutar(lista, cliente, monkeypatch) == [o for _, o in lista]
+    assert sorted(descargas) == ['s3://bucket/q{}.csv'.format(i) for i in (1, 2, 3)]
+    assert cliente.detenidas == []
+
+
+def test_query_fallida_cancela_las_demas(trabajos, monkeypatch):
+    lista, descargas = trabajos
+    cliente = ClienteAthenaFalso(estados={'q2': 'FAILED'})
+    with pytest.raises(Exception, match='b.sql falló: SYNTAX_ERROR'):
+        _ejecutar(lista, cliente, monkeypatch)
+    assert sorted(cliente.detenidas) == ['q1', 'q3']
+    assert descargas == []
+
+
+def test_error_no_reintentable_cancela_todas(trabajos, monkeypatch):
+    lista, _ = trabajos
+    cliente = ClienteAthenaFalso(errores=[ErrorCliente('AccessDeniedException')])
+    with pytest.raises(ErrorCliente):
+        _ejecutar(lista, cliente, monkeypatch)
+    assert sorted(cliente.detenidas) == ['q1', 'q2', 'q3']
+
+
+class GestorFalso:
+    '''enviar() devuelve el Future de `futuros` (por SQL que contiene la letra)'''
+
+    def __init__(self, futuros):
+        self.futuros = futuros
+        self.canceladas = []
+
+    def enviar(self, query, log=None, transporte='csv'):
+        assert transporte == 'csv'
+        return next(f for letra, f in self.futuros.items() if "'{}'".format(letra) in query)
+
+    def cancelar(self, query, transporte='csv'):
+        self.canceladas.append(next(letra for letra in self.futuros if "'{}'".format(letra) in query))
+        return True
+
+
+class ContextoFalso:
+    def __init__(self, gestor):
+        self.gestor = gestor
+        self.session = self
+
+    def client(self, servicio, region_name=None):
+        return ClienteAthenaFalso()
+
+
+def _futuro(resultado=None, error=None):
+    futuro = Future()
+    if error is not None:
+        futuro.set_exception(error)
+    elif resultado is not None:
+        futuro.set_result(resultado)
+    return futuro
+
+
+def test_con_gestor_espera_el_envio_anticipado(trabajos):
+    lista, descargas = trabajos
+    gestor = GestorFalso({'a': _futuro('q1'), 'b': _futuro('q2'), 'c': _futuro('q3')})
+    connector.ejecutar_queries_en_paralelo(lista, '2025-06-01', '2025-07-01', ContextoFalso(gestor))
+    assert sorted(descargas) == ['s3://bucket/q{}.csv'.format(i) for i in (1, 2, 3)]
+    assert gestor.canceladas == []
+
+
+def test_con_gestor_query_fallida_cancela_las_demas(trabajos):
+    lista, descargas = trabajos
+    gestor = GestorFalso({'a': _futuro(), 'b': _futuro(error=ErrorConsulta('Query q2 FAILED')), 'c': _futuro()})
+    with pytest.raises(Exception, match='b.sql falló'):
+        connector.ejecutar_queries_en_paralelo(lista, '2025-06-01', '2025-07-01', ContextoFalso(gestor))
+    assert sorted(gestor.canceladas) == ['a', 'c']
+    assert descargas == []
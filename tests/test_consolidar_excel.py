@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+'''consolidar_excel.py: los Excel parciales solo valen para su propio período'''
+import os
+
+import openpyxl
+import pytest
+
+import consolidar_excel
+from comun import lectura_excel, tablero
+
+
+def _excel(ruta, valores):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    wb = openpyxl.Workbook()
+    for celda, valor in valores.items():
+        wb.active[celda] = valor
+    wb.save(ruta)
+
+
+@pytest.fixture
+def carpeta(tmp_path, monkeypatch):
+    '''Proyecto vacío (sin nada registrado en el tablero) con Excel de enero 2026'''
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tablero, 'ALMACEN', str(tmp_path / 'tablero' / 'metricas.sqlite'))
+    lectura_excel.vaciar()
+    _excel('Contenidos_Bot/output/contenidos_bot_enero_2026.xlsx', {'D1': 'ene-26', 'D7': 10, 'D8': 5})
+    _excel('No_Entendidos/output/no_entendimiento_enero_2026.xlsx', {'D1': 'ene-26', 'D13': '7%'})
+    return tmp_path
+
+
+def test_otro_periodo_no_toma_excel_ajenos(carpeta):
+    metricas, periodo = consolidar_excel.extraer_metricas('enero_2020', 'ene-20')
+    assert set(metricas.values()) == {'-'}
+    assert periodo == 'ene-20'
+
+
+def test_sin_encabezado_tampoco(carpeta):
+    metricas, periodo = consolidar_excel.extraer_metricas('enero_2020')
+    assert set(metricas.values()) == {'-'}
+    assert periodo is None
+
+
+def test_excel_del_periodo(carpeta):
+    metricas, periodo = consolidar_excel.extraer_metricas('enero_2026', 'ene-26')
+    assert (metricas['D7'], metricas['D8'], metricas['D13']) == (10, 5, '7%')
+    assert metricas['D2'] == '-'
+    assert periodo == 'ene-26'
+
+
+def test_excel_anterior_sin_periodo_en_el_nombre_vale_por_su_header(carpeta):
+    _excel('Contenidos_Bot/output/contenidos_bot_v1.xlsx', {'D1': 'ene-20', 'D7': 3, 'D8': 1})
+    metricas, _ = consolidar_excel.extraer_metricas('enero_2020', 'ene-20')
+    assert (metricas['D7'], metricas['D8'], metricas['D13']) == (3, 1, '-')
+
+
+def test_encabezado_config(tmp_path):
+    config = tmp_path / 'config_fechas.txt'
+    config.write_text('MES=1\nAÑO=2020\n', encoding='utf-8')
+    assert consolidar_excel.encabezado_config(str(config)) == 'ene-20'
+    assert consolidar_excel.encabezado_config(str(tmp_path / 'no_existe.txt')) is None
+
+
+def test_una_apertura_por_excel(carpeta):
+    antes = lectura_excel.aperturas()
+    metricas, periodo = consolidar_excel.extraer_metricas('enero_2026')
+    assert lectura_excel.aperturas() - antes == 2
+    assert (metricas['D7'], metricas['D8'], periodo) == (10, 5, 'ene-26')
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+'''GestorConsultas ante errores de la API de Athena (cliente falso, sin AWS)'''
+import threading
+
+import pytest
+
+from comun import gestor_consultas
+from comun.gestor_consultas import ErrorConsulta, GestorConsultas
+
+
+class ErrorCliente(Exception):
+    '''Imita a botocore ClientError (atributo response con el codigo)'''
+
+    def __init__(self, codigo):
+        super().__init__('An error occurred ({})'.format(codigo))
+        self.response = {'Error': {'Code': codigo}}
+
+
+class ClienteFalso:
+    '''
+    batch_get_query_execution: `errores` es una lista de excepciones que se
+    lanzan en las primeras llamadas; despues cada query termina con el
+    estado de `estados` (default SUCCEEDED).
+    '''
+
+    def __init__(self, errores=(), estados=None):
+        self.errores = list(errores)
+        self.estados = estados or {}
+        self.llamadas = 0
+        self.detenidas = []
+
+    def batch_get_query_execution(self, QueryExecutionIds):
+        self.llamadas += 1
+        if self.errores:
+            raise self.errores.pop(0)
+        return {'QueryExecutions': [
+            {'QueryExecutionId': i, 'Status': {'State': self.estados.get(i, 'SUCCEEDED')}}
+            for i in QueryExecutionIds
+        ]}
+
+    def stop_query_execution(self, QueryExecutionId):
+        self.detenidas.append(QueryExecutionId)
+
+
+class SessionFalsa:
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def client(self, servicio):
+        return self.cliente
+
+
+class ContextoFalso:
+    def __init__(self, cliente):
+        self.session = SessionFalsa(cliente)
+        self.log = lambda *a: None
+        self.renovaciones = 0
+        self.workgroup = 'wg'
+        self.database = 'db'
+
+    def renovar_credenciales(self):
+        self.renovaciones += 1
+        return True
+
+
+@pytest.fixture(autouse=True)
+def esperas_cortas(monkeypatch):
+    monkeypatch.setattr(gestor_consultas, 'ESPERA_MINIMA', 0.001)
+    monkeypatch.setattr(gestor_consultas, 'ESPERA_MAXIMA', 0.005)
+    monkeypatch.setattr(gestor_consultas, 'ESPERA_ERROR_MINIMA', 0.001)
+    monkeypatch.setattr(gestor_consultas, 'ESPERA_ERROR_MAXIMA', 0.005)
+
+
+@pytest.fixture
+def inicios(monkeypatch):
+    '''start_query_execution falso: devuelve q1, q2, ... y guarda las SQL enviadas'''
+    enviadas = []
+    lock = threading.Lock()
+
+    def iniciar(sql, **kwargs):
+        with lock:
+            if iniciar.errores:
+                raise iniciar.errores.pop(0)
+            enviadas.append(sql)
+            return 'q{}'.format(len(enviadas))
+
+    iniciar.errores = []
+    iniciar.enviadas = enviadas
+    monkeypatch.setattr(gestor_consultas.wr.athena, 'start_query_execution', iniciar)
+    return iniciar
+
+
+def test_polling_reintenta_errores_transitorios(inicios):
+    cliente = ClienteFalso(errores=[ErrorCliente('ThrottlingException'), ConnectionError('reset')])
+    gestor = GestorConsultas(ContextoFalso(cliente))
+    futuros = [gestor.enviar('SELECT {}'.format(i)) for i in range(3)]
+    assert [f.result(timeout=5) for f in futuros] == ['q1', 'q2', 'q3']
+    assert cliente.llamadas >= 3
+
+
+def test_token_expirado_renueva_credenciales(inicios):
+    cliente = ClienteFalso(errores=[ErrorCliente('ExpiredTokenException')])
+    contexto = ContextoFalso(cliente)
+    gestor = GestorConsultas(contexto)
+    assert gestor.enviar('SELECT 1').result(timeout=5) == 'q1'
+    assert contexto.renovaciones == 1
+
+
+def test_error_persistente_falla_y_se_puede_reenviar(inicios):
+    errores = [ErrorCliente('ThrottlingException')] * gestor_consultas.INTENTOS_API
+    cliente = ClienteFalso(errores=errores)
+    gestor = GestorConsultas(ContextoFalso(cliente))
+    futuro = gestor.enviar('SELECT 1')
+    with pytest.raises(Exception, match='tras {} intentos'.format(gestor_consultas.INTENTOS_API)):
+        futuro.result(timeout=5)
+    # El Future fallido se olvido: la misma query se vuelve a enviar
+    nuevo = gestor.enviar('SELECT 1')
+    assert nuevo is not futuro
+    assert nuevo.result(timeout=5) == 'q2'
+
+
+def test_solo_fallan_las_queries_afectadas(inicios):
+    cliente = ClienteFalso(estados={'q2': 'FAILED'})
+    gestor = GestorConsultas(ContextoFalso(cliente))
+    ok, mala = gestor.enviar('SELECT 1'), gestor.enviar('SELECT 2')
+    assert ok.result(timeout=5) == 'q1'
+    with pytest.raises(ErrorConsulta):
+        mala.result(timeout=5)
+    assert gestor.enviar('SELECT 1') is ok
+
+
+def test_envio_reintenta_too_many_requests(inicios):
+    inicios.errores = [ErrorCliente('TooManyRequestsException')] * 2
+    gestor = GestorConsultas(ContextoFalso(ClienteFalso()))
+    assert gestor.enviar('SELECT 1').result(timeout=5) == 'q1'
+
+
+def test_envio_con_error_no_reintentable_se_puede_reenviar(inicios):
+    inicios.errores = [ErrorCliente('InvalidRequestException')]
+    gestor = GestorConsultas(ContextoFalso(ClienteFalso()))
+    futuro = gestor.enviar('SELECT 1')
+    with pytest.raises(ErrorCliente):
+        futuro.result(timeout=5)
+    assert gestor.enviar('SELECT 1').result(timeout=5) == 'q1'
+
+
+def test_cancelar_detiene_la_query_en_athena(inicios):
+    cliente = ClienteFalso(estados={'q1': 'RUNNING'})
+    gestor = GestorConsultas(ContextoFalso(cliente))
+    futuro = gestor.enviar('SELECT 1')
+    assert gestor.cancelar('SELECT 1')
+    assert cliente.detenidas == ['q1']
+    with pytest.raises(ErrorConsulta, match='CANCELLED'):
+        futuro.result(timeout=5)
+    assert not gestor.cancelar('SELECT 1')
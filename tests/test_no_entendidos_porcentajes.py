@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+'''PASO 10 de No_Entendidos: porcentajes vectorizados contra la version por .loc'''
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import importar_script
+
+no_entendidos = importar_script('No_Entendidos/No_Entendidos.py', 'No_Entendidos')
+
+CATEGORIAS = ['one', 'click', 'texto', 'abandono', 'nada', 'ne', 'letra']
+
+
+def porcentajes_por_loc(respuestas_por_usuario, categorias):
+    '''Implementacion anterior: un .loc por usuario y categoria'''
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # 0/0 de los usuarios con total 0
+        for categoria in categorias:
+            respuestas_por_usuario[f'porcentaje_{categoria}'] = [
+                respuestas_por_usuario.loc[i][categoria] /
+                respuestas_por_usuario.loc[i][categorias].sum()
+                for i in respuestas_por_usuario.index
+            ]
+    return respuestas_por_usuario
+
+
+def armar_pivot(rnd, n_usuarios, presentes, ceros=0):
+    '''Igual que el PASO 9: conteos por categoria presente, fillna(0) y reindex'''
+    usuarios = ['u{:04d}'.format(i) for i in range(n_usuarios)]
+    conteos = {}
+    for categoria in presentes:
+        elegidos = rnd.choice(usuarios, size=rnd.integers(1, n_usuarios + 1), replace=False)
+        conteos[categoria] = pd.Series(rnd.integers(0, 50, size=len(elegidos)), index=elegidos)
+    pivot = pd.DataFrame(conteos).sort_index().rename_axis('usuario')
+    if ceros:  # usuarios sin interacciones en ninguna categoria presente
+        extra = pd.DataFrame(0, index=['z{:02d}'.format(i) for i in range(ceros)], columns=pivot.columns)
+        pivot = pd.concat([pivot, extra.rename_axis('usuario')])
+    pivot.fillna(0, inplace=True)
+    return pivot.reset_index(drop=False).reindex(['usuario'] + CATEGORIAS, axis=1)
+
+
+def _comparar(pivot):
+    esperado = porcentajes_por_loc(pivot.copy(), CATEGORIAS)
+    obtenido = no_entendidos.calcular_porcentajes(pivot.copy(), CATEGORIAS)
+    pd.testing.assert_frame_equal(obtenido, esperado, check_dtype=False)
+
+
+@pytest.mark.parametrize('semilla', range(20))
+def test_pivots_aleatorios(semilla):
+    rnd = np.random.default_rng(semilla)
+    presentes = [c for c in CATEGORIAS if rnd.random() < 0.7] or ['ne']
+    _comparar(armar_pivot(rnd, int(rnd.integers(1, 60)), presentes, ceros=int(rnd.integers(0, 3))))
+
+
+def test_categorias_ausentes_quedan_nan():
+    pivot = armar_pivot(np.random.default_rng(0), 10, ['one', 'ne'])
+    resultado = no_entendidos.calcular_porcentajes(pivot.copy(), CATEGORIAS)
+    assert resultado['porcentaje_click'].isna().all()
+    suma = resultado[['porcentaje_one', 'porcentaje_ne']].sum(axis=1)
+    assert np.allclose(suma[pivot[['one', 'ne']].sum(axis=1) > 0], 1.0)
+    _comparar(pivot)
+
+
+def test_usuarios_con_total_cero():
+    pivot = armar_pivot(np.random.default_rng(1), 5, CATEGORIAS, ceros=3)
+    resultado = no_entendidos.calcular_porcentajes(pivot.copy(), CATEGORIAS)
+    ceros = resultado['usuario'].str.startswith('z')
+    assert resultado.loc[ceros, ['porcentaje_' + c for c in CATEGORIAS]].isna().all().all()
+    _comparar(pivot)
+
+
+def test_pivot_vacio():
+    _comparar(pd.DataFrame(columns=['usuario'] + CATEGORIAS))
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+'''
+comun/particiones.py evaluado en sqlite sobre una tabla con una fila por dia
+particionada como las *_metrics_2 (year/month/day sin ceros a la izquierda).
+'''
+import random
+import re
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from comun.particiones import (
+    MARGEN_DIAS_PARTICION, filtro_fechas, filtro_particiones, filtro_particiones_ampliado,
+)
+
+DESDE = date(2022, 1, 1)
+HASTA = date(2026, 12, 31)
+
+
+def _dias(inicio, fin):
+    return [inicio + timedelta(days=i) for i in range((fin - inicio).days + 1)]
+
+
+def _desfase(dia):
+    '''Diferencia entre la fecha de la columna y la de la particion, en [-2, 2]'''
+    return dia.toordinal() % (2 * MARGEN_DIAS_PARTICION + 1) - MARGEN_DIAS_PARTICION
+
+
+@pytest.fixture(scope='module')
+def conexion():
+    con = sqlite3.connect(':memory:')
+    con.execute('CREATE TABLE m (year TEXT, month TEXT, day TEXT, particion TEXT, session_creation_time TEXT)')
+    con.executemany('INSERT INTO m VALUES (?, ?, ?, ?, ?)', [
+        (str(d.year), str(d.month), str(d.day), d.isoformat(),
+         (d + timedelta(days=_desfase(d))).isoformat() + ' 12:00:00')
+        for d in _dias(DESDE, HASTA)
+    ])
+    yield con
+    con.close()
+
+
+def _a_sqlite(filtro):
+    '''CAST(x AS DATE) BETWEEN date 'a' and date 'b' (Athena) --> sqlite'''
+    return re.sub(r"CAST\((.+?) AS DATE\) BETWEEN date '(.+?)' and date '(.+?)'",
+                  r"date(\1) BETWEEN '\2' and '\3'", filtro)
+
+
+def _consultar(con, filtro, columna='particion'):
+    sql = 'SELECT {} FROM m WHERE {} ORDER BY 1'.format(columna, _a_sqlite(filtro))
+    return [fila[0][:10] for fila in con.execute(sql)]
+
+
+def _esperado(inicio, fin):
+    return [d.isoformat() for d in _dias(inicio, fin)]
+
+
+def _rangos():
+    '''Rangos fijos (bordes de mes/año, febrero bisiesto) + aleatorios'''
+    fijos = [
+        (date(2024, 2, 1), date(2024, 2, 29)), (date(2023, 2, 1), date(2023, 2, 28)),
+        (date(2024, 2, 28), date(2024, 3, 1)), (date(2024, 12, 31), date(2025, 1, 1)),
+        (date(2024, 12, 30), date(2025, 1, 2)), (date(2025, 3, 1), date(2025, 3, 1)),
+        (date(2025, 1, 3), date(2025, 1, 30)), (date(2023, 11, 15), date(2025, 2, 10)),
+        (date(2023, 1, 1), date(2023, 12, 31)), (date(2025, 5, 9), date(2025, 5, 10)),
+    ]
+    rnd = random.Random(5)
+    base = DESDE + timedelta(days=MARGEN_DIAS_PARTICION)
+    total = (HASTA - base).days - MARGEN_DIAS_PARTICION
+    aleatorios = []
+    for _ in range(150):
+        inicio = base + timedelta(days=rnd.randrange(total))
+        largo = rnd.choice([rnd.randrange(5), rnd.randrange(40), rnd.randrange(800)])
+        fin = min(inicio + timedelta(days=largo), HASTA - timedelta(days=MARGEN_DIAS_PARTICION))
+        aleatorios.append((inicio, fin))
+    return fijos + aleatorios
+
+
+RANGOS = _rangos()
+
+
+@pytest.mark.parametrize('inicio,fin', RANGOS)
+def test_filtro_particiones_es_el_rango(conexion, inicio, fin):
+    filtro = filtro_particiones(inicio.isoformat(), fin.isoformat())
+    assert _consultar(conexion, filtro) == _esperado(inicio, fin)
+
+
+@pytest.mark.parametrize('inicio,fin', RANGOS)
+def test_filtro_ampliado_es_el_rango_con_margen(conexion, inicio, fin):
+    filtro = filtro_particiones_ampliado(inicio.isoformat(), fin.isoformat())
+    margen = timedelta(days=MARGEN_DIAS_PARTICION)
+    assert _consultar(conexion, filtro) == _esperado(inicio - margen, fin + margen)
+
+
+@pytest.mark.parametrize('inicio,fin', RANGOS)
+def test_filtro_fechas_es_el_rango_sobre_la_columna(conexion, inicio, fin):
+    '''Aunque la fecha de la columna difiera hasta el margen de la particion'''
+    filtro = filtro_fechas('session_creation_time', inicio.isoformat(), fin.isoformat())
+    assert _consultar(conexion, filtro, 'session_creation_time') == _esperado(inicio, fin)
+
+
+def test_alias():
+    filtro = filtro_fechas('m.creation_time', '2025-01-30', '2025-02-03', alias='m')
+    assert "m.year='2025' AND m.month='1'" in filtro
+    assert "CAST(m.day AS INTEGER) >= 28" in filtro
+    assert "CAST(m.day AS INTEGER) <= 5" in filtro
+    assert "CAST(m.creation_time AS DATE) BETWEEN date '2025-01-30' and date '2025-02-03'" in filtro
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+'''
+Las queries con poda de particiones (comun/particiones.py) contra las
+queries originales, ejecutadas en DuckDB sobre tablas de prueba
+particionadas por year/month/day como las *_metrics_2: mismo resultado.
+
+La fecha de particion de cada fila difiere de sus columnas de fecha hasta
+MARGEN_DIAS_PARTICION dias (lo que cubre el margen del filtro ampliado).
+'''
+import random
+import re
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from conftest import importar_script, importar_temas
+from comun import paquete_metricas, por_mes
+
+duckdb = pytest.importorskip('duckdb')
+
+usuarios = importar_script('Metricas_Boti_Conversaciones_Usuarios/Usuarios_Conversaciones.py',
+                           'Usuarios_Conversaciones')
+sesiones_abiertas = importar_script('Sesiones_Abiertas_Pushes/Sesiones_Abiertas_porPushes.py',
+                                    'Sesiones_Abiertas_porPushes')
+pushes = importar_script('Pushes_Enviadas/Pushes_Enviadas.py', 'Pushes_Enviadas')
+contenidos = importar_script('Contenidos_mas_disparados/Contenidos_mas_disparados.py',
+                             'Contenidos_mas_disparados')
+temas = importar_temas()
+
+BASE = '"caba-piba-consume-zone-db"'
+DESDE = date(2024, 11, 20)
+DIAS = 120
+
+
+# ============================================================================
+# QUERIES ORIGINALES (antes de la poda de particiones)
+# ============================================================================
+
+def usuarios_original(fi, ff):
+    return """SELECT
+count(distinct SUBSTR(session_id, 1, 20)) as Cant_Usuario,
+count(distinct(session_id)) as Cant_Sesiones
+FROM "caba-piba-consume-zone-db"."boti_session_metrics_2"
+WHERE CAST(session_creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}'""".format(fi=fi, ff=ff)
+
+
+def sesiones_abiertas_original(fi, ff):
+    return """SELECT starting_cause, count(distinct (session_id)) as Cant_sesiones
+FROM "caba-piba-consume-zone-db"."boti_session_metrics_2"
+WHERE CAST(session_creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}'
+group by starting_cause""".format(fi=fi, ff=ff)
+
+
+def pushes_original(fi, ff):
+    return """SELECT count(distinct m.id) as count_messages
+FROM "caba-piba-consume-zone-db"."boti_event_metrics_2" ev
+JOIN "caba-piba-consume-zone-db"."boti_message_metrics_2" m
+ON ev.session_id=m.session_id
+WHERE CAST(ev.creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}'
+AND regexp_like(m.message, '^Template')
+and events_name in ('notification-status-sent')""".format(fi=fi, ff=ff)
+
+
+def paquete_original(fi, ff):
+    return """WITH base AS (
+SELECT session_id,
+       IF(rule_name like ('%CXF%')
+          AND CAST(session_creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}',
+          rule_name) AS rule_cxf,
+       (regexp_like(message, '^Template')
+          AND CAST(creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}') AS es_template
+FROM "caba-piba-consume-zone-db"."boti_message_metrics_2"
+WHERE (CAST(session_creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}'
+       AND rule_name like ('%CXF%'))
+   OR (CAST(creation_time AS DATE) BETWEEN date '{fi}' and date '{ff}'
+       AND regexp_like(message, '^Template'))
+)
+SELECT IF(grouping(rule_cxf) = 1, 'TEMPLATE', 'CXF') AS metrica,
+       rule_cxf AS rule_name,
+       IF(grouping(rule_cxf) = 1,
+          count(distinct IF(es_template, session_id)),
+          count(distinct session_id)) AS cant_sesiones
+FROM base
+GROUP BY GROUPING SETS ((rule_cxf), ())
+HAVING grouping(rule_cxf) = 1 OR rule_cxf IS NOT NULL""".format(fi=fi, ff=ff)
+
+
+def temas_original(fi, ff):
+    return """SELECT DISTINCT session_id,
+       DATE(creation_time) as creation_time,
+       id,
+       message
+FROM "caba-piba-consume-zone-db"."boti_message_metrics_2"
+WHERE CAST(session_creation_time AS DATE) BETWEEN date '{fi}' AND date '{ff}'
+  AND msg_from = 'user'
+  AND message IS NOT NULL
+  AND message_type = 'Text'
+  AND LENGTH(message) > 2
+  AND COMPREHENSION_TYPE != 'Answer to question'""".format(fi=fi, ff=ff)
+
+
+def trasco_original(fi, ff):
+    return """SELECT DISTINCT
+    m.rule_name AS "Name",
+    m.topic_path AS "Topic path",
+    ELEMENT_AT(SPLIT(m.topic_path, '/'), CARDINALITY(SPLIT(m.topic_path, '/'))) AS "Topic"
+FROM "caba-piba-consume-zone-db"."boti_message_metrics_2" m
+WHERE CAST(m.creation_time AS DATE) BETWEEN date '{fi}' AND date '{ff}'
+  AND m.rule_name IS NOT NULL
+  AND m.rule_name NOT LIKE '%push%'
+  AND m.rule_name NOT LIKE '%PUSH%'
+GROUP BY m.topic_path, m.rule_name""".format(fi=fi, ff=ff)
+
+
+QUERIES = {
+    'usuarios': (usuarios_original, usuarios.build_query),
+    'sesiones_abiertas': (sesiones_abiertas_original, sesiones_abiertas.build_query),
+    'pushes': (pushes_original, pushes.build_query),
+    'paquete': (paquete_original, paquete_metricas.build_query_paquete),
+    'temas': (temas_original, temas.build_query),
+    'trasco': (trasco_original, contenidos.build_query_trasco),
+}
+
+
+# ============================================================================
+# ATHENA (PRESTO) -> DUCKDB
+# ============================================================================
+
+def _if_de_dos_argumentos(sql):
+    '''IF(cond, valor) de Presto -> IF(cond, valor, NULL)'''
+    for inicio in reversed([m.end() for m in re.finditer(r'\bIF\(', sql, flags=re.IGNORECASE)]):
+        nivel, comas, pos = 1, 0, inicio
+        while nivel:
+            caracter = sql[pos]
+            if caracter == '(':
+                nivel += 1
+            elif caracter == ')':
+                nivel -= 1
+            elif caracter == ',' and nivel == 1:
+                comas += 1
+            pos += 1
+        if comas == 1:
+            sql = sql[:pos - 1] + ', NULL' + sql[pos - 1:]
+    return sql
+
+
+def a_duckdb(sql):
+    sql = re.sub(r'\bregexp_like\(', 'regexp_matches(', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bSPLIT\(', 'string_split(', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bELEMENT_AT\(', 'list_extract(', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bCARDINALITY\(', 'len(', sql, flags=re.IGNORECASE)
+    return _if_de_dos_argumentos(sql)
+
+
+# ============================================================================
+# DATOS DE PRUEBA
+# ============================================================================
+
+def _particion(fecha, rnd, margen=2):
+    dia = fecha.date() + timedelta(days=rnd.randint(-margen, margen))
+    return str(dia.year), str(dia.month), str(dia.day)
+
+
+def _generar(rnd):
+    sesiones, mensajes, eventos = [], [], []
+    causas = ['push', 'user', 'api', None]
+    reglas = ['Regla CXF A', 'Regla CXF B', 'Tramites', 'push campaña', 'PUSH masivo', None]
+    textos = ['Template aviso', 'Template recordatorio', 'hola quiero un turno', 'ok', 'reset',
+              'consulta sobre licencia de conducir', None]
+    for i in range(1500):
+        usuario = 'u{:019d}'.format(rnd.randrange(400))
+        session_id = '{}-s{:05d}'.format(usuario, i)
+        inicio = datetime.combine(DESDE, datetime.min.time()) + timedelta(
+            minutes=rnd.randrange(DIAS * 24 * 60))
+        sesiones.append((session_id, inicio, rnd.choice(causas)) + _particion(inicio, rnd))
+        for j in range(rnd.randint(1, 6)):
+            creado = inicio + timedelta(minutes=rnd.randrange(23 * 60))
+            # particion a +-1 dia del inicio de la sesion: a lo sumo 2 dias del mensaje
+            dia = inicio.date() + timedelta(days=rnd.randint(-1, 1))
+            mensajes.append((
+                session_id, '{}-m{}'.format(session_id, j), creado, inicio,
+                rnd.choice(['user', 'bot']), rnd.choice(textos), rnd.choice(['Text', 'Button']),
+                rnd.choice(['Answer to question', 'Other']), rnd.choice(reglas),
+                rnd.choice(['tramites/licencias', 'salud/turnos/pediatria', 'a']),
+                str(dia.year), str(dia.month), str(dia.day)
+            ))
+        for _ in range(rnd.randint(0, 3)):
+            # eventos hasta 20 dias despues del inicio de la sesion (y de sus mensajes)
+            creado = inicio + timedelta(minutes=rnd.randrange(20 * 24 * 60))
+            eventos.append((session_id, creado, rnd.choice(['notification-status-sent', 'otro']))
+                           + _particion(creado, rnd))
+    return sesiones, mensajes, eventos
+
+
+@pytest.fixture(scope='module')
+def conexion():
+    con = duckdb.connect()
+    con.execute("ATTACH ':memory:' AS {}".format(BASE))
+    con.execute('CREATE TABLE {}.boti_session_metrics_2 (session_id VARCHAR, session_creation_time TIMESTAMP, '
+                'starting_cause VARCHAR, year VARCHAR, month VARCHAR, day VARCHAR)'.format(BASE))
+    con.execute('CREATE TABLE {}.boti_message_metrics_2 (session_id VARCHAR, id VARCHAR, creation_time TIMESTAMP, '
+                'session_creation_time TIMESTAMP, msg_from VARCHAR, message VARCHAR, message_type VARCHAR, '
+                'comprehension_type VARCHAR, rule_name VARCHAR, topic_path VARCHAR, '
+                'year VARCHAR, month VARCHAR, day VARCHAR)'.format(BASE))
+    con.execute('CREATE TABLE {}.boti_event_metrics_2 (session_id VARCHAR, creation_time TIMESTAMP, '
+                'events_name VARCHAR, year VARCHAR, month VARCHAR, day VARCHAR)'.format(BASE))
+    sesiones, mensajes, eventos = _generar(random.Random(5))
+    con.executemany('INSERT INTO {}.boti_session_metrics_2 VALUES (?, ?, ?, ?, ?, ?)'.format(BASE), sesiones)
+    con.executemany('INSERT INTO {}.boti_message_metrics_2 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+                    .format(BASE), mensajes)
+    con.executemany('INSERT INTO {}.boti_event_metrics_2 VALUES (?, ?, ?, ?, ?, ?)'.format(BASE), eventos)
+    yield con
+    con.close()
+
+
+def ejecutar(con, sql):
+    df = con.execute(a_duckdb(sql)).fetchdf()
+    df.columns = [c.lower() for c in df.columns]
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def _rangos():
+    fijos = [('2024-12-01', '2024-12-31'), ('2025-01-01', '2025-01-31'), ('2025-02-01', '2025-02-28'),
+             ('2024-12-15', '2025-01-15'), ('2024-12-31', '2025-01-01'), ('2025-01-10', '2025-01-10'),
+             ('2025-01-30', '2025-02-02'), ('2024-12-01', '2025-02-28')]
+    rnd = random.Random(3)
+    aleatorios = []
+    for _ in range(6):
+        inicio = DESDE + timedelta(days=rnd.randrange(DIAS - 10))
+        fin = min(inicio + timedelta(days=rnd.randrange(45)), DESDE + timedelta(days=DIAS - 1))
+        aleatorios.append((inicio.isoformat(), fin.isoformat()))
+    return fijos + aleatorios
+
+
+@pytest.mark.parametrize('nombre', sorted(QUERIES))
+@pytest.mark.parametrize('fi,ff', _rangos())
+def test_mismo_resultado_que_la_query_original(conexion, nombre, fi, ff):
+    original, con_particiones = QUERIES[nombre]
+    esperado = ejecutar(conexion, original(fi, ff))
+    obtenido = ejecutar(conexion, con_particiones(fi, ff))
+    pd.testing.assert_frame_equal(obtenido, esperado, check_dtype=False)
+
+
+@pytest.mark.parametrize('nombre', sorted(QUERIES))
+def test_datos_no_triviales(conexion, nombre):
+    '''El mes de prueba tiene filas en todas las queries (la comparacion no es vacia)'''
+    df = ejecutar(conexion, QUERIES[nombre][0]('2025-01-01', '2025-01-31'))
+    assert len(df) > 0
+    assert (df.select_dtypes('number') > 0).all().all()
+
+
+def test_pushes_por_mes_igual_a_cada_mes(conexion):
+    meses = [(2024, 12), (2025, 1), (2025, 2)]
+    agrupado = ejecutar(conexion, pushes.build_query_por_mes(meses))
+    for mes in meses:
+        fila = agrupado[agrupado[por_mes.COLUMNA_MES] == por_mes.etiqueta(mes)]
+        esperado = ejecutar(conexion, pushes_original(*por_mes.rango_mes(mes)))
+        assert int(fila['count_messages'].iloc[0]) == int(esperado['count_messages'].iloc[0])
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+'''Orden de ejecucion de run_all.py con la cadena de No_Entendidos en el pool'''
+import threading
+
+import pytest
+
+import run_all
+from comun import athena
+
+
+@pytest.fixture
+def ejecutados(monkeypatch):
+    '''ejecutar_modulo falso: registra el orden y falla los scripts de `fallan`'''
+    orden = []
+    lock = threading.Lock()
+
+    def ejecutar(modulo, numero, total, carpeta_logs, libreria=None, contexto=None):
+        with lock:
+            orden.append(run_all.clave_modulo(modulo))
+        return {'nombre': modulo['nombre'], 'exitoso': run_all.clave_modulo(modulo) not in ejecutar.fallan,
+                'duracion': 0, 'mensaje': ''}
+
+    ejecutar.fallan = set()
+    ejecutar.orden = orden
+    monkeypatch.setattr(run_all, 'ejecutar_modulo', ejecutar)
+    return ejecutar
+
+
+def test_dependencias_validas():
+    assert run_all.validar_dependencias(run_all.MODULOS) == []
+
+
+def test_no_entendidos_despues_del_connector_y_antes_del_consolidado(ejecutados, tmp_path):
+    resultados = run_all.ejecutar_en_paralelo(run_all.MODULOS, 4, {}, str(tmp_path))
+    orden = ejecutados.orden
+    assert len(resultados) == len(run_all.MODULOS)
+    assert orden.index('athena_connector.py') < orden.index('No_Entendidos.py') < orden.index('consolidar_excel.py')
+    assert orden[-1] == 'consolidar_excel.py'
+
+
+def test_connector_fallido_omite_no_entendidos_y_consolidado(ejecutados, tmp_path):
+    ejecutados.fallan = {'athena_connector.py'}
+    resultados = run_all.ejecutar_en_paralelo(run_all.MODULOS, 4, {}, str(tmp_path))
+    assert 'No_Entendidos.py' not in ejecutados.orden
+    assert 'consolidar_excel.py' not in ejecutados.orden
+    omitidos = [r['nombre'] for r in resultados if r['mensaje'].startswith('Omitido')]
+    assert omitidos == ['No Entendimiento', 'Consolidado']
+
+
+def test_no_entendidos_manual_queda_resuelto(ejecutados, tmp_path):
+    modulos = [m for m in run_all.MODULOS if m['carpeta'] != 'No_Entendidos']
+    resueltos = {'athena_connector.py': True, 'No_Entendidos.py': True}
+    run_all.ejecutar_en_paralelo(modulos, 4, resueltos, str(tmp_path))
+    assert 'No_Entendidos.py' not in ejecutados.orden
+    assert ejecutados.orden[-1] == 'consolidar_excel.py'
+
+
+def test_connector_se_importa_en_proceso():
+    modulos = [m for m in run_all.MODULOS if run_all.clave_modulo(m) == 'athena_connector.py']
+    cargados, errores = run_all.importar_modulos_en_proceso(modulos)
+    assert errores == {}
+    assert hasattr(cargados['athena_connector.py'], 'consultas')
+
+
+def test_envio_anticipado_respeta_el_transporte_del_modulo(monkeypatch):
+    class Gestor:
+        enviadas = []
+
+        def enviar(self, query, log=None, transporte='csv'):
+            self.enviadas.append((query, transporte))
+
+    class Libreria:
+        @staticmethod
+        def consultas():
+            return [('SELECT * FROM mensajes', 'csv'), 'SELECT * FROM clicks']
+
+    contexto = type('Contexto', (), {'gestor': Gestor(), 'database': 'db', 'workgroup': 'wg'})()
+    monkeypatch.setattr(run_all.cache_consultas, 'esta_en_cache', lambda *a, **k: False)
+    monkeypatch.delenv(athena.ENV_TRANSPORTE, raising=False)
+    run_all.enviar_consultas_anticipadas({'modulo.py': Libreria}, contexto)
+    assert Gestor.enviadas == [('SELECT * FROM mensajes', 'csv'), ('SELECT * FROM clicks', 'unload')]
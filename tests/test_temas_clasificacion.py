@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+'''clasificar_serie() (regex por prioridad) contra clasificar() fila por fila'''
+import random
+
+import numpy as np
+import pandas as pd
+
+from conftest import importar_temas
+
+temas = importar_temas()
+
+
+# Palabras clave con acentos, mayusculas, metacaracteres de regex y
+# solapamientos entre categorias (una contiene a otra de menor prioridad)
+CATEGORIAS_PRUEBA = {
+    'Metacaracteres': ['c++', 'a.b', '(x)', '[ok]', 'u$d', '^inicio', 'fin$', 'a|b', '\\d', '?', '*'],
+    'Acentos': ['médico', 'información', 'ñandú'],
+    'Mayusculas': ['ABL', 'Patente'],
+    'Largo': ['turno medico'],
+    'Corto': ['turno', 'medic'],
+}
+ORDEN_PRUEBA = ['Metacaracteres', 'Acentos', 'Mayusculas', 'Largo', 'Corto']
+
+TEXTOS = [
+    None, np.nan, pd.NA, 5, 3.2, True, b'turno', '', '   ',
+    'quiero un turno medico', 'TURNO MEDICO', 'Turno', 'medico',
+    'programo en c++', 'c+', 'aXb', 'a.b', 'tengo (x) y [ok]', 'x', 'ok',
+    '100 u$d', 'u', 'd', 'fin', 'fin$ extra', 'ab', 'a|b', '\\d', '9',
+    'hola?', 'hola*', 'hola', '^inicio', 'inicio',
+    'Médico de guardia', 'MÉDICO', 'medico sin acento', 'más INFORMACIÓN',
+    'ÑANDÚ', 'nandu', 'abl', 'ABL', 'patente', 'PATENTE',
+    'turno medico (x)', 'médico turno',
+]
+
+
+def _comparar(serie, patrones=None):
+    esperado = serie.apply(temas.clasificar)
+    obtenido = temas.clasificar_serie(serie, patrones)
+    pd.testing.assert_series_equal(obtenido, esperado, check_dtype=False, check_names=False)
+
+
+def test_categorias_reales():
+    _comparar(pd.Series(TEXTOS * 3, dtype=object))
+
+
+def test_palabras_clave_de_las_categorias():
+    palabras = [p for ps in temas.CATEGORIAS.values() for p in ps]
+    variantes = palabras + [p.upper() for p in palabras] + ['xx ' + p + ' yy' for p in palabras]
+    _comparar(pd.Series(variantes, dtype=object))
+
+
+def test_categorias_con_metacaracteres_y_solapamientos(monkeypatch):
+    monkeypatch.setattr(temas, 'CATEGORIAS', CATEGORIAS_PRUEBA)
+    monkeypatch.setattr(temas, 'ORDEN_PRIORIDAD', ORDEN_PRUEBA)
+    patrones = temas.compilar_patrones(CATEGORIAS_PRUEBA, ORDEN_PRUEBA)
+    _comparar(pd.Series(TEXTOS, dtype=object), patrones)
+
+
+def test_textos_aleatorios(monkeypatch):
+    monkeypatch.setattr(temas, 'CATEGORIAS', CATEGORIAS_PRUEBA)
+    monkeypatch.setattr(temas, 'ORDEN_PRIORIDAD', ORDEN_PRUEBA)
+    patrones = temas.compilar_patrones(CATEGORIAS_PRUEBA, ORDEN_PRUEBA)
+    rnd = random.Random(11)
+    piezas = [p for ps in CATEGORIAS_PRUEBA.values() for p in ps] + list('abcdxyz .$()[]|^É')
+    textos = [''.join(rnd.choice(piezas) for _ in range(rnd.randint(0, 6))) for _ in range(2000)]
+    textos = [t.upper() if rnd.random() < 0.2 else t for t in textos] + [None] * 10
+    _comparar(pd.Series(textos, dtype=object), patrones)
+
+
+def test_conserva_el_indice():
+    serie = pd.Series(['turno', None, 'hola'], index=[10, 3, 7], dtype=object)
+    assert list(temas.clasificar_serie(serie).index) == [10, 3, 7]
+    assert temas.clasificar_serie(serie.iloc[:0]).empty
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+'''Transporte de Athena (CSV / UNLOAD) por filas esperadas (comun.athena.elegir_transporte)'''
+import pytest
+
+from comun import athena, diario
+from conftest import importar_script, importar_temas
+
+AGREGADA = 'SELECT dia, count(*) FROM t GROUP BY 1'
+DETALLE = 'SELECT session_id, message FROM t'
+
+
+@pytest.fixture(autouse=True)
+def sin_forzar(monkeypatch):
+    monkeypatch.delenv(athena.ENV_TRANSPORTE, raising=False)
+
+
+def test_sin_estimacion_decide_el_texto_de_la_query():
+    assert athena.elegir_transporte(AGREGADA) == 'csv'
+    assert athena.elegir_transporte(DETALLE) == 'unload'
+
+
+def test_la_estimacion_manda_sobre_el_texto():
+    assert athena.elegir_transporte(AGREGADA, athena.FILAS_UNLOAD) == 'unload'
+    assert athena.elegir_transporte(DETALLE, athena.FILAS_UNLOAD - 1) == 'csv'
+
+
+def test_la_variable_de_entorno_manda_sobre_la_estimacion(monkeypatch):
+    monkeypatch.setenv(athena.ENV_TRANSPORTE, 'csv')
+    assert athena.elegir_transporte(DETALLE, 10 ** 7) == 'csv'
+
+
+def test_diario_bosquejos_de_varios_dias_van_por_unload(tmp_path, monkeypatch):
+    monkeypatch.setattr(diario, 'ALMACEN', str(tmp_path / 'diario.sqlite'))
+    # GROUP BY, pero 16.384 filas por dia por HyperLogLog
+    [(query, transporte)] = diario.consultas('usuarios_conversaciones', '2026-03-01', '2026-03-31')
+    assert 'GROUP BY' in query and transporte == 'unload'
+    [(_, transporte)] = diario.consultas('pushes_enviadas', '2026-03-01', '2026-03-01')
+    assert transporte == 'csv'
+
+
+def test_contenidos_resultado_chico_va_por_csv():
+    contenidos = importar_script('Contenidos_mas_disparados/Contenidos_mas_disparados.py',
+                                 'contenidos_mas_disparados')
+    filas = contenidos.filas_estimadas_vista('2026-03-01', '2026-03-31')
+    assert filas < athena.FILAS_UNLOAD
+    # Sin agregar en el SELECT de afuera: por el texto hubiera sido UNLOAD
+    query = contenidos.build_query('2026-03-01', '2026-03-31')
+    assert athena.elegir_transporte(query) == 'unload'
+    assert athena.elegir_transporte(query, filas) == 'csv'
+
+
+def test_temas_detalle_de_mensajes_va_por_unload():
+    temas = importar_temas()
+    assert athena.elegir_transporte('', temas.filas_estimadas('2026-02-01', '2026-03-31')) == 'unload'